@@ -117,18 +117,17 @@ function App() {
     // Handle Responses from Gravity Agent
     socket.on('response', (data) => {
       console.log("Gravity Response:", data);
+      handleResponse(data);
+    });
 
-      if (data.type === 'text') {
-        // Text Response
-        addMessage('ADA', data.content);
-        speakText(data.content);
-      }
-      else if (data.type === 'play_youtube') {
-        // YouTube Response
-        addMessage('ADA', data.content); // "Playing: X"
-        setVideoData({ videoId: data.video_id, title: data.title });
-        speakText(`Playing ${data.title}`);
-      }
+    // Streaming replies: partial text first, then the final payload
+    socket.on('response_chunk', (data) => {
+      appendStreamChunk(data.content);
+    });
+
+    socket.on('response_done', (data) => {
+      console.log("Gravity Response (stream):", data);
+      handleResponse(data);
     });
 
     return () => {
@@ -137,6 +136,8 @@ function App() {
       socket.off('disconnect');
       socket.off('status');
       socket.off('response');
+      socket.off('response_chunk');
+      socket.off('response_done');
     };
   }, [socket]);
 
@@ -144,6 +145,46 @@ function App() {
     setMessages(prev => [...prev, { sender, text }]);
   };
 
+  // Grows the in-progress ADA message, starting one if needed
+  const appendStreamChunk = (chunk) => {
+    setMessages(prev => {
+      const last = prev[prev.length - 1];
+      if (last && last.streaming) {
+        return [...prev.slice(0, -1), { ...last, text: last.text + chunk }];
+      }
+      return [...prev, { sender: 'ADA', text: chunk, streaming: true }];
+    });
+  };
+
+  // Replaces the in-progress message (if any) with the final text
+  const finishMessage = (text) => {
+    setMessages(prev => {
+      const last = prev[prev.length - 1];
+      if (last && last.streaming) {
+        return [...prev.slice(0, -1), { sender: 'ADA', text }];
+      }
+      return [...prev, { sender: 'ADA', text }];
+    });
+  };
+
+  const handleResponse = (data) => {
+    if (data.type === 'text') {
+      // Text Response
+      finishMessage(data.content);
+      speakText(data.content);
+    }
+    else if (data.type === 'play_youtube') {
+      // YouTube Response
+      finishMessage(data.content); // "Playing: X"
+      setVideoData({ videoId: data.video_id, title: data.title });
+      speakText(`Playing ${data.title}`);
+    }
+    else if (data.type === 'busy') {
+      // Server queue is full; show the notice without reading it aloud
+      finishMessage(data.content);
+    }
+  };
+
   // --- TTS FUNCTION ---
   const speakText = (text) => {
     if (!window.speechSynthesis) return;
@@ -182,7 +223,8 @@ function App() {
     // Send to Backend
     socket.emit('user_input', {
       text: inputText,
-      owner_verified: true // Assuming local device is trusted for now
+      owner_verified: true, // Assuming local device is trusted for now
+      stream: true
     });
 
     setInputText('');
@@ -1,3 +1,4 @@
+import logging
 import asyncio
 import base64
 import io
@@ -5,36 +6,58 @@ import os
 import sys
 import traceback
 from dotenv import load_dotenv
-import cv2
-import pyaudio
-import PIL.Image
-import mss
 import argparse
 import math
-import struct
 import time
-import mediapipe as mp
-try:
-    # Check for DISPLAY on Linux/Cloud to avoid crashing before import if possible
-    # (Though pyautogui import usually checks this, explicit check is safer)
-    if sys.platform != 'win32' and not os.environ.get('DISPLAY'):
-        raise ImportError("Headless environment detected (No DISPLAY var)")
-
-    import pyautogui
-    # Fail-safe: moving mouse to corner throws exception
-    pyautogui.FAILSAFE = False
-    HAS_SCREEN = True
-except (ImportError, OSError, Exception) as e:
-    print(f"PyAutoGUI not available (Headless/Cloud Mode): {e}")
-    HAS_SCREEN = False
-    class MockPyAutoGUI:
-        def failSafeCheck(self): pass
-        def size(self): return (1920, 1080)
-        def moveTo(self, x, y): pass
-        def click(self): pass
-    pyautogui = MockPyAutoGUI()
 import numpy as np
 
+from agent_registry import AgentRegistry, LazyModule, load_class
+from media_payloads import decode_upload, legacy_payload, to_base64
+from scheduler import INTERACTIVE, TOOL, TaskScheduler
+from vad import SpeechGate
+from audio_capture import CaptureThread
+from audio_playback import AudioPlayback
+from audio_framing import AudioFramer, measure_rtt
+from audio_uplink import UplinkEncoder
+
+logger = logging.getLogger("klistar.ada")
+
+# Heavy native modules load on first use, not at import (see agent_registry.py)
+cv2 = LazyModule("cv2")
+pyaudio = LazyModule("pyaudio")
+mp = LazyModule("mediapipe")
+Image = LazyModule("PIL.Image")
+
+class MockPyAutoGUI:
+    def failSafeCheck(self): pass
+    def size(self): return (1920, 1080)
+    def moveTo(self, x, y): pass
+    def click(self): pass
+
+_pyautogui = None
+HAS_SCREEN = None  # Unknown until get_pyautogui() runs
+
+def get_pyautogui():
+    """Imports pyautogui on first use, falling back to a mock when headless."""
+    global _pyautogui, HAS_SCREEN
+    if _pyautogui is None:
+        try:
+            # Check for DISPLAY on Linux/Cloud to avoid crashing before import if possible
+            # (Though pyautogui import usually checks this, explicit check is safer)
+            if sys.platform != 'win32' and not os.environ.get('DISPLAY'):
+                raise ImportError("Headless environment detected (No DISPLAY var)")
+
+            import pyautogui
+            # Fail-safe: moving mouse to corner throws exception
+            pyautogui.FAILSAFE = False
+            HAS_SCREEN = True
+            _pyautogui = pyautogui
+        except (ImportError, OSError, Exception) as e:
+            logger.info("PyAutoGUI not available (Headless/Cloud Mode): %s", e)
+            HAS_SCREEN = False
+            _pyautogui = MockPyAutoGUI()
+    return _pyautogui
+
 from google import genai
 from google.genai import types
 
@@ -44,17 +67,35 @@ if sys.version_info < (3, 11, 0):
     asyncio.ExceptionGroup = exceptiongroup.ExceptionGroup
 
 from tools import tools_list
+from logging_setup import setup_logging
 
-FORMAT = pyaudio.paInt16
+FORMAT = 8  # pyaudio.paInt16, literal so pyaudio isn't imported at startup
 CHANNELS = 1
 SEND_SAMPLE_RATE = 16000
 RECEIVE_SAMPLE_RATE = 24000
-CHUNK_SIZE = 1024
+CHUNK_SIZE = 320  # 20 ms mic reads; AudioFramer decides how much goes in each message
 
 MODEL = "models/gemini-2.5-flash-native-audio-preview-12-2025"
 DEFAULT_MODE = "camera"
 
 load_dotenv()
+AUDIO_RING_FRAMES = int(os.getenv("GRAVITY_AUDIO_RING_FRAMES", 100))  # ~2 s of mic audio at CHUNK_SIZE
+# Mic audio per Live message (see audio_framing.py); with adapt on the size
+# follows websocket RTT, probed every RTT_PROBE_INTERVAL seconds
+AUDIO_FRAME_MS = int(os.getenv("GRAVITY_AUDIO_FRAME_MS", 60))
+AUDIO_FRAME_MIN_MS = int(os.getenv("GRAVITY_AUDIO_FRAME_MIN_MS", 20))
+AUDIO_FRAME_MAX_MS = int(os.getenv("GRAVITY_AUDIO_FRAME_MAX_MS", 200))
+AUDIO_FRAME_ADAPT = os.getenv("GRAVITY_AUDIO_FRAME_ADAPT", "1") != "0"
+RTT_PROBE_INTERVAL = 5.0
+# Mic audio codecs to offer, best first, and the MIME types the Live endpoint
+# takes; the session uses PCM unless both sides have something better (see audio_uplink.py)
+UPLINK_CODECS = [name.strip() for name in os.getenv("GRAVITY_UPLINK_CODEC", "pcm").split(",") if name.strip()]
+UPLINK_ACCEPTS = [mime.strip() for mime in os.getenv("GRAVITY_UPLINK_ACCEPTS", "audio/pcm").split(",") if mime.strip()]
+# Model audio playback (see audio_playback.py): seconds per device write, which
+# bounds barge-in latency, prebuffer target and the most audio held
+PLAYBACK_PERIOD = 0.02
+PLAYBACK_TARGET_MS = float(os.getenv("GRAVITY_PLAYBACK_TARGET_MS", 80))
+PLAYBACK_MAX_SECONDS = float(os.getenv("GRAVITY_PLAYBACK_MAX_SECONDS", 20))
 # client = genai.Client(http_options={"api_version": "v1beta"}, api_key=os.getenv("GEMINI_API_KEY"))
 # Moved client initialization to AudioLoop to prevent import-time crash
 
@@ -289,42 +330,44 @@ config = types.LiveConnectConfig(
     )
 )
 
-# Audio Initialization
+# Audio Initialization (on first use)
 pya = None
-try:
-    pya = pyaudio.PyAudio()
-except Exception as e:
-    print(f"[KlistarAi] [WARN] Failed to initialize PyAudio (Headless/Cloud Mode): {e}")
-
-# Safe Imports for Agents (Soft Fail)
-CadAgent = None
-WebAgent = None
-KasaAgent = None
-PrinterAgent = None
-
-try:
-    from cad_agent import CadAgent
-except Exception as e:
-    print(f"[KlistarAi] [WARN] CadAgent unavailable: {e}")
-
-try:
-    from web_agent import WebAgent
-except Exception as e:
-    print(f"[KlistarAi] [WARN] WebAgent unavailable: {e}")
-
-try:
-    from kasa_agent import KasaAgent
-except Exception as e:
-    print(f"[KlistarAi] [WARN] KasaAgent unavailable: {e}")
-
-try:
-    from printer_agent import PrinterAgent
-except Exception as e:
-    print(f"[KlistarAi] [WARN] PrinterAgent unavailable: {e}")
+_pya_failed = False
+
+def get_pyaudio():
+    """Returns the shared PyAudio instance, or None if audio is unavailable."""
+    global pya, _pya_failed
+    if pya is None and not _pya_failed:
+        try:
+            pya = pyaudio.PyAudio()
+        except Exception as e:
+            _pya_failed = True
+            logger.warning("Failed to initialize PyAudio (Headless/Cloud Mode): %s", e)
+    return pya
+
+# Tool agents: module and class, imported when a tool first needs them
+AGENT_CLASSES = {
+    "CadAgent": "cad_agent",
+    "WebAgent": "web_agent",
+    "KasaAgent": "kasa_agent",
+    "PrinterAgent": "printer_agent",
+}
+
+def __getattr__(name):
+    # Keeps `from ada import CadAgent` working without importing it at startup
+    # (None if the agent's dependencies are missing, as before)
+    if name in AGENT_CLASSES:
+        cls = load_class(AGENT_CLASSES[name], name)
+        globals()[name] = cls
+        return cls
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class AudioLoop:
-    def __init__(self, video_mode=DEFAULT_MODE, on_audio_data=None, on_video_frame=None, on_cad_data=None, on_web_data=None, on_transcription=None, on_tool_confirmation=None, on_cad_status=None, on_cad_thought=None, on_project_update=None, on_device_update=None, on_error=None, on_music_command=None, on_gesture=None, on_camera_toggle=None, on_hand_tracking_toggle=None, on_hand_landmarks=None, input_device_index=None, input_device_name=None, output_device_index=None, kasa_agent=None):
+    def __init__(self, video_mode=DEFAULT_MODE, on_audio_data=None, on_video_frame=None, on_cad_data=None, on_web_data=None, on_transcription=None, on_tool_confirmation=None, on_cad_status=None, on_cad_thought=None, on_project_update=None, on_device_update=None, on_error=None, on_music_command=None, on_gesture=None, on_camera_toggle=None, on_hand_tracking_toggle=None, on_hand_landmarks=None, input_device_index=None, input_device_name=None, output_device_index=None, kasa_agent=None, binary_media=False):
         self.video_mode = video_mode
+        # Media callbacks get raw bytes only if the relay emits them through
+        # media_payloads.MediaChannel; otherwise base64 strings, as before
+        self.binary_media = binary_media
         self.on_audio_data = on_audio_data
         self.on_video_frame = on_video_frame
         self.on_cad_data = on_cad_data
@@ -345,7 +388,9 @@ class AudioLoop:
         self.input_device_name = input_device_name
         self.output_device_index = output_device_index
 
-        self.audio_in_queue = None
+        self.playback = None  # AudioPlayback for model audio, created per session in run()
+        self.framer = None  # AudioFramer for mic audio, created per session in run()
+        self.uplink = None  # UplinkEncoder for mic audio, negotiated per session in run()
         self.out_queue = None
         self.paused = False
 
@@ -355,7 +400,7 @@ class AudioLoop:
         self._last_input_transcription = ""
         self._last_output_transcription = ""
 
-        self.audio_in_queue = None
+        self.playback = None
         self.out_queue = None
         self.paused = False
 
@@ -370,27 +415,17 @@ class AudioLoop:
             if self.on_cad_status:
                 self.on_cad_status(status_info)
         
-        if CadAgent:
-            self.cad_agent = CadAgent(on_thought=handle_cad_thought, on_status=handle_cad_status)
-        else:
-            self.cad_agent = None
-
-        if WebAgent:
-            self.web_agent = WebAgent()
-        else:
-            self.web_agent = None
-
+        # Agents are imported and built on first tool use
+        self.agents = AgentRegistry()
+        self.agents.register(
+            "cad", "cad_agent", "CadAgent",
+            factory=lambda cls: cls(on_thought=handle_cad_thought, on_status=handle_cad_status),
+        )
+        self.agents.register("web", "web_agent", "WebAgent")
+        self.agents.register("kasa", "kasa_agent", "KasaAgent")
+        self.agents.register("printer", "printer_agent", "PrinterAgent")
         if kasa_agent:
-            self.kasa_agent = kasa_agent
-        elif KasaAgent:
-             self.kasa_agent = KasaAgent()
-        else:
-             self.kasa_agent = None
-             
-        if PrinterAgent:
-            self.printer_agent = PrinterAgent()
-        else:
-            self.printer_agent = None
+            self.agents.provide("kasa", kasa_agent)
 
         self.send_text_task = None
         self.stop_event = asyncio.Event()
@@ -398,13 +433,13 @@ class AudioLoop:
         # Initialize Gemini Client Lazy Loded
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
-            print("[KlistarAi] [WARN] GEMINI_API_KEY not found. AI features will fail until key is set.")
+            logger.warning("GEMINI_API_KEY not found. AI features will fail until key is set.")
             self.client = None
         else:
             try:
                  self.client = genai.Client(http_options={"api_version": "v1beta"}, api_key=api_key)
             except Exception as e:
-                 print(f"[KlistarAi] [ERR] Failed to create Gemini Client: {e}")
+                 logger.error("Failed to create Gemini Client: %s", e)
                  self.client = None
         
         self.permissions = {} # Default Empty (Will treat unset as True)
@@ -412,9 +447,10 @@ class AudioLoop:
 
         # Video buffering state
         self._latest_image_payload = None
+        # Mic capture thread and its ring buffer, set while listen_audio runs
+        self.capture = None
         # VAD State
         self._is_speaking = False
-        self._silence_start_time = None
         
         # Stability: Logic to detect silent disconnects
         self.connection_lost_event = asyncio.Event()
@@ -427,6 +463,10 @@ class AudioLoop:
         # If ada.py is in backend/, project root is one up
         project_root = os.path.dirname(current_dir)
         self.project_manager = ProjectManager(project_root)
+
+        # Tool calls run under priority classes so CAD and web-agent runs
+        # can't crowd out quick file reads (see scheduler.py)
+        self.scheduler = TaskScheduler.from_env()
         
         # Sync Initial Project State
         if self.on_project_update:
@@ -435,6 +475,22 @@ class AudioLoop:
             # We will handle this by calling it in run() or just print for now.
             pass
 
+    @property
+    def cad_agent(self):
+        return self.agents.get("cad")
+
+    @property
+    def web_agent(self):
+        return self.agents.get("web")
+
+    @property
+    def kasa_agent(self):
+        return self.agents.get("kasa")
+
+    @property
+    def printer_agent(self):
+        return self.agents.get("printer")
+
     def flush_chat(self):
         """Forces the current chat buffer to be written to log."""
         if self.chat_buffer["sender"] and self.chat_buffer["text"].strip():
@@ -445,7 +501,7 @@ class AudioLoop:
         self._last_output_transcription = ""
 
     def update_permissions(self, new_perms):
-        print(f"[KlistarAi DEBUG] [CONFIG] Updating tool permissions: {new_perms}")
+        logger.debug("[CONFIG] Updating tool permissions: %s", new_perms)
         self.permissions.update(new_perms)
 
     def set_paused(self, paused):
@@ -455,37 +511,31 @@ class AudioLoop:
         self.stop_event.set()
         
     def resolve_tool_confirmation(self, request_id, confirmed):
-        print(f"[KlistarAi DEBUG] [RESOLVE] resolve_tool_confirmation called. ID: {request_id}, Confirmed: {confirmed}")
+        logger.debug("[RESOLVE] resolve_tool_confirmation called. ID: %s, Confirmed: %s", request_id, confirmed)
         if request_id in self._pending_confirmations:
             future = self._pending_confirmations[request_id]
             if not future.done():
-                print(f"[KlistarAi DEBUG] [RESOLVE] Future found and pending. Setting result to: {confirmed}")
+                logger.debug("[RESOLVE] Future found and pending. Setting result to: %s", confirmed)
                 future.set_result(confirmed)
             else:
-                 print(f"[KlistarAi DEBUG] [WARN] Request {request_id} future already done. Result: {future.result()}")
+                 logger.warning("Request %s future already done. Result: %s", request_id, future.result())
         else:
-            print(f"[KlistarAi DEBUG] [WARN] Confirmation Request {request_id} not found in pending dict. Keys: {list(self._pending_confirmations.keys())}")
+            logger.warning("Confirmation Request %s not found in pending dict. Keys: %s", request_id, list(self._pending_confirmations.keys()))
 
     def clear_audio_queue(self):
-        """Clears the queue of pending audio chunks to stop playback immediately."""
-        try:
-            count = 0
-            while not self.audio_in_queue.empty():
-                self.audio_in_queue.get_nowait()
-                count += 1
-            if count > 0:
-                print(f"[KlistarAi DEBUG] [AUDIO] Cleared {count} chunks from playback queue due to interruption.")
-        except Exception as e:
-            print(f"[KlistarAi DEBUG] [ERR] Failed to clear audio queue: {e}")
+        """Flushes buffered model audio to stop playback immediately (barge-in)."""
+        if self.playback:
+            self.playback.flush()
 
-    async def process_mobile_frame(self, b64_data):
+    def media_payload(self, event, payload):
+        """payload for a media callback: raw bytes with binary_media, else base64 as before."""
+        return payload if self.binary_media else legacy_payload(event, payload)
+
+    async def process_mobile_frame(self, frame_data):
         """Processes a frame from mobile for hand tracking and cursor control using reference logic."""
         try:
-            # 1. Decode Base64
-            if ',' in b64_data:
-                b64_data = b64_data.split(',')[1]
-            
-            img_bytes = base64.b64decode(b64_data)
+            # 1. Decode (binary attachment, or base64 from older clients)
+            img_bytes = decode_upload(frame_data)
             np_arr = np.frombuffer(img_bytes, np.uint8)
             frame = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
 
@@ -549,10 +599,10 @@ class AudioLoop:
                     
                     # Log Gesture
                     if gesture != "None":
-                         print(f" [G: {gesture}] ", end="", flush=True)
+                         logger.debug("[G: %s]", gesture)
 
                     # 5. Execute Actions
-                    screen_w, screen_h = pyautogui.size()
+                    screen_w, screen_h = get_pyautogui().size()
                     
                     if gesture == "Pointing" or gesture == "Open Palm":
                         x = int(lm[8].x * screen_w)
@@ -566,14 +616,14 @@ class AudioLoop:
                             self._last_click_time = 0
                         if current_time - self._last_click_time > 0.5:
                             # pyautogui.click() # Disabled for In-App Cursor
-                            print(f"[CLICK]", flush=True)
+                            logger.debug("[CLICK]")
                             self._last_click_time = current_time
 
             cv2.imshow("Backend Tracking Debug", debug_img)
             cv2.waitKey(1)
 
         except Exception as e:
-            print(f" [Track ERR: {e}] ", end="", flush=True)
+            logger.error("[Track ERR: %s]", e)
             pass
 
     async def send_frame(self, frame_data):
@@ -592,9 +642,28 @@ class AudioLoop:
             msg = await self.out_queue.get()
             await self.session.send(input=msg, end_of_turn=False)
 
+    async def probe_rtt(self):
+        """Feeds websocket round-trip times to the mic framer so frame size tracks the link."""
+        ws = getattr(self.session, "_ws", None)
+        if not hasattr(ws, "ping"):
+            logger.debug("[AUDIO] Live connection exposes no ping; audio frames stay at %s ms.", self.framer.frame_ms)
+            return
+        while True:
+            rtt = await measure_rtt(self.session)
+            if rtt is not None:
+                self.framer.observe_rtt(rtt)
+            await asyncio.sleep(RTT_PROBE_INTERVAL)
+
+    async def send_audio(self, frame):
+        if frame and self.out_queue:
+            message = self.uplink.message(frame)
+            if message:  # None while the codec buffers a partial packet
+                await self.out_queue.put(message)
+
     async def listen_audio(self):
+        pya = get_pyaudio()
         if pya is None:
-            print("[KlistarAi] [WARN] PyAudio not available. Audio features disabled.")
+            logger.warning("PyAudio not available. Audio features disabled.")
             while not self.stop_event.is_set():
                 await asyncio.sleep(1)
             return
@@ -605,7 +674,7 @@ class AudioLoop:
         resolved_input_device_index = None
         
         if self.input_device_name:
-            print(f"[KlistarAi] Attempting to find input device matching: '{self.input_device_name}'")
+            logger.info("Attempting to find input device matching: '%s'", self.input_device_name)
             count = pya.get_device_count()
             best_match = None
             
@@ -616,7 +685,7 @@ class AudioLoop:
                         name = info.get('name', '')
                         # Simple case-insensitive check
                         if self.input_device_name.lower() in name.lower() or name.lower() in self.input_device_name.lower():
-                             print(f"   Candidate {i}: {name}")
+                             logger.info("Candidate %s: %s", i, name)
                              # Prioritize exact match or very close match if possible, but first match is okay for now
                              resolved_input_device_index = i
                              best_match = name
@@ -625,21 +694,21 @@ class AudioLoop:
                     continue
             
             if resolved_input_device_index is not None:
-                print(f"[KlistarAi] Resolved input device '{self.input_device_name}' to index {resolved_input_device_index} ({best_match})")
+                logger.info("Resolved input device '%s' to index %s (%s)", self.input_device_name, resolved_input_device_index, best_match)
             else:
-                print(f"[KlistarAi] Could not find device matching '{self.input_device_name}'. Checking index...")
+                logger.info("Could not find device matching '%s'. Checking index...", self.input_device_name)
 
         # Fallback to index if Name lookup failed or wasn't provided
         if resolved_input_device_index is None and self.input_device_index is not None:
              try:
                  resolved_input_device_index = int(self.input_device_index)
-                 print(f"[KlistarAi] Requesting Input Device Index: {resolved_input_device_index}")
+                 logger.info("Requesting Input Device Index: %s", resolved_input_device_index)
              except ValueError:
-                 print(f"[KlistarAi] Invalid device index '{self.input_device_index}', reverting to default.")
+                 logger.info("Invalid device index '%s', reverting to default.", self.input_device_index)
                  resolved_input_device_index = None
 
         if resolved_input_device_index is None:
-             print("[KlistarAi] Using Default Input Device")
+             logger.info("Using Default Input Device")
 
         try:
             self.audio_stream = await asyncio.to_thread(
@@ -652,75 +721,60 @@ class AudioLoop:
                 frames_per_buffer=CHUNK_SIZE,
             )
         except OSError as e:
-            print(f"[KlistarAi] [ERR] Failed to open audio input stream: {e}")
-            print("[KlistarAi] [WARN] Audio features will be disabled. Please check microphone permissions.")
+            logger.error("Failed to open audio input stream: %s", e)
+            logger.warning("Audio features will be disabled. Please check microphone permissions.")
             return
 
-        if __debug__:
-            kwargs = {"exception_on_overflow": False}
-        else:
-            kwargs = {}
-        
-        # VAD Constants
-        VAD_THRESHOLD = 800 # Adj based on mic sensitivity (800 is conservative for 16-bit)
-        SILENCE_DURATION = 0.5 # Seconds of silence to consider "done speaking"
-        
-        while True:
-            if self.paused:
-                await asyncio.sleep(0.1)
-                continue
+        # Mic reads run on one dedicated thread into a ring buffer (see audio_capture.py)
+        capture = CaptureThread(self.audio_stream, CHUNK_SIZE, capacity=AUDIO_RING_FRAMES)
+        self.capture = capture
+        capture.start(asyncio.get_running_loop())
 
-            try:
-                data = await asyncio.to_thread(self.audio_stream.read, CHUNK_SIZE, **kwargs)
-                
-                # 1. Send Audio
-                if self.out_queue:
-                    await self.out_queue.put({"data": data, "mime_type": "audio/pcm"})
-                
-                # 2. VAD Logic for Video
-                # rms = audioop.rms(data, 2)
-                # Replacement for audioop.rms(data, 2)
-                count = len(data) // 2
-                if count > 0:
-                    shorts = struct.unpack(f"<{count}h", data)
-                    sum_squares = sum(s**2 for s in shorts)
-                    rms = int(math.sqrt(sum_squares / count))
-                else:
-                    rms = 0
-                
-                if rms > VAD_THRESHOLD:
-                    # Speech Detected
-                    self._silence_start_time = None
-                    
-                    if not self._is_speaking:
+        # Speech start/end for sending video frames (engine chosen by GRAVITY_VAD, see vad.py)
+        speech = SpeechGate.from_env(SEND_SAMPLE_RATE)
+
+        try:
+            while True:
+                if self.paused:
+                    capture.ring.discard()  # Audio captured while muted is never sent
+                    self.framer.reset()
+                    await asyncio.sleep(0.1)
+                    continue
+
+                data = await capture.ring.get()
+                try:
+                    # 1. Send Audio, in frames sized by the framer
+                    for frame in self.framer.push(data):
+                        await self.send_audio(frame)
+
+                    # 2. VAD Logic for Video
+                    event = speech.update(data)
+                    self._is_speaking = speech.speaking
+                    if event == "start":
                         # NEW Speech Utterance Started
-                        self._is_speaking = True
-                        print(f"[KlistarAi DEBUG] [VAD] Speech Detected (RMS: {rms}). Sending Video Frame.")
-                        
+                        logger.debug("[VAD] Speech Detected (RMS: %d). Sending Video Frame.", speech.level)
+
                         # Send ONE frame
                         if self._latest_image_payload and self.out_queue:
                             await self.out_queue.put(self._latest_image_payload)
                         else:
-                            print(f"[KlistarAi DEBUG] [VAD] No video frame available to send.")
-                            
-                else:
-                    # Silence
-                    if self._is_speaking:
-                        if self._silence_start_time is None:
-                            self._silence_start_time = time.time()
-                        
-                        elif time.time() - self._silence_start_time > SILENCE_DURATION:
-                            # Silence confirmed, reset state
-                            print(f"[KlistarAi DEBUG] [VAD] Silence detected. Resetting speech state.")
-                            self._is_speaking = False
-                            self._silence_start_time = None
+                            logger.debug("[VAD] No video frame available to send.")
+                    elif event == "end":
+                        logger.debug("[VAD] Silence detected. Resetting speech state.")
+                        # Don't hold the tail of an utterance back waiting for a full frame
+                        await self.send_audio(self.framer.flush())
 
-            except Exception as e:
-                print(f"Error reading audio: {e}")
-                await asyncio.sleep(0.1)
+                except Exception as e:
+                    logger.error("Error processing audio: %s", e)
+        finally:
+            # The stream is closed after this task ends; no read may be in flight then
+            await asyncio.to_thread(capture.stop)
+            stats = capture.stats()
+            if stats["overflows"] or stats["device_overflows"]:
+                logger.warning("Audio capture dropped frames: %s", stats)
 
     async def video_loop(self):
-        print("[KlistarAi] Starting Video Loop with Hand Tracking...")
+        logger.info("Starting Video Loop with Hand Tracking...")
         mp_hands = mp.solutions.hands
         mp_draw = mp.solutions.drawing_utils
         hands = mp_hands.Hands(
@@ -733,10 +787,10 @@ class AudioLoop:
         cap = await asyncio.to_thread(cv2.VideoCapture, 0)
         
         if not cap.isOpened():
-             print("[KlistarAi] [WARN] Could not open camera (Headless/No Camera). Hand tracking disabled.")
+             logger.warning("Could not open camera (Headless/No Camera). Hand tracking disabled.")
              return
         else:
-             print("[KlistarAi] Camera opened successfully.")
+             logger.info("Camera opened successfully.")
              
         cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
         cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
@@ -753,7 +807,7 @@ class AudioLoop:
                 
             ret, frame = await asyncio.to_thread(cap.read)
             if not ret:
-                print("[KlistarAi] [WARN] Failed to read frame from camera.")
+                logger.warning("Failed to read frame from camera.")
                 await asyncio.sleep(0.5)
                 continue
 
@@ -801,25 +855,25 @@ class AudioLoop:
             # Notify on change
             if current_gesture != last_gesture:
                 if current_gesture != "None":
-                    print(f"[KlistarAi] Gesture Detected: {current_gesture}")
+                    logger.info("Gesture Detected: %s", current_gesture)
                     if self.on_gesture:
                         self.on_gesture(current_gesture)
                 last_gesture = current_gesture
             
-            # SEND FRAME TO FRONTEND
+            # SEND FRAME TO FRONTEND (base64, or raw JPEG bytes for a MediaChannel relay)
             if self.on_video_frame:
                 _, buffer = cv2.imencode('.jpg', frame)
-                b64_frame = base64.b64encode(buffer).decode('utf-8')
-                self.on_video_frame(b64_frame)
+                frame_jpeg = buffer.tobytes()
+                self.on_video_frame(frame_jpeg if self.binary_media else to_base64(frame_jpeg))
 
             await asyncio.sleep(0.05) # Limit FPS slightly
         
         cap.release()
-        print("[KlistarAi] Video Loop Stopped.")
+        logger.info("Video Loop Stopped.")
 
 
     async def run(self):
-        print(f"[KlistarAi] Starting AudioLoop tasks...")
+        logger.info("Starting AudioLoop tasks...")
         
         # Start Video Loop
         asyncio.create_task(self.video_loop())
@@ -831,7 +885,7 @@ class AudioLoop:
         await asyncio.sleep(0.1) # Small delay to allow tasks to start
 
     async def handle_cad_request(self, prompt):
-        print(f"[KlistarAi DEBUG] [CAD] Background Task Started: handle_cad_request('{prompt}')")
+        logger.debug("[CAD] Background Task Started: handle_cad_request('%s')", prompt)
         if self.on_cad_status:
             self.on_cad_status("generating")
             
@@ -840,7 +894,7 @@ class AudioLoop:
             import datetime
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             new_project_name = f"Project_{timestamp}"
-            print(f"[KlistarAi DEBUG] [CAD] Auto-creating project: {new_project_name}")
+            logger.debug("[CAD] Auto-creating project: %s", new_project_name)
             
             success, msg = self.project_manager.create_project(new_project_name)
             if success:
@@ -851,7 +905,7 @@ class AudioLoop:
                     if self.on_project_update:
                          self.on_project_update(new_project_name)
                 except Exception as e:
-                    print(f"[KlistarAi DEBUG] [ERR] Failed to notify auto-project: {e}")
+                    logger.error("Failed to notify auto-project: %s", e)
 
         # Get project cad folder path
         cad_output_dir = str(self.project_manager.get_current_project_path() / "cad")
@@ -859,20 +913,20 @@ class AudioLoop:
         # Call the secondary agent with project path
         # Call the secondary agent with project path
         if not self.cad_agent:
-            print("[KlistarAi] [ERR] CadAgent is disabled.")
+            logger.error("CadAgent is disabled.")
             if self.on_error: self.on_error("CAD Agent is disabled in this environment.")
             return
 
         cad_data = await self.cad_agent.generate_prototype(prompt, output_dir=cad_output_dir)
         
         if cad_data:
-            print(f"[KlistarAi DEBUG] [OK] CadAgent returned data successfully.")
-            print(f"[KlistarAi DEBUG] [INFO] Data Check: {len(cad_data.get('vertices', []))} vertices, {len(cad_data.get('edges', []))} edges.")
+            logger.debug("[OK] CadAgent returned data successfully.")
+            logger.debug("[INFO] Data Check: %s vertices, %s edges.", len(cad_data.get('vertices', [])), len(cad_data.get('edges', [])))
             
             if self.on_cad_data:
-                print(f"[KlistarAi DEBUG] [SEND] Dispatching data to frontend callback...")
-                self.on_cad_data(cad_data)
-                print(f"[KlistarAi DEBUG] [SENT] Dispatch complete.")
+                logger.debug("[SEND] Dispatching data to frontend callback...")
+                self.on_cad_data(self.media_payload("cad_data", cad_data))
+                logger.debug("[SENT] Dispatch complete.")
             
             # Save to Project
             if 'file_path' in cad_data:
@@ -885,12 +939,12 @@ class AudioLoop:
             completion_msg = "System Notification: CAD generation is complete! The 3D model is now displayed for the user. Let them know it's ready."
             try:
                 await self.session.send(input=completion_msg, end_of_turn=True)
-                print(f"[KlistarAi DEBUG] [NOTE] Sent completion notification to model.")
+                logger.debug("[NOTE] Sent completion notification to model.")
             except Exception as e:
-                 print(f"[KlistarAi DEBUG] [ERR] Failed to send completion notification: {e}")
+                 logger.error("Failed to send completion notification: %s", e)
 
         else:
-            print(f"[KlistarAi DEBUG] [ERR] CadAgent returned None.")
+            logger.error("CadAgent returned None.")
             # Optionally notify failure
             try:
                 await self.session.send(input="System Notification: CAD generation failed.", end_of_turn=True)
@@ -900,14 +954,14 @@ class AudioLoop:
 
 
     async def handle_write_file(self, path, content):
-        print(f"[KlistarAi DEBUG] [FS] Writing file: '{path}'")
+        logger.debug("[FS] Writing file: '%s'", path)
         
         # Auto-create project if stuck in temp
         if self.project_manager.current_project == "temp":
             import datetime
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             new_project_name = f"Project_{timestamp}"
-            print(f"[KlistarAi DEBUG] [FS] Auto-creating project: {new_project_name}")
+            logger.debug("[FS] Auto-creating project: %s", new_project_name)
             
             success, msg = self.project_manager.create_project(new_project_name)
             if success:
@@ -918,7 +972,7 @@ class AudioLoop:
                     if self.on_project_update:
                          self.on_project_update(new_project_name)
                 except Exception as e:
-                    print(f"[KlistarAi DEBUG] [ERR] Failed to notify auto-project: {e}")
+                    logger.error("Failed to notify auto-project: %s", e)
         
         # Force path to be relative to current project
         # If absolute path is provided, we try to strip it or just ignore it and use basename
@@ -936,7 +990,7 @@ class AudioLoop:
         if not os.path.isabs(path):
              final_path = current_project_path / path
         
-        print(f"[KlistarAi DEBUG] [FS] Resolved path: '{final_path}'")
+        logger.debug("[FS] Resolved path: '%s'", final_path)
 
         try:
             # Ensure parent exists
@@ -947,14 +1001,14 @@ class AudioLoop:
         except Exception as e:
             result = f"Failed to write file '{path}': {str(e)}"
 
-        print(f"[KlistarAi DEBUG] [FS] Result: {result}")
+        logger.debug("[FS] Result: %s", result)
         try:
              await self.session.send(input=f"System Notification: {result}", end_of_turn=True)
         except Exception as e:
-             print(f"[KlistarAi DEBUG] [ERR] Failed to send fs result: {e}")
+             logger.error("Failed to send fs result: %s", e)
 
     async def handle_read_directory(self, path):
-        print(f"[KlistarAi DEBUG] [FS] Reading directory: '{path}'")
+        logger.debug("[FS] Reading directory: '%s'", path)
         try:
             if not os.path.exists(path):
                 result = f"Directory '{path}' does not exist."
@@ -964,14 +1018,14 @@ class AudioLoop:
         except Exception as e:
             result = f"Failed to read directory '{path}': {str(e)}"
 
-        print(f"[KlistarAi DEBUG] [FS] Result: {result}")
+        logger.debug("[FS] Result: %s", result)
         try:
              await self.session.send(input=f"System Notification: {result}", end_of_turn=True)
         except Exception as e:
-             print(f"[KlistarAi DEBUG] [ERR] Failed to send fs result: {e}")
+             logger.error("Failed to send fs result: %s", e)
 
     async def handle_read_file(self, path):
-        print(f"[KlistarAi DEBUG] [FS] Reading file: '{path}'")
+        logger.debug("[FS] Reading file: '%s'", path)
         try:
             if not os.path.exists(path):
                 result = f"File '{path}' does not exist."
@@ -982,28 +1036,28 @@ class AudioLoop:
         except Exception as e:
             result = f"Failed to read file '{path}': {str(e)}"
 
-        print(f"[KlistarAi DEBUG] [FS] Result: {result}")
+        logger.debug("[FS] Result: %s", result)
         try:
              await self.session.send(input=f"System Notification: {result}", end_of_turn=True)
         except Exception as e:
-             print(f"[KlistarAi DEBUG] [ERR] Failed to send fs result: {e}")
+             logger.error("Failed to send fs result: %s", e)
 
     async def handle_web_agent_request(self, prompt):
-        print(f"[KlistarAi DEBUG] [WEB] Web Agent Task: '{prompt}'")
+        logger.debug("[WEB] Web Agent Task: '%s'", prompt)
         
-        async def update_frontend(image_b64, log_text):
+        async def update_frontend(image_png, log_text):
             if self.on_web_data:
-                 self.on_web_data({"image": image_b64, "log": log_text})
+                 self.on_web_data(self.media_payload("browser_frame", {"image": image_png, "mime": "image/png", "log": log_text}))
                  
         # Run the web agent and wait for it to return
         result = await self.web_agent.run_task(prompt, update_callback=update_frontend)
-        print(f"[KlistarAi DEBUG] [WEB] Web Agent Task Returned: {result}")
+        logger.debug("[WEB] Web Agent Task Returned: %s", result)
         
         # Send the final result back to the main model
         try:
              await self.session.send(input=f"System Notification: Web Agent has finished.\nResult: {result}", end_of_turn=True)
         except Exception as e:
-             print(f"[KlistarAi DEBUG] [ERR] Failed to send web agent result to model: {e}")
+             logger.error("Failed to send web agent result to model: %s", e)
 
     async def receive_audio(self):
         "Background task to reads from the websocket and write pcm chunks to the output queue"
@@ -1013,7 +1067,9 @@ class AudioLoop:
                 async for response in turn:
                     # 1. Handle Audio Data
                     if data := response.data:
-                        self.audio_in_queue.put_nowait(data)
+                        self.playback.put(data)
+                        if self.on_audio_data:
+                            self.on_audio_data(data)
                         # NOTE: 'continue' removed here to allow processing transcription/tools in same packet
 
                     # 2. Handle Transcription (User & Model)
@@ -1058,7 +1114,7 @@ class AudioLoop:
                                             
                                             # Positive keywords
                                             if any(word in text_lower for word in ["yes", "allow", "approve", "confirm", "ok", "sure", "do it"]):
-                                                print(f"[KlistarAi DEBUG] [VOICE] Voice Confirmation Detected: '{text_lower}'")
+                                                logger.debug("[VOICE] Voice Confirmation Detected: '%s'", text_lower)
                                                 # Resolve the OLDEST pending confirmation
                                                 first_key = next(iter(self._pending_confirmations))
                                                 future = self._pending_confirmations[first_key]
@@ -1067,7 +1123,7 @@ class AudioLoop:
                                             
                                             # Negative keywords
                                             elif any(word in text_lower for word in ["no", "deny", "block", "cancel", "stop", "don't"]):
-                                                print(f"[KlistarAi DEBUG] [VOICE] Voice Denial Detected: '{text_lower}'")
+                                                logger.debug("[VOICE] Voice Denial Detected: '%s'", text_lower)
                                                 first_key = next(iter(self._pending_confirmations))
                                                 future = self._pending_confirmations[first_key]
                                                 if not future.done():
@@ -1107,7 +1163,7 @@ class AudioLoop:
 
                     # 3. Handle Tool Calls
                     if response.tool_call:
-                        print("The tool was called")
+                        logger.debug("The tool was called")
                         function_responses = []
                         for fc in response.tool_call.function_calls:
                             if fc.name in ["generate_cad", "run_web_agent", "write_file", "read_directory", "read_file", "create_project", "switch_project", "list_projects", "list_smart_devices", "control_light", "discover_printers", "print_stl", "get_print_status", "iterate_cad", "play_video", "toggle_camera", "toggle_hand_tracking"]:
@@ -1117,7 +1173,7 @@ class AudioLoop:
                                 confirmation_required = self.permissions.get(fc.name, True)
                                 
                                 if not confirmation_required:
-                                    print(f"[KlistarAi DEBUG] [TOOL] Permission check: '{fc.name}' -> AUTO-ALLOW")
+                                    logger.debug("[TOOL] Permission check: '%s' -> AUTO-ALLOW", fc.name)
                                     # Skip confirmation block and jump to execution
                                     pass
                                 else:
@@ -1125,7 +1181,7 @@ class AudioLoop:
                                     if self.on_tool_confirmation:
                                         import uuid
                                         request_id = str(uuid.uuid4())
-                                    print(f"[KlistarAi DEBUG] [STOP] Requesting confirmation for '{fc.name}' (ID: {request_id})")
+                                    logger.debug("[STOP] Requesting confirmation for '%s' (ID: %s)", fc.name, request_id)
                                     
                                     future = asyncio.Future()
                                     self._pending_confirmations[request_id] = future
@@ -1143,10 +1199,10 @@ class AudioLoop:
                                     finally:
                                         self._pending_confirmations.pop(request_id, None)
 
-                                    print(f"[KlistarAi DEBUG] [CONFIRM] Request {request_id} resolved. Confirmed: {confirmed}")
+                                    logger.debug("[CONFIRM] Request %s resolved. Confirmed: %s", request_id, confirmed)
 
                                     if not confirmed:
-                                        print(f"[KlistarAi DEBUG] [DENY] Tool call '{fc.name}' denied by user.")
+                                        logger.debug("[DENY] Tool call '%s' denied by user.", fc.name)
                                         function_response = types.FunctionResponse(
                                             id=fc.id,
                                             name=fc.name,
@@ -1158,7 +1214,7 @@ class AudioLoop:
                                         continue
 
                                     if not confirmed:
-                                        print(f"[KlistarAi DEBUG] [DENY] Tool call '{fc.name}' denied by user.")
+                                        logger.debug("[DENY] Tool call '%s' denied by user.", fc.name)
                                         function_response = types.FunctionResponse(
                                             id=fc.id,
                                             name=fc.name,
@@ -1171,16 +1227,16 @@ class AudioLoop:
 
                                 # If confirmed (or no callback configured, or auto-allowed), proceed
                                 if fc.name == "generate_cad":
-                                    print(f"\n[KlistarAi DEBUG] --------------------------------------------------")
-                                    print(f"[KlistarAi DEBUG] [TOOL] Tool Call Detected: 'generate_cad'")
-                                    print(f"[KlistarAi DEBUG] [IN] Arguments: prompt='{prompt}'")
+                                    logger.debug("--------------------------------------------------")
+                                    logger.debug("[TOOL] Tool Call Detected: 'generate_cad'")
+                                    logger.debug("[IN] Arguments: prompt='%s'", prompt)
                                     
-                                    asyncio.create_task(self.handle_cad_request(prompt))
+                                    self.scheduler.submit(self.handle_cad_request(prompt), TOOL, name="generate_cad")
                                     # No function response needed - model already acknowledged when user asked
                                 
                                 elif fc.name == "run_web_agent":
-                                    print(f"[KlistarAi DEBUG] [TOOL] Tool Call: 'run_web_agent' with prompt='{prompt}'")
-                                    asyncio.create_task(self.handle_web_agent_request(prompt))
+                                    logger.debug("[TOOL] Tool Call: 'run_web_agent' with prompt='%s'", prompt)
+                                    self.scheduler.submit(self.handle_web_agent_request(prompt), TOOL, name="run_web_agent")
                                     
                                     result_text = "Web Navigation started. Do not reply to this message."
                                     function_response = types.FunctionResponse(
@@ -1190,7 +1246,7 @@ class AudioLoop:
                                             "result": result_text,
                                         }
                                     )
-                                    print(f"[KlistarAi DEBUG] [RESPONSE] Sending function response: {function_response}")
+                                    logger.debug("[RESPONSE] Sending function response: %s", function_response)
                                     function_responses.append(function_response)
 
 
@@ -1198,8 +1254,8 @@ class AudioLoop:
                                 elif fc.name == "write_file":
                                     path = fc.args["path"]
                                     content = fc.args["content"]
-                                    print(f"[KlistarAi DEBUG] [TOOL] Tool Call: 'write_file' path='{path}'")
-                                    asyncio.create_task(self.handle_write_file(path, content))
+                                    logger.debug("[TOOL] Tool Call: 'write_file' path='%s'", path)
+                                    self.scheduler.submit(self.handle_write_file(path, content), INTERACTIVE, name="write_file")
                                     function_response = types.FunctionResponse(
                                         id=fc.id, name=fc.name, response={"result": "Writing file..."}
                                     )
@@ -1207,8 +1263,8 @@ class AudioLoop:
 
                                 elif fc.name == "read_directory":
                                     path = fc.args["path"]
-                                    print(f"[KlistarAi DEBUG] [TOOL] Tool Call: 'read_directory' path='{path}'")
-                                    asyncio.create_task(self.handle_read_directory(path))
+                                    logger.debug("[TOOL] Tool Call: 'read_directory' path='%s'", path)
+                                    self.scheduler.submit(self.handle_read_directory(path), INTERACTIVE, name="read_directory")
                                     function_response = types.FunctionResponse(
                                         id=fc.id, name=fc.name, response={"result": "Reading directory..."}
                                     )
@@ -1216,8 +1272,8 @@ class AudioLoop:
 
                                 elif fc.name == "read_file":
                                     path = fc.args["path"]
-                                    print(f"[KlistarAi DEBUG] [TOOL] Tool Call: 'read_file' path='{path}'")
-                                    asyncio.create_task(self.handle_read_file(path))
+                                    logger.debug("[TOOL] Tool Call: 'read_file' path='%s'", path)
+                                    self.scheduler.submit(self.handle_read_file(path), INTERACTIVE, name="read_file")
                                     function_response = types.FunctionResponse(
                                         id=fc.id, name=fc.name, response={"result": "Reading file..."}
                                     )
@@ -1225,7 +1281,7 @@ class AudioLoop:
 
                                 elif fc.name == "create_project":
                                     name = fc.args["name"]
-                                    print(f"[KlistarAi DEBUG] [TOOL] Tool Call: 'create_project' name='{name}'")
+                                    logger.debug("[TOOL] Tool Call: 'create_project' name='%s'", name)
                                     success, msg = self.project_manager.create_project(name)
                                     if success:
                                         # Auto-switch to the newly created project
@@ -1240,25 +1296,25 @@ class AudioLoop:
 
                                 elif fc.name == "switch_project":
                                     name = fc.args["name"]
-                                    print(f"[KlistarAi DEBUG] [TOOL] Tool Call: 'switch_project' name='{name}'")
+                                    logger.debug("[TOOL] Tool Call: 'switch_project' name='%s'", name)
                                     success, msg = self.project_manager.switch_project(name)
                                     if success:
                                         if self.on_project_update:
                                             self.on_project_update(name)
                                         # Gather project context and send to AI (silently, no response expected)
                                         context = self.project_manager.get_project_context()
-                                        print(f"[KlistarAi DEBUG] [PROJECT] Sending project context to AI ({len(context)} chars)")
+                                        logger.debug("[PROJECT] Sending project context to AI (%s chars)", len(context))
                                         try:
                                             await self.session.send(input=f"System Notification: {msg}\n\n{context}", end_of_turn=False)
                                         except Exception as e:
-                                            print(f"[KlistarAi DEBUG] [ERR] Failed to send project context: {e}")
+                                            logger.error("Failed to send project context: %s", e)
                                     function_response = types.FunctionResponse(
                                         id=fc.id, name=fc.name, response={"result": msg}
                                     )
                                     function_responses.append(function_response)
                                 
                                 elif fc.name == "list_projects":
-                                    print(f"[KlistarAi DEBUG] [TOOL] Tool Call: 'list_projects'")
+                                    logger.debug("[TOOL] Tool Call: 'list_projects'")
                                     projects = self.project_manager.list_projects()
                                     function_response = types.FunctionResponse(
                                         id=fc.id, name=fc.name, response={"result": f"Available projects: {', '.join(projects)}"}
@@ -1266,7 +1322,7 @@ class AudioLoop:
                                     function_responses.append(function_response)
 
                                 elif fc.name == "list_smart_devices":
-                                    print(f"[KlistarAi DEBUG] [TOOL] Tool Call: 'list_smart_devices'")
+                                    logger.debug("[TOOL] Tool Call: 'list_smart_devices'")
                                     
                                     if not self.kasa_agent:
                                          result_str = "KasaAgent is disabled (missing dependencies)."
@@ -1325,7 +1381,7 @@ class AudioLoop:
                                     brightness = fc.args.get("brightness")
                                     color = fc.args.get("color")
                                     
-                                    print(f"[KlistarAi DEBUG] [TOOL] Tool Call: 'control_light' Target='{target}' Action='{action}'")
+                                    logger.debug("[TOOL] Tool Call: 'control_light' Target='%s' Action='%s'", target, action)
                                     
                                     if not self.kasa_agent:
                                          result_msg = "KasaAgent is disabled."
@@ -1403,7 +1459,7 @@ class AudioLoop:
                                     function_responses.append(function_response)
 
                                 elif fc.name == "discover_printers":
-                                    print(f"[KlistarAi DEBUG] [TOOL] Tool Call: 'discover_printers'")
+                                    logger.debug("[TOOL] Tool Call: 'discover_printers'")
                                     
                                     if not self.printer_agent:
                                          result_str = "PrinterAgent is disabled."
@@ -1429,7 +1485,7 @@ class AudioLoop:
                                     printer = fc.args["printer"]
                                     profile = fc.args.get("profile")
                                     
-                                    print(f"[KlistarAi DEBUG] [TOOL] Tool Call: 'print_stl' STL='{stl_path}' Printer='{printer}'")
+                                    logger.debug("[TOOL] Tool Call: 'print_stl' STL='%s' Printer='%s'", stl_path, printer)
                                     
                                     if not self.printer_agent:
                                          result_str = "PrinterAgent is disabled."
@@ -1457,7 +1513,7 @@ class AudioLoop:
 
                                 elif fc.name == "get_print_status":
                                     printer = fc.args["printer"]
-                                    print(f"[KlistarAi DEBUG] [TOOL] Tool Call: 'get_print_status' Printer='{printer}'")
+                                    logger.debug("[TOOL] Tool Call: 'get_print_status' Printer='%s'", printer)
                                     
                                     if not self.printer_agent:
                                          result_str = "PrinterAgent is disabled."
@@ -1490,14 +1546,14 @@ class AudioLoop:
 
                                 elif fc.name == "iterate_cad":
                                     prompt = fc.args["prompt"]
-                                    print(f"[KlistarAi DEBUG] [TOOL] Tool Call: 'iterate_cad' Prompt='{prompt}'")
+                                    logger.debug("[TOOL] Tool Call: 'iterate_cad' Prompt='%s'", prompt)
                                     
                                     # Emit status
                                     if self.on_cad_status:
                                         self.on_cad_status("generating")
                                     
                                     if not self.cad_agent:
-                                         print("[KlistarAi] [ERR] CadAgent is disabled.")
+                                         logger.error("CadAgent is disabled.")
                                          if self.on_error: self.on_error("CAD Agent is disabled in this environment.")
                                          result_str = "CAD Agent is disabled due to missing dependencies."
                                     else:
@@ -1508,20 +1564,20 @@ class AudioLoop:
                                          cad_data = await self.cad_agent.iterate_prototype(prompt, output_dir=cad_output_dir)
                                          
                                          if cad_data:
-                                             print(f"[KlistarAi DEBUG] [OK] CadAgent iteration returned data successfully.")
+                                             logger.debug("[OK] CadAgent iteration returned data successfully.")
                                              
                                              # Dispatch to frontend
                                              if self.on_cad_data:
-                                                 print(f"[KlistarAi DEBUG] [SEND] Dispatching iterated CAD data to frontend...")
-                                                 self.on_cad_data(cad_data)
-                                                 print(f"[KlistarAi DEBUG] [SENT] Dispatch complete.")
+                                                 logger.debug("[SEND] Dispatching iterated CAD data to frontend...")
+                                                 self.on_cad_data(self.media_payload("cad_data", cad_data))
+                                                 logger.debug("[SENT] Dispatch complete.")
                                              
                                              # Save to Project
                                              self.project_manager.save_cad_artifact("output.stl", f"Iteration: {prompt}")
                                              
                                              result_str = f"Successfully iterated design: {prompt}. The updated 3D model is now displayed."
                                          else:
-                                             print(f"[KlistarAi DEBUG] [ERR] CadAgent iteration returned None.")
+                                             logger.error("CadAgent iteration returned None.")
                                              result_str = f"Failed to iterate design with prompt: {prompt}"
                                     
                                     function_response = types.FunctionResponse(
@@ -1532,7 +1588,7 @@ class AudioLoop:
                                 elif fc.name == "play_video":
                                     query = fc.args["query"]
                                     channel = fc.args.get("channel")
-                                    print(f"[KlistarAi DEBUG] [TOOL] Tool Call: 'play_video' Query='{query}' Channel='{channel}'")
+                                    logger.debug("[TOOL] Tool Call: 'play_video' Query='%s' Channel='%s'", query, channel)
                                     
                                     if self.on_video_command:
                                         self.on_video_command(query, channel)
@@ -1549,7 +1605,7 @@ class AudioLoop:
                                 
                                 elif fc.name == "toggle_camera":
                                     state = fc.args["state"]
-                                    print(f"[KlistarAi DEBUG] [TOOL] Toggle Camera: {state}")
+                                    logger.debug("[TOOL] Toggle Camera: %s", state)
                                     if self.on_camera_toggle:
                                         self.on_camera_toggle(state)
                                         res = f"Camera turned {'ON' if state else 'OFF'}."
@@ -1563,7 +1619,7 @@ class AudioLoop:
 
                                 elif fc.name == "toggle_hand_tracking":
                                     state = fc.args["state"]
-                                    print(f"[KlistarAi DEBUG] [TOOL] Toggle Hand Tracking: {state}")
+                                    logger.debug("[TOOL] Toggle Hand Tracking: %s", state)
                                     if self.on_hand_tracking_toggle:
                                         self.on_hand_tracking_toggle(state)
                                         res = f"Hand Tracking turned {'ON' if state else 'OFF'}."
@@ -1580,31 +1636,34 @@ class AudioLoop:
                 # Turn/Response Loop Finished
                 self.flush_chat()
 
-                while not self.audio_in_queue.empty():
-                    self.audio_in_queue.get_nowait()
+                self.playback.flush()
         except Exception as e:
-            print(f"Error in receive_audio: {e}")
+            logger.error("Error in receive_audio: %s", e)
             traceback.print_exc()
             raise e
         finally:
              if not self.stop_event.is_set():
-                 print("[KlistarAi DEBUG] [WARN] receive_audio task exited unexpectedly. Triggering reconnect.")
+                 logger.warning("receive_audio task exited unexpectedly. Triggering reconnect.")
                  self.connection_lost_event.set()
 
     async def play_audio(self):
         stream = await asyncio.to_thread(
-            pya.open,
+            get_pyaudio().open,
             format=FORMAT,
             channels=CHANNELS,
             rate=RECEIVE_SAMPLE_RATE,
             output=True,
             output_device_index=self.output_device_index,
+            frames_per_buffer=int(RECEIVE_SAMPLE_RATE * PLAYBACK_PERIOD),
         )
-        while True:
-            bytestream = await self.audio_in_queue.get()
-            if self.on_audio_data:
-                self.on_audio_data(bytestream)
-            await asyncio.to_thread(stream.write, bytestream)
+        # Writes happen on the playback thread; this task owns its lifetime
+        self.playback.start(stream)
+        try:
+            await self.stop_event.wait()
+        finally:
+            await asyncio.to_thread(self.playback.stop)
+            await asyncio.to_thread(stream.close)
+            logger.debug("[AUDIO] Playback stats: %s", self.playback.stats())
 
     async def get_frames(self):
         cap = await asyncio.to_thread(cv2.VideoCapture, 0, cv2.CAP_AVFOUNDATION)
@@ -1625,7 +1684,7 @@ class AudioLoop:
         if not ret:
             return None
         frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        img = PIL.Image.fromarray(frame_rgb)
+        img = Image.fromarray(frame_rgb)
         img.thumbnail([1024, 1024])
         image_io = io.BytesIO()
         img.save(image_io, format="jpeg")
@@ -1647,17 +1706,32 @@ class AudioLoop:
             self.connection_lost_event.clear()
             
             try:
-                print(f"[KlistarAi DEBUG] [CONNECT] Connecting to Gemini Live API...")
+                logger.debug("[CONNECT] Connecting to Gemini Live API...")
                 async with (
                     client.aio.live.connect(model=MODEL, config=config) as session,
                     asyncio.TaskGroup() as tg,
                 ):
                     self.session = session
 
-                    self.audio_in_queue = asyncio.Queue()
+                    self.playback = AudioPlayback(
+                        RECEIVE_SAMPLE_RATE,
+                        period=PLAYBACK_PERIOD,
+                        target_latency=PLAYBACK_TARGET_MS / 1000,
+                        max_latency=PLAYBACK_MAX_SECONDS,
+                    )
                     self.out_queue = asyncio.Queue(maxsize=10)
+                    self.framer = AudioFramer(
+                        SEND_SAMPLE_RATE,
+                        frame_ms=AUDIO_FRAME_MS,
+                        min_ms=AUDIO_FRAME_MIN_MS,
+                        max_ms=AUDIO_FRAME_MAX_MS,
+                        adapt=AUDIO_FRAME_ADAPT,
+                    )
+                    self.uplink = UplinkEncoder.negotiate(UPLINK_CODECS, UPLINK_ACCEPTS, SEND_SAMPLE_RATE)
 
                     tg.create_task(self.send_realtime())
+                    if AUDIO_FRAME_ADAPT:
+                        tg.create_task(self.probe_rtt())
                     tg.create_task(self.listen_audio())
                     # tg.create_task(self._process_video_queue()) # Removed in favor of VAD
 
@@ -1672,7 +1746,7 @@ class AudioLoop:
                     # Handle Startup vs Reconnect Logic
                     if not is_reconnect:
                         if start_message:
-                            print(f"[ADA DEBUG] [INFO] Sending start message: {start_message}")
+                            logger.debug("[INFO] Sending start message: %s", start_message)
                             await self.session.send(input=start_message, end_of_turn=True)
                         
                         # Sync Project State
@@ -1680,9 +1754,9 @@ class AudioLoop:
                             self.on_project_update(self.project_manager.current_project)
                     
                     else:
-                        print(f"[ADA DEBUG] [RECONNECT] Connection restored.")
+                        logger.debug("[RECONNECT] Connection restored.")
                         # Restore Context
-                        print(f"[ADA DEBUG] [RECONNECT] Fetching recent chat history to restore context...")
+                        logger.debug("[RECONNECT] Fetching recent chat history to restore context...")
                         history = self.project_manager.get_recent_chat_history(limit=10)
                         
                         context_msg = "System Notification: Connection was lost and just re-established. Here is the recent chat history to help you resume seamlessly:\n\n"
@@ -1693,7 +1767,7 @@ class AudioLoop:
                         
                         context_msg += "\nPlease acknowledge the reconnection to the user (e.g. 'I lost connection for a moment, but I'm back...') and resume what you were doing."
                         
-                        print(f"[ADA DEBUG] [RECONNECT] Sending restoration context to model...")
+                        logger.debug("[RECONNECT] Sending restoration context to model...")
                         await self.session.send(input=context_msg, end_of_turn=True)
 
                     # Reset retry delay on successful connection
@@ -1726,22 +1800,25 @@ class AudioLoop:
                         task.cancel()
                         
                     if self.connection_lost_event.is_set():
-                         print("[KlistarAi DEBUG] [INFO] Connection lost detected. Exiting session context to restart.")
+                         logger.debug("[INFO] Connection lost detected. Exiting session context to restart.")
                          # This exit will cause TaskGroup to cancel all other tasks (audio, video, etc)
                          # Then the 'async with' exits, and the outer 'while not stop_event' loop restarts it.
 
             except asyncio.CancelledError:
-                print(f"[ADA DEBUG] [STOP] Main loop cancelled.")
+                logger.debug("[STOP] Main loop cancelled.")
                 break
                 
             except Exception as e:
                 # This catches the ExceptionGroup from TaskGroup or direct exceptions
-                print(f"[ADA DEBUG] [ERR] Connection Error: {e}")
+                logger.error("Connection Error: %s", e)
+                if self.uplink:
+                    # Only a failure that points at the codec stops it being offered again
+                    self.uplink.session_failed(e)
                 
                 if self.stop_event.is_set():
                     break
                 
-                print(f"[ADA DEBUG] [RETRY] Reconnecting in {retry_delay} seconds...")
+                logger.debug("[RETRY] Reconnecting in %s seconds...", retry_delay)
                 await asyncio.sleep(retry_delay)
                 retry_delay = min(retry_delay * 2, 10) # Exponential backoff capped at 10s
                 is_reconnect = True # Next loop will be a reconnect
@@ -1785,6 +1862,11 @@ if __name__ == "__main__":
         help="pixels to stream from",
         choices=["camera", "screen", "none"],
     )
+    parser.add_argument("--profile-startup", action="store_true", help="Print an import-time report and exit")
     args = parser.parse_args()
+    if args.profile_startup:
+        import startup_profile
+        sys.exit(startup_profile.main(["ada"]))
+    setup_logging()
     main = AudioLoop(video_mode=args.mode)
     asyncio.run(main.run())
\ No newline at end of file
@@ -0,0 +1,116 @@
+"""
+AdmissionController - Bounds concurrent model calls and the queue in front of them.
+
+Up to max_concurrent callers run at once. Up to max_queue more wait for a
+slot (at most queue_timeout seconds each); anyone beyond that is turned
+away immediately with Overloaded, so a burst fails fast instead of piling
+up coroutines that all time out together.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+
+class Overloaded(Exception):
+    """Raised when a caller is not admitted (queue full or wait timed out)."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Server busy ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Args:
+        max_concurrent: Callers allowed to run at once.
+        max_queue: Callers allowed to wait for a slot. 0 rejects as soon as all slots are busy.
+        queue_timeout: Seconds a queued caller waits before giving up.
+        sample_size: Recent wait times kept for percentiles.
+    """
+
+    def __init__(self, max_concurrent=8, max_queue=32, queue_timeout=10.0, sample_size=1024):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+
+        self.admitted = 0
+        self.rejected = 0  # queue was full
+        self.timed_out = 0  # waited queue_timeout without getting a slot
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._waits = deque(maxlen=sample_size)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Holds one slot for the body of the with-block. Raises Overloaded if not admitted."""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self):
+        start = time.monotonic()
+        if not self._slots.locked():
+            # A slot is free: taken without suspending
+            await self._slots.acquire()
+        elif self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded("queue full", self.retry_after())
+        else:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise Overloaded("queue timeout", self.retry_after()) from None
+            finally:
+                self.queue_depth -= 1
+
+        waited = time.monotonic() - start
+        self.admitted += 1
+        self.in_flight += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        self._waits.append(waited)
+
+    def release(self):
+        self.in_flight -= 1
+        self._slots.release()
+
+    def retry_after(self):
+        """Suggested client back-off in whole seconds, from recent wait times."""
+        return max(1, int(self.wait_percentile(50) + 0.999))
+
+    def wait_percentile(self, pct):
+        """Nearest-rank percentile of recent queue waits, in seconds."""
+        if not self._waits:
+            return 0.0
+        ordered = sorted(self._waits)
+        rank = max(1, -(-len(ordered) * pct // 100))
+        return ordered[int(rank) - 1]
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrent": self.max_concurrent,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_ms_avg": self.wait_seconds_total / self.admitted * 1000 if self.admitted else 0.0,
+            "wait_ms_p50": self.wait_percentile(50) * 1000,
+            "wait_ms_p99": self.wait_percentile(99) * 1000,
+            "wait_ms_max": self.wait_seconds_max * 1000,
+        }
@@ -0,0 +1,103 @@
+"""
+AgentRegistry - Imports and constructs tool agents on first use.
+
+ada.py used to import every agent (CadAgent, WebAgent -> Playwright,
+KasaAgent, PrinterAgent) and construct them at startup, whether or not a
+session ever used them. The registry records how to build each agent and
+does the import + construction the first time a tool asks for it.
+
+LazyModule does the same for heavy third-party modules (cv2, mediapipe, ...):
+the import happens on first attribute access.
+"""
+
+import importlib
+import logging
+import time
+
+logger = logging.getLogger("klistar.agent_registry")
+
+
+class LazyModule:
+    """Module proxy that imports name on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name!r} ({state})>"
+
+
+def load_class(module_name, attr):
+    """Imports module_name and returns attr, or None if the import fails (soft fail)."""
+    try:
+        return getattr(importlib.import_module(module_name), attr)
+    except Exception as e:
+        logger.warning("%s unavailable: %s", attr, e)
+        return None
+
+
+class AgentRegistry:
+    """
+    Lazily built agents by name.
+
+    Usage:
+        agents = AgentRegistry()
+        agents.register("cad", "cad_agent", "CadAgent", factory=lambda cls: cls(on_thought=cb))
+        agents.get("cad")  # imported and constructed here; None if unavailable
+    """
+
+    def __init__(self):
+        self._specs = {}  # name -> (module, attr, factory)
+        self._instances = {}  # name -> agent, or None if it failed to load
+        self.load_times = {}  # name -> seconds spent importing + constructing
+
+    def register(self, name, module, attr, factory=None):
+        """
+        Declares an agent. factory receives the class and returns the
+        instance; by default the class is called with no arguments.
+        """
+        self._specs[name] = (module, attr, factory)
+        self._instances.pop(name, None)
+
+    def provide(self, name, instance):
+        """Uses an already constructed agent (e.g. one shared with server.py)."""
+        self._instances[name] = instance
+
+    def loaded(self, name):
+        return name in self._instances
+
+    def get(self, name):
+        """Returns the agent, building it on first call. None if it can't be loaded."""
+        if name in self._instances:
+            return self._instances[name]
+        if name not in self._specs:
+            raise KeyError(f"Unknown agent: {name}")
+
+        module, attr, factory = self._specs[name]
+        start = time.perf_counter()
+        instance = None
+        cls = load_class(module, attr)
+        if cls is not None:
+            try:
+                instance = factory(cls) if factory else cls()
+            except Exception as e:
+                logger.error("Failed to construct %s: %s", attr, e)
+        self.load_times[name] = time.perf_counter() - start
+        logger.info("Loaded agent '%s' in %.0f ms", name, self.load_times[name] * 1000)
+        self._instances[name] = instance
+        return instance
+
+    def stats(self):
+        return {
+            "registered": sorted(self._specs),
+            "loaded": sorted(name for name, agent in self._instances.items() if agent is not None),
+            "load_ms": {name: seconds * 1000 for name, seconds in self.load_times.items()},
+        }
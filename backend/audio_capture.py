@@ -0,0 +1,212 @@
+"""
+Audio capture - A persistent mic thread feeding a preallocated ring buffer.
+
+listen_audio used to run every mic read through asyncio.to_thread, a
+thread-pool job about 16 times a second, and read with
+exception_on_overflow=False so lost audio went unnoticed. CaptureThread now
+owns the blocking reads: each chunk is copied into a slot of a FrameRing
+allocated once up front, and the event loop is woken only when a consumer
+is actually waiting.
+
+FrameRing is single-producer/single-consumer and takes no locks: the thread
+only advances the write counter and the consumer only advances the read
+counter. If the consumer falls more than a ring's worth behind, the oldest
+frames are overwritten; the consumer notices, skips them and counts them as
+ring overflows. Overflows reported by the device itself are counted too.
+"""
+
+import asyncio
+import logging
+import threading
+
+try:
+    from metrics import REGISTRY
+except ImportError:
+    from backend.metrics import REGISTRY
+
+logger = logging.getLogger("klistar.audio_capture")
+
+PA_INPUT_OVERFLOWED = -9981  # PortAudio paInputOverflowed
+
+CAPTURED_FRAMES = REGISTRY.counter("gravity_audio_capture_frames", "Mic frames read by the capture thread.")
+DROPPED_FRAMES = REGISTRY.counter(
+    "gravity_audio_capture_dropped", "Mic frames lost, by reason (ring_overflow, device_overflow).", labelnames=("reason",)
+)
+# Children created up front: the capture thread must not add labels while /metrics renders
+RING_OVERFLOWS = DROPPED_FRAMES.labels("ring_overflow")
+DEVICE_OVERFLOWS = DROPPED_FRAMES.labels("device_overflow")
+
+
+class FrameRing:
+    """
+    Fixed-size frames in a preallocated buffer, written by one thread and
+    read by one asyncio task.
+
+    Args:
+        frame_bytes: Size of every frame.
+        capacity: Slots in the buffer; the consumer sees at most capacity - 1
+            unread frames, as the next slot may be mid-write.
+    """
+
+    def __init__(self, frame_bytes, capacity=32):
+        self.frame_bytes = frame_bytes
+        self.capacity = capacity
+        self._buffer = bytearray(frame_bytes * capacity)
+        self._view = memoryview(self._buffer)
+        self._written = 0  # Frames ever written; advanced only by the producer
+        self._read = 0  # Frames ever consumed or skipped; advanced only by the consumer
+        self._loop = None
+        self._ready = None  # asyncio.Event the consumer waits on
+        self._waiting = False
+        self.overflows = 0
+        self.discarded = 0
+        self.max_depth = 0
+
+    def __len__(self):
+        return min(self._written - self._read, self.capacity)
+
+    def bind(self, loop):
+        """Attaches the ring to the loop its consumer runs on."""
+        self._loop = loop
+        self._ready = asyncio.Event()
+
+    def put(self, data):
+        """Producer side: copies one frame in. Never blocks."""
+        start = (self._written % self.capacity) * self.frame_bytes
+        size = min(len(data), self.frame_bytes)
+        self._view[start:start + size] = data[:size]
+        if size < self.frame_bytes:
+            self._view[start + size:start + self.frame_bytes] = bytes(self.frame_bytes - size)
+        self._written += 1
+        self.max_depth = max(self.max_depth, self._written - self._read)
+        if self._waiting:
+            self._waiting = False
+            self._loop.call_soon_threadsafe(self._ready.set)
+
+    def get_nowait(self):
+        """Consumer side: the oldest unread frame as bytes, or None if empty."""
+        while True:
+            written = self._written
+            if written == self._read:
+                return None
+            if written - self._read >= self.capacity:
+                # Our slot is next in line to be overwritten; keep the newest capacity - 1
+                self._skip(written - self.capacity + 1 - self._read)
+            start = (self._read % self.capacity) * self.frame_bytes
+            frame = bytes(self._view[start:start + self.frame_bytes])
+            # The producer reached our slot mid-copy; the copy may be torn
+            if self._written - self._read >= self.capacity:
+                continue
+            self._read += 1
+            return frame
+
+    async def get(self):
+        """Waits for and returns the next frame."""
+        while True:
+            frame = self.get_nowait()
+            if frame is not None:
+                return frame
+            self._ready.clear()
+            self._waiting = True
+            # Re-check: a frame written before _waiting was set sends no wakeup
+            if self._written != self._read:
+                self._waiting = False
+                continue
+            await self._ready.wait()
+
+    def discard(self):
+        """Drops every unread frame (e.g. audio captured while muted)."""
+        skipped = min(self._written - self._read, self.capacity)
+        self.discarded += skipped
+        self._read = self._written
+
+    def _skip(self, n):
+        self._read += n
+        self.overflows += n
+        RING_OVERFLOWS.inc(n)
+
+    def stats(self):
+        return {
+            "capacity": self.capacity,
+            "depth": len(self),
+            "max_depth": self.max_depth,
+            "written": self._written,
+            "overflows": self.overflows,
+            "discarded": self.discarded,
+        }
+
+
+class CaptureThread:
+    """
+    Reads an input stream on a dedicated thread into a FrameRing.
+
+    Usage:
+        capture = CaptureThread(stream, frames_per_read=1024)
+        capture.start(asyncio.get_running_loop())
+        data = await capture.ring.get()
+        ...
+        await asyncio.to_thread(capture.stop)  # before closing the stream
+
+    Args:
+        stream: PyAudio-style input stream with read(n, exception_on_overflow).
+        frames_per_read: Samples per read (the stream's frames_per_buffer).
+        sample_width: Bytes per sample, times channels.
+        capacity: Frames the ring holds.
+    """
+
+    def __init__(self, stream, frames_per_read, sample_width=2, capacity=32):
+        self.stream = stream
+        self.frames_per_read = frames_per_read
+        self.ring = FrameRing(frames_per_read * sample_width, capacity)
+        self.device_overflows = 0
+        self.read_errors = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, loop):
+        self.ring.bind(loop)
+        self._thread = threading.Thread(target=self._run, name="audio-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Stops the thread and waits for its current read to return."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                data = self.stream.read(self.frames_per_read, exception_on_overflow=True)
+            except OSError as e:
+                if getattr(e, "errno", None) == PA_INPUT_OVERFLOWED:
+                    # The device buffer filled before we read it; that audio is gone
+                    self.device_overflows += 1
+                    DEVICE_OVERFLOWS.inc()
+                    continue
+                self._read_failed(e)
+                continue
+            except Exception as e:
+                self._read_failed(e)
+                continue
+            self.ring.put(data)
+            CAPTURED_FRAMES.inc()
+
+    def _read_failed(self, error):
+        if self._stop.is_set():
+            return
+        self.read_errors += 1
+        logger.error("Error reading audio: %s", error)
+        self._stop.wait(0.1)
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "device_overflows": self.device_overflows,
+            "read_errors": self.read_errors,
+            **self.ring.stats(),
+        }
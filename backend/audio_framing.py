@@ -0,0 +1,152 @@
+"""
+Audio framing - Sizes mic audio into Live API messages by target duration.
+
+The mic is read in short chunks; every message sent to the Live session
+used to carry exactly one 64 ms chunk, so message size was an accident of
+CHUNK_SIZE. AudioFramer coalesces (or splits) PCM into frames of a target
+duration instead, trading two costs against each other:
+
+    shorter frames  less audio held back before it is sent (the first
+                    sample of a frame waits a whole frame), but more
+                    messages per second, each paying the JSON/base64
+                    envelope and a websocket frame
+    longer frames   fewer, larger messages; more speech latency
+
+With adapt on, the target follows the measured round-trip time to the
+server: frame duration is kept near rtt_ratio x RTT (within min_ms and
+max_ms), so on a fast link frames are short, and on a slow one the extra
+buffering stays small next to the network delay while message overhead
+drops. tradeoff() tabulates both costs for a range of frame sizes, and
+stats() reports the current choice.
+"""
+
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger("klistar.audio_framing")
+
+# Approximate bytes a realtime_input message adds around its audio: the JSON
+# wrapper ({"realtime_input": {"media_chunks": [{"mime_type": ..., "data": ...}]}})
+# plus the websocket frame header
+ENVELOPE_BYTES = 90
+TRADEOFF_FRAME_MS = (20, 40, 60, 100, 200)
+
+
+class AudioFramer:
+    """
+    Args:
+        sample_rate: Samples per second of the PCM.
+        sample_width: Bytes per sample, times channels.
+        frame_ms: Initial (or, with adapt off, fixed) frame duration.
+        min_ms, max_ms: Bounds for the adapted frame duration.
+        adapt: Follow observed RTT.
+        rtt_ratio: Frame duration as a share of RTT when adapting.
+        smoothing: Weight of each new RTT sample in the moving average.
+    """
+
+    def __init__(self, sample_rate, sample_width=2, frame_ms=60, min_ms=20, max_ms=200, adapt=True, rtt_ratio=0.5, smoothing=0.2):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.adapt = adapt
+        self.rtt_ratio = rtt_ratio
+        self.smoothing = smoothing
+        self.frame_ms = self._clamp(frame_ms)
+        self.rtt = None  # Smoothed round-trip time, seconds
+        self._pending = bytearray()
+        self.frames = 0
+        self.bytes = 0
+        self.flushes = 0
+        self._started = time.monotonic()
+
+    def _clamp(self, ms):
+        return min(max(ms, self.min_ms), self.max_ms)
+
+    @property
+    def frame_bytes(self):
+        samples = max(int(self.sample_rate * self.frame_ms / 1000), 1)
+        return samples * self.sample_width
+
+    def push(self, data):
+        """Adds PCM and returns the whole frames now ready (possibly none)."""
+        self._pending += data
+        size = self.frame_bytes
+        frames = []
+        while len(self._pending) >= size:
+            frames.append(bytes(self._pending[:size]))
+            del self._pending[:size]
+        self._count(frames)
+        return frames
+
+    def flush(self):
+        """Returns the buffered partial frame (e.g. when speech ends), or None."""
+        if not self._pending:
+            return None
+        frame = bytes(self._pending)
+        self._pending.clear()
+        self.flushes += 1
+        self._count([frame])
+        return frame
+
+    def reset(self):
+        """Drops the partial frame (e.g. audio captured while muted)."""
+        self._pending.clear()
+
+    def _count(self, frames):
+        self.frames += len(frames)
+        self.bytes += sum(len(frame) for frame in frames)
+
+    def observe_rtt(self, seconds):
+        """Feeds one RTT sample; with adapt on, retargets the frame duration."""
+        self.rtt = seconds if self.rtt is None else self.rtt + self.smoothing * (seconds - self.rtt)
+        if self.adapt:
+            target = self._clamp(round(self.rtt * 1000 * self.rtt_ratio / 10) * 10)
+            if target != self.frame_ms:
+                logger.debug("[AUDIO] RTT %.0f ms: frames %s -> %s ms", self.rtt * 1000, self.frame_ms, target)
+                self.frame_ms = target
+
+    def costs(self, frame_ms):
+        """Latency and overhead of sending audio in frame_ms frames."""
+        payload = self.sample_rate * self.sample_width * frame_ms / 1000
+        encoded = payload * 4 / 3  # base64 in the JSON message
+        return {
+            "frame_ms": frame_ms,
+            "messages_per_second": 1000 / frame_ms,
+            "added_latency_ms": frame_ms,  # The first sample of a frame waits for the rest
+            "overhead_pct": ENVELOPE_BYTES / (encoded + ENVELOPE_BYTES) * 100,
+            "wire_bytes_per_second": (encoded + ENVELOPE_BYTES) * 1000 / frame_ms,
+        }
+
+    def tradeoff(self, options=TRADEOFF_FRAME_MS):
+        return [self.costs(frame_ms) for frame_ms in options]
+
+    def stats(self):
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        return {
+            **self.costs(self.frame_ms),
+            "adapt": self.adapt,
+            "rtt_ms": self.rtt * 1000 if self.rtt is not None else None,
+            "frames": self.frames,
+            "flushes": self.flushes,
+            "sent_per_second": self.frames / elapsed,
+        }
+
+
+async def measure_rtt(session, timeout=2.0):
+    """
+    Round-trip time to the Live server in seconds, from a websocket ping on
+    the session's connection; None if the connection doesn't expose one.
+    """
+    ws = getattr(session, "_ws", None)
+    if ws is None or not hasattr(ws, "ping"):
+        return None
+    start = time.perf_counter()
+    try:
+        pong = await ws.ping()
+        await asyncio.wait_for(pong, timeout)
+    except Exception as e:  # Timeout or the connection closing under us
+        logger.debug("[AUDIO] RTT probe failed: %s", e)
+        return None
+    return time.perf_counter() - start
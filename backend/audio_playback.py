@@ -0,0 +1,276 @@
+"""
+Audio playback - A persistent output thread fed by a bounded jitter buffer.
+
+play_audio used to take each chunk from an unbounded asyncio.Queue and run
+stream.write through asyncio.to_thread, so every chunk was a thread-pool
+job, and barge-in could only empty the queue: whatever write was already
+in flight (a whole model chunk) kept playing.
+
+AudioPlayback keeps one output thread for the session. The event loop puts
+model audio into a JitterBuffer; the thread takes it back out in short
+periods (20 ms by default) and writes them to the device:
+
+    prebuffering  after start or an underrun, playback waits until
+                  target_latency worth of audio is buffered (or the oldest
+                  audio has waited that long), so bursty network delivery
+                  doesn't stutter
+    playing       periods are written back to back; if the buffer runs dry
+                  mid-reply that is counted as an underrun
+    flush()       drops everything buffered at once; at most the period
+                  being written still plays, and that delay is recorded as
+                  the barge-in latency
+
+The buffer holds at most max_latency seconds; audio beyond that overruns
+and the oldest is dropped and counted.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+try:
+    from metrics import REGISTRY
+except ImportError:
+    from backend.metrics import REGISTRY
+
+logger = logging.getLogger("klistar.audio_playback")
+
+UNDERRUNS = REGISTRY.counter("gravity_audio_playback_underruns", "Times playback ran dry mid-reply.")
+OVERRUN_BYTES = REGISTRY.counter("gravity_audio_playback_overrun_bytes", "Audio bytes dropped because the jitter buffer was full.")
+BARGE_IN_SECONDS = REGISTRY.histogram(
+    "gravity_audio_barge_in_seconds",
+    "Time from a playback flush until the output thread stopped writing old audio.",
+    buckets=(0.005, 0.01, 0.02, 0.03, 0.05, 0.1, 0.25),
+)
+
+
+class JitterBuffer:
+    """
+    Bounded PCM byte buffer between one producer and the output thread.
+
+    Args:
+        sample_rate: Samples per second of the PCM.
+        sample_width: Bytes per sample, times channels.
+        target_latency: Seconds buffered before playback (re)starts.
+        max_latency: Seconds held before the oldest audio is dropped.
+        clock: Time source (seconds), injectable for tests.
+    """
+
+    def __init__(self, sample_rate, sample_width=2, target_latency=0.08, max_latency=20.0, clock=time.monotonic):
+        self.bytes_per_second = sample_rate * sample_width
+        self.sample_width = sample_width
+        self.target_bytes = self._align(target_latency * self.bytes_per_second)
+        self.max_bytes = max(self._align(max_latency * self.bytes_per_second), self.target_bytes)
+        self.target_latency = target_latency
+        self.clock = clock
+        self._chunks = deque()
+        self._size = 0
+        self._cond = threading.Condition()
+        self._playing = False
+        self._starved = False  # Ran dry while playing; an underrun if audio arrives before a flush
+        self._first_put = None  # When the audio now waiting for prebuffer arrived
+        self.generation = 0  # Bumped by every flush
+        self.taken_generation = 0  # generation when take() last returned audio
+        self.flushed_at = None
+        self.underruns = 0
+        self.overrun_bytes = 0
+        self.flushes = 0
+        self.max_bytes_seen = 0
+
+    def _align(self, n):
+        return int(n) // self.sample_width * self.sample_width
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def buffered_seconds(self):
+        return self._size / self.bytes_per_second
+
+    def put(self, data):
+        """Adds audio; never blocks. Drops the oldest audio past max_latency."""
+        if not data:
+            return
+        with self._cond:
+            if self._starved:
+                self._starved = False
+                self.underruns += 1
+                UNDERRUNS.inc()
+            if self._first_put is None:
+                self._first_put = self.clock()
+            self._chunks.append(memoryview(bytes(data)))  # Sliced per period without copying
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self._drop(self._size - self.max_bytes)
+            self.max_bytes_seen = max(self.max_bytes_seen, self._size)
+            self._cond.notify()
+
+    def _drop(self, n):
+        n = self._align(n + self.sample_width - 1)
+        self.overrun_bytes += n
+        OVERRUN_BYTES.inc(n)
+        self._pop(n)
+
+    def _pop(self, n):
+        """Removes and returns up to n bytes from the front (caller holds the lock)."""
+        parts = []
+        while n > 0 and self._chunks:
+            chunk = self._chunks[0]
+            if len(chunk) <= n:
+                parts.append(self._chunks.popleft())
+                n -= len(chunk)
+            else:
+                parts.append(chunk[:n])
+                self._chunks[0] = chunk[n:]
+                n = 0
+        data = b"".join(parts)
+        self._size -= len(data)
+        return data
+
+    def _ready(self):
+        if not self._size:
+            return False
+        if self._playing or self._size >= self.target_bytes:
+            return True
+        # A short reply never fills the target; play it once it has waited that long
+        return self.clock() - self._first_put >= self.target_latency
+
+    def take(self, n, timeout=0.1):
+        """
+        Output thread side: up to n bytes once playback may proceed, or
+        None after timeout seconds.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not self._ready():
+                if self._playing:
+                    # Ran dry mid-stream: prebuffer again before resuming
+                    self._playing = False
+                    self._starved = True
+                    self._first_put = None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                wait = remaining
+                if self._size:  # Prebuffering: wake when the oldest audio has waited long enough
+                    wait = min(remaining, max(self._first_put + self.target_latency - self.clock(), 0.001))
+                self._cond.wait(wait)
+            self._playing = True
+            self._first_put = None
+            self.taken_generation = self.generation
+            return self._pop(n)
+
+    def flush(self):
+        """Drops everything buffered (barge-in). Returns the bytes dropped."""
+        with self._cond:
+            dropped = self._size
+            self._chunks.clear()
+            self._size = 0
+            self._playing = False
+            self._starved = False
+            self._first_put = None
+            self.generation += 1
+            self.flushed_at = time.monotonic()
+            self.flushes += 1
+            self._cond.notify()
+            return dropped
+
+    def wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def stats(self):
+        return {
+            "buffered_ms": self.buffered_seconds * 1000,
+            "max_buffered_ms": self.max_bytes_seen / self.bytes_per_second * 1000,
+            "target_ms": self.target_bytes / self.bytes_per_second * 1000,
+            "underruns": self.underruns,
+            "overrun_bytes": self.overrun_bytes,
+            "flushes": self.flushes,
+        }
+
+
+class AudioPlayback:
+    """
+    Writes a JitterBuffer to an output stream on a dedicated thread.
+
+    Usage:
+        playback = AudioPlayback(24000)
+        playback.start(stream)
+        playback.put(pcm_bytes)
+        playback.flush()  # barge-in
+        playback.stop()   # before closing the stream
+
+    Args:
+        sample_rate: Samples per second of the PCM.
+        sample_width: Bytes per sample, times channels.
+        period: Seconds of audio per device write; bounds barge-in latency.
+        target_latency, max_latency: See JitterBuffer.
+    """
+
+    def __init__(self, sample_rate, sample_width=2, period=0.02, target_latency=0.08, max_latency=20.0):
+        self.buffer = JitterBuffer(sample_rate, sample_width, target_latency, max_latency)
+        self.period_bytes = max(self.buffer._align(period * sample_rate * sample_width), sample_width)
+        self.stream = None
+        self.write_errors = 0
+        self.barge_in_ms = deque(maxlen=256)  # Recent barge-in latencies
+        self._stop = threading.Event()
+        self._thread = None
+
+    def put(self, data):
+        self.buffer.put(data)
+
+    def flush(self):
+        dropped = self.buffer.flush()
+        if dropped:
+            logger.debug("[AUDIO] Flushed %.0f ms of queued playback.", dropped / self.buffer.bytes_per_second * 1000)
+        return dropped
+
+    def start(self, stream):
+        self.stream = stream
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audio-playback", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Stops the thread and waits for its current write to return."""
+        self._stop.set()
+        self.buffer.wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop.is_set():
+            block = self.buffer.take(self.period_bytes)
+            if block is None:
+                continue
+            generation = self.buffer.taken_generation
+            try:
+                self.stream.write(block)
+            except Exception as e:
+                self.write_errors += 1
+                logger.error("Error playing audio: %s", e)
+                self._stop.wait(0.1)
+                continue
+            if self.buffer.generation != generation:
+                # Flushed while this period was playing: it is the barge-in delay
+                self._record_barge_in(time.monotonic() - self.buffer.flushed_at)
+
+    def _record_barge_in(self, seconds):
+        BARGE_IN_SECONDS.observe(seconds)
+        self.barge_in_ms.append(seconds * 1000)
+
+    def stats(self):
+        recent = sorted(self.barge_in_ms)
+        return {
+            "running": self.running,
+            "write_errors": self.write_errors,
+            "barge_in_ms_p50": recent[len(recent) // 2] if recent else 0.0,
+            "barge_in_ms_max": recent[-1] if recent else 0.0,
+            **self.buffer.stats(),
+        }
@@ -0,0 +1,347 @@
+"""
+Audio uplink - Optional compression of mic audio sent to the Live session.
+
+Raw 16 kHz 16-bit PCM is 256 kbit/s per session before base64. An
+UplinkEncoder sits between the framer and the send queue and turns each
+frame into a {"data", "mime_type"} message in the codec chosen for the
+session:
+
+    pcm    audio/pcm, unchanged (always available)
+    mulaw  G.711 mu-law, 8 bits per sample (128 kbit/s), numpy only
+    opus   Opus in an Ogg stream (~24 kbit/s), needs the optional
+           'opuslib' package
+
+Codecs are negotiated per session: the first preferred codec that is
+installed locally and whose MIME type the endpoint accepts wins. The Live
+API currently documents only audio/pcm for realtime input, so the accepted
+list defaults to that and compressed codecs stay off until an endpoint is
+configured to take them. PCM is the fallback whenever a codec is missing,
+not accepted, fails to encode, or the server refuses it: a session closed
+with an invalid-data or invalid-argument error, or several sessions in a
+row dropped within moments of their first compressed message, take the
+codec out of negotiation for the rest of the process. Other connection
+errors, or a single early drop, keep the codec; the session reconnects
+with it after the usual backoff. Bytes sent are
+counted per codec alongside the PCM bytes they stood for.
+"""
+
+import logging
+import re
+import struct
+import time
+
+import numpy as np
+
+try:
+    from metrics import REGISTRY
+except ImportError:
+    from backend.metrics import REGISTRY
+
+try:
+    import opuslib
+    HAS_OPUS = True
+except ImportError:
+    opuslib = None
+    HAS_OPUS = False
+
+logger = logging.getLogger("klistar.audio_uplink")
+
+UPLINK_BYTES = REGISTRY.counter("gravity_audio_uplink_bytes", "Mic audio bytes sent to the Live session, by codec.", labelnames=("codec",))
+UPLINK_PCM_BYTES = REGISTRY.counter(
+    "gravity_audio_uplink_pcm_bytes", "Raw PCM bytes behind the mic audio sent, by codec.", labelnames=("codec",)
+)
+UPLINK_FALLBACKS = REGISTRY.counter("gravity_audio_uplink_fallbacks", "Sessions or encoders that fell back to PCM.")
+
+# Codecs the server dropped a session over; not offered again by this process
+REJECTED = set()
+# Websocket close codes for payloads the server can't take: unsupported data, invalid payload data
+CODEC_CLOSE_CODES = {1003, 1007}
+INVALID_ARGUMENT = re.compile(r"invalid[ _]argument", re.IGNORECASE)
+# Sessions dropped this soon after their first compressed message, this many
+# times in a row, are blamed on the codec rather than the network
+FIRST_MESSAGE_WINDOW = 2.0
+EARLY_DROP_LIMIT = 3
+EARLY_DROPS = {}  # codec name -> consecutive early drops
+
+
+def _close_code(error):
+    # websockets' ConnectionClosed carries the frame in .rcvd (.code on older releases)
+    for source in (getattr(error, "rcvd", None), error):
+        code = getattr(source, "code", None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def is_codec_error(error):
+    """
+    Whether a session failure says the server couldn't take the audio: a
+    close code in CODEC_CLOSE_CODES or an invalid-argument error anywhere in
+    the exception, its ExceptionGroup members or its causes.
+    """
+    pending, seen = [error], set()
+    while pending:
+        error = pending.pop()
+        if error is None or id(error) in seen:
+            continue
+        seen.add(id(error))
+        if _close_code(error) in CODEC_CLOSE_CODES or INVALID_ARGUMENT.search(str(error)):
+            return True
+        pending.extend(getattr(error, "exceptions", ()))
+        pending.extend((error.__cause__, error.__context__))
+    return False
+
+
+class PcmCodec:
+    name = "pcm"
+    mime_type = "audio/pcm"
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+
+    def encode(self, pcm):
+        return pcm
+
+
+MULAW_BIAS = 0x84
+MULAW_CLIP = 32635
+
+
+def mulaw_encode(samples):
+    """G.711 mu-law bytes for int16 samples."""
+    x = samples.astype(np.int32)
+    sign = (x < 0).astype(np.int32) << 7
+    magnitude = np.minimum(np.abs(x), MULAW_CLIP) + MULAW_BIAS
+    exponent = np.clip(np.floor(np.log2(magnitude)).astype(np.int32) - 7, 0, 7)
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8).tobytes()
+
+
+def mulaw_decode(data):
+    """int16 samples for G.711 mu-law bytes."""
+    u = ~np.frombuffer(data, dtype=np.uint8).astype(np.int32) & 0xFF
+    exponent = (u >> 4) & 0x07
+    magnitude = (((u & 0x0F) << 3) + MULAW_BIAS) << exponent
+    return np.where(u & 0x80, MULAW_BIAS - magnitude, magnitude - MULAW_BIAS).astype(np.int16)
+
+
+class MulawCodec:
+    name = "mulaw"
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.mime_type = f"audio/x-mulaw;rate={sample_rate}"
+
+    def encode(self, pcm):
+        return mulaw_encode(np.frombuffer(pcm, dtype="<i2", count=len(pcm) // 2))
+
+
+def _ogg_crc_table():
+    table = []
+    for i in range(256):
+        crc = i << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else crc << 1
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+_OGG_CRC = _ogg_crc_table()
+
+
+def ogg_crc(data):
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _OGG_CRC[((crc >> 24) ^ byte) & 0xFF]
+    return crc
+
+
+class OggWriter:
+    """
+    Packs packets into Ogg pages for one logical stream (RFC 3533).
+
+    Args:
+        serial: Stream serial number.
+    """
+
+    def __init__(self, serial=0x4B4C5354):
+        self.serial = serial
+        self.sequence = 0
+
+    def page(self, packets, granule, first=False):
+        """One page holding whole packets, ending at granule position granule."""
+        lacing = bytearray()
+        for packet in packets:
+            lacing += b"\xff" * (len(packet) // 255) + bytes([len(packet) % 255])
+        if len(lacing) > 255:
+            raise ValueError("Too many packets for one Ogg page")
+        header = struct.pack(
+            "<4sBBqIIIB", b"OggS", 0, 0x02 if first else 0x00, granule, self.serial, self.sequence, 0, len(lacing)
+        )
+        page = bytearray(header + lacing + b"".join(packets))
+        page[22:26] = struct.pack("<I", ogg_crc(page))
+        self.sequence += 1
+        return bytes(page)
+
+
+class OpusCodec:
+    """
+    Opus packets in a continuous Ogg stream: the first message carries the
+    OpusHead/OpusTags pages, each message after that one page of 20 ms packets.
+    """
+
+    name = "opus"
+    mime_type = "audio/ogg;codecs=opus"
+    PACKET_MS = 20
+    PRE_SKIP = 312  # Samples at 48 kHz the decoder drops at the start (encoder lookahead)
+
+    def __init__(self, sample_rate, bitrate=24000):
+        if not HAS_OPUS:
+            raise ImportError("opuslib is not installed")
+        self.sample_rate = sample_rate
+        self.encoder = opuslib.Encoder(sample_rate, 1, opuslib.APPLICATION_VOIP)
+        self.encoder.bitrate = bitrate
+        self.packet_samples = sample_rate * self.PACKET_MS // 1000
+        self.ogg = OggWriter()
+        self.granule = 0  # Always counted at 48 kHz in Ogg Opus
+        self._pending = b""
+        self._headers_sent = False
+
+    def _headers(self):
+        head = struct.pack("<8sBBHIhB", b"OpusHead", 1, 1, self.PRE_SKIP, self.sample_rate, 0, 0)
+        vendor = b"klistar"
+        tags = b"OpusTags" + struct.pack("<I", len(vendor)) + vendor + struct.pack("<I", 0)
+        return self.ogg.page([head], 0, first=True) + self.ogg.page([tags], 0)
+
+    def encode(self, pcm):
+        data = self._pending + pcm
+        step = self.packet_samples * 2
+        whole = len(data) // step * step
+        self._pending = data[whole:]  # Opus packets are fixed length; the rest waits
+        packets = [self.encoder.encode(data[i:i + step], self.packet_samples) for i in range(0, whole, step)]
+        out = b""
+        if not self._headers_sent:
+            out, self._headers_sent = self._headers(), True
+        if packets:
+            self.granule += len(packets) * self.PACKET_MS * 48
+            out += self.ogg.page(packets, self.granule)
+        return out
+
+
+CODECS = {"pcm": PcmCodec, "mulaw": MulawCodec, "opus": OpusCodec}
+AVAILABLE = {"pcm": True, "mulaw": True, "opus": HAS_OPUS}
+
+
+def negotiate(preferred, accepted, sample_rate):
+    """
+    First preferred codec that is installed, accepted by the endpoint and not
+    rejected earlier; PCM otherwise.
+
+    Args:
+        preferred: Codec names, best first.
+        accepted: MIME types the endpoint takes (parameters such as ;rate= ignored).
+    """
+    accepted_types = {mime.split(";")[0].strip().lower() for mime in accepted}
+    for name in preferred:
+        if name not in CODECS:
+            raise ValueError(f"Unknown uplink codec: {name!r} (expected one of {', '.join(CODECS)})")
+        if name == "pcm":
+            break
+        if name in REJECTED or not AVAILABLE[name]:
+            continue
+        codec = CODECS[name](sample_rate)
+        if codec.mime_type.split(";")[0].lower() in accepted_types:
+            return codec
+    return PcmCodec(sample_rate)
+
+
+class UplinkEncoder:
+    """
+    Turns PCM frames into Live API media messages in the session's codec.
+
+    Usage:
+        uplink = UplinkEncoder.negotiate(["opus", "mulaw"], ["audio/pcm"], 16000)
+        message = uplink.message(pcm_frame)  # None while the codec buffers a partial packet
+        if message:
+            await out_queue.put(message)
+        uplink.session_failed(error)  # the session died; PCM from now on if the codec was to blame
+    """
+
+    def __init__(self, codec):
+        self.codec = codec
+        self.pcm_bytes = 0
+        self.sent_bytes = 0
+        self.messages = 0
+        self.fallbacks = 0
+        self._first_message_at = None
+
+    @classmethod
+    def negotiate(cls, preferred, accepted, sample_rate):
+        codec = negotiate(preferred, accepted, sample_rate)
+        if preferred and preferred[0] != codec.name:
+            logger.info("[AUDIO] Uplink codec %s unavailable or not accepted; sending %s", preferred[0], codec.mime_type)
+        return cls(codec)
+
+    @property
+    def compressed(self):
+        return self.codec.name != "pcm"
+
+    def message(self, pcm):
+        try:
+            data = self.codec.encode(pcm)
+        except Exception as e:
+            logger.warning("[AUDIO] %s encoding failed, falling back to PCM: %s", self.codec.name, e)
+            self._fall_back()
+            data = pcm
+        self.pcm_bytes += len(pcm)
+        UPLINK_PCM_BYTES.labels(self.codec.name).inc(len(pcm))
+        if not data:
+            return None  # Held back until the codec has a whole packet (e.g. Opus' 20 ms)
+        if self._first_message_at is None:
+            self._first_message_at = time.monotonic()
+        self.messages += 1
+        self.sent_bytes += len(data)
+        UPLINK_BYTES.labels(self.codec.name).inc(len(data))
+        return {"data": data, "mime_type": self.codec.mime_type}
+
+    def session_failed(self, error):
+        """
+        The session ended with error. Rejects the codec if the failure points
+        at it (see is_codec_error, or EARLY_DROP_LIMIT sessions in a row
+        dropped right after their first message) and returns True; otherwise
+        the codec is kept for the reconnect.
+        """
+        if not self.compressed:
+            return False
+        name = self.codec.name
+        early = self._first_message_at is not None and time.monotonic() - self._first_message_at < FIRST_MESSAGE_WINDOW
+        EARLY_DROPS[name] = EARLY_DROPS.get(name, 0) + 1 if early else 0
+        if is_codec_error(error) or EARLY_DROPS[name] >= EARLY_DROP_LIMIT:
+            EARLY_DROPS.pop(name, None)
+            self.reject()
+            return True
+        logger.info("[AUDIO] Session using %s failed for an unrelated reason; keeping it", self.codec.mime_type)
+        return False
+
+    def reject(self):
+        """The server dropped a session using this codec: stop offering it and send PCM."""
+        if self.compressed:
+            logger.warning("[AUDIO] Session using %s was dropped; not offering it again", self.codec.mime_type)
+            REJECTED.add(self.codec.name)
+            self._fall_back()
+
+    def _fall_back(self):
+        self.codec = PcmCodec(self.codec.sample_rate)
+        self.fallbacks += 1
+        UPLINK_FALLBACKS.inc()
+
+    def stats(self):
+        return {
+            "codec": self.codec.name,
+            "mime_type": self.codec.mime_type,
+            "messages": self.messages,
+            "pcm_bytes": self.pcm_bytes,
+            "sent_bytes": self.sent_bytes,
+            "ratio": self.sent_bytes / self.pcm_bytes if self.pcm_bytes else 1.0,
+            "fallbacks": self.fallbacks,
+        }
@@ -1,27 +1,36 @@
 import mediapipe as mp
 from mediapipe.tasks import python as mp_python
 from mediapipe.tasks.python import vision
+import logging
 import cv2
 import asyncio
 import os
-import base64
 import numpy as np
 import urllib.request
 
+try:
+    from media_payloads import to_base64
+except ImportError:
+    from backend.media_payloads import to_base64
+
+logger = logging.getLogger("klistar.authenticator")
+
 class FaceAuthenticator:
     # MediaPipe Face Landmarker model URL
     MODEL_URL = "https://storage.googleapis.com/mediapipe-models/face_landmarker/face_landmarker/float16/1/face_landmarker.task"
     MODEL_PATH = os.path.join(os.path.dirname(__file__), "face_landmarker.task")
     
-    def __init__(self, reference_image_path="reference.jpg", on_status_change=None, on_frame=None):
+    def __init__(self, reference_image_path="reference.jpg", on_status_change=None, on_frame=None, binary_media=False):
         """
         :param reference_image_path: Path to the user's reference photo.
         :param on_status_change: Async callback(is_authenticated: bool).
-        :param on_frame: Async callback(frame_data_b64: str) to send frames to frontend.
+        :param on_frame: Async callback(frame) to send frames to frontend: a base64 JPEG string,
+                         or raw JPEG bytes with binary_media (for relays using media_payloads.MediaChannel).
         """
         self.reference_image_path = reference_image_path
         self.on_status_change = on_status_change
         self.on_frame = on_frame
+        self.binary_media = binary_media
         
         self.authenticated = False
         self.running = False
@@ -35,17 +44,17 @@ class FaceAuthenticator:
     def _ensure_model(self):
         """Download the MediaPipe Face Landmarker model if not present."""
         if not os.path.exists(self.MODEL_PATH):
-            print(f"[AUTH] Downloading Face Landmarker model...")
+            logger.info("Downloading Face Landmarker model...")
             try:
                 urllib.request.urlretrieve(self.MODEL_URL, self.MODEL_PATH)
-                print(f"[AUTH] [OK] Model downloaded to {self.MODEL_PATH}")
+                logger.info("[OK] Model downloaded to %s", self.MODEL_PATH)
             except Exception as e:
-                print(f"[AUTH] [ERR] Failed to download model: {e}")
+                logger.error("Failed to download model: %s", e)
 
     def _init_landmarker(self):
         """Initialize the MediaPipe Face Landmarker."""
         if not os.path.exists(self.MODEL_PATH):
-            print("[AUTH] [ERR] Face Landmarker model not found. Cannot initialize.")
+            logger.error("Face Landmarker model not found. Cannot initialize.")
             return
         
         try:
@@ -57,9 +66,9 @@ class FaceAuthenticator:
                 num_faces=1
             )
             self.landmarker = vision.FaceLandmarker.create_from_options(options)
-            print("[AUTH] [OK] Face Landmarker initialized.")
+            logger.info("[OK] Face Landmarker initialized.")
         except Exception as e:
-            print(f"[AUTH] [ERR] Failed to initialize Face Landmarker: {e}")
+            logger.error("Failed to initialize Face Landmarker: %s", e)
 
     def _extract_landmarks(self, image_rgb):
         """
@@ -80,7 +89,7 @@ class FaceAuthenticator:
                 return coords.flatten()
             return None
         except Exception as e:
-            print(f"[AUTH] [ERR] Landmark extraction failed: {e}")
+            logger.error("Landmark extraction failed: %s", e)
             return None
 
     def _compare_landmarks(self, landmarks1, landmarks2, threshold=0.15):
@@ -104,19 +113,19 @@ class FaceAuthenticator:
         # Threshold check (similarity should be close to 1 for a match)
         is_match = similarity > (1 - threshold)
         if is_match:
-            print(f"[AUTH] Face match! Similarity: {similarity:.4f}")
+            logger.info("Face match! Similarity: %.4f", similarity)
         return is_match
 
     def _load_reference(self):
         if not os.path.exists(self.reference_image_path):
-            print(f"[AUTH] [WARN] Reference file not found at {self.reference_image_path}. Authentication will fail.")
+            logger.warning("Reference file not found at %s. Authentication will fail.", self.reference_image_path)
             return
 
         try:
-            print("[AUTH] Loading reference image...")
+            logger.info("Loading reference image...")
             img_bgr = cv2.imread(self.reference_image_path)
             if img_bgr is None:
-                print(f"[AUTH] [ERR] Failed to read image file: {self.reference_image_path}")
+                logger.error("Failed to read image file: %s", self.reference_image_path)
                 return
             
             # Convert to RGB
@@ -125,25 +134,25 @@ class FaceAuthenticator:
             self.reference_landmarks = self._extract_landmarks(image_rgb)
             
             if self.reference_landmarks is not None:
-                print("[AUTH] [OK] Reference face landmarks extracted successfully.")
+                logger.info("[OK] Reference face landmarks extracted successfully.")
             else:
-                print("[AUTH] [ERR] No face found in reference image.")
+                logger.error("No face found in reference image.")
         except Exception as e:
-            print(f"[AUTH] [ERR] Error loading reference: {e}")
+            logger.error("Error loading reference: %s", e)
 
     async def start_authentication_loop(self):
         if self.authenticated:
-            print("[AUTH] Already authenticated.")
+            logger.info("Already authenticated.")
             if self.on_status_change:
                 await self.on_status_change(True)
             return
 
         if self.reference_landmarks is None:
-             print("[AUTH] [ERR] Cannot start auth loop: No reference landmarks.")
+             logger.error("Cannot start auth loop: No reference landmarks.")
              return
 
         self.running = True
-        print("[AUTH] Starting camera for authentication...")
+        logger.info("Starting camera for authentication...")
         
         # Capture the current (main) event loop
         loop = asyncio.get_running_loop()
@@ -151,37 +160,37 @@ class FaceAuthenticator:
         # Use a separate thread for blocking camera/CV operations
         await asyncio.to_thread(self._run_cv_loop, loop)
 
-        print("[AUTH] Authentication loop finished.")
+        logger.info("Authentication loop finished.")
     
     def stop(self):
-        print("[AUTH] Stopping authentication loop...")
+        logger.info("Stopping authentication loop...")
         self.running = False
 
     def _run_cv_loop(self, loop):
         def try_open_camera(index):
-            print(f"[AUTH] Trying to open camera with index {index}...")
+            logger.info("Trying to open camera with index %s...", index)
             cap = cv2.VideoCapture(index, cv2.CAP_AVFOUNDATION)
             if not cap.isOpened():
-                print(f"[AUTH] [ERR] Could not open video device {index}.")
+                logger.error("Could not open video device %s.", index)
                 return None
             
             ret, frame = cap.read()
             if not ret:
-                 print(f"[AUTH] [ERR] Opened device {index} but failed to read first frame.")
+                 logger.error("Opened device %s but failed to read first frame.", index)
                  cap.release()
                  return None
             
-            print(f"[AUTH] [OK] Successfully opened and read from device {index}.")
+            logger.info("[OK] Successfully opened and read from device %s.", index)
             return cap
 
         video_capture = try_open_camera(0)
         
         if video_capture is None:
-             print("[AUTH] Device 0 failed. Trying device 1...")
+             logger.warning("Device 0 failed. Trying device 1...")
              video_capture = try_open_camera(1)
 
         if video_capture is None:
-             print("[AUTH] [ERR] All camera attempts failed. Authentication cannot proceed.")
+             logger.error("All camera attempts failed. Authentication cannot proceed.")
              self.running = False
              return
 
@@ -190,7 +199,7 @@ class FaceAuthenticator:
         while self.running and not self.authenticated:
             ret, frame = video_capture.read()
             if not ret:
-                print("[AUTH] [ERR] Failed to read frame from camera loop.")
+                logger.error("Failed to read frame from camera loop.")
                 break
             
             # Convert BGR to RGB
@@ -202,7 +211,7 @@ class FaceAuthenticator:
                 
                 if self._compare_landmarks(self.reference_landmarks, current_landmarks):
                     self.authenticated = True
-                    print("[AUTH] [OPEN] FACE RECOGNIZED! Access Granted.")
+                    logger.info("[OPEN] FACE RECOGNIZED! Access Granted.")
                     if self.on_status_change:
                         asyncio.run_coroutine_threadsafe(self.on_status_change(True), loop)
                     self.running = False
@@ -214,8 +223,9 @@ class FaceAuthenticator:
             if self.on_frame:
                 small_frame = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
                 _, buffer = cv2.imencode('.jpg', small_frame)
-                b64_str = base64.b64encode(buffer).decode('utf-8')
                 
-                asyncio.run_coroutine_threadsafe(self.on_frame(b64_str), loop)
+                frame_jpeg = buffer.tobytes()
+                frame = frame_jpeg if self.binary_media else to_base64(frame_jpeg)
+                asyncio.run_coroutine_threadsafe(self.on_frame(frame), loop)
 
         video_capture.release()
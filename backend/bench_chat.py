@@ -0,0 +1,126 @@
+"""
+Load benchmark for the /chat endpoint.
+
+Fires N concurrent callers at /chat and reports p50/p99 latency. By default
+the FastAPI app is driven in-process with GravityAgent backed by a local
+StubClient, so no API key or network is needed. Pass --url to benchmark a
+running server instead.
+
+Usage:
+    python backend/bench_chat.py --clients 50 --requests 4 --latency 0.2
+    python backend/bench_chat.py --url http://localhost:8000 --clients 20
+"""
+import argparse
+import asyncio
+import math
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def build_local_app(latency, max_concurrent, max_queue):
+    """Returns the server's ASGI app with the agent swapped for a stub-backed one."""
+    import server
+    from gravity_agent import GravityAgent
+    from response_cache import ResponseCache
+    from stub_model import StubClient
+
+    stub = StubClient(latency=latency, reply="Decorators wrap a function to extend its behaviour.")
+    # No reply cache: every request has to reach the model, or the numbers measure cache hits
+    server.agent = GravityAgent(client=stub, max_concurrent_calls=max_concurrent, max_queue=max_queue, cache=ResponseCache(max_entries=0))
+    server.rate_limits = None  # Every caller shares one address; measure the agent, not the limiter
+    return server.app, stub
+
+
+async def run_caller(http, caller, n_requests, latencies, errors, busy):
+    for i in range(n_requests):
+        start = time.perf_counter()
+        try:
+            # Unique per caller and request so nothing is served from a cache or coalesced in flight
+            resp = await http.post("/chat", json={"message": f"explain python decorators (caller {caller}, request {i})"})
+            if resp.status_code == 429:
+                busy.append(time.perf_counter() - start)
+                continue
+            resp.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            errors.append(1)
+
+
+async def run_benchmark(clients, requests_per_client, latency, max_concurrent, url=None, max_queue=1000):
+    stub = None
+    if url:
+        transport = None
+        base_url = url
+    else:
+        app, stub = build_local_app(latency, max_concurrent, max_queue)
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://bench"
+
+    latencies, errors, busy = [], [], []
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=120) as http:
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(run_caller(http, caller, requests_per_client, latencies, errors, busy) for caller in range(clients)))
+        wall = time.perf_counter() - wall_start
+
+    if stub and stub.calls != len(latencies):
+        raise RuntimeError(f"{len(latencies)} requests answered but the model was called {stub.calls} times; replies were not all uncached")
+
+    return {
+        "clients": clients,
+        "requests": len(latencies) + len(errors) + len(busy),
+        "errors": len(errors),
+        "busy": len(busy),
+        "busy_max_ms": max(busy) * 1000 if busy else 0.0,
+        "wall_s": wall,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000 if latencies else 0.0,
+        "model_calls": stub.calls if stub else None,
+        "max_model_in_flight": stub.max_in_flight if stub else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent /chat load benchmark")
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent callers")
+    parser.add_argument("--requests", type=int, default=4, help="Requests per caller")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub model latency in seconds")
+    parser.add_argument("--max-concurrent", type=int, default=16, help="Model call concurrency limit")
+    parser.add_argument("--max-queue", type=int, default=1000, help="Callers allowed to wait for a model slot before 429s")
+    parser.add_argument("--url", type=str, default=None, help="Benchmark a running server instead of the in-process stub")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args.clients, args.requests, args.latency, args.max_concurrent, args.url, args.max_queue))
+
+    print(f"\n{'='*60}")
+    print(f"/chat benchmark: {report['clients']} clients x {args.requests} requests")
+    print(f"{'='*60}")
+    print(f"  requests      : {report['requests']} ({report['errors']} errors)")
+    print(f"  busy (429)    : {report['busy']} (slowest rejection: {report['busy_max_ms']:.1f} ms)")
+    print(f"  wall time     : {report['wall_s']:.2f}s")
+    print(f"  throughput    : {report['throughput_rps']:.1f} req/s")
+    print(f"  p50 latency   : {report['p50_ms']:.1f} ms")
+    print(f"  p99 latency   : {report['p99_ms']:.1f} ms")
+    print(f"  max latency   : {report['max_ms']:.1f} ms")
+    if report["model_calls"] is not None:
+        print(f"  model calls   : {report['model_calls']} of {report['requests'] - report['errors'] - report['busy']} answered (peak in flight: {report['max_model_in_flight']})")
+
+
+if __name__ == "__main__":
+    main()
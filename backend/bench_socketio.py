@@ -0,0 +1,332 @@
+"""
+Load generator for the Socket.IO server.
+
+Connects N async Socket.IO clients to server.py and has each send
+'user_input' at a fixed rate, then records per request:
+
+    connect            time for the websocket handshake (per client)
+    time_to_status     user_input -> 'Thinking...' status
+    time_to_response   user_input -> 'response' (or 'response_done' with --stream)
+
+plus busy replies, throttled messages, timeouts, dropped connections and
+throughput, and writes them as a JSON report. By default server.py is started as a subprocess with
+the stub model (no API key or network needed); pass --url to load a running
+server instead.
+
+Give --baseline a previous report to fail (exit 1) when throughput drops,
+latency grows or errors rise by more than --tolerance, e.g. in CI:
+
+    python backend/bench_socketio.py --clients 50 --rate 2 --output load.json
+    python backend/bench_socketio.py --clients 50 --rate 2 --baseline load.json
+
+Replies carry no request id, so each client matches them to its requests in
+the order they were sent. With one model call per request and a stub of
+constant latency they finish in order; a real model may reorder them. A
+message the server throttles gets a 'Throttled' status instead of a reply,
+and later ones in the same episode get nothing, so a throttled client
+takes its request out of the queue and, like a real client, holds its
+messages back until retry_after has passed (open-loop clients count the
+messages they hold back as throttled).
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import sys
+import time
+
+import socketio
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_chat import percentile
+from bench_workers import start_server, wait_until_up
+
+THINKING = "Thinking..."
+THROTTLED = "Throttled"
+ERROR_KINDS = ("connect", "emit", "throttled", "timeout", "disconnect")
+
+
+class LoadStats:
+    """Samples (seconds) and counters collected by every client of one run."""
+
+    def __init__(self):
+        self.connect = []
+        self.status = []
+        self.response = []
+        self.sent = 0
+        self.busy = 0
+        self.errors = dict.fromkeys(ERROR_KINDS, 0)
+
+
+class _Request:
+    __slots__ = ("start", "status_at", "done")
+
+    def __init__(self, loop):
+        self.start = time.perf_counter()
+        self.status_at = None
+        self.done = loop.create_future()
+
+
+async def run_client(url, index, n_requests, interval, timeout, stream, stats):
+    """
+    One client: connect, send n_requests messages every interval seconds
+    (interval 0 waits for each reply before sending the next) and wait up to
+    timeout seconds for the outstanding replies.
+    """
+    sio = socketio.AsyncClient(reconnection=False)
+    loop = asyncio.get_running_loop()
+    pending = collections.deque()
+    dropped = asyncio.Event()
+    throttled_until = 0.0
+
+    @sio.on("status")
+    async def on_status(data):
+        nonlocal throttled_until
+        # 'Online'/'Busy' follow a reply; 'Thinking...' starts one and
+        # 'Throttled' means the oldest message without a status was dropped
+        msg = data.get("msg")
+        if msg not in (THINKING, THROTTLED):
+            return
+        for request in pending:
+            if request.status_at is None:
+                break
+        else:
+            return
+        if msg == THINKING:
+            request.status_at = time.perf_counter()
+            return
+        pending.remove(request)
+        stats.errors["throttled"] += 1
+        request.done.set_result(None)
+        throttled_until = time.perf_counter() + data.get("retry_after", 1)
+
+    async def on_reply(data):
+        if not pending:
+            return
+        request = pending.popleft()
+        if request.status_at is not None:
+            stats.status.append(request.status_at - request.start)
+        if data.get("type") == "busy":
+            stats.busy += 1
+        else:
+            stats.response.append(time.perf_counter() - request.start)
+        request.done.set_result(None)
+
+    sio.on("response_done" if stream else "response", on_reply)
+
+    @sio.event
+    async def disconnect():
+        dropped.set()
+
+    start = time.perf_counter()
+    try:
+        await sio.connect(url, transports=["websocket"], wait_timeout=timeout)
+    except Exception:
+        stats.errors["connect"] += 1
+        await sio.disconnect()  # Closes the HTTP session left by the failed handshake
+        return
+    stats.connect.append(time.perf_counter() - start)
+
+    try:
+        next_send = time.perf_counter()
+        for i in range(n_requests):
+            if dropped.is_set():
+                break
+            wait = throttled_until - time.perf_counter()
+            if wait > 0 and interval <= 0:
+                await asyncio.sleep(wait)
+            elif wait > 0:
+                # The server would drop it without a word; count it and don't send
+                stats.sent += 1
+                stats.errors["throttled"] += 1
+                next_send += interval
+                await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+                continue
+            request = _Request(loop)
+            pending.append(request)
+            try:
+                await sio.emit("user_input", {"text": f"load client {index} request {i}", "stream": stream})
+            except Exception:
+                pending.remove(request)
+                stats.errors["emit"] += 1
+                continue
+            stats.sent += 1
+            if interval <= 0:
+                # Closed loop: the next message waits for this reply
+                watch_drop = asyncio.ensure_future(dropped.wait())
+                await asyncio.wait({request.done, watch_drop}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                watch_drop.cancel()
+                if not request.done.done():
+                    break
+            else:
+                next_send += interval
+                await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+
+        outstanding = [request.done for request in pending]
+        if outstanding and interval > 0 and not dropped.is_set():
+            await asyncio.wait(outstanding, timeout=timeout)
+        kind = "disconnect" if dropped.is_set() else "timeout"
+        stats.errors[kind] += sum(1 for request in pending if not request.done.done())
+    finally:
+        await sio.disconnect()
+
+
+def summarize(samples):
+    """Latency summary in milliseconds."""
+    return {
+        "count": len(samples),
+        "mean_ms": sum(samples) / len(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "max_ms": max(samples) * 1000 if samples else 0.0,
+    }
+
+
+def build_report(stats, config, wall):
+    request_errors = sum(count for kind, count in stats.errors.items() if kind != "connect")
+    return {
+        "config": config,
+        "wall_s": wall,
+        "clients_connected": len(stats.connect),
+        "requests": stats.sent,
+        "responses": len(stats.response),
+        "busy": stats.busy,
+        "errors": dict(stats.errors),
+        "error_rate": request_errors / stats.sent if stats.sent else 0.0,
+        "connect_error_rate": stats.errors["connect"] / config["clients"] if config["clients"] else 0.0,
+        "offered_rps": config["clients"] * config["rate"] if config["rate"] > 0 else None,
+        "throughput_rps": len(stats.response) / wall if wall else 0.0,
+        "connect": summarize(stats.connect),
+        "time_to_status": summarize(stats.status),
+        "time_to_response": summarize(stats.response),
+    }
+
+
+async def run_load(url, clients, requests_per_client, rate, ramp=0.0, timeout=30.0, stream=False):
+    """
+    Runs clients concurrently against url and returns the report. rate is
+    messages per second per client (0 = send on reply); client starts are
+    spread evenly over ramp seconds.
+    """
+    stats = LoadStats()
+    interval = 1.0 / rate if rate > 0 else 0.0
+
+    async def staggered(index):
+        if ramp > 0:
+            await asyncio.sleep(ramp * index / clients)
+        await run_client(url, index, requests_per_client, interval, timeout, stream, stats)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(staggered(c) for c in range(clients)))
+    wall = time.perf_counter() - wall_start
+    config = {
+        "clients": clients, "requests_per_client": requests_per_client, "rate": rate,
+        "ramp_s": ramp, "timeout_s": timeout, "stream": stream,
+    }
+    return build_report(stats, config, wall)
+
+
+def compare(report, baseline, tolerance=0.25, min_ms=20.0, max_error_increase=0.01):
+    """
+    Returns regression messages: throughput lower than baseline by more than
+    tolerance (fraction); p50/p99 latency higher by more than tolerance and
+    min_ms; error rates higher by more than max_error_increase (absolute).
+    """
+    regressions = []
+
+    before, now = baseline["throughput_rps"], report["throughput_rps"]
+    if before - now > before * tolerance:
+        regressions.append(f"throughput: {before:.1f} req/s -> {now:.1f} req/s")
+
+    for metric in ("connect", "time_to_status", "time_to_response"):
+        for pct in ("p50_ms", "p99_ms"):
+            before, now = baseline[metric][pct], report[metric][pct]
+            if now - before > max(before * tolerance, min_ms):
+                regressions.append(f"{metric} {pct[:3]}: {before:.0f} ms -> {now:.0f} ms")
+
+    for rate in ("error_rate", "connect_error_rate"):
+        before, now = baseline[rate], report[rate]
+        if now - before > max_error_increase:
+            regressions.append(f"{rate}: {before:.1%} -> {now:.1%}")
+    return regressions
+
+
+def format_report(report):
+    config = report["config"]
+    mode = f"{config['rate']:g} msg/s per client" if config["rate"] > 0 else "closed loop"
+    lines = [
+        f"\n{'='*60}",
+        f"Socket.IO load: {config['clients']} clients x {config['requests_per_client']} requests, {mode}",
+        f"{'='*60}",
+        f"  connected     : {report['clients_connected']}/{config['clients']}",
+        f"  requests      : {report['requests']} ({report['responses']} answered, {report['busy']} busy)",
+        "  errors        : " + ", ".join(f"{kind} {count}" for kind, count in report["errors"].items())
+        + f" ({report['error_rate']:.1%} of requests)",
+        f"  wall time     : {report['wall_s']:.2f}s",
+        f"  throughput    : {report['throughput_rps']:.1f} req/s",
+    ]
+    for label, key in (("connect", "connect"), ("to status", "time_to_status"), ("to response", "time_to_response")):
+        s = report[key]
+        lines.append(f"  {label:<14}: p50 {s['p50_ms']:7.1f} ms   p99 {s['p99_ms']:7.1f} ms   max {s['max_ms']:7.1f} ms")
+    return "\n".join(lines)
+
+
+async def run_benchmark(args):
+    server = None
+    url = args.url
+    if not url:
+        server = start_server(args.port, 1, args.latency, args.cpu_ms, None)
+        url = f"http://127.0.0.1:{args.port}"
+    try:
+        await wait_until_up(url)
+        return await run_load(url, args.clients, args.requests, args.rate, args.ramp, args.timeout, args.stream)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Socket.IO load generator for server.py")
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent Socket.IO clients")
+    parser.add_argument("--requests", type=int, default=10, help="Messages per client")
+    parser.add_argument("--rate", type=float, default=1.0, help="Messages per second per client (0 = send on reply)")
+    parser.add_argument("--ramp", type=float, default=1.0, help="Seconds over which clients connect")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait for connects and outstanding replies")
+    parser.add_argument("--stream", action="store_true", help="Request streamed replies")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub model latency in seconds")
+    parser.add_argument("--cpu-ms", type=float, default=0, help="Stub CPU work per request in milliseconds")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the server under test")
+    parser.add_argument("--url", type=str, default=None, help="Load a running server instead of a stub subprocess")
+    parser.add_argument("--output", type=str, default=None, help="Write the JSON report to this file")
+    parser.add_argument("--json", action="store_true", help="Print the JSON report instead of the summary")
+    parser.add_argument("--baseline", type=str, default=None, help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs baseline (fraction)")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_benchmark(args))
+    if args.url is None:
+        report["config"].update(latency_s=args.latency, cpu_ms=args.cpu_ms)
+
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print("  note: baseline was recorded with a different config", file=sys.stderr)
+        regressions = compare(report, baseline, args.tolerance)
+        for message in regressions:
+            print(f"  REGRESSION {message}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Per-chunk CPU benchmark for voice activity detection.
+
+Times the original pure-Python RMS (struct.unpack plus a generator sum)
+against the numpy engines in vad.py on synthetic 16-bit mic chunks: half
+a 220 Hz voiced tone with harmonics, half low-level noise. Reports CPU
+microseconds per chunk and how much of the real-time budget (one chunk
+every CHUNK_SIZE / rate seconds) each approach uses.
+
+Usage:
+    python backend/bench_vad.py
+    python backend/bench_vad.py --chunks 5000 --chunk-size 320 --rate 16000
+"""
+import argparse
+import math
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from vad import DEFAULT_THRESHOLD, HAS_WEBRTCVAD, EnergyVAD, SpectralVAD, SpeechGate, make_vad  # noqa: E402
+
+
+def legacy_rms(data):
+    """listen_audio's RMS before vad.py, kept as the baseline."""
+    count = len(data) // 2
+    if count > 0:
+        shorts = struct.unpack(f"<{count}h", data)
+        sum_squares = sum(s**2 for s in shorts)
+        return int(math.sqrt(sum_squares / count))
+    return 0
+
+
+def make_chunks(n, chunk_size, rate, seed=0):
+    """n chunks of int16 PCM bytes alternating voiced tone and noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(chunk_size) / rate
+    voiced = sum(np.sin(2 * np.pi * 220 * k * t) / k for k in range(1, 6)) * 6000
+    chunks = []
+    for i in range(n):
+        noise = rng.normal(0, 100, chunk_size)
+        signal = voiced + noise if i % 2 == 0 else noise
+        chunks.append(np.clip(signal, -32768, 32767).astype("<i2").tobytes())
+    return chunks
+
+
+def time_per_chunk(fn, chunks):
+    """CPU seconds per chunk for fn over all chunks."""
+    start = time.process_time()
+    for data in chunks:
+        fn(data)
+    return (time.process_time() - start) / len(chunks)
+
+
+def run_benchmark(chunks=2000, chunk_size=320, rate=16000):
+    data = make_chunks(chunks, chunk_size, rate)
+    cases = {
+        "legacy (struct + sum)": lambda d: legacy_rms(d) > DEFAULT_THRESHOLD,
+        "energy (numpy)": SpeechGate(EnergyVAD(rate)).update,
+        "spectral (numpy fft)": SpeechGate(SpectralVAD(rate)).update,
+    }
+    if HAS_WEBRTCVAD:
+        cases["webrtc"] = SpeechGate(make_vad("webrtc", rate)).update
+    budget = chunk_size / rate
+    results = {}
+    for name, fn in cases.items():
+        fn(data[0])  # Warm caches (fft window, numpy dispatch)
+        per_chunk = time_per_chunk(fn, data)
+        results[name] = {"us_per_chunk": per_chunk * 1e6, "realtime_pct": per_chunk / budget * 100}
+    baseline = results["legacy (struct + sum)"]["us_per_chunk"]
+    for result in results.values():
+        result["speedup"] = baseline / result["us_per_chunk"] if result["us_per_chunk"] else float("inf")
+    return {"chunks": chunks, "chunk_size": chunk_size, "rate": rate, "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-chunk VAD CPU benchmark")
+    parser.add_argument("--chunks", type=int, default=2000, help="Chunks to process per engine")
+    parser.add_argument("--chunk-size", type=int, default=320, help="Samples per chunk (listen_audio reads 320; it read 1024 before audio_framing.py)")
+    parser.add_argument("--rate", type=int, default=16000, help="Sample rate in Hz")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.chunks, args.chunk_size, args.rate)
+
+    print(f"\n{'='*60}")
+    print(f"VAD benchmark: {report['chunks']} chunks of {report['chunk_size']} samples at {report['rate']} Hz")
+    print(f"{'='*60}")
+    for name, result in report["results"].items():
+        print(f"  {name:22}: {result['us_per_chunk']:8.1f} us/chunk  "
+              f"{result['realtime_pct']:6.3f}% of real time  x{result['speedup']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
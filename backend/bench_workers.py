@@ -0,0 +1,153 @@
+"""
+Socket.IO benchmark for single- vs multi-worker server.py.
+
+Starts server.py as a subprocess (stub model, no API key needed) once per
+worker count, connects concurrent Socket.IO clients over websockets and
+reports p50/p99 latency and throughput for each run. Multi-worker runs use
+a local MiniRedis for shared state unless --redis-url is given.
+
+Usage:
+    python backend/bench_workers.py --workers 1 4 --clients 64 --cpu-ms 20
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import socketio
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_chat import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+async def wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as http:
+        while time.monotonic() < deadline:
+            try:
+                if (await http.get(f"{url}/status")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start")
+
+
+def start_server(port, workers, latency, cpu_ms, redis_url):
+    env = dict(os.environ)
+    env.update({
+        "GEMINI_API_KEY": env.get("GEMINI_API_KEY", "bench"),
+        "GRAVITY_STUB_LATENCY": str(latency),
+        "GRAVITY_STUB_CPU_MS": str(cpu_ms),
+        # Unique prompts per request, so nothing is served from cache
+        "GRAVITY_CACHE_SIZE": "0",
+        # Measures capacity, so one address opening many sockets must not be throttled
+        "GRAVITY_RATE_LIMIT": "0",
+        "REDIS_URL": redis_url or "",
+    })
+    return subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "server.py"), "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+async def run_client(url, index, n_requests, latencies, errors):
+    sio = socketio.AsyncClient()
+    replies = asyncio.Queue()
+
+    @sio.on("response")
+    async def on_response(data):
+        await replies.put(data)
+
+    try:
+        await sio.connect(url, transports=["websocket"])
+        for i in range(n_requests):
+            start = time.perf_counter()
+            await sio.emit("user_input", {"text": f"bench client {index} request {i}"})
+            try:
+                await asyncio.wait_for(replies.get(), timeout=60)
+                latencies.append(time.perf_counter() - start)
+            except asyncio.TimeoutError:
+                errors.append(1)
+    except Exception:
+        errors.append(1)
+    finally:
+        await sio.disconnect()
+
+
+async def run_load(url, clients, requests_per_client):
+    latencies, errors = [], []
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(run_client(url, c, requests_per_client, latencies, errors) for c in range(clients)))
+    wall = time.perf_counter() - wall_start
+    return {
+        "requests": len(latencies) + len(errors),
+        "errors": len(errors),
+        "wall_s": wall,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def run_benchmark(worker_counts, clients, requests_per_client, latency, cpu_ms, port, redis_url=None):
+    reports = []
+    mini = None
+    for workers in worker_counts:
+        url = redis_url
+        if workers > 1 and not url:
+            if mini is None:
+                mini = subprocess.Popen(
+                    [sys.executable, os.path.join(BACKEND_DIR, "mini_redis.py"), "--port", str(port + 1)],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                )
+            url = f"redis://127.0.0.1:{port + 1}/0"
+        server = start_server(port, workers, latency, cpu_ms, url)
+        try:
+            base = f"http://127.0.0.1:{port}"
+            await wait_until_up(base)
+            report = await run_load(base, clients, requests_per_client)
+            report["workers"] = workers
+            reports.append(report)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    if mini is not None:
+        mini.terminate()
+        mini.wait(timeout=10)
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Socket.IO load benchmark across worker counts")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4], help="Worker counts to compare")
+    parser.add_argument("--clients", type=int, default=64, help="Concurrent Socket.IO clients")
+    parser.add_argument("--requests", type=int, default=5, help="Requests per client")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub model latency in seconds")
+    parser.add_argument("--cpu-ms", type=float, default=20, help="Stub CPU work per request in milliseconds")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the server under test")
+    parser.add_argument("--redis-url", type=str, default=None, help="Use this Redis instead of a local MiniRedis")
+    args = parser.parse_args()
+
+    reports = asyncio.run(run_benchmark(
+        args.workers, args.clients, args.requests, args.latency, args.cpu_ms, args.port, args.redis_url
+    ))
+
+    print(f"\n{'='*60}")
+    print(f"Socket.IO benchmark: {args.clients} clients x {args.requests} requests, "
+          f"{args.latency * 1000:.0f} ms model + {args.cpu_ms:.0f} ms CPU")
+    print(f"{'='*60}")
+    for r in reports:
+        print(f"  workers={r['workers']:<3} {r['throughput_rps']:7.1f} req/s   "
+              f"p50 {r['p50_ms']:7.1f} ms   p99 {r['p99_ms']:7.1f} ms   errors {r['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import logging
 import os
 import json
 import asyncio
@@ -8,6 +9,8 @@ from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 from typing import List, Optional
 
+logger = logging.getLogger("klistar.cad_agent")
+
 load_dotenv()
 
 class CadAgent:
@@ -67,7 +70,7 @@ export_stl(result_part, 'output.stl')
             prompt: User's description of the model to generate.
             output_dir: Directory to save the script and STL. If None, uses temp dir.
         """
-        print(f"[CadAgent DEBUG] [START] Generation started for: '{prompt}'")
+        logger.debug("[START] Generation started for: '%s'", prompt)
         
         try:
             # Use provided output_dir or fall back to temp
@@ -87,7 +90,7 @@ export_stl(result_part, 'output.stl')
             current_prompt = f"You are a build123d expert. Write a generic python script to create a 3D model of: {prompt}. Ensure you export to 'output.stl'. Unscaled."
             
             for attempt in range(max_retries):
-                print(f"[CadAgent DEBUG] Attempt {attempt + 1}/{max_retries}")
+                logger.debug("Attempt %s/%s", attempt + 1, max_retries)
                 
                 # Emit status update
                 if self.on_status:
@@ -124,7 +127,7 @@ export_stl(result_part, 'output.stl')
                                 raw_content += part.text
                 
                 if not raw_content:
-                    print("[CadAgent DEBUG] [ERR] Empty response from model.")
+                    logger.error("Empty response from model.")
                     return None
 
                 # 2. Extract Code Block
@@ -134,11 +137,11 @@ export_stl(result_part, 'output.stl')
                     code = code_match.group(1).strip()
                 else:
                     # Fallback: assume entire text is code if no blocks, or fail
-                    print("[CadAgent DEBUG] [WARN] No ```python block found. Trying heuristic...")
+                    logger.warning("No ```python block found. Trying heuristic...")
                     if "import build123d" in raw_content:
                         code = raw_content
                     else:
-                        print("[CadAgent DEBUG] [ERR] Could not extract python code.")
+                        logger.error("Could not extract python code.")
                         return None
                 
                 # 3. Save to Local File in cad_outputs folder
@@ -150,7 +153,7 @@ export_stl(result_part, 'output.stl')
                     code_with_path = code.replace("output.stl", safe_output_path)
                     f.write(code_with_path)
                     
-                print(f"[CadAgent DEBUG] [EXEC] Running local script: {script_path}")
+                logger.debug("[EXEC] Running local script: %s", script_path)
                 
                 # 4. Execute Locally
                 import subprocess
@@ -166,7 +169,7 @@ export_stl(result_part, 'output.stl')
                     )
                     stdout, stderr = proc.stdout, proc.stderr
                 except Exception as e:
-                     print(f"[CadAgent DEBUG] [ERR] Subprocess run failed: {e}")
+                     logger.error("Subprocess run failed: %s", e)
                      proc = type('obj', (object,), {'returncode': 1})
                      stdout = ""
                      stderr = str(e)
@@ -176,7 +179,7 @@ export_stl(result_part, 'output.stl')
                     # Extract a concise error message for display
                     error_lines = error_msg.strip().split('\n')
                     short_error = error_lines[-1][:100] if error_lines else "Unknown error"
-                    print(f"[CadAgent DEBUG] [ERR] Script Execution Failed:\n{error_msg}")
+                    logger.error("Script Execution Failed:\n%s", error_msg)
                     
                     # Emit retry status with error
                     if self.on_status:
@@ -198,31 +201,29 @@ Original request: {prompt}
 """
                     continue # Retry loop
                 
-                print(f"[CadAgent DEBUG] [OK] Script executed successfully.")
+                logger.debug("[OK] Script executed successfully.")
                 
                 # 5. Read Output
                 if os.path.exists(output_stl):
-                    print(f"[CadAgent DEBUG] [file] '{output_stl}' found.")
+                    logger.debug("[file] '%s' found.", output_stl)
                     with open(output_stl, "rb") as f:
                         stl_data = f.read()
                         
-                    import base64
-                    b64_stl = base64.b64encode(stl_data).decode('utf-8')
-                    
+                    # Raw bytes; AudioLoop.media_payload base64s them unless the relay sends binary
                     return {
                         "format": "stl",
-                        "data": b64_stl,
+                        "data": stl_data,
                         "file_path": output_stl
                     }
                 else:
-                     print(f"[CadAgent DEBUG] [ERR] '{output_stl}' was not generated.")
+                     logger.error("'%s' was not generated.", output_stl)
                      # If script ran but no output, treat as failure and retry?
                      # Ideally yes.
                      current_prompt = f"The script executed successfully but 'output.stl' was not found. Ensure you call `export_stl(result_part, 'output.stl')` at the end."
                      continue
 
             # If loop finishes without success
-            print("[CadAgent DEBUG] [ERR] All attempts failed.")
+            logger.error("All attempts failed.")
             if self.on_status:
                 self.on_status({
                     "status": "failed",
@@ -232,10 +233,8 @@ Original request: {prompt}
                 })
             return None
 
-        except Exception as e:
-            print(f"CadAgent Error: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("CadAgent Error")
             return None
 
     async def iterate_prototype(self, prompt: str, output_dir: Optional[str] = None):
@@ -245,7 +244,7 @@ Original request: {prompt}
             prompt: User's description of the changes to make.
             output_dir: Directory containing existing script and where to save new STL.
         """
-        print(f"[CadAgent DEBUG] [START] Iteration started for: '{prompt}'")
+        logger.debug("[START] Iteration started for: '%s'", prompt)
         
         # Use provided output_dir or fall back to temp
         if output_dir:
@@ -282,7 +281,7 @@ Original request: {prompt}
                 existing_code
             )
         else:
-             print("[CadAgent DEBUG] [WARN] No existing script found. Falling back to fresh generation.")
+             logger.warning("No existing script found. Falling back to fresh generation.")
              return await self.generate_prototype(prompt)
 
         try:
@@ -303,7 +302,7 @@ Ensure you still export to 'output.stl'.
 """
             
             for attempt in range(max_retries):
-                print(f"[CadAgent DEBUG] Iteration Attempt {attempt + 1}/{max_retries}")
+                logger.debug("Iteration Attempt %s/%s", attempt + 1, max_retries)
                 
                 # Emit status update
                 if self.on_status:
@@ -340,7 +339,7 @@ Ensure you still export to 'output.stl'.
                                 raw_content += part.text
                 
                 if not raw_content:
-                    print("[CadAgent DEBUG] [ERR] Empty response from model.")
+                    logger.error("Empty response from model.")
                     return None
 
                 # 2. Extract Code Block
@@ -350,11 +349,11 @@ Ensure you still export to 'output.stl'.
                     code = code_match.group(1).strip()
                 else:
                     # Fallback: assume entire text is code if no blocks, or fail
-                    print("[CadAgent DEBUG] [WARN] No ```python block found. Trying heuristic...")
+                    logger.warning("No ```python block found. Trying heuristic...")
                     if "import build123d" in raw_content:
                         code = raw_content
                     else:
-                        print("[CadAgent DEBUG] [ERR] Could not extract python code.")
+                        logger.error("Could not extract python code.")
                         return None
                 
                 # 3. Save to Local File in cad_outputs folder
@@ -368,7 +367,7 @@ Ensure you still export to 'output.stl'.
                     code_with_path = code.replace("output.stl", safe_output_path)
                     f.write(code_with_path)
                     
-                print(f"[CadAgent DEBUG] [EXEC] Running local script: {script_path}")
+                logger.debug("[EXEC] Running local script: %s", script_path)
                 
                 # 4. Execute Locally
                 import subprocess
@@ -385,14 +384,14 @@ Ensure you still export to 'output.stl'.
                     )
                     stdout, stderr = proc.stdout, proc.stderr
                 except Exception as e:
-                    print(f"[CadAgent DEBUG] [ERR] Subprocess run failed: {e}")
+                    logger.error("Subprocess run failed: %s", e)
                     proc = type('obj', (object,), {'returncode': 1})()
                     stdout = ""
                     stderr = str(e)
                 
                 if proc.returncode != 0:
                     error_msg = stderr
-                    print(f"[CadAgent DEBUG] [ERR] Script Execution Failed:\n{error_msg}")
+                    logger.error("Script Execution Failed:\n%s", error_msg)
                     
                     # Preparing feedback for next attempt
                     current_prompt = f"""
@@ -404,29 +403,27 @@ Ensure you still export to 'output.stl'.
 """
                     continue # Retry loop
                 
-                print(f"[CadAgent DEBUG] [OK] Script executed successfully.")
+                logger.debug("[OK] Script executed successfully.")
                 
                 # 5. Read Output
                 if os.path.exists(output_stl):
-                    print(f"[CadAgent DEBUG] [file] '{output_stl}' found.")
+                    logger.debug("[file] '%s' found.", output_stl)
                     with open(output_stl, "rb") as f:
                         stl_data = f.read()
                         
-                    import base64
-                    b64_stl = base64.b64encode(stl_data).decode('utf-8')
-                    
+                    # Raw bytes; AudioLoop.media_payload base64s them unless the relay sends binary
                     return {
                         "format": "stl",
-                        "data": b64_stl,
+                        "data": stl_data,
                         "file_path": output_stl
                     }
                 else:
-                     print(f"[CadAgent DEBUG] [ERR] '{output_stl}' was not generated.")
+                     logger.error("'%s' was not generated.", output_stl)
                      current_prompt = f"The script executed successfully but '{output_stl}' was not found. Ensure you call `export_stl(result_part, 'output.stl')` at the end."
                      continue
 
             # If loop finishes without success
-            print("[CadAgent DEBUG] [ERR] All attempts failed.")
+            logger.error("All attempts failed.")
             if self.on_status:
                 self.on_status({
                     "status": "failed",
@@ -436,9 +433,7 @@ Ensure you still export to 'output.stl'.
                 })
             return None
 
-        except Exception as e:
-            print(f"CadAgent Error: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("CadAgent Error")
             return None
 
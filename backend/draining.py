@@ -0,0 +1,47 @@
+"""
+Drainer - Tracks in-flight requests so shutdown can wait for them.
+
+On shutdown the server calls begin(): handlers check `draining` and turn
+new work away, while wait() lets the requests already running finish,
+up to a deadline.
+"""
+
+import asyncio
+from contextlib import contextmanager
+
+
+class Drainer:
+    def __init__(self):
+        self.draining = False
+        self.in_flight = 0
+        self.completed = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def begin(self):
+        """Stops admitting new work (handlers check `draining`)."""
+        self.draining = True
+
+    @contextmanager
+    def track(self):
+        """Counts the wrapped block as one in-flight request."""
+        self.in_flight += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            if self.in_flight == 0:
+                self._idle.set()
+
+    async def wait(self, timeout):
+        """Waits until nothing is in flight. Returns False if timeout ran out first."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def stats(self):
+        return {"draining": self.draining, "in_flight": self.in_flight, "completed": self.completed}
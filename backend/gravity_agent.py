@@ -1,12 +1,118 @@
 import os
 import json
+import logging
 import asyncio
+import hashlib
+import inspect
+import time
 import httpx
 from google import genai
 from dotenv import load_dotenv
 
+try:
+    from admission import AdmissionController, Overloaded
+    from agent_registry import load_class
+    from intent_router import IntentRouter
+    from metrics import REGISTRY
+    from prompt_assembly import PromptAssembler
+    from response_cache import ResponseCache, normalize_text
+    from search_provider import FixtureSearchProvider, GoogleSearchProvider, SearchPipeline
+    from session_store import SessionStore
+    from single_flight import LeaderAbandoned, SingleFlight
+except ImportError:
+    from backend.admission import AdmissionController, Overloaded
+    from backend.agent_registry import load_class
+    from backend.intent_router import IntentRouter
+    from backend.metrics import REGISTRY
+    from backend.prompt_assembly import PromptAssembler
+    from backend.response_cache import ResponseCache, normalize_text
+    from backend.search_provider import FixtureSearchProvider, GoogleSearchProvider, SearchPipeline
+    from backend.session_store import SessionStore
+    from backend.single_flight import LeaderAbandoned, SingleFlight
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
 load_dotenv()
 
+logger = logging.getLogger("klistar.gravity_agent")
+
+MODEL = "gemini-2.0-flash-exp"
+
+# Upper bound on concurrent Gemini calls from this process, and how long a
+# single call may take before we give up on it.
+MAX_CONCURRENT_CALLS = int(os.getenv("GRAVITY_MAX_CONCURRENT_CALLS", "8"))
+REQUEST_TIMEOUT = float(os.getenv("GRAVITY_REQUEST_TIMEOUT", "30"))
+# Callers allowed to wait for a model slot, and for how long (seconds);
+# beyond that requests are answered "busy" straight away.
+MAX_QUEUE = int(os.getenv("GRAVITY_MAX_QUEUE", "32"))
+QUEUE_TIMEOUT = float(os.getenv("GRAVITY_QUEUE_TIMEOUT", "10"))
+
+# Reply cache: entries, TTL for text and for action replies (seconds), and an
+# optional SQLite file that keeps the cache across restarts.
+CACHE_SIZE = int(os.getenv("GRAVITY_CACHE_SIZE", "512"))
+CACHE_TTL = float(os.getenv("GRAVITY_CACHE_TTL", "3600"))
+CACHE_ACTION_TTL = float(os.getenv("GRAVITY_CACHE_ACTION_TTL", "300"))
+CACHE_DB = os.getenv("GRAVITY_CACHE_DB")
+
+# Per-session conversation history: messages kept per session, approximate
+# history tokens per prompt, and limits across all sessions.
+HISTORY_TURNS = int(os.getenv("GRAVITY_HISTORY_TURNS", "20"))
+HISTORY_TOKENS = int(os.getenv("GRAVITY_HISTORY_TOKENS", "2000"))
+MAX_SESSIONS = int(os.getenv("GRAVITY_MAX_SESSIONS", "1000"))
+SESSION_MEMORY_MB = float(os.getenv("GRAVITY_SESSION_MEMORY_MB", "16"))
+SESSION_IDLE_TIMEOUT = float(os.getenv("GRAVITY_SESSION_IDLE_TIMEOUT", "1800"))
+
+# Shared outbound HTTP client (YouTube lookups) and its query -> video cache
+HTTP_MAX_CONNECTIONS = int(os.getenv("GRAVITY_HTTP_MAX_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("GRAVITY_HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_TIMEOUT = float(os.getenv("GRAVITY_HTTP_TIMEOUT", "10"))
+YOUTUBE_CACHE_SIZE = int(os.getenv("GRAVITY_YOUTUBE_CACHE_SIZE", "256"))
+YOUTUBE_CACHE_TTL = float(os.getenv("GRAVITY_YOUTUBE_CACHE_TTL", "86400"))
+
+# Web search (see search_provider.py): provider ("google", "fixture", or
+# empty to pick google when its keys are set), result pages fetched, snippets
+# re-fed to the model, per-page fetch timeout and result cache TTL (seconds)
+SEARCH_PROVIDER = os.getenv("GRAVITY_SEARCH_PROVIDER", "")
+SEARCH_FIXTURE = os.getenv("GRAVITY_SEARCH_FIXTURE")
+SEARCH_RESULTS = int(os.getenv("GRAVITY_SEARCH_RESULTS", "5"))
+SEARCH_TOP_K = int(os.getenv("GRAVITY_SEARCH_TOP_K", "3"))
+SEARCH_FETCH_TIMEOUT = float(os.getenv("GRAVITY_SEARCH_FETCH_TIMEOUT", "4"))
+SEARCH_CACHE_SIZE = int(os.getenv("GRAVITY_SEARCH_CACHE_SIZE", "256"))
+SEARCH_CACHE_TTL = float(os.getenv("GRAVITY_SEARCH_CACHE_TTL", "3600"))
+
+# How the system prompt reaches the model (see prompt_assembly.py):
+# "inline", "system_instruction" or "cached", and the cached-content TTL
+PROMPT_MODE = os.getenv("GRAVITY_PROMPT_MODE", "system_instruction")
+PROMPT_CACHE_TTL = float(os.getenv("GRAVITY_PROMPT_CACHE_TTL", "3600"))
+
+# Local intent router for "play ..." / "search ..." commands: on/off, the
+# confidence needed to skip the model, and an optional local classifier
+# given as "module:function" (see intent_router.py).
+INTENT_ROUTER = os.getenv("GRAVITY_INTENT_ROUTER", "1") != "0"
+INTENT_THRESHOLD = float(os.getenv("GRAVITY_INTENT_THRESHOLD", "0.9"))
+INTENT_MODEL = os.getenv("GRAVITY_INTENT_MODEL")
+
+# Latency histograms served at /metrics
+PROCESS_SECONDS = REGISTRY.histogram(
+    "gravity_process_input_seconds", "End-to-end process_input latency by result type.", labelnames=("result",)
+)
+MODEL_SECONDS = REGISTRY.histogram(
+    "gravity_model_call_seconds", "Model call latency (excluding queueing) by call kind.", labelnames=("kind",)
+)
+YOUTUBE_SECONDS = REGISTRY.histogram(
+    "gravity_youtube_lookup_seconds", "YouTube lookup latency by source.", labelnames=("source",)
+)
+SEARCH_SECONDS = REGISTRY.histogram(
+    "gravity_web_search_seconds", "Web search (search + page fetch) latency by source.", labelnames=("source",)
+)
+INTENT_ROUTES = REGISTRY.counter(
+    "gravity_intent_router", "Requests seen by the intent router by outcome (rule, model, fallback).", labelnames=("outcome",)
+)
+
 # GRAVITY SYSTEM PROMPT
 SYSTEM_PROMPT = """You are KlistarAI, a private personal AI assistant.
 
@@ -51,26 +157,113 @@ Do not explain your internal logic.
 Do not mention policies.
 Do not add extra text outside the required format."""
 
+# Re-feed after a web search: only the extracted snippets, never whole pages
+SEARCH_PROMPT = """You are KlistarAI. Answer the question using the web search results below.
+Respond in the same language as the question, in plain text.
+Cite the results you use as [1], [2], ... If they don't answer the question, say so briefly.
+
+Question: {query}
+
+Search results:
+{results}"""
+
+def busy_reply(error):
+    """Result returned when admission control turns a request away."""
+    return {
+        "type": "busy",
+        "content": "I'm handling a lot of requests right now. Please try again in a moment.",
+        "retry_after": error.retry_after,
+    }
+
+def default_search():
+    """Search provider from GRAVITY_SEARCH_* settings, or None if none is configured."""
+    provider = SEARCH_PROVIDER.lower()
+    if provider == "fixture" or (not provider and SEARCH_FIXTURE):
+        return FixtureSearchProvider(path=SEARCH_FIXTURE)
+    api_key, engine_id = os.getenv("GOOGLE_SEARCH_API_KEY"), os.getenv("GOOGLE_SEARCH_ENGINE_ID")
+    if provider in ("", "google") and api_key and engine_id:
+        return GoogleSearchProvider(api_key, engine_id)
+    if provider not in ("", "google", "none"):
+        logger.warning("Unknown GRAVITY_SEARCH_PROVIDER: %s", SEARCH_PROVIDER)
+    return None
+
+def default_router():
+    """Builds the intent router from GRAVITY_INTENT_* settings, or None if disabled."""
+    if not INTENT_ROUTER:
+        return None
+    model = None
+    if INTENT_MODEL:
+        module, _, attr = INTENT_MODEL.partition(":")
+        model = load_class(module, attr)
+    return IntentRouter(model=model, threshold=INTENT_THRESHOLD)
+
 class GravityAgent:
-    def __init__(self):
+    def __init__(self, client=None, max_concurrent_calls=None, request_timeout=None, cache=None, sessions=None, shared=None, max_queue=None, queue_timeout=None, router=None, search=None, prompts=None):
         self.api_key = os.getenv("GEMINI_API_KEY")
-        self.client = None
-        self.chat_history = []  # Simple in-memory history
-        
-        if self.api_key:
+        self.client = client
+        self.request_timeout = request_timeout if request_timeout is not None else REQUEST_TIMEOUT
+        # Limits how many model calls run at once; extra callers wait their turn
+        # in a bounded queue instead of piling onto the API together.
+        self.admission = AdmissionController(
+            max_concurrent=max_concurrent_calls or MAX_CONCURRENT_CALLS,
+            max_queue=max_queue if max_queue is not None else MAX_QUEUE,
+            queue_timeout=queue_timeout if queue_timeout is not None else QUEUE_TIMEOUT,
+        )
+        self.cache = cache if cache is not None else ResponseCache(
+            max_entries=CACHE_SIZE, ttl=CACHE_TTL, action_ttl=CACHE_ACTION_TTL, db_path=CACHE_DB
+        )
+        # Identical requests arriving together share one model call
+        self.flights = SingleFlight()
+        self._http = None  # Pooled httpx client, see http_client()
+        self.youtube_cache = ResponseCache(max_entries=YOUTUBE_CACHE_SIZE, ttl=YOUTUBE_CACHE_TTL)
+        # Conversation history per client session (sid)
+        self.sessions = sessions if sessions is not None else SessionStore(
+            max_turns=HISTORY_TURNS,
+            token_budget=HISTORY_TOKENS,
+            max_sessions=MAX_SESSIONS,
+            max_total_bytes=int(SESSION_MEMORY_MB * 1024 * 1024),
+            idle_timeout=SESSION_IDLE_TIMEOUT,
+        )
+        # Optional cross-worker store (see shared_state.py); local tiers stay authoritative
+        self.shared = shared
+        # Answers simple commands locally; pass router=False to always ask the model
+        self.router = default_router() if router is None else (router or None)
+        # Web search provider (search=False disables) and its per-query snippet cache
+        provider = default_search() if search is None else (search or None)
+        if provider is not None and provider.http is None:
+            provider.http = self.http_client
+        self.search = SearchPipeline(
+            provider, results=SEARCH_RESULTS, top_k=SEARCH_TOP_K, fetch_timeout=SEARCH_FETCH_TIMEOUT
+        ) if provider is not None else None
+        self.search_cache = ResponseCache(max_entries=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+        # System prompt sent as config (built once) rather than in every request
+        self.prompts = prompts if prompts is not None else PromptAssembler(
+            SYSTEM_PROMPT, mode=PROMPT_MODE, model=MODEL, cache_ttl=PROMPT_CACHE_TTL
+        )
+
+        if self.client is not None:
+            logger.info("Using injected model client")
+        elif self.api_key:
             try:
                 self.client = genai.Client(http_options={"api_version": "v1beta"}, api_key=self.api_key)
-                print("[Gravity] Gemini Client Initialized")
+                logger.info("Gemini Client Initialized")
             except Exception as e:
-                print(f"[Gravity] Failed to init Gemini: {e}")
+                logger.error("Failed to init Gemini: %s", e)
         else:
-            print("[Gravity] WARN: GEMINI_API_KEY missing")
+            logger.warning("GEMINI_API_KEY missing")
 
-    async def process_input(self, text, owner_verified=True):
+    async def process_input(self, text, owner_verified=True, session_id=None):
         """
         Main entry point.
-        Returns a dict: { "type": "text"|"action", "content": "..." }
+        session_id: Optional client session; its recent turns are sent as context.
+        Returns a dict: { "type": "text"|"action"|"busy", "content": "..." }
         """
+        start = time.perf_counter()
+        result = await self._process_input(text, owner_verified, session_id)
+        PROCESS_SECONDS.labels(result["type"]).observe(time.perf_counter() - start)
+        return result
+
+    async def _process_input(self, text, owner_verified, session_id):
         if not self.client:
             return {"type": "text", "content": "Error: AI Brain missing (Check API Key)."}
 
@@ -85,49 +278,446 @@ class GravityAgent:
             # We can keep a running context or just one-shot for simplicity + system prompt
             # For "Teaches coding", context is good.
             
-            # Simple One-Shot with History implementation for now to avoid complexity
-            messages = [{"role": "user", "content": f"System Instructions:\n{SYSTEM_PROMPT}\n\nUser Input: {text}"}]
-            
-            # Use generate_content
-            response = self.client.models.generate_content(
-                model="gemini-2.0-flash-exp", 
-                contents=messages[0]["content"] # Simple pass
-            )
-            
-            raw_response = response.text.strip()
-            print(f"[Gravity] Raw: {raw_response}")
+            routed = await self.route_locally(text, session_id)
+            if routed is not None:
+                return routed
 
-            # Safe JSON parsing
-            try:
-                # Check if response looks like JSON
-                if raw_response.startswith("{") and raw_response.endswith("}"):
-                    data = json.loads(raw_response)
-                    action = data.get("action")
-                    
-                    if action == "play_youtube":
-                        return await self.handle_youtube(data.get("query"))
-                    
-                    elif action == "web_search":
-                        return await self.handle_search(data.get("query"))
-                        
-                # Default: Text
-                return {"type": "text", "content": raw_response}
-
-            except json.JSONDecodeError:
-                # Not JSON, treat as text
-                return {"type": "text", "content": raw_response}
+            history = await self.load_history(session_id)
+            cache_key = self.cache_key_for(text, history)
+            raw_response = await self.cache_get(self.cache, "reply", cache_key) if cache_key else None
+            if raw_response is None:
+                prompt = self.build_prompt(text, history)
+                raw_response = await self.flights.do(
+                    self.flight_key_for(cache_key, prompt), lambda: self.generate(prompt, self.prompts)
+                )
+                await self.remember(cache_key, raw_response)
+                logger.debug("Raw: %s", raw_response)
+            else:
+                logger.debug("Cache hit: %s", raw_response)
+            await self.record_turn(session_id, text, raw_response)
+
+            return await self.resolve_reply(raw_response)
+
+        except Overloaded as e:
+            logger.warning("Rejected: %s", e)
+            return busy_reply(e)
+
+        except asyncio.TimeoutError:
+            logger.warning("Model call timed out after %ss", self.request_timeout)
+            return {"type": "text", "content": "Sorry, that took too long. Please try again."}
 
         except Exception as e:
-            print(f"[Gravity] Error: {e}")
+            logger.error("%s", e)
             return {"type": "text", "content": f"I encountered an error: {str(e)}"}
 
+    async def process_batch(self, items, concurrency=4, owner_verified=True, slot=None):
+        """
+        Runs many requests through process_input (so the reply cache,
+        single-flight and admission control all apply) with at most
+        `concurrency` in flight.
+        items: Sequence of (text, session_id) pairs.
+        slot: Optional factory of an async context manager each request runs
+              inside, e.g. lambda: scheduler.slot(BACKGROUND).
+        Yields (index, result) as each request finishes, in completion order.
+        Closing the generator early cancels the requests still running.
+        """
+        items = list(items)
+        if not items:
+            return
+        done = asyncio.Queue()
+        pending = iter(range(len(items)))
+
+        async def run(text, session_id):
+            if slot is None:
+                return await self.process_input(text, owner_verified, session_id)
+            async with slot():
+                return await self.process_input(text, owner_verified, session_id)
+
+        async def worker():
+            # Workers share one index iterator, so each item runs exactly once
+            for index in pending:
+                text, session_id = items[index]
+                try:
+                    result = await run(text, session_id)
+                except Exception as e:
+                    logger.error("Batch item %s failed: %s", index, e)
+                    result = {"type": "text", "content": f"I encountered an error: {str(e)}"}
+                done.put_nowait((index, result))
+
+        workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, len(items))))]
+        try:
+            for _ in range(len(items)):
+                yield await done.get()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def stream_input(self, text, owner_verified=True, session_id=None):
+        """
+        Streaming variant of process_input.
+        Yields { "type": "chunk", "content": "..." } events as text arrives,
+        then exactly one { "type": "done", "result": <process_input dict> }.
+
+        Replies that open with '{' or a code fence may be a JSON action, so
+        they are buffered and resolved at the end instead of streamed.
+        """
+        if not self.client:
+            yield {"type": "done", "result": {"type": "text", "content": "Error: AI Brain missing (Check API Key)."}}
+            return
+
+        if not owner_verified:
+            yield {"type": "done", "result": {"type": "text", "content": "Access Denied."}}
+            return
+
+        try:
+            routed = await self.route_locally(text, session_id)
+        except Exception as e:
+            logger.error("Stream Error: %s", e)
+            yield {"type": "done", "result": {"type": "text", "content": f"I encountered an error: {str(e)}"}}
+            return
+        if routed is not None:
+            yield {"type": "done", "result": routed}
+            return
+
+        history = await self.load_history(session_id)
+        prompt = self.build_prompt(text, history)
+        cache_key = self.cache_key_for(text, history)
+        flight_key = self.flight_key_for(cache_key, prompt)
+        cached = await self.cache_get(self.cache, "reply", cache_key) if cache_key else None
+        while cached is None and self.flights.pending(flight_key) is not None:
+            # An identical request is already in flight; share its reply
+            try:
+                cached = await self.flights.join(flight_key)
+            except LeaderAbandoned:
+                continue  # Its consumer went away; follow the next leader or lead
+            except Overloaded as e:
+                yield {"type": "done", "result": busy_reply(e)}
+                return
+            except asyncio.TimeoutError:
+                yield {"type": "done", "result": {"type": "text", "content": "Sorry, that took too long. Please try again."}}
+                return
+            except Exception as e:
+                yield {"type": "done", "result": {"type": "text", "content": f"I encountered an error: {str(e)}"}}
+                return
+        if cached is not None:
+            logger.debug("Cache hit (stream): %s", cached)
+            await self.record_turn(session_id, text, cached)
+            if self.parse_action(cached) is None:
+                yield {"type": "chunk", "content": cached}
+            yield {"type": "done", "result": await self.resolve_reply(cached)}
+            return
+
+        self.flights.claim(flight_key)
+        settled = False
+        parts = []
+        mode = None  # None until the first non-blank text decides "text" or "action"
+        try:
+            async for delta in self.generate_stream(prompt, self.prompts):
+                parts.append(delta)
+                if mode is None:
+                    head = "".join(parts).lstrip()
+                    if not head:
+                        continue
+                    if head.startswith("{") or head.startswith("`"):
+                        mode = "action"
+                        continue
+                    mode = "text"
+                    yield {"type": "chunk", "content": head}
+                elif mode == "text":
+                    yield {"type": "chunk", "content": delta}
+
+            raw_response = "".join(parts).strip()
+            self.flights.resolve(flight_key, raw_response)
+            settled = True
+            await self.remember(cache_key, raw_response)
+            await self.record_turn(session_id, text, raw_response)
+            logger.debug("Raw (stream): %s", raw_response)
+
+            # The final result always carries the full content, so a buffered
+            # reply that turns out not to be an action is still delivered.
+            yield {"type": "done", "result": await self.resolve_reply(raw_response)}
+
+        except Overloaded as e:
+            self.flights.reject(flight_key, e)
+            settled = True
+            logger.warning("Rejected (stream): %s", e)
+            yield {"type": "done", "result": busy_reply(e)}
+
+        except asyncio.TimeoutError as e:
+            self.flights.reject(flight_key, e)
+            settled = True
+            logger.warning("Model stream timed out after %ss", self.request_timeout)
+            yield {"type": "done", "result": {"type": "text", "content": "Sorry, that took too long. Please try again."}}
+
+        except Exception as e:
+            self.flights.reject(flight_key, e)
+            settled = True
+            logger.error("Stream Error: %s", e)
+            yield {"type": "done", "result": {"type": "text", "content": f"I encountered an error: {str(e)}"}}
+
+        finally:
+            if not settled:
+                # Consumer went away mid-stream; let anyone waiting on us take over
+                self.flights.abandon(flight_key)
+
+    async def route_locally(self, text, session_id):
+        """
+        Dispatches a recognised command without calling the model.
+        Returns the result dict, or None to fall back to the model.
+        """
+        if self.router is None:
+            return None
+        routed = self.router.route(text)
+        if routed is None:
+            INTENT_ROUTES.labels("fallback").inc()
+            return None
+        INTENT_ROUTES.labels(routed["source"]).inc()
+        logger.debug("Routed locally (%s): %s", routed["source"], routed)
+        # Record the action the model would have replied with, so follow-ups see it
+        raw_response = json.dumps({"action": routed["action"], "query": routed["query"]})
+        await self.record_turn(session_id, text, raw_response)
+        return await self.resolve_reply(raw_response)
+
+    def build_prompt(self, text, history=None):
+        """Builds the request contents, with prior turns if any (see PromptAssembler for the system prompt)."""
+        prompt = ""
+        if history:
+            lines = [f"{'User' if role == 'user' else 'AI'}: {turn}" for role, turn in history]
+            prompt = "Conversation so far:\n" + "\n".join(lines) + "\n\n"
+        return self.prompts.contents(prompt + f"User Input: {text}")
+
+    def cache_key_for(self, text, history):
+        """
+        Cache key for a request, or None when it must not be cached.
+        Follow-ups depend on earlier turns, so only context-free requests are cached.
+        """
+        if history:
+            return None
+        return self.cache.make_key(text, SYSTEM_PROMPT)
+
+    def flight_key_for(self, cache_key, prompt):
+        """Key under which identical in-flight requests are coalesced."""
+        return cache_key or hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+    async def load_history(self, session_id):
+        """
+        Returns the session's recent turns. A session this worker hasn't
+        seen is hydrated from the shared store, if one is configured.
+        """
+        if not session_id:
+            return []
+        if session_id not in self.sessions and self.shared is not None:
+            try:
+                stored = await self.shared.get(f"session:{session_id}")
+            except Exception as e:
+                logger.warning("Shared state read failed: %s", e)
+                stored = None
+            for role, turn in json.loads(stored) if stored else []:
+                self.sessions.append(session_id, role, turn)
+        return self.sessions.history(session_id)
+
+    async def record_turn(self, session_id, text, raw_response):
+        """Appends a user/model exchange to the session history."""
+        if not session_id or not raw_response:
+            return
+        self.sessions.append(session_id, "user", text)
+        self.sessions.append(session_id, "model", raw_response)
+        if self.shared is not None:
+            try:
+                await self.shared.set(
+                    f"session:{session_id}",
+                    json.dumps(self.sessions.history(session_id)),
+                    ttl=self.sessions.idle_timeout,
+                )
+            except Exception as e:
+                logger.warning("Shared state write failed: %s", e)
+
+    async def end_session(self, session_id):
+        """Drops a session's history (called on disconnect)."""
+        self.sessions.drop(session_id)
+        if self.shared is not None:
+            try:
+                await self.shared.delete(f"session:{session_id}")
+            except Exception as e:
+                logger.warning("Shared state write failed: %s", e)
+
+    async def cache_get(self, cache, namespace, key):
+        """Looks a key up in a local cache, then in the shared store."""
+        value = await cache.aget(key)
+        if value is not None or self.shared is None or not cache.enabled:
+            return value
+        try:
+            stored = await self.shared.get(f"{namespace}:{key}")
+        except Exception as e:
+            logger.warning("Shared state read failed: %s", e)
+            return None
+        if stored is None:
+            return None
+        entry = json.loads(stored)
+        # Promote locally so this worker serves the next hit from memory
+        cache.put(key, entry["value"], kind=entry["kind"])
+        return entry["value"]
+
+    async def cache_put(self, cache, namespace, key, value, kind="text"):
+        """Stores a value locally and, if configured, in the shared store."""
+        cache.put(key, value, kind=kind)
+        if self.shared is None or not cache.enabled:
+            return
+        ttl = cache.action_ttl if kind == "action" else cache.ttl
+        try:
+            await self.shared.set(f"{namespace}:{key}", json.dumps({"value": value, "kind": kind}), ttl=ttl)
+        except Exception as e:
+            logger.warning("Shared state write failed: %s", e)
+
+    def parse_action(self, raw_response):
+        """Returns the action dict if the reply is a JSON action, else None."""
+        candidate = raw_response
+        if candidate.startswith("```"):
+            # Strip a ```json ... ``` fence around an action
+            candidate = candidate.strip("`").strip()
+            if candidate.lower().startswith("json"):
+                candidate = candidate[4:].strip()
+
+        # Check if response looks like JSON
+        if not (candidate.startswith("{") and candidate.endswith("}")):
+            return None
+        try:
+            data = json.loads(candidate)
+        except json.JSONDecodeError:
+            # Not JSON, treat as text
+            return None
+        if isinstance(data, dict) and data.get("action") in ("play_youtube", "web_search"):
+            return data
+        return None
+
+    async def remember(self, cache_key, raw_response):
+        """Caches a model reply; actions expire sooner than plain text."""
+        if not cache_key or not raw_response:
+            return
+        kind = "action" if self.parse_action(raw_response) else "text"
+        await self.cache_put(self.cache, "reply", cache_key, raw_response, kind=kind)
+
+    async def resolve_reply(self, raw_response):
+        """Turns raw model text into a result dict, dispatching JSON actions."""
+        data = self.parse_action(raw_response)
+        if data is None:
+            # Default: Text
+            return {"type": "text", "content": raw_response}
+
+        if data["action"] == "play_youtube":
+            return await self.handle_youtube(data.get("query"))
+        return await self.handle_search(data.get("query"))
+
+    def cache_stats(self):
+        """Reply cache hit/miss counters."""
+        return self.cache.stats()
+
+    async def generate(self, contents, prompts=None):
+        """
+        Runs one model call on the async client.
+        Waits for a free slot (Overloaded if not admitted), then raises
+        asyncio.TimeoutError if the call exceeds request_timeout.
+        prompts: Optional PromptAssembler whose system prompt config is sent along.
+        Returns the stripped response text.
+        """
+        config = await prompts.config(self.client) if prompts else None
+        async with self.admission.slot():
+            with MODEL_SECONDS.labels("generate").time():
+                response = await asyncio.wait_for(
+                    self.client.aio.models.generate_content(model=MODEL, contents=contents, config=config),
+                    timeout=self.request_timeout,
+                )
+        if prompts:
+            prompts.record(response, config)
+        return (response.text or "").strip()
+
+    async def generate_stream(self, contents, prompts=None):
+        """
+        Streams one model call, yielding text deltas as they arrive.
+        Holds a concurrency slot for the whole stream; request_timeout bounds
+        the total stream duration.
+        """
+        loop = asyncio.get_running_loop()
+        config = await prompts.config(self.client) if prompts else None
+        last = None
+        async with self.admission.slot():
+            start = loop.time()
+            deadline = start + self.request_timeout
+            stream = self.client.aio.models.generate_content_stream(model=MODEL, contents=contents, config=config)
+            if inspect.isawaitable(stream):
+                # Newer SDKs return a coroutine that resolves to the iterator
+                stream = await asyncio.wait_for(stream, timeout=self.request_timeout)
+            iterator = stream.__aiter__()
+            try:
+                while True:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    try:
+                        chunk = await asyncio.wait_for(iterator.__anext__(), timeout=remaining)
+                    except StopAsyncIteration:
+                        MODEL_SECONDS.labels("stream").observe(loop.time() - start)
+                        break
+                    last = chunk
+                    if chunk.text:
+                        yield chunk.text
+            finally:
+                # Release the model connection when the caller stops early or times out
+                if hasattr(stream, "aclose"):
+                    await stream.aclose()
+        if prompts:
+            # Usage metadata (incl. cached tokens) arrives with the final chunk
+            prompts.record(last, config)
+
+    def http_client(self):
+        """
+        Shared HTTP client for outbound lookups, created on first use.
+        Keeps connections alive between requests and speaks HTTP/2 when the
+        optional 'h2' package is installed.
+        """
+        if self._http is None or self._http.is_closed:
+            limits = httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            )
+            self._http = httpx.AsyncClient(http2=HAS_HTTP2, limits=limits, timeout=HTTP_TIMEOUT)
+        return self._http
+
+    def caches(self):
+        return {"reply": self.cache, "youtube": self.youtube_cache, "search": self.search_cache}
+
+    def save_caches(self, directory):
+        """Snapshots each cache to <directory>/<name>.sqlite3. Returns entries saved per cache."""
+        return {name: cache.snapshot(os.path.join(directory, f"{name}.sqlite3")) for name, cache in self.caches().items()}
+
+    def load_caches(self, directory):
+        """Restores snapshots written by save_caches. Returns entries loaded per cache."""
+        return {name: cache.restore(os.path.join(directory, f"{name}.sqlite3")) for name, cache in self.caches().items()}
+
+    async def aclose(self):
+        """Releases pooled connections. Call once on app shutdown."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
     async def handle_youtube(self, query):
         """Searches YouTube API and returns the video ID to the client."""
-        print(f"[Gravity] Searching YouTube: {query}")
+        logger.info("Searching YouTube: %s", query)
         api_key = os.getenv("YOUTUBE_API_KEY")
         if not api_key:
             return {"type": "text", "content": "I can't play videos because the YouTube API Key is missing."}
 
+        # Repeated song requests resolve without a network round-trip
+        start = time.perf_counter()
+        cache_key = normalize_text(query)
+        cached = await self.cache_get(self.youtube_cache, "youtube", cache_key)
+        if cached is not None:
+            video = json.loads(cached)
+            YOUTUBE_SECONDS.labels("cache").observe(time.perf_counter() - start)
+            return self.youtube_result(video["video_id"], video["title"])
+
         url = "https://www.googleapis.com/youtube/v3/search"
         params = {
             "part": "snippet",
@@ -137,29 +727,84 @@ class GravityAgent:
             "key": api_key
         }
         
-        async with httpx.AsyncClient() as http_client:
-            try:
-                resp = await http_client.get(url, params=params)
-                data = resp.json()
-                
-                if "items" in data and len(data["items"]) > 0:
-                    video_id = data["items"][0]["id"]["videoId"]
-                    title = data["items"][0]["snippet"]["title"]
-                    # Return SPECIAL ACTION to Frontend
-                    return {
-                        "type": "play_youtube",
-                        "video_id": video_id,
-                        "title": title,
-                        "content": f"Playing: {title}"
-                    }
-                else:
-                    return {"type": "text", "content": f"I couldn't find any videos for '{query}'."}
-            except Exception as e:
-                return {"type": "text", "content": f"YouTube search failed: {e}"}
+        try:
+            resp = await self.http_client().get(url, params=params)
+            data = resp.json()
+            YOUTUBE_SECONDS.labels("api").observe(time.perf_counter() - start)
+            
+            if "items" in data and len(data["items"]) > 0:
+                video_id = data["items"][0]["id"]["videoId"]
+                title = data["items"][0]["snippet"]["title"]
+                await self.cache_put(self.youtube_cache, "youtube", cache_key, json.dumps({"video_id": video_id, "title": title}))
+                return self.youtube_result(video_id, title)
+            else:
+                return {"type": "text", "content": f"I couldn't find any videos for '{query}'."}
+        except Exception as e:
+            YOUTUBE_SECONDS.labels("error").observe(time.perf_counter() - start)
+            return {"type": "text", "content": f"YouTube search failed: {e}"}
+
+    def youtube_result(self, video_id, title):
+        # Return SPECIAL ACTION to Frontend
+        return {
+            "type": "play_youtube",
+            "video_id": video_id,
+            "title": title,
+            "content": f"Playing: {title}"
+        }
 
     async def handle_search(self, query):
-        """Performs a Google Search (or Mock) and re-feeds to Gemini."""
-        print(f"[Gravity] Creating Search Plan: {query}")
-        # TODO: Implement Custom Search JSON API
-        # For now, we mock or use a placeholder if key missing/not setup
-        return {"type": "text", "content": f"I understand you want to search for '{query}', but my web search module is currently being optimized. Please ask me directly for now!"}
+        """
+        Searches the web, then re-feeds the top snippets to Gemini for an answer.
+        Result: { "type": "text", "content": "...", "sources": [{ "title", "url" }] }
+        """
+        logger.info("Searching the web: %s", query)
+        if self.search is None:
+            return {"type": "text", "content": "I can't search the web because no search provider is configured."}
+
+        try:
+            snippets = await self.search_snippets(query)
+        except Exception as e:
+            return {"type": "text", "content": f"Web search failed: {e}"}
+        if not snippets:
+            return {"type": "text", "content": f"I couldn't find anything for '{query}'."}
+
+        try:
+            answer = await self.generate(self.build_search_prompt(query, snippets))
+        except Overloaded as e:
+            logger.warning("Rejected (search): %s", e)
+            return busy_reply(e)
+        except asyncio.TimeoutError:
+            logger.warning("Search summary timed out after %ss", self.request_timeout)
+            return {"type": "text", "content": "Sorry, that took too long. Please try again."}
+        except Exception as e:
+            logger.error("%s", e)
+            return {"type": "text", "content": f"I encountered an error: {str(e)}"}
+        return {
+            "type": "text",
+            "content": answer,
+            "sources": [{"title": s["title"], "url": s["url"]} for s in snippets],
+        }
+
+    async def search_snippets(self, query):
+        """Top-k snippets for query, from the search cache or a fresh search."""
+        start = time.perf_counter()
+        cache_key = normalize_text(query)
+        cached = await self.cache_get(self.search_cache, "search", cache_key)
+        if cached is not None:
+            SEARCH_SECONDS.labels("cache").observe(time.perf_counter() - start)
+            return json.loads(cached)
+        try:
+            snippets = await self.search.run(query)
+        except Exception:
+            SEARCH_SECONDS.labels("error").observe(time.perf_counter() - start)
+            raise
+        SEARCH_SECONDS.labels(self.search.provider.name).observe(time.perf_counter() - start)
+        if snippets:
+            await self.cache_put(self.search_cache, "search", cache_key, json.dumps(snippets))
+        return snippets
+
+    def build_search_prompt(self, query, snippets):
+        results = "\n\n".join(
+            f"[{i}] {s['title']} ({s['url']})\n{s['text']}" for i, s in enumerate(snippets, 1)
+        )
+        return SEARCH_PROMPT.format(query=query, results=results)
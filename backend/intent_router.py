@@ -0,0 +1,109 @@
+"""
+IntentRouter - Local fast path for simple commands.
+
+"play <song>" or "search <x>" used to cost a full Gemini round-trip just to
+get back {"action": "play_youtube", "query": ...}. The router recognises
+these with keyword/regex rules (and, optionally, a small local model) and
+returns the same action dict in microseconds. Anything it isn't confident
+about returns None and goes to the model as before.
+
+A local model is any callable text -> (action, query, confidence) or None,
+e.g. a keyword classifier or a small ONNX model wrapped in a function. It
+is only consulted when no rule matches.
+"""
+
+import re
+
+PLAY_YOUTUBE = "play_youtube"
+WEB_SEARCH = "web_search"
+
+# "please", "can you", "could you" ... in front of a command
+_POLITE = r"(?:(?:hey\s+)?(?:klistar\s*,?\s*)?(?:please\s+|(?:can|could|would)\s+you\s+(?:please\s+)?)?)"
+_END = r"[\s.!?]*$"
+
+# (action, pattern, confidence). Patterns must capture the query as "query".
+DEFAULT_RULES = (
+    (PLAY_YOUTUBE, rf"^{_POLITE}play\s+(?P<query>.+?)\s+on\s+youtube{_END}", 0.99),
+    (PLAY_YOUTUBE, rf"^{_POLITE}(?:search\s+youtube|youtube\s+search)\s+(?:for\s+)?(?P<query>.+?){_END}", 0.97),
+    (PLAY_YOUTUBE, rf"^{_POLITE}(?:play|put\s+on)\s+(?:the\s+)?(?:song|songs|music|video)\s+(?P<query>.+?){_END}", 0.97),
+    (PLAY_YOUTUBE, rf"^{_POLITE}(?:play|put\s+on)\s+(?P<query>.+?){_END}", 0.93),
+    (WEB_SEARCH, rf"^{_POLITE}(?:search|google|look\s+up)\s+(?:the\s+web\s+|online\s+|google\s+)?(?:for\s+)?(?P<query>.+?)(?:\s+online)?{_END}", 0.95),
+)
+
+# Queries that look like a command but aren't one the fast path can answer:
+# games ("play chess with me") and references to earlier turns ("play it
+# again"), which need the conversation history the model has.
+_NOT_A_QUERY = re.compile(
+    r"^(?:it|that|this|them|again|something|anything|the\s+(?:last|previous|same)\s+one)\b"
+    r"|\b(?:game|games|chess|with\s+me|along|pretend|role)\b",
+    re.IGNORECASE,
+)
+
+MAX_QUERY_CHARS = 120
+
+
+class IntentRouter:
+    """
+    Classifies a request as a direct action when confident enough.
+
+    Args:
+        rules: (action, regex, confidence) tuples, tried in order.
+        model: Optional local classifier consulted when no rule matches.
+        threshold: Minimum confidence to skip the model call.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES, model=None, threshold=0.9):
+        self.rules = [(action, re.compile(pattern, re.IGNORECASE), confidence) for action, pattern, confidence in rules]
+        self.model = model
+        self.threshold = threshold
+        self.hits = {"rule": 0, "model": 0}
+        self.misses = 0
+
+    def classify(self, text):
+        """
+        Returns (action, query, confidence, source) for the best local guess,
+        or None. Does not apply the threshold or touch the counters.
+        """
+        # Multi-line input (pasted code, long prompts) is never a bare command
+        if not text or "\n" in text.strip():
+            return None
+        text = " ".join(text.split())
+        for action, pattern, confidence in self.rules:
+            match = pattern.match(text)
+            if match:
+                query = match.group("query").strip(" \"'")
+                if self._usable(query):
+                    return action, query, confidence, "rule"
+                return None
+        if self.model is not None:
+            guess = self.model(text)
+            if guess:
+                action, query, confidence = guess
+                if action in (PLAY_YOUTUBE, WEB_SEARCH) and self._usable(query):
+                    return action, query, confidence, "model"
+        return None
+
+    def route(self, text):
+        """
+        Returns {"action", "query", "source"} to dispatch directly, or None
+        when the request should go to the model. source is "rule" or "model".
+        """
+        guess = self.classify(text)
+        if guess is None or guess[2] < self.threshold:
+            self.misses += 1
+            return None
+        action, query, _, source = guess
+        self.hits[source] += 1
+        return {"action": action, "query": query, "source": source}
+
+    def _usable(self, query):
+        return bool(query) and len(query) <= MAX_QUERY_CHARS and not _NOT_A_QUERY.search(query)
+
+    def stats(self):
+        hits = sum(self.hits.values())
+        total = hits + self.misses
+        return {
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "hit_ratio": hits / total if total else 0.0,
+        }
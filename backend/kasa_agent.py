@@ -1,6 +1,10 @@
+import logging
 import asyncio
 from kasa import Discover, SmartDevice, SmartBulb, SmartPlug
 
+logger = logging.getLogger("klistar.kasa_agent")
+
+
 class KasaAgent:
     def __init__(self, known_devices=None):
         self.devices = {}
@@ -9,7 +13,7 @@ class KasaAgent:
     async def initialize(self):
         """Initializes devices from the saved configuration."""
         if self.known_devices_config:
-            print(f"[KasaAgent] Initializing {len(self.known_devices_config)} known devices...")
+            logger.info("Initializing %s known devices...", len(self.known_devices_config))
             tasks = []
             for d in self.known_devices_config:
                 if not d: continue
@@ -32,18 +36,18 @@ class KasaAgent:
             if dev:
                 await dev.update()
                 self.devices[ip] = dev
-                print(f"[KasaAgent] Loaded known device: {dev.alias} ({ip})")
+                logger.info("Loaded known device: %s (%s)", dev.alias, ip)
             else:
-                 print(f"[KasaAgent] Could not connect to known device at {ip}")
+                 logger.warning("Could not connect to known device at %s", ip)
         except Exception as e:
-            print(f"[KasaAgent] Error loading known device {ip}: {e}")
+            logger.error("Error loading known device %s: %s", ip, e)
 
     async def discover_devices(self):
         """Discovers devices on the local network."""
-        print("Discovering Kasa devices (Broadcast)...")
+        logger.info("Discovering Kasa devices (Broadcast)...")
         # Use explicit broadcast and slightly longer timeout for Windows reliability
         found_devices = await Discover.discover(target="255.255.255.255", timeout=5)
-        print(f"[KasaAgent] Raw discovery found {len(found_devices)} devices.")
+        logger.debug("Raw discovery found %s devices.", len(found_devices))
         
         # We don't wipe self.devices completely, we merge/update
         # But if a device is NOT found, we might want to keep it if it was known?
@@ -80,7 +84,7 @@ class KasaAgent:
             }
             device_list.append(device_info)
             
-        print(f"Total Kasa devices (found + cached): {len(device_list)}")
+        logger.info("Total Kasa devices (found + cached): %s", len(device_list))
         return device_list
 
     def get_device_by_alias(self, alias):
@@ -133,7 +137,7 @@ class KasaAgent:
                 await dev.update()
                 return True
             except Exception as e:
-                print(f"Error turning on {target}: {e}")
+                logger.error("Error turning on %s: %s", target, e)
                 return False
         
         # Fallback: Try to discover single if it looks like an IP
@@ -158,7 +162,7 @@ class KasaAgent:
                 await dev.update()
                 return True
             except Exception as e:
-                print(f"Error turning off {target}: {e}")
+                logger.error("Error turning off %s: %s", target, e)
                 return False
         
         if target.count(".") == 3:
@@ -182,7 +186,7 @@ class KasaAgent:
                 await dev.update()
                 return True
             except Exception as e:
-                 print(f"Error setting brightness for {target}: {e}")
+                 logger.error("Error setting brightness for %s: %s", target, e)
         return False
 
     async def set_color(self, target, color_input):
@@ -204,7 +208,7 @@ class KasaAgent:
                 await dev.update()
                 return True
             except Exception as e:
-                 print(f"Error setting color for {target}: {e}")
+                 logger.error("Error setting color for %s: %s", target, e)
         return False
 
 # Standalone test
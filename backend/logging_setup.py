@@ -0,0 +1,109 @@
+"""
+Logging setup for the KlistarAI backend.
+
+Modules log through logging.getLogger("klistar.<module>"). setup_logging()
+attaches a QueueHandler to the "klistar" logger, so code on the event loop
+only enqueues records; a background QueueListener thread formats them and
+does the blocking write to stdout. Use %-style arguments
+(logger.debug("x=%s", x)) so disabled levels skip formatting entirely.
+
+Environment:
+    LOG_LEVEL: Default level (INFO).
+    LOG_LEVELS: Per-module overrides, e.g. "ada=DEBUG,printer_agent=WARNING".
+    LOG_FORMAT: "text" (default) or "json" for one JSON object per line.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+ROOT_LOGGER = "klistar"
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-7s [%(name)s] %(message)s"
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including any extra= fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def parse_levels(spec):
+    """Parses "ada=DEBUG,server=WARNING" into {"ada": "DEBUG", "server": "WARNING"}."""
+    levels = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            module, level = item.split("=", 1)
+            levels[module.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(level=None, levels=None, fmt=None, stream=None):
+    """
+    Configures the "klistar" loggers. Safe to call more than once; only the
+    first call takes effect.
+
+    Args:
+        level: Default level name (falls back to LOG_LEVEL, then INFO).
+        levels: Dict of module -> level name (merged over LOG_LEVELS).
+        fmt: "text" or "json" (falls back to LOG_FORMAT).
+        stream: Output stream (default stdout).
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    module_levels = parse_levels(os.getenv("LOG_LEVELS"))
+    module_levels.update(levels or {})
+    fmt = fmt or os.getenv("LOG_FORMAT", "text")
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(records))
+    root.propagate = False
+    for module, module_level in module_levels.items():
+        logging.getLogger(f"{ROOT_LOGGER}.{module}").setLevel(module_level)
+
+    _listener = logging.handlers.QueueListener(records, handler)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flushes queued records and stops the writer thread."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    root = logging.getLogger(ROOT_LOGGER)
+    for handler in list(root.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+    root.propagate = True
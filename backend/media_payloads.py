@@ -0,0 +1,211 @@
+"""
+Media payloads - Binary Socket.IO attachments with per-client negotiation.
+
+Camera frames, web-agent screenshots and STL meshes used to travel as
+base64 strings, ~33% larger than the bytes they carry and encoded/decoded
+on both ends. MediaChannel takes raw bytes and shapes each payload for the
+client it is sent to:
+
+    binary client   frames/screenshots as binary attachments, meshes
+                    compressed (zstd or deflate) with an "encoding" field
+    legacy client   base64 strings, exactly as before
+
+A client opts in by emitting 'media_capabilities' after connecting:
+    { "binary": true, "compression": ["zstd", "deflate"] }
+The ack carries what the server will use, e.g.
+    { "binary": true, "compression": "deflate" }
+Clients that never send it keep receiving base64.
+
+Producers (AudioLoop, FaceAuthenticator) keep handing their callbacks
+base64, as before, unless built with binary_media=True; only a relay that
+sends those callbacks through MediaChannel.emit should set it.
+
+Capabilities are kept per worker. With several workers behind a Redis
+manager, a broadcast reaches binary clients connected to other workers in
+the legacy (base64) form; they still decode it, just without the saving.
+
+zstd needs the optional 'zstandard' package; deflate (zlib) always works.
+"""
+
+import base64
+import zlib
+
+try:
+    from metrics import REGISTRY
+except ImportError:
+    from backend.metrics import REGISTRY
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    zstandard = None
+    HAS_ZSTD = False
+
+# event -> (field holding the bytes, compress it for binary clients).
+# JPEG/PNG are already compressed, so only meshes are worth deflating.
+MEDIA_EVENTS = {
+    "video_frame": ("image", False),
+    "browser_frame": ("image", False),
+    "auth_frame": ("image", False),
+    "cad_data": ("data", True),
+}
+
+# Preferred first
+CODECS = ("zstd", "deflate")
+ZSTD_LEVEL = 3
+DEFLATE_LEVEL = 6
+
+MEDIA_BYTES = REGISTRY.counter(
+    "gravity_media_bytes", "Media payload bytes emitted by event and encoding.", labelnames=("event", "encoding")
+)
+
+_BYTES_TYPES = (bytes, bytearray, memoryview)
+
+
+class MediaCapabilities:
+    """What one client accepts: binary attachments, and a mesh codec (or None)."""
+
+    __slots__ = ("binary", "codec")
+
+    def __init__(self, binary=False, codec=None):
+        self.binary = binary
+        self.codec = codec
+
+    def as_dict(self):
+        return {"binary": self.binary, "compression": self.codec}
+
+    def __eq__(self, other):
+        return isinstance(other, MediaCapabilities) and (self.binary, self.codec) == (other.binary, other.codec)
+
+    def __hash__(self):
+        return hash((self.binary, self.codec))
+
+
+LEGACY = MediaCapabilities()
+
+
+def negotiate(offer):
+    """Picks capabilities from a client's offer; anything unrecognised means legacy."""
+    if not isinstance(offer, dict) or not offer.get("binary"):
+        return LEGACY
+    offered = offer.get("compression") or []
+    if isinstance(offered, str):
+        offered = [offered]
+    codec = next((c for c in CODECS if c in offered and (c != "zstd" or HAS_ZSTD)), None)
+    return MediaCapabilities(binary=True, codec=codec)
+
+
+def compress(data, codec):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if codec == "deflate":
+        return zlib.compress(data, DEFLATE_LEVEL)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def decompress(data, codec):
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "deflate":
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def to_base64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def legacy_payload(event, payload):
+    """payload with the event's media bytes as a base64 string, as producers sent it before MediaChannel."""
+    field, _ = MEDIA_EVENTS[event]
+    value = payload.get(field)
+    if not isinstance(value, _BYTES_TYPES):
+        return payload
+    return {**payload, field: to_base64(value)}
+
+
+def encode_payload(event, payload, caps):
+    """
+    Returns payload shaped for a client with caps. Only the event's media
+    field changes; payloads whose field isn't bytes pass through untouched.
+    """
+    field, compressible = MEDIA_EVENTS.get(event, (None, False))
+    value = payload.get(field) if field else None
+    if not isinstance(value, _BYTES_TYPES):
+        return payload
+    encoded = dict(payload)
+    if not caps.binary:
+        encoded[field] = to_base64(value)
+        encoding = "base64"
+    elif compressible and caps.codec:
+        encoded[field] = compress(bytes(value), caps.codec)
+        encoded["encoding"] = encoding = caps.codec
+    else:
+        encoded[field] = bytes(value)
+        encoding = "binary"
+    MEDIA_BYTES.labels(event, encoding).inc(len(encoded[field]))
+    return encoded
+
+
+def decode_upload(value):
+    """
+    Bytes from a client upload (e.g. 'video_frame'): binary attachments pass
+    through, base64 strings (with or without a data: URL prefix) are decoded.
+    """
+    if isinstance(value, _BYTES_TYPES):
+        return bytes(value)
+    if isinstance(value, str):
+        if value.startswith("data:"):
+            value = value.split(",", 1)[1]
+        return base64.b64decode(value)
+    raise TypeError(f"Expected bytes or base64 string, got {type(value).__name__}")
+
+
+class MediaChannel:
+    """
+    Remembers each client's capabilities and emits media payloads in the
+    form each client understands.
+
+    Usage:
+        media = MediaChannel(sio)
+        media.negotiate(sid, offer)           # from 'media_capabilities'
+        await media.emit("cad_data", {"format": "stl", "data": stl_bytes})
+        media.forget(sid)                     # on disconnect
+    """
+
+    def __init__(self, sio):
+        self.sio = sio
+        self.clients = {}  # sid -> MediaCapabilities (binary clients only)
+
+    def negotiate(self, sid, offer):
+        """Stores the client's capabilities and returns them (sent back as the ack)."""
+        caps = negotiate(offer)
+        if caps.binary:
+            self.clients[sid] = caps
+        else:
+            self.clients.pop(sid, None)
+        return caps.as_dict()
+
+    def forget(self, sid):
+        self.clients.pop(sid, None)
+
+    def capabilities(self, sid):
+        return self.clients.get(sid, LEGACY)
+
+    async def emit(self, event, payload, room=None):
+        """
+        Emits to one client (room=sid) or, with no room, to every client.
+        Only this worker's binary clients get the binary form (see above).
+        """
+        if room is not None:
+            await self.sio.emit(event, encode_payload(event, payload, self.capabilities(room)), room=room)
+            return
+        # Broadcast: encode once per capability profile, not once per client
+        groups = {}
+        for sid, caps in self.clients.items():
+            groups.setdefault(caps, []).append(sid)
+        binary_sids = list(self.clients)
+        await self.sio.emit(event, encode_payload(event, payload, LEGACY), skip_sid=binary_sids or None)
+        for caps, sids in groups.items():
+            await self.sio.emit(event, encode_payload(event, payload, caps), room=sids)
@@ -0,0 +1,254 @@
+"""
+MiniRedis - A tiny Redis-compatible server for tests and local multi-worker runs.
+
+Speaks enough RESP2/RESP3 for the shared state backend and python-socketio's
+AsyncRedisManager: HELLO, strings with expiry (GET/SET/DEL/EXPIRE/TTL/INCRBY)
+and pub/sub (PUBLISH/SUBSCRIBE/UNSUBSCRIBE). Everything lives in memory
+in one process. Not for production - use a real Redis there.
+
+Usage:
+    python backend/mini_redis.py --port 6379
+"""
+import argparse
+import asyncio
+import time
+
+
+class RespError(Exception):
+    pass
+
+
+class Push(list):
+    """Out-of-band message (pub/sub), sent as a RESP3 push when negotiated."""
+
+
+def encode(value, resp3=False):
+    """Encodes a Python value as a RESP2 (or, with resp3, RESP3) reply."""
+    if value is None:
+        return b"_\r\n" if resp3 else b"$-1\r\n"
+    if isinstance(value, RespError):
+        return b"-" + str(value).encode() + b"\r\n"
+    if isinstance(value, bool):
+        return b":" + (b"1" if value else b"0") + b"\r\n"
+    if isinstance(value, int):
+        return b":" + str(value).encode() + b"\r\n"
+    if isinstance(value, str) and value in ("OK", "PONG", "QUEUED"):
+        return b"+" + value.encode() + b"\r\n"
+    if isinstance(value, str):
+        value = value.encode()
+    if isinstance(value, bytes):
+        return b"$" + str(len(value)).encode() + b"\r\n" + value + b"\r\n"
+    if isinstance(value, dict):
+        if resp3:
+            items = b"".join(encode(k, resp3) + encode(v, resp3) for k, v in value.items())
+            return b"%" + str(len(value)).encode() + b"\r\n" + items
+        value = [item for pair in value.items() for item in pair]
+    if isinstance(value, (list, tuple)):
+        kind = b">" if resp3 and isinstance(value, Push) else b"*"
+        return kind + str(len(value)).encode() + b"\r\n" + b"".join(encode(v, resp3) for v in value)
+    raise TypeError(f"Cannot encode {type(value)}")
+
+
+async def read_command(reader):
+    """Reads one command as a list of bytes arguments, or None on EOF."""
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # Inline command, e.g. from telnet
+        return line.strip().split()
+    args = []
+    for _ in range(int(line[1:])):
+        header = await reader.readline()
+        length = int(header[1:])
+        data = await reader.readexactly(length + 2)
+        args.append(data[:-2])
+    return args
+
+
+class MiniRedis:
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self._data = {}  # key -> (value, expires_at or None)
+        self._channels = {}  # channel -> set of writers
+        self._resp3 = set()  # writers that negotiated RESP3 via HELLO
+        self._clients = set()
+        self._server = None
+
+    @property
+    def url(self):
+        return f"redis://{self.host}:{self.port}/0"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for task in list(self._clients):
+                task.cancel()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _handle(self, reader, writer):
+        subscriptions = set()
+        task = asyncio.current_task()
+        self._clients.add(task)
+        try:
+            while True:
+                try:
+                    args = await read_command(reader)
+                except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+                    break
+                if args is None:
+                    break
+                if not args:
+                    continue
+                name = args[0].decode().upper()
+                if name in ("SUBSCRIBE", "UNSUBSCRIBE"):
+                    self._subscription(name, args[1:], writer, subscriptions)
+                else:
+                    try:
+                        reply = self.execute(name, args[1:])
+                    except RespError as e:
+                        reply = e
+                    except (ValueError, IndexError):
+                        reply = RespError(f"ERR wrong arguments for '{name.lower()}' command")
+                    if name == "HELLO" and isinstance(reply, dict):
+                        if reply["proto"] == 3:
+                            self._resp3.add(writer)
+                        else:
+                            self._resp3.discard(writer)
+                    writer.write(encode(reply, writer in self._resp3))
+                await writer.drain()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            for channel in subscriptions:
+                self._channels.get(channel, set()).discard(writer)
+            self._resp3.discard(writer)
+            self._clients.discard(task)
+            writer.close()
+
+    def _subscription(self, name, channels, writer, subscriptions):
+        if name == "SUBSCRIBE":
+            for channel in channels:
+                subscriptions.add(channel)
+                self._channels.setdefault(channel, set()).add(writer)
+                writer.write(encode(Push([b"subscribe", channel, len(subscriptions)]), writer in self._resp3))
+        else:
+            for channel in channels or list(subscriptions):
+                subscriptions.discard(channel)
+                self._channels.get(channel, set()).discard(writer)
+                writer.write(encode(Push([b"unsubscribe", channel, len(subscriptions)]), writer in self._resp3))
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def execute(self, name, args):
+        """Runs a non-pub/sub command and returns its reply value."""
+        if name == "PING":
+            return args[0] if args else "PONG"
+        if name == "ECHO":
+            return args[0]
+        if name in ("SELECT", "CLIENT", "READONLY"):
+            return "OK"
+        if name == "HELLO":
+            proto = int(args[0]) if args else 2
+            if proto not in (2, 3):
+                raise RespError("NOPROTO unsupported protocol version")
+            return {"server": "mini-redis", "version": "7.0.0", "proto": proto, "mode": "standalone"}
+        if name == "GET":
+            entry = self._live(args[0])
+            return entry[0] if entry else None
+        if name == "SET":
+            return self._set(args)
+        if name == "DEL":
+            return sum(1 for key in args if self._live(key) and self._data.pop(key, None))
+        if name == "EXISTS":
+            return sum(1 for key in args if self._live(key))
+        if name in ("EXPIRE", "PEXPIRE"):
+            entry = self._live(args[0])
+            if not entry:
+                return 0
+            seconds = int(args[1]) / (1000.0 if name == "PEXPIRE" else 1.0)
+            self._data[args[0]] = (entry[0], time.monotonic() + seconds)
+            return 1
+        if name == "TTL":
+            entry = self._live(args[0])
+            if not entry:
+                return -2
+            return -1 if entry[1] is None else int(entry[1] - time.monotonic() + 0.999)
+        if name in ("INCR", "INCRBY"):
+            entry = self._live(args[0])
+            value = int(entry[0]) if entry else 0
+            value += int(args[1]) if name == "INCRBY" else 1
+            self._data[args[0]] = (str(value).encode(), entry[1] if entry else None)
+            return value
+        if name == "PUBLISH":
+            return self._publish(args[0], args[1])
+        if name in ("FLUSHDB", "FLUSHALL"):
+            self._data.clear()
+            return "OK"
+        raise RespError(f"ERR unknown command '{name.lower()}'")
+
+    def _set(self, args):
+        key, value = args[0], args[1]
+        expires_at = None
+        options = [a.decode().upper() for a in args[2:]]
+        i = 0
+        while i < len(options):
+            if options[i] == "EX":
+                expires_at = time.monotonic() + int(options[i + 1])
+                i += 2
+            elif options[i] == "PX":
+                expires_at = time.monotonic() + int(options[i + 1]) / 1000.0
+                i += 2
+            elif options[i] == "NX":
+                if self._live(key):
+                    return None
+                i += 1
+            else:
+                raise RespError("ERR syntax error")
+        self._data[key] = (value, expires_at)
+        return "OK"
+
+    def _publish(self, channel, message):
+        writers = self._channels.get(channel, set())
+        message = Push([b"message", channel, message])
+        for writer in list(writers):
+            writer.write(encode(message, writer in self._resp3))
+        return len(writers)
+
+
+async def _serve(host, port):
+    server = await MiniRedis(host, port).start()
+    print(f"[MiniRedis] Listening on {server.url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tiny Redis-compatible server for local testing")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -7,6 +7,7 @@ Supported Printer Types:
 - PrusaLink (REST API)
 """
 
+import logging
 import asyncio
 import os
 import subprocess
@@ -15,10 +16,13 @@ import platform
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, asdict
 from enum import Enum
+from functools import cached_property
 
 import aiohttp
 from zeroconf import Zeroconf, ServiceBrowser, ServiceListener
 
+logger = logging.getLogger("klistar.printer_agent")
+
 
 class PrinterType(Enum):
     OCTOPRINT = "octoprint"
@@ -88,7 +92,7 @@ class PrinterDiscoveryListener(ServiceListener):
                     printer_type=printer_type
                 )
                 self.printers.append(printer)
-                print(f"[PRINTER] Discovered: {printer.name} at {printer.host}:{printer.port} ({printer.printer_type.value})")
+                logger.info("Discovered: %s at %s:%s (%s)", printer.name, printer.host, printer.port, printer.printer_type.value)
 
     def remove_service(self, zc: Zeroconf, type_: str, name: str) -> None:
         pass
@@ -108,12 +112,18 @@ class PrinterAgent:
         self._zeroconf: Optional[Zeroconf] = None
         self._error_tracker = set() # Track hosts with errors to prevent log spam
         
-        # Detect slicer path and profiles directory
-        self.slicer_path = self._detect_slicer_path()
-        self._orca_profiles_dir = self._detect_orca_profiles_dir()
-        
         # Ensure profiles directory exists
         os.makedirs(profiles_dir, exist_ok=True)
+
+    # Slicer detection probes the filesystem and shells out to `which`, so it
+    # runs the first time slicing needs it rather than at construction
+    @cached_property
+    def slicer_path(self) -> Optional[str]:
+        return self._detect_slicer_path()
+
+    @cached_property
+    def _orca_profiles_dir(self) -> Optional[str]:
+        return self._detect_orca_profiles_dir()
     
     def _detect_orca_profiles_dir(self) -> Optional[str]:
         """Detect OrcaSlicer profiles directory."""
@@ -127,7 +137,7 @@ class PrinterAgent:
             base = os.path.expanduser("~/.config/OrcaSlicer")
         
         if os.path.isdir(base):
-            print(f"[PRINTER] Found OrcaSlicer profiles at: {base}")
+            logger.info("Found OrcaSlicer profiles at: %s", base)
             return base
         
         return None
@@ -210,7 +220,7 @@ class PrinterAgent:
         
         system_dir = os.path.join(self._orca_profiles_dir, "system", vendor)
         if not os.path.isdir(system_dir):
-            print(f"[PRINTER] Vendor folder not found: {vendor}")
+            logger.info("Vendor folder not found: %s", vendor)
             return None
         
         target_dir = os.path.join(system_dir, profile_type)
@@ -279,7 +289,7 @@ class PrinterAgent:
                 best_match = os.path.join(target_dir, filename)
         
         if best_match:
-            print(f"[PRINTER] Matched {profile_type} profile: {os.path.basename(best_match)} (score: {best_score})")
+            logger.info("Matched %s profile: %s (score: %s)", profile_type, os.path.basename(best_match), best_score)
         
         return best_match
     
@@ -329,7 +339,7 @@ class PrinterAgent:
         
         for path in paths:
             if os.path.exists(path):
-                print(f"[PRINTER] Found Slicer at: {path}")
+                logger.info("Found Slicer at: %s", path)
                 return path
         
         # Try to find via which/where
@@ -341,12 +351,12 @@ class PrinterAgent:
                 )
                 if result.returncode == 0 and result.stdout.strip():
                     path = result.stdout.strip().split('\n')[0]
-                    print(f"[PRINTER] Found Slicer via PATH: {path}")
+                    logger.info("Found Slicer via PATH: %s", path)
                     return path
              except Exception:
                 pass
         
-        print("[PRINTER] Warning: No Slicer (Orca/Prusa) found. Slicing will fail.")
+        logger.warning("No Slicer (Orca/Prusa) found. Slicing will fail.")
         return None
 
     async def discover_printers(self, timeout: float = 5.0) -> List[Dict]:
@@ -354,7 +364,7 @@ class PrinterAgent:
         Discovers 3D printers on the local network via mDNS.
         Returns list of discovered printers.
         """
-        print(f"[PRINTER] Starting printer discovery (timeout: {timeout}s)...")
+        logger.info("Starting printer discovery (timeout: %ss)...", timeout)
         
         self._zeroconf = Zeroconf()
         listener = PrinterDiscoveryListener()
@@ -383,11 +393,11 @@ class PrinterAgent:
         # We try to identify them by hitting known endpoints
         for printer in listener.printers:
             if printer.printer_type == PrinterType.UNKNOWN:
-                print(f"[PRINTER] Probing unknown printer: {printer.host}...")
+                logger.info("Probing unknown printer: %s...", printer.host)
                 ptype = await self._probe_printer_type(printer.host, printer.port)
                 if ptype != PrinterType.UNKNOWN:
                     printer.printer_type = ptype
-                    print(f"[PRINTER] Identified {printer.name} as {ptype.value}")
+                    logger.info("Identified %s as %s", printer.name, ptype.value)
         
         # PROBE CAMERAS
         for printer in listener.printers:
@@ -402,12 +412,12 @@ class PrinterAgent:
             # Avoid duplicates if we found same host on multiple services
             self.printers[printer.host] = printer
         
-        print(f"[PRINTER] Discovery complete. Found {len(self.printers)} printers.")
+        logger.info("Discovery complete. Found %s printers.", len(self.printers))
         return [p.to_dict() for p in self.printers.values()]
 
     async def _probe_printer_type(self, host: str, port: int) -> PrinterType:
         """Probe a host to check if it's running Moonraker or OctoPrint."""
-        print(f"[PRINTER DEBUG] Probing http://{host}:{port}...")
+        logger.debug("Probing http://%s:%s...", host, port)
         try:
             # Short timeout to avoid hangs on unreachable ports
             timeout = aiohttp.ClientTimeout(total=2.0, connect=1.0)
@@ -417,26 +427,26 @@ class PrinterAgent:
                 try:
                     url = f"http://{host}:{port}/printer/info"
                     async with session.get(url) as resp:
-                        print(f"[PRINTER DEBUG] {url} -> {resp.status}")
+                        logger.debug("%s -> %s", url, resp.status)
                         if resp.status == 200:
                             data = await resp.json()
                             if "result" in data or "hostname" in data:
-                                print(f"[PRINTER DEBUG] Found MOONRAKER at {host}:{port}")
+                                logger.debug("Found MOONRAKER at %s:%s", host, port)
                                 return PrinterType.MOONRAKER
                 except asyncio.TimeoutError:
-                    print(f"[PRINTER DEBUG] Timeout probing {host}:{port}")
+                    logger.debug("Timeout probing %s:%s", host, port)
                 except Exception as e:
-                    print(f"[PRINTER DEBUG] Error probing {host}:{port}: {e}")
+                    logger.warning("Error probing %s:%s: %s", host, port, e)
 
                 # Check OctoPrint
                 # /api/version usually requires key, but returns 401 or 200
                 try:
                      url = f"http://{host}:{port}/api/version"
                      async with session.get(url) as resp:
-                         print(f"[PRINTER DEBUG] {url} -> {resp.status}")
+                         logger.debug("%s -> %s", url, resp.status)
                          # 200 (if public), 403 (needs key) - both mean it IS OctoPrint
                          if resp.status in (200, 403, 401):
-                             print(f"[PRINTER DEBUG] Found OCTOPRINT at {host}:{port}")
+                             logger.debug("Found OCTOPRINT at %s:%s", host, port)
                              return PrinterType.OCTOPRINT
                 except asyncio.TimeoutError:
                      pass
@@ -448,17 +458,17 @@ class PrinterAgent:
                     url = f"http://{host}:{port}/"
                     async with session.get(url) as resp:
                         content = await resp.text()
-                        print(f"[PRINTER DEBUG] Root {url} -> {resp.status}")
+                        logger.debug("Root %s -> %s", url, resp.status)
                         if "<title>" in content:
                             title = content.split("<title>")[1].split("</title>")[0]
-                            print(f"[PRINTER DEBUG] Page Title: {title}")
+                            logger.debug("Page Title: %s", title)
                         if "Server" in resp.headers:
-                            print(f"[PRINTER DEBUG] Server Header: {resp.headers['Server']}")
+                            logger.debug("Server Header: %s", resp.headers['Server'])
                 except:
                     pass
                     
         except Exception as e:
-            print(f"[PRINTER] Probe error for {host}:{port}: {e}")
+            logger.warning("Probe error for %s:%s: %s", host, port, e)
         
         return PrinterType.UNKNOWN
 
@@ -489,7 +499,7 @@ class PrinterAgent:
                             # Verify content type is a stream
                             ctype = resp.headers.get("Content-Type", "")
                             if "multipart/x-mixed-replace" in ctype or "image" in ctype:
-                                print(f"[PRINTER] Found Camera: {url}")
+                                logger.info("Found Camera: %s", url)
                                 return url
                 except:
                     continue
@@ -502,7 +512,7 @@ class PrinterAgent:
         ptype = PrinterType(printer_type) if printer_type in [e.value for e in PrinterType] else PrinterType.UNKNOWN
         printer = Printer(name=name, host=host, port=port, printer_type=ptype, api_key=api_key, camera_url=camera_url)
         self.printers[host] = printer
-        print(f"[PRINTER] Manually added: {name} at {host}:{port}")
+        logger.info("Manually added: %s at %s:%s", name, host, port)
         return printer
     
     def _resolve_printer(self, target: str) -> Optional[Printer]:
@@ -548,7 +558,7 @@ class PrinterAgent:
         
         for p in common_paths:
             if os.path.exists(p):
-                print(f"[PRINTER] Resolved {path} -> {p}")
+                logger.info("Resolved %s -> %s", path, p)
                 return p
         
         return None
@@ -572,13 +582,13 @@ class PrinterAgent:
             Path to generated G-code file, or None on failure
         """
         if not self.slicer_path:
-            print("[PRINTER] Error: Slicer not found")
+            logger.error("Slicer not found")
             return None
         
         # Robust path resolution
         resolved_path = self._resolve_file_path(stl_path, root_path)
         if not resolved_path:
-            print(f"[PRINTER] Error: STL file not found: {stl_path} (root: {root_path})")
+            logger.error("STL file not found: %s (root: %s)", stl_path, root_path)
             return None
         stl_path = resolved_path
         
@@ -589,7 +599,7 @@ class PrinterAgent:
                 os.makedirs(gcode_dir, exist_ok=True)
                 basename = os.path.splitext(os.path.basename(stl_path))[0]
                 output_path = os.path.join(gcode_dir, f"{basename}.gcode")
-                print(f"[PRINTER] G-code output: {output_path}")
+                logger.info("G-code output: %s", output_path)
             else:
                 output_path = stl_path.rsplit('.', 1)[0] + ".gcode"
         
@@ -626,12 +636,12 @@ class PrinterAgent:
             # Add --load-settings if we have profiles
             if settings_files:
                 cmd.extend(["--load-settings", ";".join(settings_files)])
-                print(f"[PRINTER] Using settings: {[os.path.basename(f) for f in settings_files]}")
+                logger.info("Using settings: %s", [os.path.basename(f) for f in settings_files])
             
             # Add --load-filaments if we have filament profile
             if profiles and profiles.get("filament"):
                 cmd.extend(["--load-filaments", profiles["filament"]])
-                print(f"[PRINTER] Using filament: {os.path.basename(profiles['filament'])}")
+                logger.info("Using filament: %s", os.path.basename(profiles['filament']))
             
             # Add STL file at the end
             cmd.append(stl_path)
@@ -663,8 +673,8 @@ class PrinterAgent:
                 cmd.insert(1, "--load")
                 cmd.insert(2, profile_path)
         
-        print(f"[PRINTER] Slicing: {stl_path}")
-        print(f"[PRINTER] Command: {' '.join(cmd)}")
+        logger.info("Slicing: %s", stl_path)
+        logger.info("Command: %s", ' '.join(cmd))
         
         try:
             # Notify slicing start
@@ -690,13 +700,13 @@ class PrinterAgent:
                 if result.stdout:
                     for line in result.stdout.strip().split('\n'):
                         if line:
-                            print(f"[SLICER OUTPUT] {line}")
+                            logger.debug("[SLICER OUTPUT] %s", line)
                 
                 if progress_callback:
                     await progress_callback(90, "Finalizing...")
                 
             except Exception as e:
-                print(f"[PRINTER] Subprocess run failed: {e}")
+                logger.warning("Subprocess run failed: %s", e)
                 return None
             
             if result.returncode == 0:
@@ -722,23 +732,23 @@ class PrinterAgent:
                         if actual_gcode != output_path:
                             import shutil
                             shutil.move(actual_gcode, output_path)
-                            print(f"[PRINTER] Renamed {os.path.basename(actual_gcode)} -> {os.path.basename(output_path)}")
+                            logger.info("Renamed %s -> %s", os.path.basename(actual_gcode), os.path.basename(output_path))
                     elif not os.path.exists(output_path):
-                        print(f"[PRINTER] Warning: Expected G-code not found in {output_dir}")
+                        logger.warning("Expected G-code not found in %s", output_dir)
 
-                print(f"[PRINTER] Slicing complete: {output_path}")
+                logger.info("Slicing complete: %s", output_path)
                 if progress_callback:
                     await progress_callback(100, "Slicing Complete")
                 return output_path
             else:
-                print(f"[PRINTER] Slicing failed: {result.stderr}")
+                logger.warning("Slicing failed: %s", result.stderr)
                 return None
                 
         except subprocess.TimeoutExpired:
-            print("[PRINTER] Slicing timeout (5 min exceeded)")
+            logger.warning("Slicing timeout (5 min exceeded)")
             return None
         except Exception as e:
-            print(f"[PRINTER] Slicing error: {e}")
+            logger.warning("Slicing error: %s", e)
             return None
     
     async def upload_gcode(self, target: str, gcode_path: str, 
@@ -756,11 +766,11 @@ class PrinterAgent:
         """
         printer = self._resolve_printer(target)
         if not printer:
-            print(f"[PRINTER] Error: Printer not found: {target}")
+            logger.error("Printer not found: %s", target)
             return False
         
         if not os.path.exists(gcode_path):
-            print(f"[PRINTER] Error: G-code file not found: {gcode_path}")
+            logger.error("G-code file not found: %s", gcode_path)
             return False
         
         if printer.printer_type == PrinterType.OCTOPRINT:
@@ -768,7 +778,7 @@ class PrinterAgent:
         elif printer.printer_type == PrinterType.MOONRAKER:
             return await self._upload_moonraker(printer, gcode_path, start_print)
         else:
-            print(f"[PRINTER] Error: Unsupported printer type: {printer.printer_type}")
+            logger.error("Unsupported printer type: %s", printer.printer_type)
             return False
     
     async def _upload_octoprint(self, printer: Printer, gcode_path: str, 
@@ -791,13 +801,13 @@ class PrinterAgent:
                     
                     async with session.post(url, data=data, headers=headers) as resp:
                         if resp.status in (200, 201, 202, 204):
-                            print(f"[PRINTER] Uploaded {filename} to OctoPrint at {printer.host}")
+                            logger.info("Uploaded %s to OctoPrint at %s", filename, printer.host)
                             return True
                         else:
-                            print(f"[PRINTER] OctoPrint upload failed ({resp.status})")
+                            logger.warning("OctoPrint upload failed (%s)", resp.status)
                             return False
         except Exception as e:
-            print(f"[PRINTER] OctoPrint upload error: {e}")
+            logger.warning("OctoPrint upload error: %s", e)
             return False
 
     async def _upload_moonraker(self, printer: Printer, gcode_path: str, 
@@ -816,7 +826,7 @@ class PrinterAgent:
                     
                     async with session.post(url, data=data) as resp:
                         if resp.status in (200, 201):
-                            print(f"[PRINTER] Uploaded {filename} to Moonraker at {printer.host}")
+                            logger.info("Uploaded %s to Moonraker at %s", filename, printer.host)
                             
                             if start_print:
                                 # Trigger print
@@ -824,23 +834,23 @@ class PrinterAgent:
                                 data_print = {"filename": filename}
                                 async with session.post(print_url, json=data_print) as resp_print:
                                     if resp_print.status == 200:
-                                        print(f"[PRINTER] Started print on Moonraker")
+                                        logger.info("Started print on Moonraker")
                                         return True
                                     else:
-                                        print(f"[PRINTER] Moonraker start print failed ({resp_print.status})")
+                                        logger.warning("Moonraker start print failed (%s)", resp_print.status)
                                         return False
                             return True
                         else:
-                            print(f"[PRINTER] Moonraker upload failed ({resp.status}). Trying OctoPrint compatibility layer...")
+                            logger.warning("Moonraker upload failed (%s). Trying OctoPrint compatibility layer...", resp.status)
 
             # Fallback to OctoPrint API (as Moonraker usually supports it and Creality K1 definitely does)
             return await self._upload_octoprint(printer, gcode_path, start_print)
             
         except Exception as e:
-            print(f"[PRINTER] Moonraker upload error: {e}")
+            logger.warning("Moonraker upload error: %s", e)
             return False
         except Exception as e:
-            print(f"[PRINTER] Moonraker upload error: {e}")
+            logger.warning("Moonraker upload error: %s", e)
             return False
 
     async def get_print_status(self, target: str) -> Optional[PrintStatus]:
@@ -909,7 +919,7 @@ class PrinterAgent:
                     return None
 
         except Exception as e:
-            print(f"[PRINTER] OctoPrint status error: {e}")
+            logger.warning("OctoPrint status error: %s", e)
             return None
     
     async def _status_moonraker(self, printer: Printer) -> Optional[PrintStatus]:
@@ -950,16 +960,16 @@ class PrinterAgent:
                         )
                     else:
                          if printer.host not in self._error_tracker:
-                            print(f"[PRINTER] Moonraker status failed ({resp.status})")
+                            logger.warning("Moonraker status failed (%s)", resp.status)
                             self._error_tracker.add(printer.host)
                          return None
         except Exception as e:
             msg = str(e)
             if printer.host not in self._error_tracker:
                 if "404" in msg:
-                     print(f"[PRINTER] Moonraker status failed (404) at {url}")
+                     logger.warning("Moonraker status failed (404) at %s", url)
                 else:
-                     print(f"[PRINTER] Moonraker status failed: {e}")
+                     logger.warning("Moonraker status failed: %s", e)
                 self._error_tracker.add(printer.host)
             
             return PrintStatus(
@@ -986,7 +996,7 @@ class PrinterAgent:
         """
         Orchestrate the full printing workflow: Slice -> Upload -> Print.
         """
-        print(f"[PRINTER] Starting print job for {stl_path} on {printer_name}")
+        logger.info("Starting print job for %s on %s", stl_path, printer_name)
         
         # 1. Resolve Printer
         printer = self._resolve_printer(printer_name)
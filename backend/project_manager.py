@@ -1,9 +1,12 @@
+import logging
 import os
 import json
 import shutil
 import time
 from pathlib import Path
 
+logger = logging.getLogger("klistar.project_manager")
+
 class ProjectManager:
     def __init__(self, workspace_root: str):
         self.workspace_root = Path(workspace_root)
@@ -17,7 +20,7 @@ class ProjectManager:
         # Clear temp project on startup if it exists
         temp_path = self.projects_dir / "temp"
         if temp_path.exists():
-            print("[ProjectManager] Clearing temp project...")
+            logger.info("Clearing temp project...")
             shutil.rmtree(temp_path)
             
         # Ensure temp project receives fresh creation
@@ -33,7 +36,7 @@ class ProjectManager:
             project_path.mkdir()
             (project_path / "cad").mkdir()
             (project_path / "browser").mkdir()
-            print(f"[ProjectManager] Created project: {safe_name}")
+            logger.info("Created project: %s", safe_name)
             return True, f"Project '{safe_name}' created."
         return False, f"Project '{safe_name}' already exists."
 
@@ -44,7 +47,7 @@ class ProjectManager:
         
         if project_path.exists():
             self.current_project = safe_name
-            print(f"[ProjectManager] Switched to project: {safe_name}")
+            logger.info("Switched to project: %s", safe_name)
             return True, f"Switched to project '{safe_name}'."
         return False, f"Project '{safe_name}' does not exist."
 
@@ -69,7 +72,7 @@ class ProjectManager:
     def save_cad_artifact(self, source_path: str, prompt: str):
         """Copies a generated CAD file to the project's 'cad' folder."""
         if not os.path.exists(source_path):
-            print(f"[ProjectManager] [ERR] Source file not found: {source_path}")
+            logger.error("Source file not found: %s", source_path)
             return None
 
         # Create a filename based on timestamp and prompt
@@ -82,10 +85,10 @@ class ProjectManager:
         
         try:
             shutil.copy2(source_path, dest_path)
-            print(f"[ProjectManager] Saved CAD artifact to: {dest_path}")
+            logger.info("Saved CAD artifact to: %s", dest_path)
             return str(dest_path)
         except Exception as e:
-            print(f"[ProjectManager] [ERR] Failed to save artifact: {e}")
+            logger.error("Failed to save artifact: %s", e)
             return None
 
     def get_project_context(self, max_file_size: int = 10000) -> str:
@@ -161,6 +164,6 @@ class ProjectManager:
                     continue
             return history
         except Exception as e:
-            print(f"[ProjectManager] [ERR] Failed to read chat history: {e}")
+            logger.error("Failed to read chat history: %s", e)
             return []
 
@@ -0,0 +1,155 @@
+"""
+Prompt assembly - Sends the fixed system prompt once instead of per request.
+
+GravityAgent used to paste SYSTEM_PROMPT into the text of every request.
+PromptAssembler keeps it out of the per-request contents and decides how
+the model receives it:
+
+    inline              pasted in front of the contents (old behaviour)
+    system_instruction  GenerateContentConfig.system_instruction; the config
+                        object is built once and reused for every call
+    cached              uploaded once as a Gemini cached-content handle that
+                        requests reference by name; renewed before it expires
+
+The model still counts a system_instruction as input tokens; only the
+cached mode reduces billed prompt tokens, so tokens saved are the cached
+tokens the model reports for requests that referenced the handle. Models
+or prompts that can't be
+cached (e.g. below the API's minimum size) fall back to system_instruction
+and caching is retried after the cache TTL.
+"""
+
+import asyncio
+import logging
+import time
+
+from google.genai import types
+
+try:
+    from metrics import REGISTRY
+    from session_store import estimate_tokens
+except ImportError:
+    from backend.metrics import REGISTRY
+    from backend.session_store import estimate_tokens
+
+logger = logging.getLogger("klistar.prompt_assembly")
+
+MODES = ("inline", "system_instruction", "cached")
+
+# Renew a cached-content handle this many seconds before it expires
+RENEW_MARGIN = 60.0
+
+TOKENS_SAVED = REGISTRY.counter(
+    "gravity_prompt_tokens_saved",
+    "Prompt tokens served from the system prompt's cached-content handle, by mode.",
+    labelnames=("mode",),
+)
+CACHED_TOKENS = REGISTRY.counter(
+    "gravity_prompt_cached_tokens", "Prompt tokens the model reported as served from cached content."
+)
+
+
+class PromptAssembler:
+    """
+    Builds request contents and config around a fixed system prompt.
+
+    Args:
+        system_prompt: Instructions shared by every request.
+        mode: "inline", "system_instruction" or "cached".
+        model: Model the cached content is created for.
+        cache_ttl: Seconds a cached-content handle lives.
+    """
+
+    def __init__(self, system_prompt, mode="system_instruction", model=None, cache_ttl=3600.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown prompt mode: {mode}")
+        self.system_prompt = system_prompt
+        self.mode = mode
+        self.model = model
+        self.cache_ttl = cache_ttl
+        self.system_tokens = estimate_tokens(system_prompt)
+        self._system_config = types.GenerateContentConfig(system_instruction=system_prompt)
+        self._cached_config = None
+        self._cached_expires = 0.0
+        self._cache_retry_at = 0.0
+        self._lock = asyncio.Lock()
+        self.requests = 0
+        self.tokens_saved = 0
+        self.cached_tokens = 0
+        self.cache_creates = 0
+
+    def contents(self, body):
+        """Request contents for body (history + user input)."""
+        if self.mode == "inline":
+            return f"System Instructions:\n{self.system_prompt}\n\n{body}"
+        return body
+
+    async def config(self, client):
+        """GenerateContentConfig to send with the request, or None for inline prompts."""
+        if self.mode == "inline":
+            return None
+        if self.mode == "cached":
+            cached = await self._cached(client)
+            if cached is not None:
+                return cached
+        return self._system_config
+
+    async def _cached(self, client):
+        now = time.monotonic()
+        if self._cached_config is not None and now < self._cached_expires - RENEW_MARGIN:
+            return self._cached_config
+        if now < self._cache_retry_at:
+            return None
+        async with self._lock:
+            # Another caller may have renewed the handle while we waited
+            if self._cached_config is not None and time.monotonic() < self._cached_expires - RENEW_MARGIN:
+                return self._cached_config
+            try:
+                cache = await client.aio.caches.create(
+                    model=self.model,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=self.system_prompt, ttl=f"{int(self.cache_ttl)}s"
+                    ),
+                )
+            except Exception as e:
+                logger.warning("Cached content unavailable, using system_instruction: %s", e)
+                self._cached_config = None
+                self._cache_retry_at = time.monotonic() + self.cache_ttl
+                return None
+            self.cache_creates += 1
+            usage = getattr(cache, "usage_metadata", None)
+            if getattr(usage, "total_token_count", None):
+                self.system_tokens = usage.total_token_count
+            self._cached_config = types.GenerateContentConfig(cached_content=cache.name)
+            self._cached_expires = time.monotonic() + self.cache_ttl
+            logger.info("Created cached content %s (%d tokens)", cache.name, self.system_tokens)
+            return self._cached_config
+
+    def record(self, response=None, config=None):
+        """
+        Counts one request and the cached tokens its response reports. They
+        count as saved only if the request referenced the cached-content
+        handle (config is what config() returned for it); cached tokens from
+        the model's own implicit caching don't.
+        """
+        self.requests += 1
+        usage = getattr(response, "usage_metadata", None)
+        cached = getattr(usage, "cached_content_token_count", None)
+        if not cached:
+            return
+        self.cached_tokens += cached
+        CACHED_TOKENS.inc(cached)
+        if getattr(config, "cached_content", None):
+            self.tokens_saved += cached
+            TOKENS_SAVED.labels(self.mode).inc(cached)
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "cached": self._cached_config is not None,
+            "system_tokens": self.system_tokens,
+            "requests": self.requests,
+            "tokens_saved": self.tokens_saved,
+            "tokens_saved_per_request": self.tokens_saved / self.requests if self.requests else 0.0,
+            "cached_tokens": self.cached_tokens,
+        }
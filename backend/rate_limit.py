@@ -0,0 +1,186 @@
+"""
+Rate limiting - Token buckets per client, keyed by socket sid and remote IP.
+
+A bucket holds up to `burst` tokens and refills at `rate` tokens per second;
+each event takes one. Buckets live in an LRU-ordered dict, so lookups,
+refills and idle eviction are O(1) per event. A bucket idle long enough to
+have refilled completely is indistinguishable from a new one, so it is
+dropped; memory is proportional to recently active clients only.
+
+ClientRateLimits holds one budget per kind of traffic (e.g. "user_input",
+"chat"). Each request takes a token from the client's sid bucket
+and from its IP bucket, which allows `ip_factor` times the per-client rate
+so that several devices behind one address still fit. Buckets are per
+worker process.
+"""
+
+import time
+from collections import OrderedDict
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated", "notified")
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.updated = now
+        self.notified = False  # Client was told it is throttled; reset on the next allowed event
+
+
+class RateLimiter:
+    """
+    Token buckets keyed by an arbitrary string.
+
+    Args:
+        rate: Tokens added per second. 0 or less disables the limiter.
+        burst: Bucket capacity (events allowed back to back).
+        max_keys: Buckets kept before the least recently used is dropped.
+        clock: Time source (seconds), injectable for tests.
+    """
+
+    def __init__(self, rate, burst, max_keys=10000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_keys = max_keys
+        self.clock = clock
+        # Time for an empty bucket to refill; after that a bucket equals a new one
+        self.idle_timeout = self.burst / rate if rate > 0 else 0.0
+        self._buckets = OrderedDict()  # key -> _Bucket, least recently used first
+        self.allowed = 0
+        self.throttled = 0
+
+    def __len__(self):
+        return len(self._buckets)
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def wait_time(self, key, cost=1.0):
+        """Seconds until key can spend cost tokens (0 if it can now). Spends nothing."""
+        if not self.enabled:
+            return 0.0
+        bucket = self._refill(key)
+        if bucket.tokens >= cost:
+            return 0.0
+        return (cost - bucket.tokens) / self.rate
+
+    def spend(self, key, cost=1.0):
+        """Takes cost tokens from key's bucket (call after wait_time returned 0)."""
+        if not self.enabled:
+            return
+        bucket = self._refill(key)
+        bucket.tokens -= cost
+        bucket.notified = False
+        self.allowed += 1
+
+    def acquire(self, key, cost=1.0):
+        """Spends cost tokens if available. Returns 0 if allowed, else seconds to wait."""
+        wait = self.wait_time(key, cost)
+        if wait:
+            self.throttled += 1
+        else:
+            self.spend(key, cost)
+        return wait
+
+    def first_throttle(self, key):
+        """True the first time key is throttled since its last allowed event."""
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.notified:
+            return False
+        bucket.notified = True
+        return True
+
+    def forget(self, key):
+        self._buckets.pop(key, None)
+
+    def evict_idle(self, now=None):
+        """Drops buckets that have had time to refill completely."""
+        now = self.clock() if now is None else now
+        # Least recently used first, so stop at the first recent bucket
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if now - bucket.updated < self.idle_timeout:
+                break
+            del self._buckets[key]
+
+    def _refill(self, key):
+        now = self.clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self.evict_idle(now)
+            bucket = self._buckets[key] = _Bucket(self.burst, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return bucket
+        bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+        bucket.updated = now
+        self._buckets.move_to_end(key)
+        return bucket
+
+    def stats(self):
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "keys": len(self._buckets),
+            "allowed": self.allowed,
+            "throttled": self.throttled,
+        }
+
+
+class ClientRateLimits:
+    """
+    Per-budget limits applied to both a client's sid and its IP address.
+
+    Usage:
+        limits = ClientRateLimits({"user_input": (1.0, 10)}, ip_factor=8)
+        wait = limits.check("user_input", sid="abc", ip="203.0.113.7")
+        if wait: ...  # throttled; retry in `wait` seconds
+
+    Args:
+        budgets: name -> (rate per second, burst).
+        ip_factor: IP buckets allow this many clients' worth of traffic.
+        max_keys: Buckets kept per budget and key type.
+    """
+
+    def __init__(self, budgets, ip_factor=8, max_keys=10000, clock=time.monotonic):
+        self.clients = {}
+        self.ips = {}
+        for name, (rate, burst) in budgets.items():
+            self.clients[name] = RateLimiter(rate, burst, max_keys=max_keys, clock=clock)
+            self.ips[name] = RateLimiter(rate * ip_factor, burst * ip_factor, max_keys=max_keys, clock=clock)
+
+    def check(self, budget, sid=None, ip=None, cost=1.0):
+        """
+        Spends cost tokens from the sid and IP buckets if both have them;
+        a cost above a bucket's burst empties that bucket. Returns 0 if
+        allowed, else seconds until the request would be.
+        """
+        limiters = [
+            (limiter, key, min(cost, limiter.burst))
+            for limiter, key in ((self.clients[budget], sid), (self.ips[budget], ip)) if key
+        ]
+        wait = max((limiter.wait_time(key, spend) for limiter, key, spend in limiters), default=0.0)
+        if wait:
+            for limiter, _, _ in limiters:
+                limiter.throttled += 1
+            return wait
+        for limiter, key, spend in limiters:
+            limiter.spend(key, spend)
+        return 0.0
+
+    def first_throttle(self, budget, sid=None, ip=None):
+        """True if the caller hasn't been told about this throttle yet (one notice per episode)."""
+        key, limiter = (sid, self.clients[budget]) if sid else (ip, self.ips[budget])
+        return limiter.first_throttle(key)
+
+    def forget(self, sid):
+        """Drops a disconnected client's buckets (its IP buckets expire on their own)."""
+        for limiter in self.clients.values():
+            limiter.forget(sid)
+
+    def stats(self):
+        return {
+            name: {"client": self.clients[name].stats(), "ip": self.ips[name].stats()}
+            for name in self.clients
+        }
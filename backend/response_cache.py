@@ -0,0 +1,264 @@
+"""
+ResponseCache - LRU + TTL cache for Gravity Agent model replies.
+
+Keys are built from normalized user text plus a hash of the system prompt,
+so trivially different phrasings ("Explain Python decorators?" vs
+"explain python  decorators") share an entry and a prompt change
+invalidates everything. An optional SQLite tier keeps entries across
+restarts. It stays off the event loop: writes are queued and committed in
+batches by a background thread, and aget() looks memory misses up on a
+worker thread.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+_WHITESPACE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = " \t\n.,!?;:'\"`"
+
+
+def normalize_text(text):
+    """Canonical form of user input used for cache keys."""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    text = _WHITESPACE.sub(" ", text)
+    return text.strip(_EDGE_PUNCTUATION)
+
+
+def prompt_fingerprint(system_prompt):
+    """Short stable hash of a system prompt."""
+    return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class ResponseCache:
+    """
+    Two-tier reply cache.
+
+    Args:
+        max_entries: In-memory LRU capacity. 0 disables the cache.
+        ttl: Seconds a plain text reply stays valid.
+        action_ttl: Seconds an action reply (play_youtube, web_search) stays valid.
+        db_path: Optional SQLite file for the persistent tier.
+    """
+
+    def __init__(self, max_entries=512, ttl=3600, action_ttl=300, db_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.action_ttl = action_ttl
+        self.db_path = db_path
+
+        self._entries = OrderedDict()  # key -> (expires_at, value, kind)
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_lock = threading.Lock()  # Held for SQLite work; when nested, taken before _lock
+        self._pending_writes = {}  # key -> row not yet committed to SQLite
+        self._wake_writer = threading.Event()
+        self._writer = None
+        self._closed = False
+
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, kind TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+            self._writer = threading.Thread(target=self._write_behind, name="response-cache-writer", daemon=True)
+            self._writer.start()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def make_key(self, text, system_prompt):
+        """Cache key for a user input under a given system prompt."""
+        raw = f"{prompt_fingerprint(system_prompt)}\n{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Returns the cached value or None. Expired entries are dropped."""
+        if not self.enabled:
+            return None
+        value = self._get_memory(key)
+        if value is None and self._db is not None:
+            value = self._get_disk(key)
+        if value is None:
+            self._count_miss()
+        return value
+
+    async def aget(self, key):
+        """get() for the event loop: SQLite lookups run on a worker thread."""
+        if not self.enabled:
+            return None
+        value = self._get_memory(key)
+        if value is None and self._db is not None:
+            value = await asyncio.to_thread(self._get_disk, key)
+        if value is None:
+            self._count_miss()
+        return value
+
+    def _get_memory(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value, _kind = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            return None
+
+    def _get_disk(self, key):
+        # Rows queued for the writer are taken under _db_lock, so a row is
+        # always either still queued or committed by the time this reads
+        with self._lock:
+            row = self._pending_writes.get(key)
+        if row is None:
+            with self._db_lock:
+                if self._db is None:
+                    return None
+                row = self._db.execute(
+                    "SELECT key, value, kind, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+        if not row or row[3] <= time.time():
+            return None
+        with self._lock:
+            # Promote into memory so the next hit skips SQLite
+            self._store(key, row[1], row[2], row[3])
+            self.hits += 1
+            self.disk_hits += 1
+        return row[1]
+
+    def _count_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def put(self, key, value, kind="text"):
+        """Stores a value. kind="action" uses the shorter action TTL."""
+        if not self.enabled:
+            return
+
+        ttl = self.action_ttl if kind == "action" else self.ttl
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._store(key, value, kind, expires_at)
+            if self._writer is not None:
+                self._pending_writes[key] = (key, value, kind, expires_at)
+                self._wake_writer.set()
+
+    def _write_behind(self):
+        while not self._closed:
+            self._wake_writer.wait()
+            self._wake_writer.clear()
+            self.flush()
+
+    def flush(self):
+        """Commits queued writes to SQLite in one transaction. Returns the row count."""
+        with self._db_lock:
+            with self._lock:
+                rows = list(self._pending_writes.values())
+                self._pending_writes.clear()
+            if not rows or self._db is None:
+                return 0
+            self._db.executemany(
+                "INSERT OR REPLACE INTO responses (key, value, kind, expires_at) VALUES (?, ?, ?, ?)", rows
+            )
+            self._db.commit()
+        return len(rows)
+
+    def _store(self, key, value, kind, expires_at):
+        self._entries[key] = (expires_at, value, kind)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._pending_writes.clear()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def snapshot(self, path):
+        """
+        Writes the unexpired in-memory entries to a SQLite file (replacing it
+        atomically), so a restart can start warm. Returns the entry count.
+        """
+        now = time.time()
+        with self._lock:
+            rows = [(key, value, kind, expires_at) for key, (expires_at, value, kind) in self._entries.items() if expires_at > now]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        db = sqlite3.connect(tmp_path)
+        try:
+            db.execute(
+                "CREATE TABLE responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, kind TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            db.executemany("INSERT INTO responses (key, value, kind, expires_at) VALUES (?, ?, ?, ?)", rows)
+            db.commit()
+        finally:
+            db.close()
+        os.replace(tmp_path, path)
+        return len(rows)
+
+    def restore(self, path):
+        """Loads unexpired entries from a snapshot() file. Returns the entry count."""
+        if not self.enabled or not os.path.exists(path):
+            return 0
+        db = sqlite3.connect(path)
+        try:
+            # Oldest expiry first, so the LRU keeps the freshest entries
+            rows = db.execute(
+                "SELECT key, value, kind, expires_at FROM responses WHERE expires_at > ? ORDER BY expires_at",
+                (time.time(),),
+            ).fetchall()
+        except sqlite3.DatabaseError:
+            return 0
+        finally:
+            db.close()
+        with self._lock:
+            for key, value, kind, expires_at in rows:
+                self._store(key, value, kind, expires_at)
+        return min(len(rows), self.max_entries)
+
+    def stats(self):
+        """Hit/miss counters for diagnostics."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
+
+    def close(self):
+        """Commits queued writes and closes the SQLite tier."""
+        if self._writer is not None:
+            self._closed = True
+            self._wake_writer.set()
+            self._writer.join()
+            self._writer = None
+        self.flush()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
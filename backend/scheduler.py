@@ -0,0 +1,202 @@
+"""
+TaskScheduler - Priority classes and concurrency caps for work on one event loop.
+
+Chat turns, CAD generations, web-agent runs and printer jobs used to be
+started with bare asyncio.create_task calls, all competing equally for the
+loop and the default thread pool (which the audio and camera reads also
+use). The scheduler runs each job under a priority class:
+
+    interactive   chat turns and quick file tools - a user is waiting
+    tool          CAD generation, web-agent runs, slicing
+    background    bulk work (e.g. each /chat/batch message)
+
+Each class has its own concurrency cap, and max_running bounds them all.
+When a slot frees up, waiting jobs are admitted strictly by class
+(interactive first), FIFO within a class; a class at its cap never blocks
+the classes below it. Time spent waiting is recorded per class.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+try:
+    from metrics import REGISTRY
+except ImportError:
+    from backend.metrics import REGISTRY
+
+logger = logging.getLogger("klistar.scheduler")
+
+INTERACTIVE = "interactive"
+TOOL = "tool"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, TOOL, BACKGROUND)  # Highest first
+
+DEFAULT_CAPS = {INTERACTIVE: 64, TOOL: 2, BACKGROUND: 2}
+DEFAULT_MAX_RUNNING = 64
+
+WAIT_SECONDS = REGISTRY.histogram(
+    "gravity_scheduler_wait_seconds", "Time jobs waited for a scheduler slot, by priority class.", labelnames=("priority",)
+)
+
+
+class TaskScheduler:
+    """
+    Args:
+        caps: priority -> jobs of that class allowed to run at once.
+        max_running: Jobs allowed to run at once across all classes.
+        sample_size: Recent wait times kept per class for percentiles.
+    """
+
+    def __init__(self, caps=None, max_running=DEFAULT_MAX_RUNNING, sample_size=1024):
+        self.caps = {**DEFAULT_CAPS, **(caps or {})}
+        self.max_running = max_running
+        self.running = dict.fromkeys(PRIORITIES, 0)
+        self.total_running = 0
+        self._waiters = {priority: deque() for priority in PRIORITIES}
+        self._tasks = set()  # Jobs started with submit(), kept alive until done
+        self.completed = dict.fromkeys(PRIORITIES, 0)
+        self.failed = dict.fromkeys(PRIORITIES, 0)
+        self._waits = {priority: deque(maxlen=sample_size) for priority in PRIORITIES}
+        self.wait_seconds_max = dict.fromkeys(PRIORITIES, 0.0)
+
+    @classmethod
+    def from_env(cls):
+        """Scheduler sized by GRAVITY_SCHED_* settings."""
+        caps = {
+            priority: int(os.getenv(f"GRAVITY_SCHED_{priority.upper()}", DEFAULT_CAPS[priority]))
+            for priority in PRIORITIES
+        }
+        return cls(caps, max_running=int(os.getenv("GRAVITY_SCHED_MAX_RUNNING", DEFAULT_MAX_RUNNING)))
+
+    def queued(self, priority):
+        return len(self._waiters[priority])
+
+    @asynccontextmanager
+    async def slot(self, priority):
+        """Runs the body of the with-block under priority once a slot is free."""
+        await self.acquire(priority)
+        try:
+            yield
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.failed[priority] += 1
+            raise
+        finally:
+            self.release(priority)
+        self.completed[priority] += 1
+
+    async def run(self, priority, coro):
+        """Awaits coro under priority and returns its result."""
+        try:
+            async with self.slot(priority):
+                return await coro
+        finally:
+            coro.close()  # No-op once awaited; avoids "never awaited" if cancelled while queued
+
+    def submit(self, coro, priority, name=None):
+        """
+        Starts coro as a task that waits for a slot of its class; the
+        scheduled replacement for asyncio.create_task. Failures are logged.
+        """
+        task = asyncio.create_task(self._run_logged(coro, priority), name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run_logged(self, coro, priority):
+        try:
+            return await self.run(priority, coro)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("%s job failed", priority)
+            return None
+
+    async def acquire(self, priority):
+        if priority not in self.running:
+            raise ValueError(f"Unknown priority: {priority}")
+        start = time.monotonic()
+        if not self._waiters[priority] and self._has_room(priority):
+            self._take(priority)
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters[priority].append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Granted a slot just as we were cancelled: hand it on
+                    self.release(priority)
+                elif waiter in self._waiters[priority]:
+                    # (_wake may already have popped it as done)
+                    self._waiters[priority].remove(waiter)
+                raise
+        waited = time.monotonic() - start
+        self._waits[priority].append(waited)
+        self.wait_seconds_max[priority] = max(self.wait_seconds_max[priority], waited)
+        WAIT_SECONDS.labels(priority).observe(waited)
+
+    def release(self, priority):
+        self.running[priority] -= 1
+        self.total_running -= 1
+        self._wake()
+
+    def _has_room(self, priority):
+        return self.running[priority] < self.caps[priority] and self.total_running < self.max_running
+
+    def _take(self, priority):
+        self.running[priority] += 1
+        self.total_running += 1
+
+    def _wake(self):
+        """Hands free slots to waiters, highest class first."""
+        for priority in PRIORITIES:
+            waiters = self._waiters[priority]
+            while waiters and self._has_room(priority):
+                waiter = waiters.popleft()
+                if waiter.done():
+                    continue
+                self._take(priority)
+                waiter.set_result(None)
+            if self.total_running >= self.max_running:
+                return
+
+    async def aclose(self):
+        """Cancels jobs started with submit() and waits for them to finish."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def wait_percentile(self, priority, pct):
+        """Nearest-rank percentile of recent waits for a class, in seconds."""
+        waits = self._waits[priority]
+        if not waits:
+            return 0.0
+        ordered = sorted(waits)
+        rank = max(1, -(-len(ordered) * pct // 100))
+        return ordered[int(rank) - 1]
+
+    def stats(self):
+        return {
+            "max_running": self.max_running,
+            "running": self.total_running,
+            "classes": {
+                priority: {
+                    "cap": self.caps[priority],
+                    "running": self.running[priority],
+                    "queued": self.queued(priority),
+                    "completed": self.completed[priority],
+                    "failed": self.failed[priority],
+                    "wait_ms_p50": self.wait_percentile(priority, 50) * 1000,
+                    "wait_ms_p99": self.wait_percentile(priority, 99) * 1000,
+                    "wait_ms_max": self.wait_seconds_max[priority] * 1000,
+                }
+                for priority in PRIORITIES
+            },
+        }
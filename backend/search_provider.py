@@ -0,0 +1,262 @@
+"""
+Search providers - Web search behind GravityAgent.handle_search.
+
+A provider turns a query into result links (title, url, snippet).
+SearchPipeline then fetches the result pages concurrently, extracts their
+text and keeps the top-k passages that best match the query, so the model
+is re-fed a few short snippets instead of whole pages.
+
+Providers:
+    GoogleSearchProvider    Google Custom Search JSON API (needs an API key
+                            and a search engine id)
+    FixtureSearchProvider   Canned results and pages from a dict or JSON
+                            file, for offline tests and demos
+"""
+
+import asyncio
+import json
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+
+try:
+    from response_cache import normalize_text
+except ImportError:
+    from backend.response_cache import normalize_text
+
+
+@dataclass
+class SearchResult:
+    title: str
+    url: str
+    snippet: str = ""
+
+
+class SearchProvider:
+    """
+    Base provider. Subclasses implement search(); fetch() downloads a result
+    page with the shared HTTP client and may be overridden (e.g. fixtures).
+
+    Args:
+        http: Callable returning the shared httpx.AsyncClient.
+    """
+
+    name = "base"
+
+    def __init__(self, http=None):
+        self.http = http
+
+    async def search(self, query, limit):
+        """Returns up to limit SearchResults for query."""
+        raise NotImplementedError
+
+    async def fetch(self, url, max_bytes):
+        """
+        Returns the page's HTML (truncated to max_bytes), or None if it isn't
+        HTML. The body is streamed and the download stops once max_bytes have
+        been read; non-HTML responses are dropped before any of it is read.
+        """
+        async with self.http().stream("GET", url, follow_redirects=True) as resp:
+            resp.raise_for_status()
+            if "html" not in resp.headers.get("content-type", "html"):
+                return None
+            parts, size = [], 0
+            async for text in resp.aiter_text():
+                parts.append(text)
+                size += len(text)
+                if size >= max_bytes:
+                    break
+        return "".join(parts)[:max_bytes]
+
+
+class GoogleSearchProvider(SearchProvider):
+    """Google Custom Search JSON API."""
+
+    name = "google"
+    URL = "https://www.googleapis.com/customsearch/v1"
+
+    def __init__(self, api_key, engine_id, http=None):
+        super().__init__(http)
+        self.api_key = api_key
+        self.engine_id = engine_id
+
+    async def search(self, query, limit):
+        params = {"key": self.api_key, "cx": self.engine_id, "q": query, "num": min(limit, 10)}
+        resp = await self.http().get(self.URL, params=params)
+        resp.raise_for_status()
+        return [
+            SearchResult(title=item.get("title", ""), url=item["link"], snippet=item.get("snippet", ""))
+            for item in resp.json().get("items", [])[:limit]
+        ]
+
+
+class FixtureSearchProvider(SearchProvider):
+    """
+    Offline provider serving canned data:
+        {"results": {"<query>": [{"title", "url", "snippet"}], "*": [...]},
+         "pages": {"<url>": "<html>"}}
+    Queries are matched after normalisation; "*" answers any other query.
+    """
+
+    name = "fixture"
+
+    def __init__(self, results=None, pages=None, path=None):
+        super().__init__()
+        if path:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            results, pages = data.get("results", {}), data.get("pages", {})
+        self.results = {normalize_text(q) if q != "*" else q: items for q, items in (results or {}).items()}
+        self.pages = pages or {}
+        self.fetched = []
+
+    async def search(self, query, limit):
+        items = self.results.get(normalize_text(query), self.results.get("*", []))
+        return [SearchResult(**item) for item in items[:limit]]
+
+    async def fetch(self, url, max_bytes):
+        self.fetched.append(url)
+        if url not in self.pages:
+            raise LookupError(f"No fixture page for {url}")
+        return self.pages[url][:max_bytes]
+
+
+class _TextExtractor(HTMLParser):
+    """Collects visible text blocks, skipping scripts, styles and page chrome."""
+
+    SKIP = {"script", "style", "noscript", "nav", "header", "footer", "svg", "form"}
+    BLOCK = {"p", "div", "li", "section", "article", "br", "h1", "h2", "h3", "h4", "td", "pre"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []
+        self._current = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skipping += 1
+        elif tag in self.BLOCK:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in self.BLOCK:
+            self._flush()
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self._current.append(data)
+
+    def _flush(self):
+        text = " ".join("".join(self._current).split())
+        if text:
+            self.blocks.append(text)
+        self._current = []
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def extract_text(html):
+    """Visible text blocks of an HTML page, in document order."""
+    parser = _TextExtractor()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass  # Keep whatever was parsed before malformed markup
+    return parser.blocks
+
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def query_terms(query):
+    return {word for word in _WORD.findall(query.lower()) if len(word) > 2}
+
+
+def passages(blocks, size):
+    """Joins short blocks and splits long ones into ~size-character passages."""
+    current = ""
+    for block in blocks:
+        while len(block) > size:
+            cut = block.rfind(" ", 0, size)
+            cut = cut if cut > size // 2 else size
+            if current:
+                yield current
+                current = ""
+            yield block[:cut]
+            block = block[cut:].lstrip()
+        if len(current) + len(block) + 1 > size and current:
+            yield current
+            current = ""
+        current = f"{current} {block}".strip()
+    if current:
+        yield current
+
+
+def score(passage, terms):
+    """Distinct query terms covered, then how often they occur."""
+    words = _WORD.findall(passage.lower())
+    hits = [word for word in words if word in terms]
+    return (len(set(hits)), len(hits) / (len(words) or 1))
+
+
+class SearchPipeline:
+    """
+    search -> concurrent page fetch -> extract -> top-k passages.
+
+    Args:
+        provider: SearchProvider to query.
+        results: Result pages to fetch per query.
+        top_k: Passages returned (at most one per page).
+        passage_chars: Target passage length.
+        fetch_timeout: Seconds allowed per page; slow pages fall back to the provider's snippet.
+        max_page_bytes: Characters of HTML parsed per page.
+    """
+
+    def __init__(self, provider, results=5, top_k=3, passage_chars=400, fetch_timeout=4.0, max_page_bytes=500_000):
+        self.provider = provider
+        self.results = results
+        self.top_k = top_k
+        self.passage_chars = passage_chars
+        self.fetch_timeout = fetch_timeout
+        self.max_page_bytes = max_page_bytes
+
+    async def run(self, query):
+        """Returns up to top_k {"title", "url", "text"} dicts, best first."""
+        hits = await self.provider.search(query, self.results)
+        if not hits:
+            return []
+        terms = query_terms(query)
+        best = await asyncio.gather(*(self._best_passage(hit, terms) for hit in hits))
+        # More query terms covered first; ties keep the provider's ranking
+        ranked = sorted(zip(best, range(len(hits))), key=lambda item: (item[0][0][0], -item[1]), reverse=True)
+        return [
+            {"title": hits[i].title, "url": hits[i].url, "text": text}
+            for (_, text), i in ranked[: self.top_k]
+            if text
+        ]
+
+    async def _best_passage(self, hit, terms):
+        """(score, text) of the page's best passage, or of the provider snippet."""
+        fallback = (score(hit.snippet, terms), hit.snippet)
+        try:
+            html = await asyncio.wait_for(self.provider.fetch(hit.url, self.max_page_bytes), self.fetch_timeout)
+        except Exception:
+            return fallback
+        if not html:
+            return fallback
+        # Parsing a large page takes a while; keep it off the event loop
+        best = await asyncio.to_thread(self._rank_page, html, terms)
+        # Prefer the page unless its best passage covers fewer query terms than the snippet
+        if best is None or best[0][0] < fallback[0][0]:
+            return fallback
+        return best
+
+    def _rank_page(self, html, terms):
+        candidates = [(score(p, terms), p) for p in passages(extract_text(html), self.passage_chars)]
+        return max(candidates, key=lambda item: item[0]) if candidates else None
@@ -1,32 +1,255 @@
 import sys
+import argparse
+import logging
 import socketio
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import json
+import math
+import signal
 import asyncio
+from contextlib import asynccontextmanager
 try:
     from gravity_agent import GravityAgent
+    from shared_state import create_state
+    from stub_model import StubClient
+    from metrics import REGISTRY, CONTENT_TYPE, RateMeter
+    from logging_setup import setup_logging
+    from media_payloads import MediaChannel
+    from draining import Drainer
+    from rate_limit import ClientRateLimits
+    from scheduler import BACKGROUND, INTERACTIVE, PRIORITIES, TaskScheduler
 except ImportError:
     from backend.gravity_agent import GravityAgent
+    from backend.shared_state import create_state
+    from backend.stub_model import StubClient
+    from backend.metrics import REGISTRY, CONTENT_TYPE, RateMeter
+    from backend.logging_setup import setup_logging
+    from backend.media_payloads import MediaChannel
+    from backend.draining import Drainer
+    from backend.rate_limit import ClientRateLimits
+    from backend.scheduler import BACKGROUND, INTERACTIVE, PRIORITIES, TaskScheduler
 
 from pydantic import BaseModel
+from typing import List, Optional
+
+# Queue-backed logging: handlers never block the event loop (see logging_setup.py)
+setup_logging()
+logger = logging.getLogger("klistar.server")
 
 class ChatRequest(BaseModel):
     message: str
+    session_id: Optional[str] = None # Optional: keep conversation context across calls
+
+class BatchItem(BaseModel):
+    message: str
+    id: Optional[str] = None # Caller's label, echoed back with the result
+    session_id: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    messages: List[BatchItem]
+    concurrency: Optional[int] = None # Capped at GRAVITY_BATCH_CONCURRENCY
+
+# Multi-worker mode: with REDIS_URL set, sessions/caches and Socket.IO
+# broadcasts are shared across worker processes through Redis
+REDIS_URL = os.getenv("REDIS_URL", "")
+# Benchmarks only: replace Gemini with a local stub of this latency (seconds)
+STUB_LATENCY = os.getenv("GRAVITY_STUB_LATENCY")
+STUB_CPU_MS = float(os.getenv("GRAVITY_STUB_CPU_MS", "0"))
+# /chat/batch: most messages per request, and most run at once per request
+BATCH_MAX_ITEMS = int(os.getenv("GRAVITY_BATCH_MAX_ITEMS", "256"))
+BATCH_CONCURRENCY = int(os.getenv("GRAVITY_BATCH_CONCURRENCY", "4"))
+# Graceful shutdown: seconds to let in-flight requests finish (keep below the
+# platform's kill timeout, e.g. Docker's 10 s), the Retry-After sent to callers
+# turned away meanwhile, and an optional directory for cache snapshots
+DRAIN_TIMEOUT = float(os.getenv("GRAVITY_DRAIN_TIMEOUT", "8"))
+DRAIN_RETRY_AFTER = int(os.getenv("GRAVITY_DRAIN_RETRY_AFTER", "2"))
+CACHE_SNAPSHOT_DIR = os.getenv("GRAVITY_CACHE_SNAPSHOT_DIR", "")
+# Per-client rate limits (see rate_limit.py): events per second and burst per
+# budget, applied per socket and, GRAVITY_RATE_IP_FACTOR times larger, per IP.
+# A rate of 0 disables a budget; GRAVITY_RATE_LIMIT=0 disables them all.
+RATE_LIMIT = os.getenv("GRAVITY_RATE_LIMIT", "1") != "0"
+RATE_BUDGETS = {
+    "user_input": (float(os.getenv("GRAVITY_RATE_USER_INPUT", "1")), float(os.getenv("GRAVITY_RATE_USER_INPUT_BURST", "10"))),
+    "chat": (float(os.getenv("GRAVITY_RATE_CHAT", "1")), float(os.getenv("GRAVITY_RATE_CHAT_BURST", "10"))),
+}
+RATE_IP_FACTOR = float(os.getenv("GRAVITY_RATE_IP_FACTOR", "8"))
+# Behind a reverse proxy (Render, Railway, nginx) every peer address is the
+# proxy's; trust X-Forwarded-For for the client IP instead
+TRUST_FORWARDED = os.getenv("GRAVITY_TRUST_FORWARDED", "0") == "1"
+
+def create_agent():
+    shared = create_state(REDIS_URL)
+    if STUB_LATENCY is not None:
+        client = StubClient(latency=float(STUB_LATENCY), cpu_time=STUB_CPU_MS / 1000.0)
+        return GravityAgent(client=client, shared=shared)
+    return GravityAgent(shared=shared)
 
 # Initialize Gravity Agent (The Brain)
-agent = GravityAgent()
+agent = create_agent()
+
+# Server metrics (see /metrics). Gauges backed by functions read the
+# current agent at scrape time.
+CONNECTED_CLIENTS = REGISTRY.gauge("gravity_socketio_connected_clients", "Socket.IO clients connected to this worker.")
+SOCKET_EVENTS = REGISTRY.counter("gravity_socketio_events", "Socket.IO events handled.", labelnames=("event",))
+event_rate = RateMeter(window=60)
+REGISTRY.gauge("gravity_socketio_events_per_second", "Socket.IO events per second (1 minute average).").set_function(event_rate.rate)
+CACHE_HIT_RATIO = REGISTRY.gauge("gravity_cache_hit_ratio", "Hit ratio since start.", labelnames=("cache",))
+CACHE_HIT_RATIO.labels("reply").set_function(lambda: agent.cache.stats()["hit_ratio"])
+CACHE_HIT_RATIO.labels("youtube").set_function(lambda: agent.youtube_cache.stats()["hit_ratio"])
+REGISTRY.gauge("gravity_intent_router_hit_ratio", "Share of requests answered without a model call.").set_function(
+    lambda: agent.router.stats()["hit_ratio"] if agent.router else 0.0
+)
+REGISTRY.gauge("gravity_admission_queue_depth", "Callers waiting for a model slot.").set_function(lambda: agent.admission.queue_depth)
+REGISTRY.gauge("gravity_admission_in_flight", "Model calls running.").set_function(lambda: agent.admission.in_flight)
+RATE_LIMITED = REGISTRY.counter("gravity_rate_limited", "Requests and events refused by the rate limiter.", labelnames=("budget",))
+
+rate_limits = ClientRateLimits(RATE_BUDGETS, ip_factor=RATE_IP_FACTOR) if RATE_LIMIT else None
+client_ips = {}  # sid -> client IP, recorded on connect
+
+# Chat turns run as interactive work, /chat/batch as background, so bulk
+# jobs queue behind users (see scheduler.py; sized by GRAVITY_SCHED_*)
+scheduler = TaskScheduler.from_env()
+SCHEDULER_QUEUED = REGISTRY.gauge("gravity_scheduler_queued", "Jobs waiting for a scheduler slot.", labelnames=("priority",))
+SCHEDULER_RUNNING = REGISTRY.gauge("gravity_scheduler_running", "Jobs running.", labelnames=("priority",))
+for _priority in PRIORITIES:
+    SCHEDULER_QUEUED.labels(_priority).set_function(lambda p=_priority: scheduler.queued(p))
+    SCHEDULER_RUNNING.labels(_priority).set_function(lambda p=_priority: scheduler.running[p])
+
+# In-flight requests, so shutdown can wait for them (see draining.py)
+drainer = Drainer()
+_drain_task = None
+
+def restarting_reply():
+    """Busy-style reply for requests arriving while the server drains."""
+    return {
+        "type": "busy",
+        "content": "The server is restarting. Please try again in a moment.",
+        "retry_after": DRAIN_RETRY_AFTER,
+    }
+
+def count_event(name):
+    SOCKET_EVENTS.labels(name).inc()
+    event_rate.mark()
+
+def client_ip(forwarded, peer):
+    """Client address: the first X-Forwarded-For hop if trusted, else the peer address."""
+    if TRUST_FORWARDED and forwarded:
+        return forwarded.split(",")[0].strip()
+    return peer
+
+async def throttle(budget, sid=None, ip=None, cost=1):
+    """
+    Spends cost from the caller's budget. Returns 0 if allowed, else the
+    Retry-After in seconds. Sockets get one 'Throttled' status per episode,
+    not one per dropped event.
+    """
+    if rate_limits is None:
+        return 0
+    wait = rate_limits.check(budget, sid=sid, ip=ip, cost=cost)
+    if not wait:
+        return 0
+    RATE_LIMITED.labels(budget).inc()
+    retry_after = max(1, math.ceil(wait))
+    if sid and rate_limits.first_throttle(budget, sid=sid, ip=ip):
+        logger.info("Throttled %s for %s (%s)", budget, sid, ip)
+        await sio.emit('status', {'msg': 'Throttled', 'event': budget, 'retry_after': retry_after}, room=sid)
+    return retry_after
+
+def throttled_reply(retry_after):
+    """/chat body and headers for a caller over its rate limit."""
+    return JSONResponse(
+        status_code=429,
+        content={"reply": "Too many requests. Please slow down.", "error": "rate_limited"},
+        headers={"Retry-After": str(retry_after)},
+    )
 
 # Create Socket.IO Server
 sio = socketio.AsyncServer(
     async_mode='asgi',
+    client_manager=socketio.AsyncRedisManager(REDIS_URL) if REDIS_URL else None,
     cors_allowed_origins='*',
     cors_credentials=False, # Disable credentials for wildcard support
     ping_timeout=60, 
     ping_interval=25
 )
-app = FastAPI()
+# Frames, screenshots and meshes go out as binary to clients that negotiated
+# it (see media_payloads.py). A relay forwarding AudioLoop/FaceAuthenticator
+# media callbacks builds them with binary_media=True and sends each through
+# media.emit(event, payload, room); without that they keep producing base64
+media = MediaChannel(sio)
+async def drain(timeout=None):
+    """
+    Stops taking new requests, tells connected clients, and waits up to
+    timeout (GRAVITY_DRAIN_TIMEOUT) for in-flight requests. Safe to call twice.
+    """
+    global _drain_task
+
+    async def run():
+        drainer.begin()
+        logger.info("Draining: %d request(s) in flight", drainer.in_flight)
+        try:
+            await sio.emit('status', {'msg': 'Restarting', 'retry_after': DRAIN_RETRY_AFTER})
+        except Exception as e:
+            logger.warning("Could not notify clients of restart: %s", e)
+        if await drainer.wait(DRAIN_TIMEOUT if timeout is None else timeout):
+            logger.info("Drained cleanly")
+        else:
+            logger.warning("Drain deadline passed with %d request(s) in flight", drainer.in_flight)
+
+    if _drain_task is None:
+        _drain_task = asyncio.ensure_future(run())
+    await asyncio.shield(_drain_task)
+
+def drain_on_signals():
+    """
+    Runs drain() before uvicorn's own SIGTERM/SIGINT handling, so sockets stay
+    open while in-flight replies are delivered. A second signal exits at once.
+    """
+    loop = asyncio.get_running_loop()
+
+    async def drain_then(previous, signum):
+        await drain()
+        previous(signum, None)
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        previous = signal.getsignal(signum)
+        if not callable(previous):
+            continue
+
+        def handler(signum, frame, previous=previous):
+            if drainer.draining:
+                previous(signum, frame)
+            else:
+                loop.call_soon_threadsafe(lambda: asyncio.ensure_future(drain_then(previous, signum)))
+
+        try:
+            signal.signal(signum, handler)
+        except ValueError:
+            return  # Not the main thread (e.g. embedded in tests); lifespan shutdown still drains
+
+@asynccontextmanager
+async def lifespan(app):
+    if CACHE_SNAPSHOT_DIR:
+        logger.info("Restored cache snapshots: %s", agent.load_caches(CACHE_SNAPSHOT_DIR))
+    drain_on_signals()
+    yield
+    await drain()
+    # Close pooled HTTP connections held by the agent
+    await agent.aclose()
+    if agent.shared is not None:
+        await agent.shared.close()
+    if CACHE_SNAPSHOT_DIR:
+        try:
+            logger.info("Saved cache snapshots: %s", agent.save_caches(CACHE_SNAPSHOT_DIR))
+        except Exception as e:
+            logger.warning("Cache snapshot failed: %s", e)
+    agent.cache.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS
 app.add_middleware(
@@ -41,65 +264,223 @@ app_socketio = socketio.ASGIApp(sio, app)
 
 @app.get("/status")
 async def status():
-    return {"status": "running", "brain": "Gravity Agent"}
+    body = {"status": "draining" if drainer.draining else "running", "brain": "Gravity Agent", "cache": agent.cache_stats(), "sessions": agent.sessions.stats(), "single_flight": agent.flights.stats(), "admission": agent.admission.stats(), "prompt": agent.prompts.stats(), "rate_limits": rate_limits.stats() if rate_limits else None, "scheduler": scheduler.stats(), "drain": drainer.stats()}
+    if drainer.draining:
+        # Health checks fail while draining so load balancers stop routing here
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus scrape endpoint
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+def request_ip(http):
+    return client_ip(http.headers.get("x-forwarded-for"), http.client.host if http.client else None)
 
 @app.post("/chat")
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http: Request):
+    if drainer.draining:
+        result = restarting_reply()
+        return JSONResponse(
+            status_code=503,
+            content={"reply": result["content"], "error": "restarting"},
+            headers={"Retry-After": str(result["retry_after"])},
+        )
+    retry_after = await throttle("chat", ip=request_ip(http))
+    if retry_after:
+        return throttled_reply(retry_after)
     # Use existing agent instance
-    result = await agent.process_input(request.message, owner_verified=True)
+    with drainer.track():
+        async with scheduler.slot(INTERACTIVE):
+            result = await agent.process_input(request.message, owner_verified=True, session_id=request.session_id)
+    if result["type"] == "busy":
+        # Model queue is full: tell the caller to back off instead of waiting
+        return JSONResponse(
+            status_code=429,
+            content={"reply": result["content"], "error": "busy"},
+            headers={"Retry-After": str(result["retry_after"])},
+        )
     # Extract text content from result dict
     reply_text = result.get("content", "Error processing request")
     return {"reply": reply_text}
 
+@app.post("/chat/batch")
+async def chat_batch_endpoint(request: BatchRequest, http: Request):
+    """
+    Runs many messages with bounded parallelism and streams one NDJSON line
+    per message as it completes (completion order, not request order):
+    { "index": 0, "id": "...", "type": "text"|"play_youtube"|"busy", "content": "...", ... }
+    """
+    if drainer.draining:
+        return JSONResponse(
+            status_code=503,
+            content={"error": "restarting"},
+            headers={"Retry-After": str(DRAIN_RETRY_AFTER)},
+        )
+    if len(request.messages) > BATCH_MAX_ITEMS:
+        return JSONResponse(
+            status_code=413,
+            content={"error": "batch_too_large", "max_items": BATCH_MAX_ITEMS},
+        )
+    # Each message is a model call: charge them all, up to a full bucket
+    retry_after = await throttle("chat", ip=request_ip(http), cost=max(len(request.messages), 1))
+    if retry_after:
+        return throttled_reply(retry_after)
+    concurrency = max(1, min(request.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY))
+    items = [(item.message, item.session_id) for item in request.messages]
+
+    async def lines():
+        with drainer.track():
+            # Each message takes its own background slot, so the background cap
+            # bounds model calls across all batches, not the number of batches
+            batch = agent.process_batch(items, concurrency=concurrency, slot=lambda: scheduler.slot(BACKGROUND))
+            async for index, result in batch:
+                line = {"index": index, "id": request.messages[index].id, **response_payload(result)}
+                yield json.dumps(line) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @sio.event
 async def connect(sid, environ):
-    print(f"Client connected: {sid}")
+    logger.info("Client connected: %s", sid)
+    peer = (environ.get("asgi.scope") or {}).get("client") or (environ.get("REMOTE_ADDR"),)
+    client_ips[sid] = client_ip(environ.get("HTTP_X_FORWARDED_FOR"), peer[0])
+    CONNECTED_CLIENTS.inc()
+    count_event("connect")
     await sio.emit('status', {'msg': 'Connected to KlistarAI Gravity'}, room=sid)
 
 @sio.event
 async def disconnect(sid):
-    print(f"Client disconnected: {sid}")
+    logger.info("Client disconnected: %s", sid)
+    CONNECTED_CLIENTS.dec()
+    count_event("disconnect")
+    media.forget(sid)
+    client_ips.pop(sid, None)
+    if rate_limits is not None:
+        rate_limits.forget(sid)
+    await agent.end_session(sid)
+
+@sio.event
+async def media_capabilities(sid, data):
+    """
+    Client offer, e.g. { "binary": true, "compression": ["zstd", "deflate"] }.
+    Returns (as the ack) what this server will send that client.
+    """
+    count_event("media_capabilities")
+    accepted = media.negotiate(sid, data)
+    logger.debug("Media capabilities for %s: %s", sid, accepted)
+    return accepted
+
+def response_payload(result):
+    """Shapes a GravityAgent result dict into the client 'response' event payload."""
+    if result["type"] == "play_youtube":
+        return {
+            "type": "play_youtube",
+            "content": result["content"], # "Playing: Song Name"
+            "video_id": result["video_id"],
+            "title": result["title"]
+        }
+    if result["type"] == "busy":
+        return {
+            "type": "busy",
+            "content": result["content"],
+            "retry_after": result["retry_after"]
+        }
+    payload = {
+        "type": "text",
+        "content": result["content"]
+    }
+    if result.get("sources"):
+        payload["sources"] = result["sources"] # Web search answers cite their pages
+    return payload
 
 @sio.event
 async def user_input(sid, data):
     """
     Main communication channel.
-    Input: { "text": "Play telugu songs", "owner_verified": true }
+    Input: { "text": "Play telugu songs", "owner_verified": true, "stream": false }
+
+    When the model queue is full, or the server is shutting down, the reply
+    has type "busy" (with a "retry_after" hint in seconds) and the status
+    becomes 'Busy'. Messages over the client's rate limit are dropped and
+    the client gets a 'Throttled' status with "retry_after".
+
+    With "stream": true the reply is sent as 'response_chunk' events
+    ({ "content": "..." }) followed by one 'response_done' carrying the
+    same payload as 'response'. Otherwise a single 'response' is sent.
     """
     text = data.get('text')
     verified = data.get('owner_verified', True) # Default true for now while manual mode
+    stream = data.get('stream', False)
+    count_event("user_input")
     
-    print(f"[Server] User: {text} (Verified: {verified})")
+    logger.debug("User: %s (Verified: %s, Stream: %s)", text, verified, stream)
     
     if not text:
         return
 
+    if drainer.draining:
+        # Shutting down: answer right away so the client retries elsewhere
+        result = restarting_reply()
+        await sio.emit('response', response_payload(result), room=sid)
+        await sio.emit('status', {'msg': 'Busy', 'retry_after': result["retry_after"]}, room=sid)
+        return
+
+    if await throttle("user_input", sid=sid, ip=client_ips.get(sid)):
+        return
+
+    with drainer.track():
+        async with scheduler.slot(INTERACTIVE):
+            result = await handle_user_input(sid, text, verified, stream)
+        if result["type"] == "busy":
+            await sio.emit('status', {'msg': 'Busy', 'retry_after': result["retry_after"]}, room=sid)
+        else:
+            await sio.emit('status', {'msg': 'Online'}, room=sid)
+
+async def handle_user_input(sid, text, verified, stream):
+    """Runs one user_input through the agent and emits the reply. Returns the result dict."""
     # 1. Send "Thinking" status
     await sio.emit('status', {'msg': 'Thinking...'}, room=sid)
     
     # 2. Process via Gravity Agent
-    result = await agent.process_input(text, owner_verified=verified)
-    
-    # 3. Handle Result
-    # result is { "type": "text"|"play_youtube", "content": "...", "video_id": "..." }
-    
-    if result["type"] == "text":
-        # Send text back for display + TTS
-        await sio.emit('response', {
-            "type": "text",
-            "content": result["content"]
-        }, room=sid)
+    if stream:
+        async for event in agent.stream_input(text, owner_verified=verified, session_id=sid):
+            if event["type"] == "chunk":
+                await sio.emit('response_chunk', {"content": event["content"]}, room=sid)
+            else:
+                result = event["result"]
+                await sio.emit('response_done', response_payload(result), room=sid)
+    else:
+        result = await agent.process_input(text, owner_verified=verified, session_id=sid)
         
-    elif result["type"] == "play_youtube":
-        # Send command to play video
-        await sio.emit('response', {
-            "type": "play_youtube",
-            "content": result["content"], # "Playing: Song Name"
-            "video_id": result["video_id"],
-            "title": result["title"]
-        }, room=sid)
-        
-    await sio.emit('status', {'msg': 'Online'}, room=sid)
+        # 3. Handle Result
+        # result is { "type": "text"|"play_youtube"|"busy", "content": "...", "video_id": "..." }
+        await sio.emit('response', response_payload(result), room=sid)
+    return result
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    parser = argparse.ArgumentParser(description="KlistarAI Gravity server")
+    parser.add_argument("--host", type=str, default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")),
+                        help="Worker processes (set REDIS_URL when using more than one)")
+    parser.add_argument("--profile-startup", action="store_true", help="Print an import-time report and exit")
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        import startup_profile
+        sys.exit(startup_profile.main(["server"]))
+
+    if args.workers > 1 and not REDIS_URL:
+        logger.warning("--workers > 1 without REDIS_URL; sessions and caches will not be shared between workers")
+
+    # Serve the Socket.IO wrapper (it forwards plain HTTP routes to FastAPI).
+    # An import string is required for uvicorn to spawn workers.
+    uvicorn.run(
+        "server:app_socketio",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+    )
@@ -0,0 +1,143 @@
+"""
+SessionStore - Bounded per-client conversation history for the Gravity Agent.
+
+Each session (a Socket.IO sid, or a caller-supplied id on /chat) keeps a
+ring buffer of recent turns trimmed to a token budget. Across all sessions
+the store enforces a session count cap, a total memory cap and an idle
+timeout, evicting least recently used sessions first.
+"""
+
+import time
+from collections import OrderedDict, deque
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token for English/code)."""
+    return len(text) // 4 + 1
+
+
+class Conversation:
+    """Ring buffer of (role, text) turns for one session."""
+
+    __slots__ = ("turns", "token_budget", "tokens", "size_bytes", "last_used")
+
+    def __init__(self, max_turns, token_budget):
+        self.turns = deque(maxlen=max_turns)  # entries: (role, text, tokens, size_bytes)
+        self.token_budget = token_budget
+        self.tokens = 0
+        self.size_bytes = 0
+        self.last_used = time.monotonic()
+
+    def append(self, role, text):
+        if len(self.turns) == self.turns.maxlen:
+            self._forget(self.turns[0])
+        entry = (role, text, estimate_tokens(text), len(text.encode("utf-8")))
+        self.turns.append(entry)
+        self.tokens += entry[2]
+        self.size_bytes += entry[3]
+        # Trim oldest turns to the token budget, always keeping the newest one
+        while self.tokens > self.token_budget and len(self.turns) > 1:
+            self._forget(self.turns.popleft())
+
+    def pop_oldest(self):
+        """Drops the oldest turn. Returns the bytes freed."""
+        entry = self.turns.popleft()
+        self._forget(entry)
+        return entry[3]
+
+    def _forget(self, entry):
+        self.tokens -= entry[2]
+        self.size_bytes -= entry[3]
+
+    def messages(self):
+        return [(role, text) for role, text, _, _ in self.turns]
+
+
+class SessionStore:
+    """
+    Args:
+        max_turns: Messages kept per session (user and model turns both count).
+        token_budget: Approximate prompt tokens of history per session.
+        max_sessions: Sessions kept before the least recently used is evicted.
+        max_total_bytes: Hard cap on history text held across all sessions.
+        idle_timeout: Seconds without activity before a session is dropped.
+    """
+
+    def __init__(self, max_turns=20, token_budget=2000, max_sessions=1000, max_total_bytes=16 * 1024 * 1024, idle_timeout=1800):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.max_sessions = max_sessions
+        self.max_total_bytes = max_total_bytes
+        self.idle_timeout = idle_timeout
+
+        self._sessions = OrderedDict()  # sid -> Conversation, least recently used first
+        self.total_bytes = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, sid):
+        return sid in self._sessions
+
+    def history(self, sid):
+        """Returns the session's turns as a list of (role, text)."""
+        self.evict_idle()
+        conv = self._sessions.get(sid)
+        if conv is None:
+            return []
+        self._touch(sid, conv)
+        return conv.messages()
+
+    def append(self, sid, role, text):
+        """Records one turn for a session, creating it if needed."""
+        conv = self._sessions.get(sid)
+        if conv is None:
+            conv = Conversation(self.max_turns, self.token_budget)
+            self._sessions[sid] = conv
+        before = conv.size_bytes
+        conv.append(role, text)
+        self.total_bytes += conv.size_bytes - before
+        self._touch(sid, conv)
+        self._enforce_caps(keep=sid)
+
+    def drop(self, sid):
+        """Forgets a session (e.g. on disconnect)."""
+        conv = self._sessions.pop(sid, None)
+        if conv is not None:
+            self.total_bytes -= conv.size_bytes
+
+    def evict_idle(self, now=None):
+        """Drops sessions idle for longer than idle_timeout."""
+        now = time.monotonic() if now is None else now
+        # Oldest activity is at the front, so stop at the first fresh session
+        while self._sessions:
+            sid, conv = next(iter(self._sessions.items()))
+            if now - conv.last_used <= self.idle_timeout:
+                break
+            self.drop(sid)
+            self.evictions += 1
+
+    def _touch(self, sid, conv):
+        conv.last_used = time.monotonic()
+        self._sessions.move_to_end(sid)
+
+    def _enforce_caps(self, keep):
+        while len(self._sessions) > self.max_sessions or self.total_bytes > self.max_total_bytes:
+            sid = next(iter(self._sessions))
+            if sid != keep:
+                self.drop(sid)
+                self.evictions += 1
+                continue
+            # Only the active session is left over the cap: shed its oldest turns
+            conv = self._sessions[keep]
+            if self.total_bytes <= self.max_total_bytes or len(conv.turns) <= 1:
+                break
+            self.total_bytes -= conv.pop_oldest()
+
+    def stats(self):
+        return {
+            "sessions": len(self._sessions),
+            "total_bytes": self.total_bytes,
+            "evictions": self.evictions,
+        }
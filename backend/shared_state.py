@@ -0,0 +1,52 @@
+"""
+Shared state backends for running server.py with several workers.
+
+GravityAgent keeps its caches and session history in process memory. When
+a shared backend is configured (REDIS_URL), entries are also written there
+so any worker can pick them up.
+"""
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+
+class RedisState:
+    """
+    String key/value store with per-key TTL on a Redis-compatible server.
+
+    Args:
+        url: redis:// connection URL.
+        prefix: Namespace prepended to every key.
+    """
+
+    def __init__(self, url, prefix="klistar:"):
+        if aioredis is None:
+            raise RuntimeError('Redis package is not installed (Run "pip install redis").')
+        self.url = url
+        self.prefix = prefix
+        self.redis = aioredis.Redis.from_url(url, decode_responses=True)
+
+    async def get(self, key):
+        return await self.redis.get(self.prefix + key)
+
+    async def set(self, key, value, ttl=None):
+        # Redis rejects EX 0, so round sub-second TTLs up
+        ex = max(1, int(ttl + 0.999)) if ttl else None
+        await self.redis.set(self.prefix + key, value, ex=ex)
+
+    async def delete(self, key):
+        await self.redis.delete(self.prefix + key)
+
+    async def close(self):
+        # redis-py 5 renamed close() to aclose()
+        close = getattr(self.redis, "aclose", None) or self.redis.close
+        await close()
+
+
+def create_state(url):
+    """Returns a shared state backend for url, or None when running single-process."""
+    if not url:
+        return None
+    return RedisState(url)
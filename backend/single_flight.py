@@ -0,0 +1,94 @@
+"""
+SingleFlight - Coalesces concurrent identical async calls.
+
+The first caller for a key does the work; callers arriving while it is in
+flight await the same result instead of starting their own call. If a
+leader gives up without a result (its consumer went away), followers get
+LeaderAbandoned and do() retries, so one of them leads instead.
+"""
+
+import asyncio
+
+
+class LeaderAbandoned(Exception):
+    """The leader for a key went away before producing a result."""
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}  # key -> Future
+        self.leaders = 0
+        self.coalesced = 0
+
+    def pending(self, key):
+        """Returns the in-flight future for key, or None."""
+        return self._flights.get(key)
+
+    async def do(self, key, fn):
+        """
+        Runs fn() once per key at a time and returns its result to every caller.
+        fn is a zero-argument coroutine function. The shared call runs as its
+        own task, so a caller being cancelled does not cancel it for the others.
+        """
+        while (flight := self._flights.get(key)) is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(flight)
+            except LeaderAbandoned:
+                continue  # Lead the call ourselves, or follow whoever already does
+
+        self.leaders += 1
+        task = asyncio.ensure_future(fn())
+        self._flights[key] = task
+        task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def claim(self, key):
+        """
+        Registers the caller as leader for key and returns the future others
+        will wait on. The leader must call resolve() or reject() when done.
+        """
+        self.leaders += 1
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = future
+        return future
+
+    def resolve(self, key, result):
+        future = self._flights.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(result)
+
+    def reject(self, key, error):
+        future = self._flights.pop(key, None)
+        if future is None or future.done():
+            return
+        future.set_exception(error)
+        # Followers may not exist; don't warn about an unretrieved exception
+        future.exception()
+
+    def abandon(self, key):
+        """The leader is giving up without a result; its followers retry."""
+        self.reject(key, LeaderAbandoned(key))
+
+    async def join(self, key):
+        """
+        Waits for the in-flight result for key (caller must check pending
+        first). Raises LeaderAbandoned if the leader gives up; check pending
+        again, and lead if nobody does.
+        """
+        self.coalesced += 1
+        return await asyncio.shield(self._flights[key])
+
+    def _finished(self, key, flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            # Mark the exception retrieved even if every caller went away
+            flight.exception()
+
+    def stats(self):
+        return {
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,134 @@
+"""
+Startup profiler - Reports where backend import time goes.
+
+Imports a module in a fresh interpreter under `python -X importtime` and
+summarises the slowest imports, so startup regressions show up in review.
+
+Usage:
+    python backend/startup_profile.py ada --top 15
+    python backend/startup_profile.py server --json > startup.json
+    python backend/startup_profile.py server --baseline startup.json --tolerance 0.25
+
+server.py and ada.py expose the same report via --profile-startup.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr):
+    """Parses -X importtime output into a list of import records (times in ms)."""
+    imports = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append({
+                "name": name,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                # importtime indents nested imports by two spaces per level
+                "depth": (len(indent) - 1) // 2,
+            })
+    return imports
+
+
+def profile_import(module, cwd=BACKEND_DIR):
+    """Imports module in a subprocess and returns its timing profile."""
+    env = dict(os.environ)
+    env.setdefault("GEMINI_API_KEY", "startup-profile")
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, env=env, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    imports = parse_importtime(proc.stderr)
+    top_level = [i for i in imports if i["depth"] == 0]
+    return {
+        "module": module,
+        "ok": proc.returncode == 0,
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+        "wall_ms": wall_ms,
+        "import_ms": sum(i["cumulative_ms"] for i in top_level),
+        "imports": imports,
+    }
+
+
+def packages(profile):
+    """Top-level packages pulled in by the import (e.g. cv2, mediapipe), slowest first."""
+    seen = {}
+    for entry in profile["imports"]:
+        name = entry["name"]
+        if "." in name or name == profile["module"]:
+            continue
+        seen[name] = max(seen.get(name, 0.0), entry["cumulative_ms"])
+    return sorted(seen.items(), key=lambda item: -item[1])
+
+
+def format_report(profile, top=15):
+    lines = [
+        f"Startup profile: import {profile['module']}",
+        f"  wall time   : {profile['wall_ms']:.0f} ms (interpreter start included)",
+        f"  import time : {profile['import_ms']:.0f} ms",
+    ]
+    if not profile["ok"]:
+        lines.append(f"  import FAILED: {profile['error']}")
+    lines.append("  slowest packages:")
+    for name, ms in packages(profile)[:top]:
+        lines.append(f"    {ms:8.1f} ms  {name}")
+    return "\n".join(lines)
+
+
+def compare(profile, baseline, tolerance=0.25, min_ms=20.0):
+    """
+    Returns regression messages: total import time, or any imported
+    package, slower than baseline by more than tolerance (fraction) and min_ms.
+    """
+    regressions = []
+
+    def check(label, now, before):
+        if now - before > max(before * tolerance, min_ms):
+            regressions.append(f"{label}: {before:.0f} ms -> {now:.0f} ms")
+
+    check("total import time", profile["import_ms"], baseline["import_ms"])
+    before = dict(packages(baseline))
+    for name, ms in packages(profile):
+        check(name, ms, before.get(name, 0.0))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time profile of a backend module")
+    parser.add_argument("module", nargs="?", default="server", help="Module to import (from backend/)")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--json", action="store_true", help="Print the raw profile as JSON")
+    parser.add_argument("--baseline", type=str, default=None, help="JSON profile to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs baseline (fraction)")
+    args = parser.parse_args(argv)
+
+    profile = profile_import(args.module)
+    if args.json:
+        print(json.dumps(profile, indent=2))
+    else:
+        print(format_report(profile, args.top))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(profile, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"  REGRESSION {message}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0 if profile["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+StubClient - A local stand-in for the google-genai client.
+
+Mirrors the small slice of the SDK that GravityAgent uses
+(`client.aio.models.generate_content` / `generate_content_stream` and
+`client.aio.caches.create`) so
+benchmarks and tests can exercise the full server path without network
+access or an API key.
+"""
+
+import asyncio
+import time
+
+
+class StubResponse:
+    """Minimal GenerateContentResponse look-alike."""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class _StubAsyncModels:
+    def __init__(self, owner):
+        self._owner = owner
+
+    async def generate_content(self, model, contents, config=None):
+        owner = self._owner
+        owner.calls += 1
+        owner.last_config = config
+        owner.in_flight += 1
+        owner.max_in_flight = max(owner.max_in_flight, owner.in_flight)
+        try:
+            await asyncio.sleep(owner.latency)
+            owner.burn_cpu()
+            return StubResponse(owner.reply_for(contents))
+        finally:
+            owner.in_flight -= 1
+
+    async def generate_content_stream(self, model, contents, config=None):
+        owner = self._owner
+        owner.calls += 1
+        owner.last_config = config
+        owner.burn_cpu()
+        text = owner.reply_for(contents)
+        pieces = owner.split_chunks(text)
+        delay = owner.latency / max(len(pieces), 1)
+
+        async def chunks():
+            owner.in_flight += 1
+            owner.max_in_flight = max(owner.max_in_flight, owner.in_flight)
+            try:
+                for piece in pieces:
+                    await asyncio.sleep(delay)
+                    yield StubResponse(piece)
+            finally:
+                owner.in_flight -= 1
+
+        return chunks()
+
+
+class _StubSyncModels:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def generate_content(self, model, contents, config=None):
+        owner = self._owner
+        owner.calls += 1
+        time.sleep(owner.latency)
+        owner.burn_cpu()
+        return StubResponse(owner.reply_for(contents))
+
+
+class StubCachedContent:
+    """Minimal CachedContent look-alike."""
+
+    def __init__(self, name):
+        self.name = name
+
+
+class _StubAsyncCaches:
+    def __init__(self, owner):
+        self._owner = owner
+
+    async def create(self, model, config=None):
+        owner = self._owner
+        owner.cached_contents.append(config)
+        return StubCachedContent(f"cachedContents/stub-{len(owner.cached_contents)}")
+
+
+class _StubAio:
+    def __init__(self, owner):
+        self.models = _StubAsyncModels(owner)
+        self.caches = _StubAsyncCaches(owner)
+
+
+class StubClient:
+    """
+    Fake Gemini client with a fixed latency.
+
+    Args:
+        latency: Seconds each model call takes.
+        reply: A string, or a callable taking the prompt and returning a string.
+        chunk_size: Characters per chunk when streaming.
+        cpu_time: Seconds of busy CPU work per call, holding the event loop
+            (emulates prompt building/parsing cost in benchmarks).
+    """
+
+    def __init__(self, latency=0.05, reply="Stub reply.", chunk_size=8, cpu_time=0.0):
+        self.latency = latency
+        self.cpu_time = cpu_time
+        self.reply = reply
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.last_config = None  # config passed with the latest call
+        self.cached_contents = []  # config of each caches.create()
+        self.aio = _StubAio(self)
+        self.models = _StubSyncModels(self)
+
+    def reply_for(self, contents):
+        if callable(self.reply):
+            return self.reply(contents)
+        return self.reply
+
+    def burn_cpu(self):
+        deadline = time.perf_counter() + self.cpu_time
+        while time.perf_counter() < deadline:
+            pass
+
+    def split_chunks(self, text):
+        size = max(self.chunk_size, 1)
+        return [text[i:i + size] for i in range(0, len(text), size)] or [""]
@@ -0,0 +1,224 @@
+"""
+Voice activity detection - Decides whether a mic chunk contains speech.
+
+listen_audio used to unpack every chunk into a Python tuple and sum the
+squares in a generator, continuously, on the event-loop thread. Chunks are
+now viewed as int16 arrays with numpy.frombuffer (no copy) and scored by a
+pluggable engine:
+
+    energy    RMS above a fixed threshold (the original behaviour)
+    spectral  voice-band (300-3400 Hz) energy above an adaptive noise floor,
+              so fans, hum and hiss don't count as speech
+    webrtc    the WebRTC VAD; needs the optional 'webrtcvad' package and
+              falls back to spectral without it
+
+SpeechGate smooths the per-chunk decisions: speech starts after `attack`
+consecutive speech chunks and ends only after `hangover` seconds without
+speech, so pauses between words don't end an utterance.
+
+Run backend/bench_vad.py to compare per-chunk CPU time.
+"""
+
+import logging
+import math
+import os
+
+import numpy as np
+
+try:
+    import webrtcvad
+    HAS_WEBRTCVAD = True
+except ImportError:
+    webrtcvad = None
+    HAS_WEBRTCVAD = False
+
+logger = logging.getLogger("klistar.vad")
+
+DEFAULT_THRESHOLD = 800  # RMS for 16-bit audio; conservative for most mics
+DEFAULT_HANGOVER = 0.5  # Seconds of non-speech before an utterance ends
+
+
+def samples_of(data):
+    """int16 view of little-endian 16-bit PCM bytes (a trailing odd byte is ignored)."""
+    return np.frombuffer(data, dtype="<i2", count=len(data) // 2)
+
+
+def rms(samples):
+    """Root mean square of int16 samples; 0 for an empty chunk."""
+    if not len(samples):
+        return 0.0
+    floats = samples.astype(np.float32)
+    return math.sqrt(float(np.dot(floats, floats)) / len(floats))
+
+
+class EnergyVAD:
+    """Speech when the chunk's RMS is above threshold."""
+
+    def __init__(self, sample_rate, threshold=DEFAULT_THRESHOLD):
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+
+    def is_speech(self, samples):
+        return rms(samples) > self.threshold
+
+
+class SpectralVAD:
+    """
+    Speech when enough of the chunk's energy is in the voice band and that
+    band is snr_db above the noise floor. The floor follows the band energy
+    of non-speech chunks, dropping at once and rising slowly, so steady
+    background noise is learned and ignored.
+
+    Args:
+        sample_rate: Samples per second of the PCM chunks.
+        snr_db: Voice-band energy needed above the noise floor.
+        min_rms: Chunks quieter than this are never speech.
+        band_ratio: Share of the chunk's energy that must lie in the voice band
+            (voiced speech keeps much of its energy in a fundamental below 300 Hz).
+        adapt: Per-chunk weight of new energy in the rising noise floor.
+    """
+
+    BAND = (300.0, 3400.0)
+
+    def __init__(self, sample_rate, snr_db=9.0, min_rms=150.0, band_ratio=0.25, adapt=0.05):
+        self.sample_rate = sample_rate
+        self.snr = 10 ** (snr_db / 10)
+        self.min_rms = min_rms
+        self.band_ratio = band_ratio
+        self.adapt = adapt
+        self.noise_floor = None
+        self._window = None  # Hann window, cached per chunk length
+
+    def _spectrum(self, samples):
+        if self._window is None or len(self._window) != len(samples):
+            self._window = np.hanning(len(samples)).astype(np.float32)
+        return np.abs(np.fft.rfft(samples.astype(np.float32) * self._window)) ** 2
+
+    def is_speech(self, samples):
+        if len(samples) < 2 or rms(samples) < self.min_rms:
+            return False
+        power = self._spectrum(samples)
+        freqs = np.fft.rfftfreq(len(samples), 1.0 / self.sample_rate)
+        in_band = (freqs >= self.BAND[0]) & (freqs <= self.BAND[1])
+        band = float(power[in_band].sum())
+        total = float(power.sum()) or 1.0
+        if self.noise_floor is None:
+            self.noise_floor = band
+        speech = band > self.noise_floor * self.snr and band / total >= self.band_ratio
+        if not speech:
+            if band < self.noise_floor:
+                self.noise_floor = band
+            else:
+                self.noise_floor += self.adapt * (band - self.noise_floor)
+        return speech
+
+
+class WebRTCVAD:
+    """
+    The WebRTC VAD, which takes 10/20/30 ms frames: chunks are cut into
+    20 ms frames (leftover samples carry over to the next chunk) and a chunk
+    counts as speech if any of its frames is. A chunk too short to complete
+    a frame repeats the previous decision.
+
+    Args:
+        aggressiveness: 0 (least) to 3 (most eager to call audio non-speech).
+    """
+
+    FRAME_MS = 20
+
+    def __init__(self, sample_rate, aggressiveness=2):
+        if not HAS_WEBRTCVAD:
+            raise ImportError("webrtcvad is not installed")
+        self.sample_rate = sample_rate
+        self.vad = webrtcvad.Vad(aggressiveness)
+        self.frame_samples = sample_rate * self.FRAME_MS // 1000
+        self._pending = np.empty(0, dtype="<i2")
+        self._last = False
+
+    def is_speech(self, samples):
+        n = self.frame_samples
+        if len(self._pending):
+            samples = np.concatenate((self._pending, samples))
+        whole = len(samples) // n * n
+        self._pending = samples[whole:].copy()
+        if whole:
+            self._last = any(
+                self.vad.is_speech(samples[start:start + n].tobytes(), self.sample_rate)
+                for start in range(0, whole, n)
+            )
+        return self._last
+
+
+ENGINES = {"energy": EnergyVAD, "spectral": SpectralVAD, "webrtc": WebRTCVAD}
+
+
+def make_vad(name, sample_rate, **options):
+    """Builds the named engine; 'webrtc' without webrtcvad installed falls back to 'spectral'."""
+    if name not in ENGINES:
+        raise ValueError(f"Unknown VAD engine: {name!r} (expected one of {', '.join(ENGINES)})")
+    if name == "webrtc" and not HAS_WEBRTCVAD:
+        logger.warning("webrtcvad not installed; using the spectral VAD")
+        return SpectralVAD(sample_rate)
+    return ENGINES[name](sample_rate, **options)
+
+
+class SpeechGate:
+    """
+    Turns per-chunk decisions into utterance start/end events.
+
+    Usage:
+        gate = SpeechGate.from_env(16000)
+        event = gate.update(chunk_bytes)  # "start", "end" or None
+
+    Args:
+        detector: Engine with is_speech(samples).
+        hangover: Seconds of non-speech that end an utterance.
+        attack: Consecutive speech chunks that start one.
+    """
+
+    def __init__(self, detector, hangover=DEFAULT_HANGOVER, attack=1):
+        self.detector = detector
+        self.hangover = hangover
+        self.attack = attack
+        self.speaking = False
+        self.level = 0.0  # RMS of the last chunk, for logging
+        self._run = 0  # Consecutive speech chunks while not speaking
+        self._silence = 0.0  # Seconds of non-speech while speaking
+
+    @classmethod
+    def from_env(cls, sample_rate):
+        """Gate configured by GRAVITY_VAD* settings."""
+        name = os.getenv("GRAVITY_VAD", "energy")
+        options = {}
+        if name == "energy":
+            options["threshold"] = float(os.getenv("GRAVITY_VAD_THRESHOLD", DEFAULT_THRESHOLD))
+        elif name == "webrtc":
+            options["aggressiveness"] = int(os.getenv("GRAVITY_VAD_AGGRESSIVENESS", 2))
+        return cls(
+            make_vad(name, sample_rate, **options),
+            hangover=float(os.getenv("GRAVITY_VAD_HANGOVER", DEFAULT_HANGOVER)),
+            attack=int(os.getenv("GRAVITY_VAD_ATTACK", 1)),
+        )
+
+    def update(self, data):
+        """Feeds one chunk of 16-bit PCM. Returns "start", "end" or None."""
+        samples = samples_of(data)
+        self.level = rms(samples)
+        if self.detector.is_speech(samples):
+            self._silence = 0.0
+            if self.speaking:
+                return None
+            self._run += 1
+            if self._run >= self.attack:
+                self.speaking = True
+                self._run = 0
+                return "start"
+            return None
+        self._run = 0
+        if self.speaking:
+            self._silence += len(samples) / self.detector.sample_rate
+            if self._silence > self.hangover:
+                self.speaking = False
+                self._silence = 0.0
+                return "end"
+        return None
@@ -1,12 +1,14 @@
+import logging
 import os
 import time
 import asyncio
-import base64
 from dotenv import load_dotenv
 from playwright.async_api import async_playwright
 from google import genai
 from google.genai import types
 
+logger = logging.getLogger("klistar.web_agent")
+
 # 1. Load API Key
 load_dotenv()
 API_KEY = os.getenv("GEMINI_API_KEY")
@@ -42,15 +44,15 @@ class WebAgent:
             call_id = getattr(call, 'id', None)
             fn_name = call.name
             args = call.args
-            print(f"[ACTION] Action: {fn_name} {args}")
+            logger.info("[ACTION] Action: %s %s", fn_name, args)
 
             # --- SAFETY CHECK ---
             requires_acknowledgement = False
             if "safety_decision" in args:
                  decision = args["safety_decision"]
                  if decision.get("decision") == "require_confirmation":
-                     print(f"   [SAFETY] Safety Alert: {decision.get('explanation')}")
-                     print("   -> Auto-acknowledging to proceed.")
+                     logger.info("[SAFETY] Safety Alert: %s", decision.get('explanation'))
+                     logger.info("-> Auto-acknowledging to proceed.")
                      requires_acknowledgement = True
 
             result_data = {}
@@ -136,13 +138,13 @@ class WebAgent:
                     await self.page.mouse.wheel(dx, dy)
 
                 else:
-                    print(f"[WARN] Warning: Model requested unimplemented function {fn_name}")
+                    logger.warning("Model requested unimplemented function %s", fn_name)
 
                 # Wait a moment for UI to settle
                 await asyncio.sleep(1)
                 
             except Exception as e:
-                print(f"[ERR] Error executing {fn_name}: {e}")
+                logger.error("Error executing %s: %s", fn_name, e)
                 result_data = {"error": str(e)}
 
             # Add the acknowledgement flag if needed
@@ -186,10 +188,10 @@ class WebAgent:
     async def run_task(self, prompt, update_callback=None):
         """
         Runs the agent with the given prompt.
-        update_callback: async function(screenshot_b64: str, logs: str)
+        update_callback: async function(screenshot_png: bytes, logs: str)
         Returns the final response from the agent.
         """
-        print(f"[START] WebAgent started. Goal: {prompt}")
+        logger.info("[START] WebAgent started. Goal: %s", prompt)
         final_response = "Agent finished without a final summary."
 
         async with async_playwright() as p:
@@ -219,8 +221,7 @@ class WebAgent:
             
             # Send initial state
             if update_callback:
-                encoded_image = base64.b64encode(initial_screenshot).decode('utf-8')
-                await update_callback(encoded_image, "Web Agent Initialized")
+                await update_callback(initial_screenshot, "Web Agent Initialized")
 
             chat_history = [
                 types.Content(
@@ -236,7 +237,7 @@ class WebAgent:
             MAX_TURNS = 20
             
             for turn in range(MAX_TURNS):
-                print(f"\n--- Turn {turn + 1} ---")
+                logger.info("--- Turn %s ---", turn + 1)
                 
                 try:
                     response = await self.client.aio.models.generate_content(
@@ -245,13 +246,13 @@ class WebAgent:
                         config=config
                     )
                 except Exception as e:
-                    print(f"[CRITICAL] Critical API Error: {e}")
+                    logger.critical("Critical API Error: %s", e)
                     if update_callback: await update_callback(None, f"Error: {e}")
                     break
                 
                 # Check for empty response
                 if not response.candidates:
-                    print("[WARN] Model returned no content.")
+                    logger.warning("Model returned no content.")
                     break
                 
                 candidate = response.candidates[0]
@@ -265,10 +266,10 @@ class WebAgent:
                 
                 for part in model_content.parts:
                     if part.thought:
-                        print(f"[THOUGHT] Thought: {part.text}")
+                        logger.info("[THOUGHT] Thought: %s", part.text)
                         thought_text += f"[Thoughts] {part.text}\n"
                     elif part.text:
-                        print(f"[AGENT] Agent: {part.text}")
+                        logger.info("[AGENT] Agent: %s", part.text)
                         thought_text += f"[Agent] {part.text}\n"
                         agent_text = part.text
                     if part.function_call:
@@ -285,33 +286,32 @@ class WebAgent:
                 
                 if not function_calls:
                     if not has_tool_use:
-                        print("[DONE] Task finished details.")
+                        logger.info("[DONE] Task finished details.")
                         if update_callback: await update_callback(None, "Task Finished")
                         break
                     else:
-                        print("...Thinking...")
+                        logger.info("...Thinking...")
                         continue
 
                 # Execute Actions
                 results = await self.execute_function_calls(function_calls)
                 
                 # Capture new state
-                print("[SNAP] Capturing new state...")
+                logger.info("[SNAP] Capturing new state...")
                 function_responses, screenshot_bytes = await self.get_function_responses(results)
                 
                 # Update frontend
                 if update_callback:
-                    encoded_image = base64.b64encode(screenshot_bytes).decode('utf-8')
                     # Format a log message from the actions taken
                     actions_log = ", ".join([r[1] for r in results])
-                    await update_callback(encoded_image, f"Executed: {actions_log}")
+                    await update_callback(screenshot_bytes, f"Executed: {actions_log}")
 
                 # Send Response Back
                 response_parts = [types.Part(function_response=fr) for fr in function_responses]
                 chat_history.append(types.Content(role="user", parts=response_parts))
 
             await self.browser.close()
-            print("[CLOSE] Browser closed.")
+            logger.info("[CLOSE] Browser closed.")
             return final_response
 
 if __name__ == "__main__":
@@ -15,6 +15,7 @@ import AuthLock from './components/AuthLock';
 import KasaWindow from './components/KasaWindow';
 import PrinterWindow from './components/PrinterWindow';
 import SettingsWindow from './components/SettingsWindow';
+import { MEDIA_CAPABILITIES, toImageSrc, releaseImageSrc, decodeMesh } from './mediaPayloads';
 
 
 
@@ -321,6 +322,8 @@ function App() {
             setStatus('Connected');
             setSocketConnected(true);
             socket.emit('get_settings');
+            // Ask for binary frames/meshes instead of base64
+            socket.emit('media_capabilities', MEDIA_CAPABILITIES);
         });
         socket.on('disconnect', () => {
             setStatus('Disconnected');
@@ -372,8 +375,9 @@ function App() {
             console.error("Socket Error:", data);
             addMessage('System', `Error: ${data.msg}`);
         });
-        socket.on('cad_data', (data) => {
-            console.log("Received CAD Data:", data);
+        socket.on('cad_data', async (payload) => {
+            const data = await decodeMesh(payload);
+            console.log("Received CAD Data:", data.format);
             setCadData(data);
             setCadThoughts(''); // Clear thoughts when generation complete
             setShowCadWindow(true); // Open window when data arrives
@@ -422,10 +426,13 @@ function App() {
             setCadThoughts(prev => prev + data.text);
         });
         socket.on('browser_frame', (data) => {
-            setBrowserData(prev => ({
-                image: data.image,
-                logs: [...prev.logs, data.log].filter(l => l).slice(-50) // Keep last 50 logs
-            }));
+            setBrowserData(prev => {
+                releaseImageSrc(prev.image);
+                return {
+                    image: toImageSrc(data.image, data.mime || 'image/png'),
+                    logs: [...prev.logs, data.log].filter(l => l).slice(-50) // Keep last 50 logs
+                };
+            });
             setShowBrowserWindow(true);
             // Auto-show browser window if hidden, clamped to viewport
             if (!elementPositions.browser) {
@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { Lock, Unlock, User } from 'lucide-react';
+import { toImageSrc, releaseImageSrc } from '../mediaPayloads';
 
 const AuthLock = ({ socket, onAuthenticated, onAnimationComplete }) => {
     const [frameSrc, setFrameSrc] = useState(null);
@@ -26,7 +27,10 @@ const AuthLock = ({ socket, onAuthenticated, onAnimationComplete }) => {
         };
 
         const handleAuthFrame = (data) => {
-            setFrameSrc(`data:image/jpeg;base64,${data.image}`);
+            setFrameSrc(prev => {
+                releaseImageSrc(prev);
+                return toImageSrc(data.image, 'image/jpeg');
+            });
         };
 
         socket.on('auth_status', handleAuthStatus);
@@ -28,7 +28,7 @@ const LoadingCube = () => {
 };
 
 const CadWindow = ({ data, thoughts, retryInfo = {}, onClose, socket }) => {
-    // data format: { format: "stl", data: "base64..." }
+    // data format: { format: "stl", data: "base64..." | ArrayBuffer }
     const [isIterating, setIsIterating] = useState(false);
     const [prompt, setPrompt] = useState("");
     const [isSending, setIsSending] = useState(false);
@@ -50,17 +50,20 @@ const CadWindow = ({ data, thoughts, retryInfo = {}, onClose, socket }) => {
         if (!data || data.format !== 'stl' || !data.data) return null;
 
         try {
-            // Convert Base64 to ArrayBuffer
-            const byteCharacters = atob(data.data);
-            const byteNumbers = new Array(byteCharacters.length);
-            for (let i = 0; i < byteCharacters.length; i++) {
-                byteNumbers[i] = byteCharacters.charCodeAt(i);
+            let buffer = data.data;
+            if (typeof buffer === 'string') {
+                // Legacy servers send Base64; convert to ArrayBuffer
+                const byteCharacters = atob(buffer);
+                const byteArray = new Uint8Array(byteCharacters.length);
+                for (let i = 0; i < byteCharacters.length; i++) {
+                    byteArray[i] = byteCharacters.charCodeAt(i);
+                }
+                buffer = byteArray.buffer;
             }
-            const byteArray = new Uint8Array(byteNumbers);
 
             // Parse directly using THREE.STLLoader
             const loader = new STLLoader();
-            const geom = loader.parse(byteArray.buffer);
+            const geom = loader.parse(buffer);
             geom.center(); // Optional: Center the geometry
             return geom;
         } catch (e) {
@@ -0,0 +1,36 @@
+// Binary media payloads (see backend/media_payloads.py).
+// After connecting, offer binary support; the server then sends frames and
+// screenshots as ArrayBuffers and STL meshes deflate-compressed. Servers or
+// clients without it keep using base64 strings.
+
+export const MEDIA_CAPABILITIES = {
+    binary: true,
+    compression: typeof DecompressionStream !== 'undefined' ? ['deflate'] : [],
+};
+
+// Image field (base64 string or ArrayBuffer) -> value usable as <img src>.
+// Blob URLs must be released with releaseImageSrc when replaced.
+export function toImageSrc(value, mime = 'image/jpeg') {
+    if (!value) return null;
+    if (typeof value === 'string') {
+        return value.startsWith('data:') ? value : `data:${mime};base64,${value}`;
+    }
+    return URL.createObjectURL(new Blob([value], { type: mime }));
+}
+
+export function releaseImageSrc(src) {
+    if (src && src.startsWith('blob:')) URL.revokeObjectURL(src);
+}
+
+// cad_data payload -> same payload with `data` as a base64 string or an
+// uncompressed ArrayBuffer.
+export async function decodeMesh(payload) {
+    if (!payload || typeof payload.data === 'string' || !payload.data) return payload;
+    let buffer = payload.data;
+    if (payload.encoding === 'deflate') {
+        const stream = new Blob([buffer]).stream().pipeThrough(new DecompressionStream('deflate'));
+        buffer = await new Response(stream).arrayBuffer();
+    }
+    const { encoding, ...rest } = payload;
+    return { ...rest, data: buffer };
+}
@@ -0,0 +1,109 @@
+"""
+Tests for admission control in front of model calls.
+"""
+import pytest
+import asyncio
+
+from admission import AdmissionController, Overloaded
+from gravity_agent import GravityAgent
+from response_cache import ResponseCache
+from stub_model import StubClient
+
+
+class TestAdmissionController:
+    """Test slot, queue and rejection accounting."""
+
+    @pytest.mark.asyncio
+    async def test_limits_concurrency(self):
+        """Test no more than max_concurrent callers run at once."""
+        admission = AdmissionController(max_concurrent=2, max_queue=10)
+        running, peak = 0, 0
+
+        async def work():
+            nonlocal running, peak
+            async with admission.slot():
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(work() for _ in range(8)))
+        assert peak == 2
+        assert admission.stats()["admitted"] == 8
+        assert admission.stats()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_queue_full(self):
+        """Test callers beyond slots + queue are turned away immediately."""
+        admission = AdmissionController(max_concurrent=1, max_queue=1)
+
+        async def work():
+            async with admission.slot():
+                await asyncio.sleep(0.05)
+
+        results = await asyncio.gather(*(work() for _ in range(4)), return_exceptions=True)
+        rejected = [r for r in results if isinstance(r, Overloaded)]
+        assert len(rejected) == 2
+        assert rejected[0].reason == "queue full"
+        stats = admission.stats()
+        assert stats["admitted"] == 2
+        assert stats["rejected"] == 2
+        assert stats["max_queue_depth"] == 1
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout(self):
+        """Test a queued caller gives up after queue_timeout."""
+        admission = AdmissionController(max_concurrent=1, max_queue=5, queue_timeout=0.02)
+        async with admission.slot():
+            with pytest.raises(Overloaded) as exc:
+                await admission.acquire()
+        assert exc.value.reason == "queue timeout"
+        assert exc.value.retry_after >= 1
+        assert admission.stats()["timed_out"] == 1
+        assert admission.stats()["queue_depth"] == 0
+
+    @pytest.mark.asyncio
+    async def test_wait_metrics(self):
+        """Test queued waits are recorded."""
+        admission = AdmissionController(max_concurrent=1, max_queue=5)
+
+        async def work():
+            async with admission.slot():
+                await asyncio.sleep(0.03)
+
+        await asyncio.gather(work(), work())
+        stats = admission.stats()
+        assert stats["wait_ms_max"] >= 20
+        assert stats["wait_ms_p99"] == stats["wait_ms_max"]
+
+
+class TestAgentAdmission:
+    """Test GravityAgent answers busy instead of queueing without bound."""
+
+    @pytest.mark.asyncio
+    async def test_busy_reply(self):
+        """Test overflow requests get a busy result."""
+        agent = GravityAgent(
+            client=StubClient(latency=0.05), cache=ResponseCache(max_entries=0),
+            max_concurrent_calls=1, max_queue=1,
+        )
+        results = await asyncio.gather(*(agent.process_input(f"q{i}") for i in range(4)))
+        types = sorted(r["type"] for r in results)
+        assert types == ["busy", "busy", "text", "text"]
+        assert agent.client.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_busy_stream(self):
+        """Test streaming callers get a busy result too."""
+        agent = GravityAgent(
+            client=StubClient(latency=0.05), cache=ResponseCache(max_entries=0),
+            max_concurrent_calls=1, max_queue=0,
+        )
+
+        async def collect(text):
+            return [e async for e in agent.stream_input(text)]
+
+        first, second = await asyncio.gather(collect("a"), collect("b"))
+        assert first[-1]["result"]["type"] == "text"
+        assert second == [{"type": "done", "result": second[-1]["result"]}]
+        assert second[-1]["result"]["type"] == "busy"
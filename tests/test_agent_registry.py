@@ -0,0 +1,166 @@
+"""
+Tests for lazy agent loading and the startup import profiler.
+"""
+import sys
+import types
+
+import pytest
+
+from agent_registry import AgentRegistry, LazyModule, load_class
+import startup_profile
+
+
+@pytest.fixture
+def fake_module(monkeypatch):
+    """Installs an importable module that counts constructions."""
+    module = types.ModuleType("fake_agent_mod")
+
+    class FakeAgent:
+        built = 0
+
+        def __init__(self, label="default"):
+            FakeAgent.built += 1
+            self.label = label
+
+    module.FakeAgent = FakeAgent
+    monkeypatch.setitem(sys.modules, "fake_agent_mod", module)
+    return module
+
+
+class TestAgentRegistry:
+    """Test agents are built on first use, once."""
+
+    def test_not_built_until_requested(self, fake_module):
+        """Test register() neither imports nor constructs the agent."""
+        agents = AgentRegistry()
+        agents.register("fake", "fake_agent_mod", "FakeAgent")
+        assert fake_module.FakeAgent.built == 0
+        assert not agents.loaded("fake")
+
+    def test_get_builds_once(self, fake_module):
+        """Test get() constructs on first call and caches the instance."""
+        agents = AgentRegistry()
+        agents.register("fake", "fake_agent_mod", "FakeAgent")
+        first = agents.get("fake")
+        assert agents.get("fake") is first
+        assert fake_module.FakeAgent.built == 1
+        assert agents.stats()["loaded"] == ["fake"]
+        assert "fake" in agents.stats()["load_ms"]
+
+    def test_factory_receives_class(self, fake_module):
+        """Test a factory controls construction arguments."""
+        agents = AgentRegistry()
+        agents.register("fake", "fake_agent_mod", "FakeAgent", factory=lambda cls: cls(label="cad"))
+        assert agents.get("fake").label == "cad"
+
+    def test_missing_module_soft_fails(self):
+        """Test an unimportable agent resolves to None instead of raising."""
+        agents = AgentRegistry()
+        agents.register("ghost", "no_such_agent_module", "Ghost")
+        assert agents.get("ghost") is None
+        assert agents.loaded("ghost")
+        assert agents.stats()["loaded"] == []
+
+    def test_constructor_error_soft_fails(self, fake_module):
+        """Test an agent whose constructor raises resolves to None."""
+        def broken(cls):
+            raise RuntimeError("no hardware")
+
+        agents = AgentRegistry()
+        agents.register("fake", "fake_agent_mod", "FakeAgent", factory=broken)
+        assert agents.get("fake") is None
+
+    def test_provide_skips_construction(self, fake_module):
+        """Test a provided instance is used as-is."""
+        shared = object()
+        agents = AgentRegistry()
+        agents.register("fake", "fake_agent_mod", "FakeAgent")
+        agents.provide("fake", shared)
+        assert agents.get("fake") is shared
+        assert fake_module.FakeAgent.built == 0
+
+    def test_unknown_agent(self):
+        """Test requesting an unregistered agent raises KeyError."""
+        with pytest.raises(KeyError):
+            AgentRegistry().get("nope")
+
+
+class TestLazyModule:
+    """Test deferred module imports."""
+
+    def test_imports_on_attribute_access(self, fake_module):
+        """Test the module is imported on first attribute access."""
+        lazy = LazyModule("fake_agent_mod")
+        assert "not loaded" in repr(lazy)
+        assert lazy.FakeAgent is fake_module.FakeAgent
+        assert "not loaded" not in repr(lazy)
+
+    def test_missing_module_raises_on_use(self):
+        """Test a missing module only errors when it is used."""
+        lazy = LazyModule("no_such_module_for_lazy")
+        with pytest.raises(ImportError):
+            lazy.anything
+
+    def test_load_class(self, fake_module):
+        """Test load_class returns the attribute, or None on failure."""
+        assert load_class("fake_agent_mod", "FakeAgent") is fake_module.FakeAgent
+        assert load_class("no_such_agent_module", "Ghost") is None
+
+
+SAMPLE_IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        300 |     numpy.core
+import time:      2000 |       2300 |   numpy
+import time:       500 |       2920 | ada
+"""
+
+
+def profile_from(text, module="ada"):
+    imports = startup_profile.parse_importtime(text)
+    top_level = [i for i in imports if i["depth"] == 0]
+    return {
+        "module": module,
+        "ok": True,
+        "error": None,
+        "wall_ms": 0.0,
+        "import_ms": sum(i["cumulative_ms"] for i in top_level),
+        "imports": imports,
+    }
+
+
+class TestStartupProfile:
+    """Test -X importtime parsing and baseline comparison."""
+
+    def test_parse_importtime(self):
+        """Test records are parsed with millisecond times and nesting depth."""
+        imports = startup_profile.parse_importtime(SAMPLE_IMPORTTIME)
+        assert [i["name"] for i in imports] == ["_io", "numpy.core", "numpy", "ada"]
+        numpy = imports[2]
+        assert numpy["self_ms"] == 2.0
+        assert numpy["cumulative_ms"] == 2.3
+        assert numpy["depth"] == 1
+        assert imports[1]["depth"] == 2
+        assert imports[3]["depth"] == 0
+
+    def test_packages_excludes_submodules_and_target(self):
+        """Test packages() lists top-level dependencies slowest first."""
+        names = [name for name, _ in startup_profile.packages(profile_from(SAMPLE_IMPORTTIME))]
+        assert names == ["numpy", "_io"]
+
+    def test_compare_flags_regression(self):
+        """Test a new heavy import is reported against the baseline."""
+        baseline = profile_from(SAMPLE_IMPORTTIME)
+        slower = profile_from(SAMPLE_IMPORTTIME.replace(
+            "import time:       500 |       2920 | ada",
+            "import time:    400000 |     400000 |   cv2\n"
+            "import time:       500 |     402920 | ada",
+        ))
+        regressions = startup_profile.compare(slower, baseline)
+        assert any(message.startswith("total import time") for message in regressions)
+        assert any(message.startswith("cv2") for message in regressions)
+
+    def test_compare_within_tolerance(self):
+        """Test small differences are not regressions."""
+        baseline = profile_from(SAMPLE_IMPORTTIME)
+        assert startup_profile.compare(baseline, baseline) == []
@@ -0,0 +1,131 @@
+"""
+Tests for the mic capture thread and its ring buffer.
+A fake stream stands in for PyAudio, so no audio device is required.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from audio_capture import PA_INPUT_OVERFLOWED, CaptureThread, FrameRing
+
+
+def frame(i, size=8):
+    return bytes([i % 256]) * size
+
+
+class FakeStream:
+    """PyAudio-like input stream returning numbered frames, or raising scripted errors."""
+
+    def __init__(self, size=8, script=(), delay=0.001):
+        self.size = size
+        self.script = list(script)  # Exceptions to raise, one per read, before normal frames
+        self.delay = delay
+        self.count = 0
+        self.overflow_flags = []
+
+    def read(self, n, exception_on_overflow=True):
+        self.overflow_flags.append(exception_on_overflow)
+        threading.Event().wait(self.delay)
+        if self.script:
+            raise self.script.pop(0)
+        self.count += 1
+        return frame(self.count, self.size)
+
+
+class TestFrameRing:
+    """Test the single-producer/single-consumer ring."""
+
+    def test_fifo(self):
+        """Test frames come out in the order they went in."""
+        ring = FrameRing(8, capacity=4)
+        for i in range(3):
+            ring.put(frame(i))
+        assert [ring.get_nowait() for _ in range(4)] == [frame(0), frame(1), frame(2), None]
+
+    def test_preallocated(self):
+        """Test writing frames reuses the buffer allocated up front."""
+        ring = FrameRing(8, capacity=4)
+        buffer = ring._buffer
+        for i in range(20):
+            ring.put(frame(i))
+            ring.get_nowait()
+        assert ring._buffer is buffer and len(buffer) == 32
+
+    def test_overflow_keeps_newest(self):
+        """Test a consumer that falls behind skips the oldest frames and counts them."""
+        ring = FrameRing(8, capacity=4)
+        for i in range(10):
+            ring.put(frame(i))
+        assert [ring.get_nowait() for _ in range(4)] == [frame(7), frame(8), frame(9), None]
+        assert ring.overflows == 7
+        assert ring.stats()["max_depth"] == 10
+
+    def test_short_frame_padded(self):
+        """Test a short read is zero-padded to the frame size."""
+        ring = FrameRing(8, capacity=4)
+        ring.put(b"\x01\x02")
+        assert ring.get_nowait() == b"\x01\x02" + bytes(6)
+
+    def test_discard(self):
+        """Test discard drops unread frames without counting overflows."""
+        ring = FrameRing(8, capacity=4)
+        ring.put(frame(1))
+        ring.put(frame(2))
+        ring.discard()
+        assert ring.get_nowait() is None
+        assert ring.stats()["discarded"] == 2
+        assert ring.overflows == 0
+
+    @pytest.mark.asyncio
+    async def test_wakeup_from_thread(self):
+        """Test a waiting consumer is woken by a frame written on another thread."""
+        ring = FrameRing(8, capacity=4)
+        ring.bind(asyncio.get_running_loop())
+        getter = asyncio.create_task(ring.get())
+        await asyncio.sleep(0.01)
+        threading.Thread(target=ring.put, args=(frame(5),)).start()
+        assert await asyncio.wait_for(getter, 1) == frame(5)
+
+
+class TestCaptureThread:
+    """Test the capture thread reading a stream into the ring."""
+
+    @pytest.mark.asyncio
+    async def test_frames_in_order(self):
+        """Test frames read on the thread reach the consumer in order."""
+        stream = FakeStream()
+        capture = CaptureThread(stream, frames_per_read=4, capacity=64)
+        capture.start(asyncio.get_running_loop())
+        try:
+            frames = [await asyncio.wait_for(capture.ring.get(), 1) for _ in range(10)]
+        finally:
+            await asyncio.to_thread(capture.stop)
+        assert frames == [frame(i) for i in range(1, 11)]
+        assert not capture.running
+
+    @pytest.mark.asyncio
+    async def test_device_overflow_counted(self):
+        """Test overflows reported by the device are counted instead of silently ignored."""
+        overflow = OSError(PA_INPUT_OVERFLOWED, "Input overflowed")
+        stream = FakeStream(script=[overflow, overflow])
+        capture = CaptureThread(stream, frames_per_read=4)
+        capture.start(asyncio.get_running_loop())
+        try:
+            assert await asyncio.wait_for(capture.ring.get(), 1) == frame(1)
+        finally:
+            await asyncio.to_thread(capture.stop)
+        assert capture.stats()["device_overflows"] == 2
+        assert all(stream.overflow_flags)
+
+    @pytest.mark.asyncio
+    async def test_read_error_retried(self):
+        """Test a failed read is logged and the thread keeps capturing."""
+        stream = FakeStream(script=[OSError(-9999, "Unanticipated host error")])
+        capture = CaptureThread(stream, frames_per_read=4)
+        capture.start(asyncio.get_running_loop())
+        try:
+            assert await asyncio.wait_for(capture.ring.get(), 1) == frame(1)
+        finally:
+            await asyncio.to_thread(capture.stop)
+        assert capture.stats()["read_errors"] == 1
@@ -0,0 +1,130 @@
+"""
+Tests for mic audio framing and RTT-driven frame sizing.
+Uses plain byte strings and a fake websocket, so no audio device or network is required.
+"""
+import asyncio
+
+import pytest
+
+from audio_framing import AudioFramer, measure_rtt
+
+RATE = 16000  # 32 bytes per ms of 16-bit mono
+
+
+class TestFraming:
+    """Test coalescing and splitting PCM into target-sized frames."""
+
+    def test_coalesces_small_chunks(self):
+        """Test 20 ms reads are joined into 60 ms frames."""
+        framer = AudioFramer(RATE, frame_ms=60, adapt=False)
+        assert framer.push(b"\x01" * 640) == []
+        assert framer.push(b"\x02" * 640) == []
+        frames = framer.push(b"\x03" * 640)
+        assert frames == [b"\x01" * 640 + b"\x02" * 640 + b"\x03" * 640]
+
+    def test_splits_large_chunks(self):
+        """Test a long read is cut into several frames, keeping the remainder."""
+        framer = AudioFramer(RATE, frame_ms=20, adapt=False)
+        frames = framer.push(bytes(range(256)) * 10)  # 2560 bytes = 80 ms
+        assert [len(frame) for frame in frames] == [640] * 4
+        assert b"".join(frames) == (bytes(range(256)) * 10)[:2560]
+        assert framer.flush() is None
+
+    def test_flush_partial(self):
+        """Test flush hands over a partial frame, e.g. at the end of speech."""
+        framer = AudioFramer(RATE, frame_ms=60, adapt=False)
+        framer.push(b"\x01" * 100)
+        assert framer.flush() == b"\x01" * 100
+        assert framer.flush() is None
+        assert framer.stats()["flushes"] == 1
+
+    def test_reset(self):
+        """Test reset drops a partial frame without sending it."""
+        framer = AudioFramer(RATE, frame_ms=60, adapt=False)
+        framer.push(b"\x01" * 100)
+        framer.reset()
+        assert framer.flush() is None
+        assert framer.frames == 0
+
+
+class TestAdaptation:
+    """Test the frame duration follows measured RTT."""
+
+    def test_follows_rtt(self):
+        """Test frames grow on a slow link and shrink on a fast one."""
+        framer = AudioFramer(RATE, frame_ms=60, rtt_ratio=0.5, smoothing=1.0)
+        framer.observe_rtt(0.3)
+        assert framer.frame_ms == 150
+        framer.observe_rtt(0.05)
+        assert framer.frame_ms == 20  # 25 ms rounds to 20
+
+    def test_bounds(self):
+        """Test adapted frames stay within min_ms and max_ms."""
+        framer = AudioFramer(RATE, min_ms=40, max_ms=100, smoothing=1.0)
+        framer.observe_rtt(2.0)
+        assert framer.frame_ms == 100
+        framer.observe_rtt(0.001)
+        assert framer.frame_ms == 40
+
+    def test_smoothing(self):
+        """Test one RTT spike only moves the average part of the way."""
+        framer = AudioFramer(RATE, smoothing=0.2)
+        framer.observe_rtt(0.1)
+        framer.observe_rtt(1.1)
+        assert framer.rtt == pytest.approx(0.3)
+
+    def test_fixed_when_not_adapting(self):
+        """Test RTT is still reported but the frame size stays put with adapt off."""
+        framer = AudioFramer(RATE, frame_ms=60, adapt=False)
+        framer.observe_rtt(0.5)
+        assert framer.frame_ms == 60
+        assert framer.stats()["rtt_ms"] == pytest.approx(500)
+
+
+class TestTradeoff:
+    """Test the latency/overhead table."""
+
+    def test_shorter_frames_cost_more_overhead(self):
+        """Test overhead falls and added latency rises with frame duration."""
+        rows = AudioFramer(RATE).tradeoff((20, 60, 200))
+        assert [row["added_latency_ms"] for row in rows] == [20, 60, 200]
+        assert [row["messages_per_second"] for row in rows] == [50, pytest.approx(16.67, abs=0.01), 5]
+        overheads = [row["overhead_pct"] for row in rows]
+        assert overheads == sorted(overheads, reverse=True)
+        assert rows[0]["wire_bytes_per_second"] > rows[-1]["wire_bytes_per_second"]
+
+
+class FakeWebsocket:
+    def __init__(self, delay):
+        self.delay = delay
+
+    async def ping(self):
+        loop = asyncio.get_running_loop()
+        pong = loop.create_future()
+        loop.call_later(self.delay, pong.set_result, None)
+        return pong
+
+
+class FakeSession:
+    def __init__(self, ws):
+        self._ws = ws
+
+
+class TestMeasureRtt:
+    """Test RTT probes over the session's websocket."""
+
+    @pytest.mark.asyncio
+    async def test_ping(self):
+        """Test the RTT is the time until the pong arrives."""
+        rtt = await measure_rtt(FakeSession(FakeWebsocket(0.02)))
+        assert 0.015 < rtt < 0.5
+
+    @pytest.mark.asyncio
+    async def test_timeout(self):
+        """Test a lost pong gives no sample rather than a huge one."""
+        assert await measure_rtt(FakeSession(FakeWebsocket(5)), timeout=0.01) is None
+
+    @pytest.mark.asyncio
+    async def test_no_websocket(self):
+        """Test sessions without a reachable websocket are skipped."""
+        assert await measure_rtt(object()) is None
@@ -0,0 +1,179 @@
+"""
+Tests for the playback thread and its jitter buffer.
+A fake stream stands in for PyAudio, so no audio device is required.
+"""
+import threading
+import time
+
+import pytest
+
+from audio_playback import AudioPlayback, JitterBuffer
+
+RATE = 1000  # 2000 bytes per second of 16-bit mono, so 1 ms = 2 bytes
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FakeStream:
+    """Output stream whose writes take real time, like a device draining its buffer."""
+
+    def __init__(self, seconds_per_byte=0.0):
+        self.seconds_per_byte = seconds_per_byte
+        self.written = []
+        self.lock = threading.Lock()
+
+    def write(self, data):
+        time.sleep(len(data) * self.seconds_per_byte)
+        with self.lock:
+            self.written.append(bytes(data))
+
+    @property
+    def data(self):
+        with self.lock:
+            return b"".join(self.written)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+class TestJitterBuffer:
+    """Test prebuffering, underruns, overruns and flushes."""
+
+    def test_prebuffers_to_target(self, clock):
+        """Test nothing plays until the target latency is buffered."""
+        buffer = JitterBuffer(RATE, target_latency=0.1, clock=clock)
+        buffer.put(b"\x01" * 100)
+        assert buffer.take(40, timeout=0) is None
+        buffer.put(b"\x02" * 100)
+        assert buffer.take(40, timeout=0) == b"\x01" * 40
+
+    def test_short_reply_plays_after_target_time(self, clock):
+        """Test audio shorter than the target still plays once it has waited that long."""
+        buffer = JitterBuffer(RATE, target_latency=0.1, clock=clock)
+        buffer.put(b"\x01" * 10)
+        assert buffer.take(40, timeout=0) is None
+        clock.advance(0.1)
+        assert buffer.take(40, timeout=0) == b"\x01" * 10
+
+    def test_periods_span_chunks(self, clock):
+        """Test periods are cut across chunk boundaries in order."""
+        buffer = JitterBuffer(RATE, target_latency=0, clock=clock)
+        buffer.put(b"ab")
+        buffer.put(b"cdef")
+        assert buffer.take(4, timeout=0) == b"abcd"
+        assert buffer.take(4, timeout=0) == b"ef"
+
+    def test_underrun_counted_once_audio_resumes(self, clock):
+        """Test running dry mid-reply is an underrun, and playback prebuffers again."""
+        buffer = JitterBuffer(RATE, target_latency=0.01, clock=clock)
+        buffer.put(b"\x01" * 20)
+        assert buffer.take(20, timeout=0)
+        assert buffer.take(20, timeout=0) is None
+        assert buffer.underruns == 0  # Could be the end of the reply
+        buffer.put(b"\x02" * 10)
+        assert buffer.underruns == 1
+        assert buffer.take(20, timeout=0) is None  # Prebuffering again
+
+    def test_flush_is_not_an_underrun(self, clock):
+        """Test audio after a barge-in flush doesn't count as an underrun."""
+        buffer = JitterBuffer(RATE, target_latency=0, clock=clock)
+        buffer.put(b"\x01" * 20)
+        buffer.take(20, timeout=0)
+        buffer.take(20, timeout=0)
+        buffer.flush()
+        buffer.put(b"\x02" * 20)
+        assert buffer.underruns == 0
+
+    def test_overrun_drops_oldest(self, clock):
+        """Test audio past max_latency drops the oldest bytes and counts them."""
+        buffer = JitterBuffer(RATE, target_latency=0, max_latency=0.05, clock=clock)
+        buffer.put(b"\x01" * 60)
+        buffer.put(b"\x02" * 60)
+        assert len(buffer) == 100
+        assert buffer.overrun_bytes == 20
+        assert buffer.take(100, timeout=0) == b"\x01" * 40 + b"\x02" * 60
+
+    def test_flush(self, clock):
+        """Test flush drops everything and reports how much."""
+        buffer = JitterBuffer(RATE, target_latency=0, clock=clock)
+        buffer.put(b"\x01" * 50)
+        assert buffer.flush() == 50
+        assert buffer.take(10, timeout=0) is None
+        assert buffer.stats()["flushes"] == 1
+
+
+class TestAudioPlayback:
+    """Test the output thread writing the buffer to a stream."""
+
+    def test_plays_everything_in_order(self):
+        """Test queued audio reaches the stream in order, in period-sized writes."""
+        stream = FakeStream()
+        playback = AudioPlayback(RATE, period=0.01, target_latency=0.0)
+        playback.start(stream)
+        try:
+            for i in range(5):
+                playback.put(bytes([i]) * 30)
+            deadline = time.monotonic() + 1
+            while len(stream.data) < 150 and time.monotonic() < deadline:
+                time.sleep(0.005)
+        finally:
+            playback.stop()
+        assert stream.data == b"".join(bytes([i]) * 30 for i in range(5))
+        assert max(len(block) for block in stream.written) == 20
+        assert not playback.running
+
+    def test_barge_in_latency(self):
+        """Test a flush stops playback within about one period and records the delay."""
+        stream = FakeStream(seconds_per_byte=0.0005)  # Real time: 20 ms per 40-byte period
+        playback = AudioPlayback(RATE, period=0.02, target_latency=0.0)
+        playback.start(stream)
+        try:
+            playback.put(b"\x01" * 2000)  # One second of audio
+            time.sleep(0.05)
+            playback.flush()
+            time.sleep(0.1)
+            played = len(stream.data)
+        finally:
+            playback.stop()
+        assert played < 400  # Far less than the second that was queued
+        stats = playback.stats()
+        assert stats["flushes"] == 1
+        assert 0 < stats["barge_in_ms_max"] <= 50
+
+    def test_write_error_survives(self):
+        """Test a failed write is logged and the thread keeps playing."""
+
+        class FlakyStream(FakeStream):
+            def __init__(self):
+                super().__init__()
+                self.fail = True
+
+            def write(self, data):
+                if self.fail:
+                    self.fail = False
+                    raise OSError("Output underflowed")
+                super().write(data)
+
+        stream = FlakyStream()
+        playback = AudioPlayback(RATE, period=0.01, target_latency=0.0)
+        playback.start(stream)
+        try:
+            playback.put(b"\x01" * 40)
+            deadline = time.monotonic() + 1
+            while not stream.written and time.monotonic() < deadline:
+                time.sleep(0.005)
+        finally:
+            playback.stop()
+        assert playback.stats()["write_errors"] == 1
+        assert stream.written
@@ -0,0 +1,277 @@
+"""
+Tests for mic uplink codecs, Ogg framing and per-session negotiation.
+Opus encoding itself needs the optional opuslib package and is skipped without it.
+"""
+import struct
+
+import numpy as np
+import pytest
+
+import audio_uplink
+from audio_uplink import (
+    HAS_OPUS,
+    MulawCodec,
+    OggWriter,
+    OpusCodec,
+    UplinkEncoder,
+    mulaw_decode,
+    mulaw_encode,
+    is_codec_error,
+    negotiate,
+    ogg_crc,
+)
+
+RATE = 16000
+
+
+@pytest.fixture(autouse=True)
+def no_rejections(monkeypatch):
+    """Each test starts with no codec rejected by an earlier session."""
+    monkeypatch.setattr(audio_uplink, "REJECTED", set())
+    monkeypatch.setattr(audio_uplink, "EARLY_DROPS", {})
+
+
+def speech(n=320, seed=0):
+    rng = np.random.default_rng(seed)
+    return (np.sin(np.arange(n) / 5) * 8000 + rng.normal(0, 300, n)).astype("<i2")
+
+
+def parse_pages(stream):
+    """(header_type, granule, sequence, packets) per Ogg page, checking each CRC."""
+    pages = []
+    while stream:
+        magic, _, header_type, granule, _, sequence, crc, count = struct.unpack("<4sBBqIIIB", stream[:27])
+        assert magic == b"OggS"
+        lacing = stream[27:27 + count]
+        size = 27 + count + sum(lacing)
+        page = bytearray(stream[:size])
+        page[22:26] = b"\0\0\0\0"
+        assert ogg_crc(page) == crc
+        packets, offset, current = [], 27 + count, 0
+        for lace in lacing:
+            current += lace
+            if lace < 255:
+                packets.append(stream[offset:offset + current])
+                offset += current
+                current = 0
+        pages.append((header_type, granule, sequence, packets))
+        stream = stream[size:]
+    return pages
+
+
+class TestMulaw:
+    """Test the numpy G.711 mu-law codec."""
+
+    def test_reference_values(self):
+        """Test encoding matches G.711 for silence and full scale."""
+        encoded = mulaw_encode(np.array([0, -1, 32767, -32768], dtype=np.int16))
+        assert encoded == bytes([0xFF, 0x7F, 0x80, 0x00])
+
+    def test_round_trip_error(self):
+        """Test decoded audio stays within mu-law's quantisation error."""
+        samples = speech(4000)
+        decoded = mulaw_decode(mulaw_encode(samples)).astype(np.int32)
+        error = np.abs(decoded - samples.astype(np.int32))
+        assert np.all(error <= np.abs(samples.astype(np.int32)) // 16 + 16)
+
+    def test_halves_bytes(self):
+        """Test mu-law sends one byte per sample."""
+        codec = MulawCodec(RATE)
+        assert len(codec.encode(speech().tobytes())) == 320
+        assert codec.mime_type == "audio/x-mulaw;rate=16000"
+
+
+class TestOggWriter:
+    """Test Ogg page framing."""
+
+    def test_crc_reference(self):
+        """Test the Ogg CRC (CRC-32/CKSUM without the final xor) on the standard check string."""
+        assert ogg_crc(b"123456789") ^ 0xFFFFFFFF == 0x765E7680
+
+    def test_pages(self):
+        """Test pages carry their packets, granule, sequence and a valid CRC."""
+        ogg = OggWriter()
+        stream = ogg.page([b"head"], 0, first=True) + ogg.page([b"a" * 300, b"b" * 10], 960)
+        pages = parse_pages(stream)
+        assert pages[0] == (0x02, 0, 0, [b"head"])
+        assert pages[1] == (0x00, 960, 1, [b"a" * 300, b"b" * 10])
+
+
+class TestNegotiation:
+    """Test codec choice per session."""
+
+    def test_defaults_to_pcm(self):
+        """Test an endpoint accepting only PCM gets PCM whatever is preferred."""
+        assert negotiate(["mulaw"], ["audio/pcm"], RATE).name == "pcm"
+
+    def test_accepted_codec(self):
+        """Test a preferred codec the endpoint accepts is chosen, ignoring MIME parameters."""
+        assert negotiate(["mulaw"], ["audio/x-mulaw", "audio/pcm"], RATE).name == "mulaw"
+
+    def test_missing_library_skipped(self, monkeypatch):
+        """Test a codec whose library isn't installed falls through to the next one."""
+        monkeypatch.setitem(audio_uplink.AVAILABLE, "opus", False)
+        codec = negotiate(["opus", "mulaw"], ["audio/ogg", "audio/x-mulaw"], RATE)
+        assert codec.name == "mulaw"
+
+    def test_rejected_not_offered(self):
+        """Test a codec the server dropped a session over isn't negotiated again."""
+        uplink = UplinkEncoder.negotiate(["mulaw"], ["audio/x-mulaw"], RATE)
+        uplink.reject()
+        assert uplink.codec.name == "pcm"
+        assert negotiate(["mulaw"], ["audio/x-mulaw"], RATE).name == "pcm"
+
+    def test_unknown_codec(self):
+        """Test a typo in the codec name fails loudly."""
+        with pytest.raises(ValueError):
+            negotiate(["aac"], ["audio/pcm"], RATE)
+
+
+class TestUplinkEncoder:
+    """Test messages and byte accounting."""
+
+    def test_pcm_message(self):
+        """Test PCM frames are sent unchanged as audio/pcm, as before."""
+        uplink = UplinkEncoder.negotiate(["pcm"], ["audio/pcm"], RATE)
+        frame = speech().tobytes()
+        assert uplink.message(frame) == {"data": frame, "mime_type": "audio/pcm"}
+        assert uplink.stats()["ratio"] == 1.0
+
+    def test_compressed_accounting(self):
+        """Test bytes sent and the PCM bytes they stand for are both counted."""
+        uplink = UplinkEncoder.negotiate(["mulaw"], ["audio/x-mulaw"], RATE)
+        for _ in range(3):
+            uplink.message(speech().tobytes())
+        stats = uplink.stats()
+        assert stats["pcm_bytes"] == 1920
+        assert stats["sent_bytes"] == 960
+        assert stats["ratio"] == 0.5
+
+    def test_encoder_failure_falls_back(self):
+        """Test a codec that throws switches the session to PCM without losing the frame."""
+
+        class BrokenCodec(MulawCodec):
+            def encode(self, pcm):
+                raise RuntimeError("encoder crashed")
+
+        uplink = UplinkEncoder(BrokenCodec(RATE))
+        frame = speech().tobytes()
+        assert uplink.message(frame) == {"data": frame, "mime_type": "audio/pcm"}
+        assert uplink.stats()["fallbacks"] == 1
+
+    def test_buffered_frame_sends_nothing(self):
+        """Test a frame the codec holds back yields no message until a packet is ready."""
+
+        class PacketCodec(MulawCodec):
+            def __init__(self, rate):
+                super().__init__(rate)
+                self.pending = b""
+
+            def encode(self, pcm):
+                self.pending += pcm
+                if len(self.pending) < 1280:
+                    return b""
+                data, self.pending = super().encode(self.pending), b""
+                return data
+
+        uplink = UplinkEncoder(PacketCodec(RATE))
+        assert uplink.message(speech().tobytes()) is None
+        assert uplink.message(speech().tobytes())["mime_type"].startswith("audio/x-mulaw")
+        stats = uplink.stats()
+        assert stats["messages"] == 1
+        assert stats["pcm_bytes"] == 1280
+        assert stats["sent_bytes"] == 640
+
+
+class ConnectionClosed(Exception):
+    """Shaped like websockets.ConnectionClosed: the close frame's code is on .rcvd."""
+
+    class Frame:
+        def __init__(self, code):
+            self.code = code
+
+    def __init__(self, code):
+        super().__init__(f"received {code}")
+        self.rcvd = self.Frame(code)
+
+
+class TestSessionFailure:
+    """Test which session failures take a codec out of negotiation."""
+
+    def test_generic_error_keeps_codec(self, monkeypatch):
+        """Test a connection error unrelated to the audio keeps the negotiated codec for the reconnect."""
+        uplink = UplinkEncoder.negotiate(["mulaw"], ["audio/x-mulaw"], RATE)
+        uplink.message(speech().tobytes())
+        monkeypatch.setattr(audio_uplink, "FIRST_MESSAGE_WINDOW", 0)
+        error = ExceptionGroup("unhandled errors in a TaskGroup", [ConnectionResetError("connection reset by peer")])
+        assert not uplink.session_failed(error)
+        assert uplink.codec.name == "mulaw"
+        assert audio_uplink.REJECTED == set()
+        assert negotiate(["mulaw"], ["audio/x-mulaw"], RATE).name == "mulaw"
+
+    def test_invalid_payload_close_rejects(self, monkeypatch):
+        """Test a 1007 close, even wrapped in a TaskGroup's ExceptionGroup, rejects the codec."""
+        uplink = UplinkEncoder.negotiate(["mulaw"], ["audio/x-mulaw"], RATE)
+        monkeypatch.setattr(audio_uplink, "FIRST_MESSAGE_WINDOW", 0)
+        assert uplink.session_failed(ExceptionGroup("unhandled errors in a TaskGroup", [ConnectionClosed(1007)]))
+        assert uplink.codec.name == "pcm"
+        assert audio_uplink.REJECTED == {"mulaw"}
+
+    def test_codec_errors(self):
+        """Test close codes and invalid-argument errors are recognised, other errors aren't."""
+        assert is_codec_error(ConnectionClosed(1003))
+        assert is_codec_error(RuntimeError("400 INVALID_ARGUMENT: unsupported mime type"))
+        assert not is_codec_error(ConnectionClosed(1011))
+        assert not is_codec_error(TimeoutError())
+
+    def test_single_early_drop_keeps_codec(self):
+        """Test one session dropped right after its first compressed message keeps the codec."""
+        uplink = UplinkEncoder.negotiate(["mulaw"], ["audio/x-mulaw"], RATE)
+        uplink.message(speech().tobytes())
+        assert not uplink.session_failed(ConnectionClosed(1011))
+        assert audio_uplink.REJECTED == set()
+        assert negotiate(["mulaw"], ["audio/x-mulaw"], RATE).name == "mulaw"
+
+    def test_repeated_early_drops_reject(self):
+        """Test sessions dropped right after their first compressed message, several times in a row, blame the codec."""
+        for _ in range(audio_uplink.EARLY_DROP_LIMIT - 1):
+            uplink = UplinkEncoder.negotiate(["mulaw"], ["audio/x-mulaw"], RATE)
+            uplink.message(speech().tobytes())
+            assert not uplink.session_failed(ConnectionClosed(1011))
+        uplink = UplinkEncoder.negotiate(["mulaw"], ["audio/x-mulaw"], RATE)
+        uplink.message(speech().tobytes())
+        assert uplink.session_failed(ConnectionClosed(1011))
+        assert audio_uplink.REJECTED == {"mulaw"}
+
+    def test_late_drop_resets_early_count(self, monkeypatch):
+        """Test a session that outlived the window clears earlier early drops."""
+        uplink = UplinkEncoder.negotiate(["mulaw"], ["audio/x-mulaw"], RATE)
+        uplink.message(speech().tobytes())
+        uplink.session_failed(ConnectionClosed(1011))
+        monkeypatch.setattr(audio_uplink, "FIRST_MESSAGE_WINDOW", 0)
+        uplink = UplinkEncoder.negotiate(["mulaw"], ["audio/x-mulaw"], RATE)
+        uplink.message(speech().tobytes())
+        assert not uplink.session_failed(ConnectionClosed(1011))
+        assert audio_uplink.EARLY_DROPS == {"mulaw": 0}
+
+    def test_pcm_never_rejected(self):
+        """Test a PCM session failing changes nothing."""
+        uplink = UplinkEncoder.negotiate(["pcm"], ["audio/pcm"], RATE)
+        assert not uplink.session_failed(ConnectionClosed(1007))
+        assert uplink.stats()["fallbacks"] == 0
+
+
+@pytest.mark.skipif(not HAS_OPUS, reason="opuslib not installed")
+class TestOpus:
+    """Test Opus in Ogg with the real encoder."""
+
+    def test_stream(self):
+        """Test the first message carries the headers and later ones 20 ms packets."""
+        codec = OpusCodec(RATE)
+        first = parse_pages(codec.encode(speech(960).tobytes()))
+        assert first[0][3][0].startswith(b"OpusHead")
+        assert first[1][3][0].startswith(b"OpusTags")
+        assert len(first[2][3]) == 3
+        assert first[2][1] == 3 * 960
+        later = codec.encode(speech(960).tobytes())
+        assert len(later) < 960 * 2 // 4
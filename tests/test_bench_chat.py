@@ -0,0 +1,29 @@
+"""
+Tests for the /chat load benchmark against the in-process stub model.
+"""
+import pytest
+
+from bench_chat import percentile, run_benchmark
+
+
+class TestPercentile:
+    """Test the nearest-rank percentile."""
+
+    def test_nearest_rank(self):
+        """Test p50 and p99 pick samples from the list."""
+        samples = list(range(1, 101))
+        assert percentile(samples, 50) == 50
+        assert percentile(samples, 99) == 99
+        assert percentile([], 50) == 0.0
+
+
+class TestRun:
+    """Test a short run against the stub-backed app."""
+
+    @pytest.mark.asyncio
+    async def test_every_request_reaches_the_model(self):
+        """Test requests aren't answered from the reply cache, so model calls match requests."""
+        report = await run_benchmark(clients=3, requests_per_client=2, latency=0.01, max_concurrent=4)
+        assert report["requests"] == 6
+        assert report["errors"] == report["busy"] == 0
+        assert report["model_calls"] == 6
@@ -0,0 +1,177 @@
+"""
+Tests for the Socket.IO load generator: report building, baseline
+comparison and a short run against a stub server.
+"""
+import asyncio
+import socket
+
+import pytest
+import socketio
+import uvicorn
+
+import bench_socketio
+from bench_socketio import LoadStats, build_report, compare, summarize
+from bench_workers import start_server, wait_until_up
+
+
+def report_with(throughput=30.0, response_p99=250.0, error_rate=0.0):
+    stats = LoadStats()
+    stats.connect = [0.01] * 10
+    stats.status = [0.002] * 10
+    stats.response = [0.2] * 10
+    stats.sent = 10
+    report = build_report(stats, {"clients": 10, "requests_per_client": 1, "rate": 1.0}, wall=1.0)
+    report["throughput_rps"] = throughput
+    report["time_to_response"]["p99_ms"] = response_p99
+    report["error_rate"] = error_rate
+    return report
+
+
+class TestReport:
+    """Test samples become a JSON-ready report."""
+
+    def test_summarize_in_milliseconds(self):
+        """Test percentiles and max are reported in milliseconds."""
+        summary = summarize([0.1, 0.2, 0.3, 0.4])
+        assert summary["count"] == 4
+        assert summary["p50_ms"] == pytest.approx(200.0)
+        assert summary["max_ms"] == pytest.approx(400.0)
+        assert summary["mean_ms"] == pytest.approx(250.0)
+
+    def test_summarize_empty(self):
+        """Test a metric with no samples reports zeros."""
+        assert summarize([])["p99_ms"] == 0.0
+
+    def test_error_rates(self):
+        """Test request errors are a fraction of sent requests, connect errors of clients."""
+        stats = LoadStats()
+        stats.connect = [0.01] * 3
+        stats.response = [0.2] * 6
+        stats.sent = 8
+        stats.errors.update(connect=1, timeout=2)
+        report = build_report(stats, {"clients": 4, "requests_per_client": 2, "rate": 2.0}, wall=2.0)
+        assert report["error_rate"] == pytest.approx(0.25)
+        assert report["connect_error_rate"] == pytest.approx(0.25)
+        assert report["throughput_rps"] == pytest.approx(3.0)
+        assert report["offered_rps"] == pytest.approx(8.0)
+
+    def test_closed_loop_has_no_offered_rate(self):
+        """Test rate 0 (send on reply) reports no offered rate."""
+        report = build_report(LoadStats(), {"clients": 1, "requests_per_client": 1, "rate": 0}, wall=1.0)
+        assert report["offered_rps"] is None
+
+
+class TestCompare:
+    """Test baseline comparison flags regressions only."""
+
+    def test_same_report_passes(self):
+        """Test a report matching its baseline has no regressions."""
+        assert compare(report_with(), report_with()) == []
+
+    def test_throughput_drop(self):
+        """Test throughput below baseline by more than the tolerance is flagged."""
+        regressions = compare(report_with(throughput=20.0), report_with(throughput=30.0))
+        assert len(regressions) == 1
+        assert regressions[0].startswith("throughput")
+
+    def test_small_latency_change_ignored(self):
+        """Test latency growth under both tolerance and min_ms passes."""
+        assert compare(report_with(response_p99=265.0), report_with(response_p99=250.0)) == []
+
+    def test_latency_regression(self):
+        """Test p99 growth beyond the tolerance is flagged."""
+        regressions = compare(report_with(response_p99=400.0), report_with(response_p99=250.0))
+        assert regressions == ["time_to_response p99: 250 ms -> 400 ms"]
+
+    def test_error_rate_increase(self):
+        """Test a higher error rate is flagged."""
+        regressions = compare(report_with(error_rate=0.05), report_with())
+        assert regressions == ["error_rate: 0.0% -> 5.0%"]
+
+    def test_improvement_passes(self):
+        """Test faster, error-free runs are never regressions."""
+        assert compare(report_with(throughput=60.0, response_p99=100.0), report_with(error_rate=0.1)) == []
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class TestLoadRun:
+    """Test a short load run against server.py with the stub model."""
+
+    @pytest.fixture
+    async def server_url(self):
+        port = free_port()
+        server = start_server(port, 1, 0.05, 0, None)
+        url = f"http://127.0.0.1:{port}"
+        try:
+            await wait_until_up(url)
+            yield url
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    async def test_every_request_answered(self, server_url):
+        """Test open-loop clients get a status and a reply for every message."""
+        report = await bench_socketio.run_load(server_url, clients=4, requests_per_client=3, rate=10.0, timeout=10)
+        assert report["clients_connected"] == 4
+        assert report["requests"] == 12
+        assert report["responses"] + report["busy"] == 12
+        assert report["error_rate"] == 0.0
+        assert report["time_to_status"]["count"] == 12
+        assert report["time_to_status"]["p50_ms"] <= report["time_to_response"]["p50_ms"]
+
+    async def test_closed_loop_stream(self, server_url):
+        """Test closed-loop clients complete streamed replies."""
+        report = await bench_socketio.run_load(
+            server_url, clients=2, requests_per_client=2, rate=0, timeout=10, stream=True
+        )
+        assert report["responses"] == 4
+        assert sum(report["errors"].values()) == 0
+
+    async def test_unreachable_server(self):
+        """Test a refused connection is a connect error, not a crash."""
+        report = await bench_socketio.run_load(
+            f"http://127.0.0.1:{free_port()}", clients=2, requests_per_client=1, rate=1.0, timeout=2
+        )
+        assert report["errors"]["connect"] == 2
+        assert report["connect_error_rate"] == 1.0
+        assert report["requests"] == 0
+
+
+class TestThrottled:
+    """Test a 'Throttled' status against an in-process server that throttles one message."""
+
+    @pytest.fixture
+    async def throttling_url(self):
+        sio = socketio.AsyncServer(async_mode="asgi")
+
+        @sio.event
+        async def user_input(sid, data):
+            if data["text"].endswith("request 1"):
+                await sio.emit("status", {"msg": "Throttled", "event": "user_input", "retry_after": 1}, room=sid)
+                return
+            await sio.emit("status", {"msg": "Thinking..."}, room=sid)
+            await sio.emit("response", {"type": "text", "content": "ok"}, room=sid)
+
+        server = uvicorn.Server(uvicorn.Config(socketio.ASGIApp(sio), host="127.0.0.1", port=free_port(), log_level="error"))
+        task = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+        try:
+            yield f"http://127.0.0.1:{server.config.port}"
+        finally:
+            server.should_exit = True
+            await task
+
+    async def test_throttled_not_timeout(self, throttling_url):
+        """Test the throttled message and those held back for retry_after count as throttled, and later replies still match."""
+        # One message every 0.4 s: #1 is throttled at 0.4 s, #2 and #3 fall inside its second, #4 is sent at 1.6 s
+        report = await bench_socketio.run_load(throttling_url, clients=1, requests_per_client=5, rate=2.5, timeout=5)
+        assert report["errors"]["throttled"] == 3
+        assert report["errors"]["timeout"] == 0
+        assert report["responses"] == 2
+        assert report["time_to_status"]["count"] == 2
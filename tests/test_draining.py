@@ -0,0 +1,55 @@
+"""
+Tests for in-flight request tracking used by graceful shutdown.
+"""
+import pytest
+import asyncio
+
+from draining import Drainer
+
+
+class TestDrainer:
+    """Test in-flight accounting and waiting."""
+
+    @pytest.mark.asyncio
+    async def test_wait_returns_when_idle(self):
+        """Test wait() returns once tracked work finishes."""
+        drainer = Drainer()
+
+        async def work():
+            with drainer.track():
+                await asyncio.sleep(0.05)
+
+        task = asyncio.ensure_future(work())
+        await asyncio.sleep(0)
+        assert drainer.in_flight == 1
+        drainer.begin()
+        assert await drainer.wait(1.0) is True
+        assert drainer.stats() == {"draining": True, "in_flight": 0, "completed": 1}
+        await task
+
+    @pytest.mark.asyncio
+    async def test_wait_times_out(self):
+        """Test wait() gives up at the deadline."""
+        drainer = Drainer()
+
+        async def work():
+            with drainer.track():
+                await asyncio.sleep(1.0)
+
+        task = asyncio.ensure_future(work())
+        await asyncio.sleep(0)
+        assert await drainer.wait(0.02) is False
+        task.cancel()
+
+    @pytest.mark.asyncio
+    async def test_idle_immediately(self):
+        """Test wait() on an idle drainer returns at once."""
+        assert await Drainer().wait(0.01) is True
+
+    def test_errors_still_counted_out(self):
+        """Test a failing request doesn't leave the count stuck."""
+        drainer = Drainer()
+        with pytest.raises(ValueError):
+            with drainer.track():
+                raise ValueError("boom")
+        assert drainer.in_flight == 0
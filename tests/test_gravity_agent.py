@@ -0,0 +1,242 @@
+"""
+Tests for the Gravity Agent (text brain behind server.py).
+Uses the local StubClient, so no API key or network is required.
+"""
+import pytest
+import asyncio
+import time
+
+import httpx
+
+from gravity_agent import GravityAgent
+from stub_model import StubClient
+
+
+class TestProcessInput:
+    """Test the async model path."""
+
+    @pytest.mark.asyncio
+    async def test_plain_text_reply(self):
+        """Test a plain text reply is passed through."""
+        agent = GravityAgent(client=StubClient(latency=0, reply="  Hello there.  "))
+        result = await agent.process_input("hi")
+        assert result == {"type": "text", "content": "Hello there."}
+
+    @pytest.mark.asyncio
+    async def test_owner_not_verified(self):
+        """Test unverified callers never reach the model."""
+        stub = StubClient(latency=0)
+        agent = GravityAgent(client=stub)
+        result = await agent.process_input("hi", owner_verified=False)
+        assert result["content"] == "Access Denied."
+        assert stub.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_youtube_action_dispatch(self, monkeypatch):
+        """Test JSON play_youtube replies are routed to handle_youtube."""
+        agent = GravityAgent(client=StubClient(latency=0, reply='{"action": "play_youtube", "query": "lofi"}'))
+        queries = []
+
+        async def fake_youtube(query):
+            queries.append(query)
+            return {"type": "play_youtube", "video_id": "abc", "title": "Lofi", "content": "Playing: Lofi"}
+
+        monkeypatch.setattr(agent, "handle_youtube", fake_youtube)
+        result = await agent.process_input("play lofi")
+        assert queries == ["lofi"]
+        assert result["type"] == "play_youtube"
+
+    @pytest.mark.asyncio
+    async def test_timeout(self):
+        """Test a slow model call is abandoned after request_timeout."""
+        agent = GravityAgent(client=StubClient(latency=1.0), request_timeout=0.05)
+        start = time.perf_counter()
+        result = await agent.process_input("hi")
+        assert time.perf_counter() - start < 0.5
+        assert result["type"] == "text"
+        assert "too long" in result["content"]
+
+
+class TestConcurrency:
+    """Test the event loop stays responsive under load."""
+
+    @pytest.mark.asyncio
+    async def test_calls_overlap(self):
+        """Test concurrent calls run in parallel instead of serially."""
+        agent = GravityAgent(client=StubClient(latency=0.1), max_concurrent_calls=10)
+        start = time.perf_counter()
+        await asyncio.gather(*(agent.process_input(f"q{i}") for i in range(10)))
+        # Serial execution would take ~1s
+        assert time.perf_counter() - start < 0.5
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self):
+        """Test no more than max_concurrent_calls reach the model at once."""
+        stub = StubClient(latency=0.02)
+        agent = GravityAgent(client=stub, max_concurrent_calls=3)
+        await asyncio.gather(*(agent.process_input(f"q{i}") for i in range(12)))
+        assert stub.calls == 12
+        assert stub.max_in_flight == 3
+
+
+class TestStreaming:
+    """Test stream_input chunking and action sniffing."""
+
+    async def collect(self, agent, text):
+        return [event async for event in agent.stream_input(text)]
+
+    @pytest.mark.asyncio
+    async def test_text_is_streamed(self):
+        """Test plain text arrives as several chunks plus a final result."""
+        reply = "Decorators wrap a function to extend it."
+        agent = GravityAgent(client=StubClient(latency=0, reply=reply, chunk_size=5))
+        events = await self.collect(agent, "explain decorators")
+
+        chunks = [e["content"] for e in events if e["type"] == "chunk"]
+        assert len(chunks) > 1
+        assert "".join(chunks) == reply
+        assert events[-1] == {"type": "done", "result": {"type": "text", "content": reply}}
+
+    @pytest.mark.asyncio
+    async def test_action_is_not_streamed(self, monkeypatch):
+        """Test a JSON action is buffered and dispatched, never shown as text."""
+        reply = '{"action": "play_youtube", "query": "telugu songs"}'
+        agent = GravityAgent(client=StubClient(latency=0, reply=reply, chunk_size=4))
+
+        async def fake_youtube(query):
+            return {"type": "play_youtube", "video_id": "xyz", "title": query, "content": f"Playing: {query}"}
+
+        monkeypatch.setattr(agent, "handle_youtube", fake_youtube)
+        events = await self.collect(agent, "play telugu songs")
+
+        assert [e["type"] for e in events] == ["done"]
+        assert events[0]["result"]["video_id"] == "xyz"
+
+    @pytest.mark.asyncio
+    async def test_fenced_action(self, monkeypatch):
+        """Test an action wrapped in a ```json fence is still detected."""
+        reply = '```json\n{"action": "web_search", "query": "python 3.13"}\n```'
+        agent = GravityAgent(client=StubClient(latency=0, reply=reply))
+        queries = []
+
+        async def fake_search(query):
+            queries.append(query)
+            return {"type": "text", "content": "results"}
+
+        monkeypatch.setattr(agent, "handle_search", fake_search)
+        events = await self.collect(agent, "search python 3.13")
+        assert queries == ["python 3.13"]
+        assert events[-1]["result"]["content"] == "results"
+
+    @pytest.mark.asyncio
+    async def test_stream_timeout(self):
+        """Test a stalled stream ends with a timeout result."""
+        agent = GravityAgent(client=StubClient(latency=2.0, chunk_size=100), request_timeout=0.05)
+        events = await self.collect(agent, "hi")
+        assert events[-1]["type"] == "done"
+        assert "too long" in events[-1]["result"]["content"]
+
+    @pytest.mark.asyncio
+    async def test_abandoned_stream_is_closed(self):
+        """Test a caller that stops reading early closes the model stream."""
+        stub = StubClient(latency=0, reply="One two three four five.", chunk_size=4)
+        agent = GravityAgent(client=stub)
+        deltas = agent.generate_stream("hi")
+        assert await deltas.__anext__() == "One "
+        assert stub.in_flight == 1
+        await deltas.aclose()
+        assert stub.in_flight == 0
+
+
+class TestBatch:
+    """Test process_batch parallelism and ordering."""
+
+    @pytest.mark.asyncio
+    async def test_completion_order(self):
+        """Test results arrive as they finish, tagged with their index."""
+        delays = {"slow": 0.1, "fast": 0.0}
+        stub = StubClient(latency=0, reply=lambda prompt: prompt.rsplit(": ", 1)[-1])
+        agent = GravityAgent(client=stub, router=False)
+        original = agent.process_input
+
+        async def delayed(text, owner_verified=True, session_id=None):
+            await asyncio.sleep(delays[text])
+            return await original(text, owner_verified, session_id)
+
+        agent.process_input = delayed
+        results = [item async for item in agent.process_batch([("slow", None), ("fast", None)], concurrency=2)]
+        assert [index for index, _ in results] == [1, 0]
+        assert results[0][1]["content"] == "fast"
+
+    @pytest.mark.asyncio
+    async def test_bounded_parallelism(self):
+        """Test no more than concurrency requests run at once."""
+        stub = StubClient(latency=0.02)
+        agent = GravityAgent(client=stub, router=False)
+        items = [(f"q{i}", None) for i in range(12)]
+        results = [item async for item in agent.process_batch(items, concurrency=3)]
+        assert sorted(index for index, _ in results) == list(range(12))
+        assert stub.max_in_flight == 3
+
+    @pytest.mark.asyncio
+    async def test_duplicates_share_cache(self):
+        """Test repeated messages in a batch cost one model call."""
+        stub = StubClient(latency=0.02)
+        agent = GravityAgent(client=stub, router=False)
+        results = [item async for item in agent.process_batch([("same", None)] * 5, concurrency=5)]
+        assert len(results) == 5
+        assert stub.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_close_cancels_remaining(self):
+        """Test closing the generator early stops the rest of the batch."""
+        stub = StubClient(latency=0.05)
+        agent = GravityAgent(client=stub, router=False)
+        batch = agent.process_batch([(f"q{i}", None) for i in range(10)], concurrency=2)
+        await batch.__anext__()
+        await batch.aclose()
+        await asyncio.sleep(0.1)
+        assert stub.calls < 10
+        assert stub.in_flight == 0
+
+
+class TestYouTubeLookup:
+    """Test the pooled HTTP client and query cache."""
+
+    @pytest.fixture
+    def agent(self, monkeypatch):
+        monkeypatch.setenv("YOUTUBE_API_KEY", "test-key")
+        return GravityAgent(client=StubClient(latency=0))
+
+    def mock_youtube(self, agent, requests):
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json={
+                "items": [{"id": {"videoId": "vid123"}, "snippet": {"title": "Lofi Beats"}}]
+            })
+        agent._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    def test_client_is_shared(self, agent):
+        """Test the same pooled client is returned every time."""
+        assert agent.http_client() is agent.http_client()
+
+    @pytest.mark.asyncio
+    async def test_repeat_query_cached(self, agent):
+        """Test a repeated song request makes one network call."""
+        requests = []
+        self.mock_youtube(agent, requests)
+
+        first = await agent.handle_youtube("Lofi Beats")
+        second = await agent.handle_youtube("lofi beats ")
+        assert first == second
+        assert first["video_id"] == "vid123"
+        assert len(requests) == 1
+        await agent.aclose()
+
+    @pytest.mark.asyncio
+    async def test_aclose(self, agent):
+        """Test aclose releases the pooled client."""
+        client = agent.http_client()
+        await agent.aclose()
+        assert client.is_closed
+        assert agent._http is None
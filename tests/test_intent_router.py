@@ -0,0 +1,147 @@
+"""
+Tests for the local intent router in front of the model.
+"""
+import json
+
+import pytest
+
+from gravity_agent import GravityAgent
+from intent_router import IntentRouter, PLAY_YOUTUBE, WEB_SEARCH
+from stub_model import StubClient
+
+
+class TestRules:
+    """Test which requests the rules answer locally."""
+
+    @pytest.mark.parametrize("text, query", [
+        ("play despacito", "despacito"),
+        ("Play Shape of You on YouTube!", "Shape of You"),
+        ("please play telugu songs", "telugu songs"),
+        ("can you put on the song bohemian rhapsody", "bohemian rhapsody"),
+        ("search youtube for lofi beats", "lofi beats"),
+    ])
+    def test_play_commands(self, text, query):
+        """Test play commands become play_youtube actions."""
+        assert IntentRouter().route(text) == {"action": PLAY_YOUTUBE, "query": query, "source": "rule"}
+
+    @pytest.mark.parametrize("text, query", [
+        ("search python 3.13", "python 3.13"),
+        ("search the web for asyncio tutorials", "asyncio tutorials"),
+        ("look up weather in hyderabad", "weather in hyderabad"),
+        ("google rust ownership", "rust ownership"),
+    ])
+    def test_search_commands(self, text, query):
+        """Test search commands become web_search actions."""
+        assert IntentRouter().route(text) == {"action": WEB_SEARCH, "query": query, "source": "rule"}
+
+    @pytest.mark.parametrize("text", [
+        "explain python decorators",
+        "how do I play guitar?",
+        "play chess with me",
+        "play it again",
+        "play that one more time",
+        "what should I search for?",
+        "search this:\nfor x in range(3): print(x)",
+        "",
+    ])
+    def test_falls_back_when_unsure(self, text):
+        """Test questions, games and follow-ups go to the model."""
+        assert IntentRouter().route(text) is None
+
+    def test_threshold(self):
+        """Test a rule below the threshold falls back."""
+        router = IntentRouter(threshold=0.995)
+        assert router.route("play despacito") is None
+
+    def test_stats(self):
+        """Test hit and miss counters."""
+        router = IntentRouter()
+        router.route("play despacito")
+        router.route("explain decorators")
+        stats = router.stats()
+        assert stats["hits"] == {"rule": 1, "model": 0}
+        assert stats["misses"] == 1
+        assert stats["hit_ratio"] == 0.5
+
+
+class TestLocalModel:
+    """Test the optional local classifier."""
+
+    def test_model_used_when_no_rule_matches(self):
+        """Test the model's confident guess is routed."""
+        router = IntentRouter(model=lambda text: (PLAY_YOUTUBE, "lofi", 0.95))
+        assert router.route("I'd love some lofi") == {"action": PLAY_YOUTUBE, "query": "lofi", "source": "model"}
+        assert router.stats()["hits"]["model"] == 1
+
+    def test_unsure_model_falls_back(self):
+        """Test a low-confidence or empty model guess falls back."""
+        assert IntentRouter(model=lambda text: (PLAY_YOUTUBE, "lofi", 0.5)).route("hmm") is None
+        assert IntentRouter(model=lambda text: None).route("hmm") is None
+
+    def test_unknown_action_ignored(self):
+        """Test the model cannot invent actions the agent doesn't handle."""
+        router = IntentRouter(model=lambda text: ("shutdown", "now", 1.0))
+        assert router.route("turn off") is None
+
+
+class TestAgentRouting:
+    """Test GravityAgent answers routed commands without a model call."""
+
+    @pytest.mark.asyncio
+    async def test_play_skips_model(self, monkeypatch):
+        """Test a play command reaches handle_youtube without calling the model."""
+        stub = StubClient(latency=0)
+        agent = GravityAgent(client=stub)
+        queries = []
+
+        async def fake_youtube(query):
+            queries.append(query)
+            return {"type": "play_youtube", "video_id": "abc", "title": query, "content": f"Playing: {query}"}
+
+        monkeypatch.setattr(agent, "handle_youtube", fake_youtube)
+        result = await agent.process_input("play despacito", session_id="s1")
+        assert result["video_id"] == "abc"
+        assert queries == ["despacito"]
+        assert stub.calls == 0
+        # The turn is recorded as the action the model would have returned
+        assert json.loads(agent.sessions.history("s1")[-1][1]) == {"action": PLAY_YOUTUBE, "query": "despacito"}
+
+    @pytest.mark.asyncio
+    async def test_stream_skips_model(self, monkeypatch):
+        """Test stream_input also short-circuits routed commands."""
+        stub = StubClient(latency=0)
+        agent = GravityAgent(client=stub)
+
+        async def fake_search(query):
+            return {"type": "text", "content": f"results for {query}"}
+
+        monkeypatch.setattr(agent, "handle_search", fake_search)
+        events = [event async for event in agent.stream_input("search asyncio")]
+        assert events == [{"type": "done", "result": {"type": "text", "content": "results for asyncio"}}]
+        assert stub.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_other_requests_use_model(self):
+        """Test unrouted requests still go to the model."""
+        stub = StubClient(latency=0, reply="Sure.")
+        agent = GravityAgent(client=stub)
+        result = await agent.process_input("explain decorators")
+        assert result == {"type": "text", "content": "Sure."}
+        assert stub.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_router_disabled(self):
+        """Test router=False always asks the model."""
+        stub = StubClient(latency=0, reply="ok")
+        agent = GravityAgent(client=stub, router=False)
+        await agent.process_input("play despacito")
+        assert agent.router is None
+        assert stub.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_owner_check_comes_first(self):
+        """Test unverified callers are refused before routing."""
+        agent = GravityAgent(client=StubClient(latency=0))
+        result = await agent.process_input("play despacito", owner_verified=False)
+        assert result["content"] == "Access Denied."
+        assert agent.router.stats()["hits"]["rule"] == 0
@@ -0,0 +1,85 @@
+"""
+Tests for the queue-based logging setup.
+"""
+import io
+import json
+import sys
+import logging
+
+import pytest
+
+import logging_setup
+from logging_setup import JsonFormatter, parse_levels, setup_logging, shutdown_logging
+
+
+@pytest.fixture
+def log_stream():
+    """Route klistar logging to a StringIO for the test, then restore the previous setup."""
+    was_active = logging_setup._listener is not None
+    shutdown_logging()
+    stream = io.StringIO()
+    yield stream
+    shutdown_logging()
+    for name in ("klistar", "klistar.noisy"):
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    if was_active:
+        setup_logging()
+
+
+class TestLoggingSetup:
+    """Test levels, formats and the background writer."""
+
+    def test_parse_levels(self):
+        """Test per-module level overrides are parsed."""
+        assert parse_levels("ada=debug, printer_agent=WARNING") == {"ada": "DEBUG", "printer_agent": "WARNING"}
+        assert parse_levels("") == {}
+
+    def test_records_written_by_listener(self, log_stream):
+        """Test records reach the stream once the queue is flushed."""
+        setup_logging(level="INFO", stream=log_stream)
+        logging.getLogger("klistar.test").info("hello %s", "world")
+        shutdown_logging()
+        assert "hello world" in log_stream.getvalue()
+        assert "[klistar.test]" in log_stream.getvalue()
+
+    def test_module_levels(self, log_stream):
+        """Test a module override beats the default level."""
+        setup_logging(level="INFO", levels={"noisy": "ERROR"}, stream=log_stream)
+        logging.getLogger("klistar.noisy").warning("suppressed")
+        logging.getLogger("klistar.other").warning("kept")
+        shutdown_logging()
+        assert "suppressed" not in log_stream.getvalue()
+        assert "kept" in log_stream.getvalue()
+
+    def test_disabled_debug_is_not_formatted(self, log_stream):
+        """Test arguments of disabled debug calls are never formatted."""
+        setup_logging(level="INFO", stream=log_stream)
+
+        class Exploding:
+            def __str__(self):
+                raise AssertionError("formatted")
+
+        logging.getLogger("klistar.test").debug("value %s", Exploding())
+        shutdown_logging()
+        assert log_stream.getvalue() == ""
+
+    def test_json_format(self, log_stream):
+        """Test JSON lines carry level, logger, message and extra fields."""
+        setup_logging(level="DEBUG", fmt="json", stream=log_stream)
+        logging.getLogger("klistar.test").debug("tool %s", "write_file", extra={"sid": "abc"})
+        shutdown_logging()
+        entry = json.loads(log_stream.getvalue().strip())
+        assert entry["level"] == "DEBUG"
+        assert entry["logger"] == "klistar.test"
+        assert entry["msg"] == "tool write_file"
+        assert entry["sid"] == "abc"
+
+    def test_json_formatter_exception(self):
+        """Test exceptions are included in JSON output."""
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = logging.getLogger("klistar.test").makeRecord(
+                "klistar.test", logging.ERROR, __file__, 1, "failed", (), sys.exc_info()
+            )
+        assert "ValueError: boom" in json.loads(JsonFormatter().format(record))["exc"]
@@ -0,0 +1,171 @@
+"""
+Tests for binary media payloads and per-client negotiation.
+"""
+import base64
+import os
+
+import pytest
+
+import media_payloads
+from media_payloads import (
+    LEGACY,
+    MEDIA_EVENTS,
+    MediaCapabilities,
+    MediaChannel,
+    decode_upload,
+    decompress,
+    encode_payload,
+    legacy_payload,
+    negotiate,
+)
+
+# A small "mesh": STL is repetitive enough to compress well
+STL = b"solid t\n" + b"facet normal 0 0 1\n outer loop\n  vertex 0 0 0\n endloop\nendfacet\n" * 200
+JPEG = os.urandom(2048)
+
+
+class TestNegotiate:
+    """Test capability offers."""
+
+    def test_no_offer_is_legacy(self):
+        """Test missing or malformed offers fall back to base64."""
+        assert negotiate(None) == LEGACY
+        assert negotiate("binary") == LEGACY
+        assert negotiate({"binary": False}) == LEGACY
+
+    def test_binary_with_deflate(self):
+        """Test a deflate-capable client gets deflate."""
+        caps = negotiate({"binary": True, "compression": ["deflate"]})
+        assert caps == MediaCapabilities(binary=True, codec="deflate")
+
+    def test_zstd_needs_package(self, monkeypatch):
+        """Test zstd is only chosen when zstandard is installed."""
+        monkeypatch.setattr(media_payloads, "HAS_ZSTD", False)
+        assert negotiate({"binary": True, "compression": ["zstd", "deflate"]}).codec == "deflate"
+        assert negotiate({"binary": True, "compression": ["zstd"]}).codec is None
+
+
+class TestEncodePayload:
+    """Test payload shaping per client."""
+
+    def test_legacy_gets_base64(self):
+        """Test old clients receive the same base64 strings as before."""
+        payload = encode_payload("cad_data", {"format": "stl", "data": STL}, LEGACY)
+        assert payload == {"format": "stl", "data": base64.b64encode(STL).decode("ascii")}
+
+    def test_binary_frame_is_raw(self):
+        """Test frames go out as raw bytes, uncompressed."""
+        payload = encode_payload("browser_frame", {"image": JPEG, "log": "x"}, MediaCapabilities(True, "deflate"))
+        assert payload["image"] == JPEG
+        assert "encoding" not in payload
+
+    def test_binary_mesh_is_compressed(self):
+        """Test meshes are compressed, marked, and round-trip."""
+        payload = encode_payload("cad_data", {"format": "stl", "data": STL}, MediaCapabilities(True, "deflate"))
+        assert payload["encoding"] == "deflate"
+        assert len(payload["data"]) < len(STL) / 4
+        assert decompress(payload["data"], "deflate") == STL
+
+    def test_binary_mesh_without_codec(self):
+        """Test a binary client without a codec gets raw mesh bytes."""
+        payload = encode_payload("cad_data", {"format": "stl", "data": STL}, MediaCapabilities(True, None))
+        assert payload["data"] == STL
+
+    def test_non_bytes_passthrough(self):
+        """Test payloads that are already strings, or other events, are untouched."""
+        legacy = {"format": "stl", "data": "c29saWQ="}
+        assert encode_payload("cad_data", legacy, MediaCapabilities(True, "deflate")) is legacy
+        other = {"text": "hi"}
+        assert encode_payload("status", other, LEGACY) is other
+
+    def test_does_not_mutate_input(self):
+        """Test the caller's payload can be reused for other clients."""
+        original = {"image": JPEG}
+        encode_payload("video_frame", original, LEGACY)
+        assert original["image"] == JPEG
+
+
+class TestLegacyPayload:
+    """Test the base64 form producers hand their callbacks unless the relay sends binary."""
+
+    def test_matches_what_legacy_clients_get(self):
+        """Test a producer's default payload is exactly what an un-negotiated client receives."""
+        for event, payload in (("cad_data", {"format": "stl", "data": STL}), ("browser_frame", {"image": JPEG, "log": "x"})):
+            assert legacy_payload(event, payload) == encode_payload(event, payload, LEGACY)
+            assert isinstance(legacy_payload(event, payload)[MEDIA_EVENTS[event][0]], str)
+
+    @pytest.mark.asyncio
+    async def test_base64_passes_through_channel(self):
+        """Test base64 payloads from producers reach every client unchanged, negotiated or not."""
+        sio = FakeSio()
+        media = MediaChannel(sio)
+        media.negotiate("bin", {"binary": True, "compression": ["deflate"]})
+        payload = legacy_payload("cad_data", {"format": "stl", "data": STL})
+        await media.emit("cad_data", payload, room="old")
+        await media.emit("cad_data", payload, room="bin")
+        assert [emitted[1] for emitted in sio.emitted] == [payload, payload]
+
+
+class TestDecodeUpload:
+    """Test client upload decoding."""
+
+    def test_bytes_and_base64(self):
+        """Test binary, base64 and data URL uploads decode to the same bytes."""
+        encoded = base64.b64encode(JPEG).decode()
+        assert decode_upload(JPEG) == JPEG
+        assert decode_upload(encoded) == JPEG
+        assert decode_upload("data:image/jpeg;base64," + encoded) == JPEG
+
+    def test_rejects_other_types(self):
+        """Test unexpected types raise TypeError."""
+        with pytest.raises(TypeError):
+            decode_upload(42)
+
+
+class FakeSio:
+    def __init__(self):
+        self.emitted = []
+
+    async def emit(self, event, data=None, room=None, skip_sid=None):
+        self.emitted.append((event, data, room, skip_sid))
+
+
+class TestMediaChannel:
+    """Test per-client emits."""
+
+    @pytest.mark.asyncio
+    async def test_emit_to_client_uses_its_capabilities(self):
+        """Test a targeted emit is encoded for that client."""
+        sio = FakeSio()
+        media = MediaChannel(sio)
+        assert media.negotiate("bin", {"binary": True, "compression": ["deflate"]}) == {"binary": True, "compression": "deflate"}
+
+        await media.emit("video_frame", {"image": JPEG}, room="bin")
+        await media.emit("video_frame", {"image": JPEG}, room="old")
+        assert sio.emitted[0][1]["image"] == JPEG
+        assert sio.emitted[1][1]["image"] == base64.b64encode(JPEG).decode()
+
+    @pytest.mark.asyncio
+    async def test_broadcast_encodes_once_per_profile(self):
+        """Test a broadcast sends base64 to legacy clients and binary to the rest."""
+        sio = FakeSio()
+        media = MediaChannel(sio)
+        media.negotiate("a", {"binary": True, "compression": ["deflate"]})
+        media.negotiate("b", {"binary": True, "compression": ["deflate"]})
+
+        await media.emit("cad_data", {"format": "stl", "data": STL})
+        assert len(sio.emitted) == 2
+        legacy, binary = sio.emitted
+        assert isinstance(legacy[1]["data"], str)
+        assert sorted(legacy[3]) == ["a", "b"]
+        assert binary[1]["encoding"] == "deflate"
+        assert sorted(binary[2]) == ["a", "b"]
+
+    def test_forget(self):
+        """Test disconnecting clients are dropped and renegotiation can opt out."""
+        media = MediaChannel(FakeSio())
+        media.negotiate("a", {"binary": True})
+        media.negotiate("b", {"binary": True})
+        media.forget("a")
+        media.negotiate("b", {"binary": False})
+        assert media.clients == {}
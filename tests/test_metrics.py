@@ -0,0 +1,82 @@
+"""
+Tests for the Prometheus metrics layer.
+"""
+import pytest
+
+from metrics import Registry, RateMeter
+from gravity_agent import GravityAgent, PROCESS_SECONDS, MODEL_SECONDS
+from stub_model import StubClient
+
+
+class TestInstruments:
+    """Test counters, gauges and histograms render correctly."""
+
+    def test_counter(self):
+        """Test counters render with a _total suffix and labels."""
+        registry = Registry()
+        events = registry.counter("events", "Events.", labelnames=("event",))
+        events.labels("connect").inc()
+        events.labels(event="connect").inc(2)
+        text = registry.render()
+        assert "# TYPE events counter" in text
+        assert 'events_total{event="connect"} 3' in text
+
+    def test_gauge_function(self):
+        """Test a function-backed gauge is read at render time."""
+        registry = Registry()
+        value = {"n": 1}
+        registry.gauge("depth", "Depth.").set_function(lambda: value["n"])
+        value["n"] = 7
+        assert "depth 7" in registry.render()
+
+    def test_histogram_buckets(self):
+        """Test buckets are cumulative and include +Inf, sum and count."""
+        registry = Registry()
+        latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 5.0):
+            latency.observe(value)
+        text = registry.render()
+        assert 'latency_seconds_bucket{le="0.1"} 2' in text
+        assert 'latency_seconds_bucket{le="1.0"} 3' in text
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in text
+        assert "latency_seconds_count 4" in text
+        assert "latency_seconds_sum 5.65" in text
+
+    def test_label_escaping(self):
+        """Test quotes in label values are escaped."""
+        registry = Registry()
+        registry.counter("c", "C.", labelnames=("q",)).labels('say "hi"').inc()
+        assert 'c_total{q="say \\"hi\\""} 1' in registry.render()
+
+    def test_same_name_returns_same_metric(self):
+        """Test re-registering a name returns the existing metric."""
+        registry = Registry()
+        assert registry.counter("c", "C.") is registry.counter("c", "C.")
+        with pytest.raises(ValueError):
+            registry.gauge("c", "C.")
+
+
+class TestRateMeter:
+    """Test the sliding-window events/second meter."""
+
+    def test_rate_over_window(self):
+        """Test events inside the window are averaged and old ones expire."""
+        meter = RateMeter(window=10)
+        for second in range(10):
+            meter.mark(5, now=100 + second)
+        assert meter.rate(now=109) == 5.0
+        assert meter.rate(now=125) == 0.0
+
+
+class TestAgentInstrumentation:
+    """Test GravityAgent records latency histograms."""
+
+    @pytest.mark.asyncio
+    async def test_process_and_model_latency(self):
+        """Test a request observes process_input and model call latency."""
+        before_process = PROCESS_SECONDS.labels("text").count
+        before_model = MODEL_SECONDS.labels("generate").count
+        agent = GravityAgent(client=StubClient(latency=0))
+        await agent.process_input("unique metrics question")
+        assert PROCESS_SECONDS.labels("text").count == before_process + 1
+        assert MODEL_SECONDS.labels("generate").count == before_model + 1
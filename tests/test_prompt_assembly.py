@@ -0,0 +1,178 @@
+"""
+Tests for system prompt assembly and the cached-content handle.
+Uses the local StubClient, so no API key or network is required.
+"""
+import types
+
+import pytest
+
+from gravity_agent import GravityAgent, SYSTEM_PROMPT
+from prompt_assembly import PromptAssembler
+from stub_model import StubClient
+
+
+class FailingCaches:
+    def __init__(self):
+        self.attempts = 0
+
+    async def create(self, model, config=None):
+        self.attempts += 1
+        raise RuntimeError("Cached content token count below minimum")
+
+
+def usage_response(cached_tokens):
+    return types.SimpleNamespace(usage_metadata=types.SimpleNamespace(cached_content_token_count=cached_tokens))
+
+
+class TestModes:
+    """Test where the system prompt goes in each mode."""
+
+    @pytest.mark.asyncio
+    async def test_inline(self):
+        """Test inline mode pastes the prompt into the contents and sends no config."""
+        prompts = PromptAssembler("Be brief.", mode="inline")
+        assert prompts.contents("User Input: hi") == "System Instructions:\nBe brief.\n\nUser Input: hi"
+        assert await prompts.config(StubClient()) is None
+
+    @pytest.mark.asyncio
+    async def test_system_instruction_built_once(self):
+        """Test the system_instruction config is one reused object."""
+        prompts = PromptAssembler("Be brief.")
+        assert prompts.contents("User Input: hi") == "User Input: hi"
+        first = await prompts.config(StubClient())
+        assert first.system_instruction == "Be brief."
+        assert await prompts.config(StubClient()) is first
+
+    def test_unknown_mode(self):
+        """Test a typo in the mode fails loudly."""
+        with pytest.raises(ValueError):
+            PromptAssembler("Be brief.", mode="cache")
+
+
+class TestCachedContent:
+    """Test the cached-content handle lifecycle."""
+
+    @pytest.mark.asyncio
+    async def test_created_once(self):
+        """Test the cache is created once and referenced by name afterwards."""
+        stub = StubClient()
+        prompts = PromptAssembler("Be brief.", mode="cached", model="gemini-test")
+        first = await prompts.config(stub)
+        second = await prompts.config(stub)
+        assert len(stub.cached_contents) == 1
+        assert stub.cached_contents[0].system_instruction == "Be brief."
+        assert first.cached_content == "cachedContents/stub-1"
+        assert second is first
+
+    @pytest.mark.asyncio
+    async def test_renewed_before_expiry(self):
+        """Test a handle close to expiry is replaced."""
+        stub = StubClient()
+        prompts = PromptAssembler("Be brief.", mode="cached", cache_ttl=3600)
+        await prompts.config(stub)
+        prompts._cached_expires = 0.0
+        config = await prompts.config(stub)
+        assert config.cached_content == "cachedContents/stub-2"
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_system_instruction(self):
+        """Test an uncacheable prompt uses system_instruction and isn't retried on every call."""
+        client = types.SimpleNamespace(aio=types.SimpleNamespace(caches=FailingCaches()))
+        prompts = PromptAssembler("Be brief.", mode="cached")
+        for _ in range(3):
+            config = await prompts.config(client)
+            assert config.system_instruction == "Be brief."
+        assert client.aio.caches.attempts == 1
+        assert prompts.stats()["cached"] is False
+
+
+class TestAccounting:
+    """Test tokens saved are counted only when the cached-content handle served them."""
+
+    def test_inline_saves_nothing(self):
+        """Test inline requests report no savings."""
+        prompts = PromptAssembler("x" * 400, mode="inline")
+        prompts.record()
+        assert prompts.stats()["tokens_saved"] == 0
+
+    def test_system_instruction_saves_nothing(self):
+        """Test a system_instruction is still billed as input, so it reports no savings."""
+        prompts = PromptAssembler("x" * 400)
+        prompts.record(config=prompts._system_config)
+        prompts.record(config=prompts._system_config)
+        stats = prompts.stats()
+        assert stats["system_tokens"] == 101
+        assert stats["tokens_saved"] == 0
+        assert stats["tokens_saved_per_request"] == 0
+
+    @pytest.mark.asyncio
+    async def test_saved_from_handle(self):
+        """Test requests that referenced the handle save the cached tokens the model reports."""
+        prompts = PromptAssembler("Be brief.", mode="cached")
+        config = await prompts.config(StubClient(latency=0))
+        prompts.record(usage_response(512), config)
+        prompts.record(usage_response(512), config)
+        stats = prompts.stats()
+        assert stats["tokens_saved"] == 1024
+        assert stats["tokens_saved_per_request"] == 512
+
+    @pytest.mark.asyncio
+    async def test_fallback_saves_nothing(self):
+        """Test a cached-mode request sent without a handle (creation failed) saves nothing."""
+        client = types.SimpleNamespace(aio=types.SimpleNamespace(caches=FailingCaches()))
+        prompts = PromptAssembler("Be brief.", mode="cached")
+        config = await prompts.config(client)
+        prompts.record(usage_response(512), config)  # Implicit caching on the model's side
+        stats = prompts.stats()
+        assert stats["tokens_saved"] == 0
+        assert stats["cached_tokens"] == 512
+
+    def test_cached_tokens_from_usage(self):
+        """Test cached token counts reported by the model are added up."""
+        prompts = PromptAssembler("Be brief.", mode="cached")
+        prompts.record(usage_response(512))
+        prompts.record(usage_response(None))
+        assert prompts.stats()["cached_tokens"] == 512
+
+
+class TestAgentPrompts:
+    """Test GravityAgent sends the system prompt as config."""
+
+    @pytest.mark.asyncio
+    async def test_prompt_not_in_contents(self):
+        """Test requests carry only the user turn; the instructions ride in the config."""
+        seen = []
+        stub = StubClient(latency=0, reply=lambda contents: seen.append(contents) or "ok")
+        agent = GravityAgent(client=stub, router=False)
+        await agent.process_input("explain closures")
+        assert seen == ["User Input: explain closures"]
+        assert stub.last_config.system_instruction == SYSTEM_PROMPT
+        assert agent.prompts.stats()["tokens_saved"] == 0
+
+    @pytest.mark.asyncio
+    async def test_stream_uses_config(self):
+        """Test streamed requests send the same config."""
+        stub = StubClient(latency=0)
+        agent = GravityAgent(client=stub, router=False)
+        events = [event async for event in agent.stream_input("explain closures")]
+        assert events[-1]["result"]["content"] == "Stub reply."
+        assert stub.last_config.system_instruction == SYSTEM_PROMPT
+        assert agent.prompts.stats()["requests"] == 1
+
+    @pytest.mark.asyncio
+    async def test_inline_agent(self):
+        """Test inline mode keeps the old single-string prompt."""
+        seen = []
+        stub = StubClient(latency=0, reply=lambda contents: seen.append(contents) or "ok")
+        agent = GravityAgent(client=stub, router=False, prompts=PromptAssembler(SYSTEM_PROMPT, mode="inline"))
+        await agent.process_input("explain closures")
+        assert seen[0].startswith(f"System Instructions:\n{SYSTEM_PROMPT}")
+        assert stub.last_config is None
+
+    @pytest.mark.asyncio
+    async def test_search_summary_has_own_prompt(self):
+        """Test the search re-feed isn't sent with the assistant's system prompt."""
+        stub = StubClient(latency=0)
+        agent = GravityAgent(client=stub, router=False)
+        await agent.generate(agent.build_search_prompt("q", [{"title": "t", "url": "u", "text": "x"}]))
+        assert stub.last_config is None
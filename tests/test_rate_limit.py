@@ -0,0 +1,152 @@
+"""
+Tests for token-bucket rate limiting.
+Time is injected, so nothing sleeps.
+"""
+import pytest
+
+from rate_limit import ClientRateLimits, RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+class TestRateLimiter:
+    """Test a single keyed token bucket."""
+
+    def test_burst_then_throttle(self, clock):
+        """Test burst events pass back to back, the next one waits 1/rate."""
+        limiter = RateLimiter(rate=2, burst=3, clock=clock)
+        assert [limiter.acquire("a") for _ in range(3)] == [0, 0, 0]
+        assert limiter.acquire("a") == pytest.approx(0.5)
+        assert limiter.stats()["throttled"] == 1
+
+    def test_refill(self, clock):
+        """Test tokens come back at rate per second, capped at burst."""
+        limiter = RateLimiter(rate=2, burst=3, clock=clock)
+        for _ in range(3):
+            limiter.acquire("a")
+        clock.advance(0.5)
+        assert limiter.acquire("a") == 0
+        assert limiter.acquire("a") > 0
+        clock.advance(60)
+        assert [limiter.acquire("a") for _ in range(4)][-1] > 0
+
+    def test_keys_independent(self, clock):
+        """Test one key's flood doesn't touch another key."""
+        limiter = RateLimiter(rate=1, burst=1, clock=clock)
+        limiter.acquire("noisy")
+        assert limiter.acquire("noisy") > 0
+        assert limiter.acquire("quiet") == 0
+
+    def test_disabled(self, clock):
+        """Test a rate of 0 allows everything and keeps no buckets."""
+        limiter = RateLimiter(rate=0, burst=1, clock=clock)
+        assert all(limiter.acquire("a") == 0 for _ in range(100))
+        assert len(limiter) == 0
+
+    def test_idle_buckets_evicted(self, clock):
+        """Test buckets that have refilled completely are dropped."""
+        limiter = RateLimiter(rate=1, burst=5, clock=clock)
+        for key in ("a", "b", "c"):
+            limiter.acquire(key)
+        clock.advance(5)
+        limiter.acquire("d")
+        assert len(limiter) == 1
+
+    def test_recent_buckets_kept(self, clock):
+        """Test a bucket still refilling survives eviction (its debt is remembered)."""
+        limiter = RateLimiter(rate=1, burst=5, clock=clock)
+        for _ in range(5):
+            limiter.acquire("a")
+        clock.advance(2)
+        limiter.acquire("b")
+        assert len(limiter) == 2
+        assert limiter.acquire("a") == 0
+        assert limiter.acquire("a") == 0
+        assert limiter.acquire("a") > 0
+
+    def test_max_keys(self, clock):
+        """Test memory stays bounded under many distinct keys."""
+        limiter = RateLimiter(rate=1, burst=5, max_keys=100, clock=clock)
+        for i in range(1000):
+            limiter.acquire(f"k{i}")
+        assert len(limiter) == 100
+
+    def test_first_throttle_once_per_episode(self, clock):
+        """Test the throttle notice fires once until an event is allowed again."""
+        limiter = RateLimiter(rate=1, burst=1, clock=clock)
+        limiter.acquire("a")
+        limiter.acquire("a")
+        assert limiter.first_throttle("a") is True
+        limiter.acquire("a")
+        assert limiter.first_throttle("a") is False
+        clock.advance(1)
+        limiter.acquire("a")
+        limiter.acquire("a")
+        assert limiter.first_throttle("a") is True
+
+
+class TestClientRateLimits:
+    """Test budgets applied per sid and per IP."""
+
+    def test_sid_limit(self, clock):
+        """Test one socket is limited on its own budget."""
+        limits = ClientRateLimits({"user_input": (1, 2)}, ip_factor=8, clock=clock)
+        assert limits.check("user_input", sid="s1", ip="1.2.3.4") == 0
+        assert limits.check("user_input", sid="s1", ip="1.2.3.4") == 0
+        assert limits.check("user_input", sid="s1", ip="1.2.3.4") > 0
+        assert limits.check("user_input", sid="s2", ip="1.2.3.4") == 0
+
+    def test_ip_limit_across_sockets(self, clock):
+        """Test reconnecting with fresh sids can't escape the IP budget."""
+        limits = ClientRateLimits({"user_input": (1, 2)}, ip_factor=2, clock=clock)
+        allowed = sum(limits.check("user_input", sid=f"s{i}", ip="1.2.3.4") == 0 for i in range(10))
+        assert allowed == 4
+
+    def test_throttled_spends_nothing(self, clock):
+        """Test a request refused by the IP bucket doesn't drain the sid bucket."""
+        limits = ClientRateLimits({"chat": (1, 2)}, ip_factor=1, clock=clock)
+        limits.check("chat", sid="a", ip="ip")
+        limits.check("chat", sid="b", ip="ip")
+        assert limits.check("chat", sid="a", ip="ip") > 0
+        assert limits.clients["chat"].wait_time("a") == 0
+
+    def test_budgets_separate(self, clock):
+        """Test /chat traffic doesn't use up the user_input budget."""
+        limits = ClientRateLimits({"user_input": (1, 1), "chat": (10, 1)}, clock=clock)
+        limits.check("chat", sid="s1")
+        assert limits.check("chat", sid="s1") > 0
+        assert limits.check("user_input", sid="s1") == 0
+
+    def test_cost(self, clock):
+        """Test a costly request takes several tokens at once."""
+        limits = ClientRateLimits({"chat": (1, 10)}, ip_factor=1, clock=clock)
+        assert limits.check("chat", ip="ip", cost=10) == 0
+        assert limits.check("chat", ip="ip") == pytest.approx(1.0)
+
+    def test_cost_capped_at_burst(self, clock):
+        """Test a cost larger than the bucket empties it instead of never passing."""
+        limits = ClientRateLimits({"chat": (1, 4)}, ip_factor=1, clock=clock)
+        assert limits.check("chat", ip="ip", cost=100) == 0
+        assert limits.check("chat", ip="ip") > 0
+
+    def test_forget(self, clock):
+        """Test disconnecting drops the sid buckets."""
+        limits = ClientRateLimits({"user_input": (1, 1)}, clock=clock)
+        limits.check("user_input", sid="s1", ip="ip")
+        limits.forget("s1")
+        assert limits.stats()["user_input"]["client"]["keys"] == 0
+        assert limits.stats()["user_input"]["ip"]["keys"] == 1
@@ -0,0 +1,172 @@
+"""
+Tests for the Gravity Agent reply cache.
+"""
+import pytest
+import sqlite3
+import time
+
+from response_cache import ResponseCache, normalize_text
+from gravity_agent import GravityAgent, SYSTEM_PROMPT
+from stub_model import StubClient
+
+
+class TestNormalization:
+    """Test cache key normalization."""
+
+    def test_equivalent_phrasings(self):
+        """Test case, spacing and trailing punctuation are ignored."""
+        assert normalize_text("Explain  Python decorators?") == normalize_text("explain python decorators")
+
+    def test_code_symbols_kept(self):
+        """Test language names like C++ and C# are not collapsed."""
+        assert normalize_text("teach me c++") != normalize_text("teach me c")
+        assert normalize_text("teach me C#") == "teach me c#"
+
+    def test_prompt_changes_key(self):
+        """Test a different system prompt gives a different key."""
+        cache = ResponseCache()
+        assert cache.make_key("hi", "prompt A") != cache.make_key("hi", "prompt B")
+
+
+class TestEviction:
+    """Test LRU and TTL eviction."""
+
+    def test_lru_capacity(self):
+        """Test the least recently used entry is evicted first."""
+        cache = ResponseCache(max_entries=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+        assert cache.get("a") == "1"
+        assert cache.get("b") is None
+        assert cache.get("c") == "3"
+
+    def test_action_ttl(self):
+        """Test action replies expire on their own shorter TTL."""
+        cache = ResponseCache(ttl=60, action_ttl=0.05)
+        cache.put("text", "hello", kind="text")
+        cache.put("action", '{"action": "play_youtube"}', kind="action")
+        time.sleep(0.1)
+        assert cache.get("text") == "hello"
+        assert cache.get("action") is None
+
+    def test_disabled(self):
+        """Test max_entries=0 disables caching."""
+        cache = ResponseCache(max_entries=0)
+        cache.put("a", "1")
+        assert cache.get("a") is None
+
+
+class TestSqliteTier:
+    """Test the persistent tier."""
+
+    def test_survives_restart(self, temp_dir):
+        """Test entries written by one cache are read by a new one."""
+        db_path = str(temp_dir / "responses.sqlite3")
+        first = ResponseCache(db_path=db_path)
+        first.put("k", "persisted")
+        first.close()
+
+        second = ResponseCache(db_path=db_path)
+        assert second.get("k") == "persisted"
+        assert second.stats()["disk_hits"] == 1
+        second.close()
+
+    def test_writes_committed_in_batches(self, temp_dir):
+        """Test puts are queued for the writer thread and all committed by close."""
+        db_path = str(temp_dir / "responses.sqlite3")
+        cache = ResponseCache(db_path=db_path)
+        for i in range(50):
+            cache.put(f"k{i}", "v")
+        cache.close()
+
+        db = sqlite3.connect(db_path)
+        try:
+            assert db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 50
+        finally:
+            db.close()
+
+    @pytest.mark.asyncio
+    async def test_aget_reads_disk_off_loop(self, temp_dir):
+        """Test aget finds entries only on disk, promoting them into memory."""
+        db_path = str(temp_dir / "responses.sqlite3")
+        first = ResponseCache(db_path=db_path)
+        first.put("k", "persisted")
+        first.close()
+
+        second = ResponseCache(db_path=db_path)
+        assert await second.aget("k") == "persisted"
+        assert await second.aget("k") == "persisted"
+        assert await second.aget("missing") is None
+        stats = second.stats()
+        assert (stats["hits"], stats["disk_hits"], stats["misses"]) == (2, 1, 1)
+        second.close()
+
+
+class TestSnapshot:
+    """Test snapshot/restore of the in-memory tier."""
+
+    def test_round_trip(self, temp_dir):
+        """Test a new cache restored from a snapshot serves the old entries."""
+        path = str(temp_dir / "snap" / "reply.sqlite3")
+        first = ResponseCache()
+        first.put("a", "one")
+        first.put("b", '{"action": "play_youtube"}', kind="action")
+        assert first.snapshot(path) == 2
+
+        second = ResponseCache()
+        assert second.restore(path) == 2
+        assert second.get("a") == "one"
+        assert second.get("b") == '{"action": "play_youtube"}'
+
+    def test_expired_entries_skipped(self, temp_dir):
+        """Test entries past their TTL are neither saved nor restored."""
+        path = str(temp_dir / "reply.sqlite3")
+        cache = ResponseCache(ttl=0.01)
+        cache.put("old", "stale")
+        time.sleep(0.02)
+        assert cache.snapshot(path) == 0
+        assert ResponseCache().restore(path) == 0
+
+    def test_missing_or_corrupt_file(self, temp_dir):
+        """Test restoring from nothing or garbage starts cold instead of failing."""
+        assert ResponseCache().restore(str(temp_dir / "absent.sqlite3")) == 0
+        garbage = temp_dir / "garbage.sqlite3"
+        garbage.write_bytes(b"not a database")
+        assert ResponseCache().restore(str(garbage)) == 0
+
+
+class TestAgentCache:
+    """Test GravityAgent uses the cache."""
+
+    @pytest.mark.asyncio
+    async def test_repeat_question_skips_model(self):
+        """Test a repeated question is answered from cache."""
+        stub = StubClient(latency=0, reply="Decorators wrap functions.")
+        agent = GravityAgent(client=stub, cache=ResponseCache())
+        first = await agent.process_input("Explain python decorators")
+        second = await agent.process_input("explain Python decorators?")
+        assert first == second
+        assert stub.calls == 1
+        assert agent.cache_stats()["hits"] == 1
+        assert agent.cache_stats()["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_uses_cache(self):
+        """Test a streamed reply is cached for later requests."""
+        stub = StubClient(latency=0, reply="Cached answer.")
+        agent = GravityAgent(client=stub, cache=ResponseCache())
+        [e async for e in agent.stream_input("hello")]
+        events = [e async for e in agent.stream_input("hello")]
+        assert stub.calls == 1
+        assert events[0] == {"type": "chunk", "content": "Cached answer."}
+
+    @pytest.mark.asyncio
+    async def test_errors_not_cached(self):
+        """Test timed-out calls are not cached."""
+        stub = StubClient(latency=1.0)
+        agent = GravityAgent(client=stub, cache=ResponseCache(), request_timeout=0.02)
+        await agent.process_input("hi")
+        key = agent.cache.make_key("hi", SYSTEM_PROMPT)
+        assert agent.cache.get(key) is None
@@ -20,6 +20,30 @@ MODULES = {
     "web": "test_web_agent.py",
     "auth": "test_authenticator.py",
     "tools": "test_ada_tools.py",
+    "gravity": "test_gravity_agent.py",
+    "server": "test_server.py",
+    "cache": "test_response_cache.py",
+    "sessions": "test_session_store.py",
+    "single_flight": "test_single_flight.py",
+    "shared_state": "test_shared_state.py",
+    "admission": "test_admission.py",
+    "metrics": "test_metrics.py",
+    "logging": "test_logging_setup.py",
+    "registry": "test_agent_registry.py",
+    "intent": "test_intent_router.py",
+    "media": "test_media_payloads.py",
+    "search": "test_search_provider.py",
+    "draining": "test_draining.py",
+    "load": "test_bench_socketio.py",
+    "chat_load": "test_bench_chat.py",
+    "prompt": "test_prompt_assembly.py",
+    "ratelimit": "test_rate_limit.py",
+    "scheduler": "test_scheduler.py",
+    "vad": "test_vad.py",
+    "capture": "test_audio_capture.py",
+    "playback": "test_audio_playback.py",
+    "framing": "test_audio_framing.py",
+    "uplink": "test_audio_uplink.py",
 }
 
 TESTS_DIR = Path(__file__).parent
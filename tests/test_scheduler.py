@@ -0,0 +1,205 @@
+"""
+Tests for the priority task scheduler.
+Jobs are plain coroutines gated on events, so no model or network is needed.
+"""
+import asyncio
+import logging
+
+import pytest
+
+from scheduler import BACKGROUND, INTERACTIVE, TOOL, TaskScheduler
+
+
+async def settle():
+    """Let queued callbacks and woken waiters run."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestCaps:
+    """Test per-class and total concurrency limits."""
+
+    @pytest.mark.asyncio
+    async def test_class_cap(self):
+        """Test a class never runs more jobs than its cap."""
+        scheduler = TaskScheduler({TOOL: 2})
+        peak = 0
+
+        async def job():
+            nonlocal peak
+            peak = max(peak, scheduler.running[TOOL])
+            await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(scheduler.run(TOOL, job()) for _ in range(6)))
+        assert peak == 2
+        assert scheduler.completed[TOOL] == 6
+
+    @pytest.mark.asyncio
+    async def test_capped_class_does_not_block_others(self):
+        """Test interactive work starts at once while tool jobs queue at their cap."""
+        scheduler = TaskScheduler({TOOL: 1})
+        release = asyncio.Event()
+        first = scheduler.submit(release.wait(), TOOL)
+        second = scheduler.submit(release.wait(), TOOL)
+        await settle()
+        assert scheduler.queued(TOOL) == 1
+
+        assert await asyncio.wait_for(scheduler.run(INTERACTIVE, asyncio.sleep(0, "done")), 1) == "done"
+        release.set()
+        await asyncio.gather(first, second)
+
+    @pytest.mark.asyncio
+    async def test_unknown_priority(self):
+        """Test a typo in the class fails loudly."""
+        scheduler = TaskScheduler()
+        job = asyncio.sleep(0)
+        with pytest.raises(ValueError):
+            await scheduler.run("urgent", job)
+
+
+class TestOrdering:
+    """Test which waiting job gets a freed slot."""
+
+    @pytest.mark.asyncio
+    async def test_interactive_first(self):
+        """Test a freed slot goes to interactive work even if background work queued earlier."""
+        scheduler = TaskScheduler(max_running=1)
+        release = asyncio.Event()
+        order = []
+
+        async def job(label):
+            order.append(label)
+
+        blocker = scheduler.submit(release.wait(), TOOL)
+        await settle()
+        background = scheduler.submit(job("background"), BACKGROUND)
+        tool = scheduler.submit(job("tool"), TOOL)
+        await settle()
+        interactive = scheduler.submit(job("interactive"), INTERACTIVE)
+        await settle()
+        release.set()
+        await asyncio.gather(blocker, background, tool, interactive)
+        assert order == ["interactive", "tool", "background"]
+
+    @pytest.mark.asyncio
+    async def test_fifo_within_class(self):
+        """Test jobs of one class start in the order they arrived."""
+        scheduler = TaskScheduler({TOOL: 1})
+        order = []
+
+        async def job(i):
+            order.append(i)
+            await asyncio.sleep(0)
+
+        await asyncio.gather(*(scheduler.run(TOOL, job(i)) for i in range(5)))
+        assert order == list(range(5))
+
+
+class TestCancellation:
+    """Test jobs cancelled while waiting or running."""
+
+    @pytest.mark.asyncio
+    async def test_cancel_while_queued(self):
+        """Test a cancelled waiter leaves the queue and its coroutine is closed."""
+        scheduler = TaskScheduler({TOOL: 1})
+        release = asyncio.Event()
+        started = []
+
+        async def job():
+            started.append(True)
+
+        blocker = scheduler.submit(release.wait(), TOOL)
+        waiting = scheduler.submit(job(), TOOL)
+        await settle()
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        assert scheduler.queued(TOOL) == 0
+        release.set()
+        await blocker
+        assert started == []
+        assert scheduler.running[TOOL] == 0
+
+    @pytest.mark.asyncio
+    async def test_cancel_running_frees_slot(self):
+        """Test cancelling a running job hands its slot to the next one."""
+        scheduler = TaskScheduler({TOOL: 1})
+        running = scheduler.submit(asyncio.Event().wait(), TOOL)
+        await settle()
+        queued = scheduler.submit(asyncio.sleep(0, "next"), TOOL)
+        await settle()
+        running.cancel()
+        assert await asyncio.wait_for(queued, 1) == "next"
+        assert scheduler.total_running == 0
+
+    @pytest.mark.asyncio
+    async def test_cancel_running_and_queued_together(self):
+        """Test cancelling a running job and the waiter it was about to wake raises CancelledError, not ValueError."""
+        scheduler = TaskScheduler({TOOL: 1})
+        running = scheduler.submit(asyncio.Event().wait(), TOOL)
+        await settle()
+        queued = scheduler.submit(asyncio.Event().wait(), TOOL)
+        await settle()
+        running.cancel()
+        queued.cancel()
+        results = await asyncio.gather(running, queued, return_exceptions=True)
+        assert all(isinstance(result, asyncio.CancelledError) for result in results)
+        assert scheduler.total_running == 0
+        assert scheduler.queued(TOOL) == 0
+
+    @pytest.mark.asyncio
+    async def test_aclose(self):
+        """Test aclose cancels submitted jobs, queued or running."""
+        scheduler = TaskScheduler({TOOL: 1})
+        tasks = [scheduler.submit(asyncio.Event().wait(), TOOL) for _ in range(3)]
+        await settle()
+        await scheduler.aclose()
+        assert all(task.cancelled() for task in tasks)
+        assert scheduler.total_running == 0
+        assert scheduler.queued(TOOL) == 0
+
+
+class TestAccounting:
+    """Test failures, counts and wait times are reported."""
+
+    @pytest.mark.asyncio
+    async def test_submit_logs_failure(self, caplog):
+        """Test a failing background job is logged and counted, not lost."""
+        scheduler = TaskScheduler()
+
+        async def boom():
+            raise RuntimeError("slicer crashed")
+
+        with caplog.at_level(logging.ERROR, logger="klistar.scheduler"):
+            assert await scheduler.submit(boom(), TOOL) is None
+        assert "tool job failed" in caplog.text
+        assert scheduler.failed[TOOL] == 1
+        assert scheduler.completed[TOOL] == 0
+
+    @pytest.mark.asyncio
+    async def test_slot(self):
+        """Test the slot context manager holds a slot for the block and counts it."""
+        scheduler = TaskScheduler()
+        async with scheduler.slot(INTERACTIVE):
+            assert scheduler.running[INTERACTIVE] == 1
+        assert scheduler.running[INTERACTIVE] == 0
+        assert scheduler.completed[INTERACTIVE] == 1
+
+    @pytest.mark.asyncio
+    async def test_wait_stats(self):
+        """Test queued jobs report their wait time per class."""
+        scheduler = TaskScheduler({BACKGROUND: 1})
+        await asyncio.gather(*(scheduler.run(BACKGROUND, asyncio.sleep(0.02)) for _ in range(3)))
+        stats = scheduler.stats()["classes"][BACKGROUND]
+        assert stats["completed"] == 3
+        assert stats["queued"] == 0
+        assert stats["wait_ms_p50"] >= 15
+        assert stats["wait_ms_max"] >= 35
+        assert scheduler.stats()["classes"][INTERACTIVE]["wait_ms_max"] == 0
+
+    def test_from_env(self, monkeypatch):
+        """Test caps are read from GRAVITY_SCHED_* variables."""
+        monkeypatch.setenv("GRAVITY_SCHED_TOOL", "5")
+        monkeypatch.setenv("GRAVITY_SCHED_MAX_RUNNING", "8")
+        scheduler = TaskScheduler.from_env()
+        assert scheduler.caps[TOOL] == 5
+        assert scheduler.max_running == 8
@@ -0,0 +1,186 @@
+"""
+Tests for the web search pipeline behind GravityAgent.handle_search.
+Uses the offline fixture provider (tests/fixtures/search.json).
+"""
+import asyncio
+import os
+
+import httpx
+import pytest
+
+from gravity_agent import GravityAgent
+from search_provider import (
+    FixtureSearchProvider,
+    SearchPipeline,
+    SearchProvider,
+    SearchResult,
+    extract_text,
+    passages,
+)
+from stub_model import StubClient
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "search.json")
+
+
+@pytest.fixture
+def provider():
+    return FixtureSearchProvider(path=FIXTURE)
+
+
+class TestExtraction:
+    """Test HTML text extraction and passage splitting."""
+
+    def test_skips_scripts_and_chrome(self):
+        """Test scripts, styles, nav and footers are not extracted."""
+        html = "<nav>Menu</nav><script>x=1</script><style>p{}</style><p>Hello <b>world</b></p><footer>(c)</footer>"
+        assert extract_text(html) == ["Hello world"]
+
+    def test_malformed_html(self):
+        """Test broken markup still yields the text before it."""
+        assert extract_text("<p>Good text<p><div <<<")[0] == "Good text"
+
+    def test_passages_respect_size(self):
+        """Test long blocks are split and short ones joined."""
+        blocks = ["a" * 10, "b" * 10, " ".join(["word"] * 100)]
+        out = list(passages(blocks, 60))
+        assert out[0] == "a" * 10 + " " + "b" * 10
+        assert all(len(p) <= 60 for p in out)
+
+
+class TestFetch:
+    """Test page downloads with the shared HTTP client."""
+
+    @staticmethod
+    def provider(content_type, chunks, sent):
+        async def body():
+            for chunk in chunks:
+                sent.append(chunk)
+                yield chunk
+
+        def handler(request):
+            return httpx.Response(200, headers={"content-type": content_type}, content=body())
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return SearchProvider(http=lambda: client)
+
+    @pytest.mark.asyncio
+    async def test_stops_reading_at_max_bytes(self):
+        """Test a large page is only downloaded up to max_bytes."""
+        sent = []
+        provider = self.provider("text/html; charset=utf-8", [b"<p>" + b"x" * 997] * 100, sent)
+        html = await provider.fetch("https://example.com/big", 2500)
+        assert len(html) == 2500
+        assert html.startswith("<p>xxx")
+        assert len(sent) < 5
+
+    @pytest.mark.asyncio
+    async def test_non_html_body_not_read(self):
+        """Test a non-HTML response returns None without downloading its body."""
+        sent = []
+        provider = self.provider("application/pdf", [b"%PDF"] * 100, sent)
+        assert await provider.fetch("https://example.com/doc.pdf", 2500) is None
+        assert len(sent) < 2
+
+
+class TestPipeline:
+    """Test search -> fetch -> top-k snippets."""
+
+    @pytest.mark.asyncio
+    async def test_top_k_from_pages(self, provider):
+        """Test the best passage per page is returned, best pages first."""
+        snippets = await SearchPipeline(provider, top_k=2).run("python 3.13 release")
+        assert len(snippets) == 2
+        assert snippets[0]["url"] == "https://docs.python.org/3/whatsnew/3.13.html"
+        assert "free-threaded" in snippets[0]["text"]
+        # Script and nav text never reach the model
+        assert "tracking" not in snippets[0]["text"]
+        assert "Docs home" not in snippets[0]["text"]
+
+    @pytest.mark.asyncio
+    async def test_fetch_failure_uses_provider_snippet(self, provider):
+        """Test a page that can't be fetched falls back to its search snippet."""
+        snippets = await SearchPipeline(provider, top_k=3).run("python 3.13 release")
+        mirror = next(s for s in snippets if "mirror.invalid" in s["url"])
+        assert mirror["text"].startswith("Python 3.13 was released")
+
+    @pytest.mark.asyncio
+    async def test_pages_fetched_concurrently(self):
+        """Test result pages are fetched in parallel, each bounded by fetch_timeout."""
+        class SlowProvider(FixtureSearchProvider):
+            async def fetch(self, url, max_bytes):
+                await asyncio.sleep(0.1 if url != "slow" else 5)
+                return "<p>asyncio answer</p>"
+
+        hits = [{"title": str(i), "url": f"u{i}", "snippet": ""} for i in range(4)] + [{"title": "s", "url": "slow", "snippet": "asyncio snippet"}]
+        pipeline = SearchPipeline(SlowProvider(results={"*": hits}), results=5, top_k=5, fetch_timeout=0.3)
+        start = asyncio.get_running_loop().time()
+        snippets = await pipeline.run("asyncio")
+        assert asyncio.get_running_loop().time() - start < 0.5
+        assert len(snippets) == 5
+
+    @pytest.mark.asyncio
+    async def test_no_results(self, provider):
+        """Test an unknown query returns no snippets."""
+        assert await SearchPipeline(provider).run("nothing matches this") == []
+
+
+class TestHandleSearch:
+    """Test GravityAgent.handle_search with the fixture provider."""
+
+    @pytest.mark.asyncio
+    async def test_refeeds_only_snippets(self, provider):
+        """Test the summary prompt carries the top-k snippets, not whole pages."""
+        prompts = []
+
+        def reply(prompt):
+            prompts.append(prompt)
+            return "Python 3.13 adds a free-threaded build [1]."
+
+        agent = GravityAgent(client=StubClient(latency=0, reply=reply), search=provider)
+        result = await agent.handle_search("python 3.13 release")
+
+        assert result["content"] == "Python 3.13 adds a free-threaded build [1]."
+        assert result["sources"][0]["url"] == "https://docs.python.org/3/whatsnew/3.13.html"
+        assert "[1] What's New In Python 3.13" in prompts[0]
+        assert "Copyright" not in prompts[0]
+        assert len(prompts[0]) < 2500
+
+    @pytest.mark.asyncio
+    async def test_results_are_cached(self, provider):
+        """Test a repeated query skips the search and page fetches."""
+        agent = GravityAgent(client=StubClient(latency=0, reply="ok"), search=provider)
+        await agent.handle_search("python 3.13 release")
+        fetched = len(provider.fetched)
+        await agent.handle_search("Python 3.13 release")
+        assert len(provider.fetched) == fetched
+        assert agent.search_cache.stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_no_results(self, provider):
+        """Test an empty search answers without calling the model."""
+        stub = StubClient(latency=0)
+        agent = GravityAgent(client=stub, search=provider)
+        result = await agent.handle_search("nothing matches this")
+        assert "couldn't find" in result["content"]
+        assert stub.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_not_configured(self):
+        """Test a clear reply when no provider is configured."""
+        agent = GravityAgent(client=StubClient(latency=0), search=False)
+        result = await agent.handle_search("anything")
+        assert "no search provider" in result["content"]
+
+    @pytest.mark.asyncio
+    async def test_end_to_end_via_router(self, provider):
+        """Test "search ..." goes router -> search -> one summary call."""
+        stub = StubClient(latency=0, reply="Summary.")
+        agent = GravityAgent(client=stub, search=provider)
+        result = await agent.process_input("search python 3.13 release")
+        assert result["content"] == "Summary."
+        assert stub.calls == 1
+
+
+def test_search_result_fields():
+    """Test SearchResult defaults the snippet."""
+    assert SearchResult(title="t", url="u").snippet == ""
@@ -0,0 +1,458 @@
+"""
+Tests for the Socket.IO / FastAPI server.
+The Gravity Agent is swapped for one backed by the local StubClient.
+"""
+import pytest
+
+try:
+    import server
+    HAS_SERVER = True
+except ImportError as e:
+    HAS_SERVER = False
+    IMPORT_ERROR = str(e)
+
+from draining import Drainer
+from gravity_agent import GravityAgent
+from rate_limit import ClientRateLimits
+from stub_model import StubClient
+
+pytestmark = pytest.mark.skipif(not HAS_SERVER, reason=f"Server dependencies not installed: {IMPORT_ERROR if not HAS_SERVER else ''}")
+
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limits(monkeypatch):
+    """Give each test its own buckets, so earlier tests never throttle later ones."""
+    if HAS_SERVER:
+        monkeypatch.setattr(server, "rate_limits", ClientRateLimits(server.RATE_BUDGETS, ip_factor=server.RATE_IP_FACTOR))
+
+
+@pytest.fixture
+def emitted(monkeypatch):
+    """Capture sio.emit calls as (event, payload, room) tuples."""
+    events = []
+
+    async def fake_emit(event, data=None, room=None, **kwargs):
+        events.append((event, data, room))
+
+    monkeypatch.setattr(server.sio, "emit", fake_emit)
+    return events
+
+
+@pytest.fixture
+def stub_agent(monkeypatch):
+    """Replace the module-level agent with a stub-backed one."""
+    agent = GravityAgent(client=StubClient(latency=0, reply="Hello from the stub.", chunk_size=6))
+    monkeypatch.setattr(server, "agent", agent)
+    return agent
+
+
+class TestUserInput:
+    """Test the user_input Socket.IO handler."""
+
+    @pytest.mark.asyncio
+    async def test_single_response(self, emitted, stub_agent):
+        """Test the default mode emits one response event."""
+        await server.user_input("sid1", {"text": "hi"})
+        names = [e[0] for e in emitted]
+        assert names == ["status", "response", "status"]
+        assert emitted[1][1] == {"type": "text", "content": "Hello from the stub."}
+        assert all(room == "sid1" for _, _, room in emitted)
+
+    @pytest.mark.asyncio
+    async def test_streaming_response(self, emitted, stub_agent):
+        """Test stream mode emits chunks followed by response_done."""
+        await server.user_input("sid1", {"text": "hi", "stream": True})
+        names = [e[0] for e in emitted]
+        assert names[0] == "status"
+        assert names[-2:] == ["response_done", "status"]
+        chunks = [data["content"] for name, data, _ in emitted if name == "response_chunk"]
+        assert len(chunks) > 1
+        assert "".join(chunks) == "Hello from the stub."
+        assert emitted[-2][1] == {"type": "text", "content": "Hello from the stub."}
+
+    @pytest.mark.asyncio
+    async def test_empty_text_ignored(self, emitted, stub_agent):
+        """Test empty input emits nothing."""
+        await server.user_input("sid1", {"text": ""})
+        assert emitted == []
+
+
+class TestAdmission:
+    """Test overload responses."""
+
+    @pytest.fixture
+    def busy_agent(self, monkeypatch):
+        """An agent whose only model slot is taken and which has no queue."""
+        agent = GravityAgent(client=StubClient(latency=0), max_concurrent_calls=1, max_queue=0)
+        monkeypatch.setattr(server, "agent", agent)
+        return agent
+
+    @pytest.mark.asyncio
+    async def test_chat_returns_429(self, busy_agent):
+        """Test /chat answers 429 with Retry-After when the queue is full."""
+        import httpx
+
+        transport = httpx.ASGITransport(app=server.app)
+        async with busy_agent.admission.slot():
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                resp = await http.post("/chat", json={"message": "hi"})
+        assert resp.status_code == 429
+        assert resp.json()["error"] == "busy"
+        assert int(resp.headers["Retry-After"]) >= 1
+
+    @pytest.mark.asyncio
+    async def test_socket_busy_status(self, emitted, busy_agent):
+        """Test user_input reports a busy reply and a Busy status."""
+        async with busy_agent.admission.slot():
+            await server.user_input("sid1", {"text": "hi"})
+        assert emitted[1][1]["type"] == "busy"
+        assert emitted[-1][1]["msg"] == "Busy"
+
+
+class TestCoalescing:
+    """Test requests sharing an identical in-flight call."""
+
+    @pytest.mark.asyncio
+    async def test_chat_follower_of_abandoned_stream(self, monkeypatch):
+        """Test a /chat caller waiting on a stream whose consumer went away gets a reply, not a 500."""
+        import asyncio
+
+        import httpx
+
+        from response_cache import ResponseCache
+
+        stub = StubClient(latency=0.1, reply="Shared reply.", chunk_size=2)
+        agent = GravityAgent(client=stub, router=False, cache=ResponseCache(max_entries=0))
+        monkeypatch.setattr(server, "agent", agent)
+        stream = agent.stream_input("explain closures")
+        assert (await stream.__anext__())["type"] == "chunk"
+
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            follower = asyncio.create_task(http.post("/chat", json={"message": "explain closures"}))
+            while not agent.flights.stats()["coalesced"]:
+                await asyncio.sleep(0.005)
+            await stream.aclose()
+            resp = await follower
+        assert resp.status_code == 200
+        assert resp.json() == {"reply": "Shared reply."}
+        assert stub.calls == 2
+
+
+class TestBatch:
+    """Test the /chat/batch NDJSON endpoint."""
+
+    async def post(self, body):
+        import httpx
+
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.post("/chat/batch", json=body)
+
+    @pytest.mark.asyncio
+    async def test_streams_one_line_per_message(self, stub_agent):
+        """Test every message gets one NDJSON line carrying its index and id."""
+        import json
+
+        resp = await self.post({"messages": [{"message": f"q{i}", "id": f"m{i}"} for i in range(5)]})
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in resp.text.splitlines()]
+        assert sorted(line["index"] for line in lines) == list(range(5))
+        assert all(line["id"] == f"m{line['index']}" for line in lines)
+        assert all(line["content"] == "Hello from the stub." for line in lines)
+
+    @pytest.mark.asyncio
+    async def test_too_large(self, stub_agent, monkeypatch):
+        """Test batches over the size limit are refused."""
+        monkeypatch.setattr(server, "BATCH_MAX_ITEMS", 2)
+        resp = await self.post({"messages": [{"message": "a"}, {"message": "b"}, {"message": "c"}]})
+        assert resp.status_code == 413
+        assert resp.json()["max_items"] == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_capped(self, monkeypatch):
+        """Test a caller can't raise parallelism above the server cap."""
+        stub = StubClient(latency=0.02)
+        monkeypatch.setattr(server, "agent", GravityAgent(client=stub, router=False))
+        monkeypatch.setattr(server, "BATCH_CONCURRENCY", 2)
+        resp = await self.post({"messages": [{"message": f"q{i}"} for i in range(6)], "concurrency": 50})
+        assert len(resp.text.splitlines()) == 6
+        assert stub.max_in_flight == 2
+
+    @pytest.mark.asyncio
+    async def test_runs_as_background_work(self, stub_agent, monkeypatch):
+        """Test batches take a background slot while socket turns take interactive ones."""
+        from scheduler import TaskScheduler
+
+        monkeypatch.setattr(server, "scheduler", TaskScheduler())
+        await self.post({"messages": [{"message": "a"}, {"message": "b"}]})
+        await server.user_input("sid1", {"text": "hi"})
+        classes = (await server.status())["scheduler"]["classes"]
+        assert classes["background"]["completed"] == 2
+        assert classes["interactive"]["completed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_background_cap_bounds_model_calls(self, monkeypatch):
+        """Test the background cap limits model calls across a batch, not just whole batches."""
+        from scheduler import BACKGROUND, TaskScheduler
+
+        stub = StubClient(latency=0.02)
+        monkeypatch.setattr(server, "agent", GravityAgent(client=stub, router=False))
+        monkeypatch.setattr(server, "scheduler", TaskScheduler({BACKGROUND: 1}))
+        resp = await self.post({"messages": [{"message": f"q{i}"} for i in range(4)], "concurrency": 4})
+        assert len(resp.text.splitlines()) == 4
+        assert stub.max_in_flight == 1
+
+
+class TestMedia:
+    """Test media capability negotiation."""
+
+    @pytest.mark.asyncio
+    async def test_negotiation_and_disconnect(self, emitted, stub_agent):
+        """Test the ack reports the accepted capabilities and disconnect forgets them."""
+        accepted = await server.media_capabilities("sid1", {"binary": True, "compression": ["deflate"]})
+        assert accepted == {"binary": True, "compression": "deflate"}
+        assert server.media.capabilities("sid1").binary
+        await server.disconnect("sid1")
+        assert not server.media.capabilities("sid1").binary
+
+
+class TestRateLimits:
+    """Test per-client throttling of socket events and /chat."""
+
+    @pytest.fixture
+    def tight(self, monkeypatch):
+        budgets = {"user_input": (1, 2), "chat": (1, 2)}
+        monkeypatch.setattr(server, "RATE_BUDGETS", budgets)
+        monkeypatch.setattr(server, "rate_limits", ClientRateLimits(budgets, ip_factor=2))
+
+    async def post(self, path, body, headers=None):
+        import httpx
+
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.post(path, json=body, headers=headers)
+
+    @pytest.mark.asyncio
+    async def test_user_input_throttled_status(self, emitted, stub_agent, tight):
+        """Test a flood gets one Throttled status and no extra model calls."""
+        for _ in range(5):
+            await server.user_input("sid1", {"text": "hi"})
+        throttled = [data for name, data, _ in emitted if name == "status" and data["msg"] == "Throttled"]
+        assert throttled == [{"msg": "Throttled", "event": "user_input", "retry_after": 1}]
+        assert len([name for name, _, _ in emitted if name == "response"]) == 2
+
+    @pytest.mark.asyncio
+    async def test_other_clients_unaffected(self, emitted, stub_agent, tight):
+        """Test one client's flood leaves another client's budget alone."""
+        for _ in range(5):
+            await server.user_input("noisy", {"text": "hi"})
+        await server.user_input("quiet", {"text": "hi"})
+        assert [room for name, _, room in emitted if name == "response"][-1] == "quiet"
+
+    @pytest.mark.asyncio
+    async def test_ip_budget_shared_by_sockets(self, emitted, stub_agent, tight):
+        """Test sockets from one address share the IP budget."""
+        for i in range(6):
+            await server.connect(f"s{i}", {"asgi.scope": {"client": ("203.0.113.7", 5000)}})
+            await server.user_input(f"s{i}", {"text": "hi"})
+        assert len([name for name, _, _ in emitted if name == "response"]) == 4
+        for i in range(6):
+            await server.disconnect(f"s{i}")
+        assert server.client_ips == {}
+
+    @pytest.mark.asyncio
+    async def test_chat_returns_429(self, stub_agent, tight):
+        """Test /chat answers 429 rate_limited with Retry-After past the burst."""
+        codes = [(await self.post("/chat", {"message": "hi"})).status_code for _ in range(5)]
+        assert codes == [200, 200, 200, 200, 429]
+        resp = await self.post("/chat", {"message": "hi"})
+        assert resp.json()["error"] == "rate_limited"
+        assert int(resp.headers["Retry-After"]) >= 1
+
+    @pytest.mark.asyncio
+    async def test_forwarded_for(self, stub_agent, tight, monkeypatch):
+        """Test behind a trusted proxy each X-Forwarded-For client has its own budget."""
+        monkeypatch.setattr(server, "TRUST_FORWARDED", True)
+        for _ in range(4):
+            await self.post("/chat", {"message": "hi"}, headers={"X-Forwarded-For": "198.51.100.1, 10.0.0.1"})
+        resp = await self.post("/chat", {"message": "hi"}, headers={"X-Forwarded-For": "198.51.100.2"})
+        assert resp.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_batch_charged_per_message(self, stub_agent, tight):
+        """Test a batch spends one token per message."""
+        resp = await self.post("/chat/batch", {"messages": [{"message": f"q{i}"} for i in range(4)]})
+        assert resp.status_code == 200
+        resp = await self.post("/chat/batch", {"messages": [{"message": "again"}]})
+        assert resp.status_code == 429
+
+    @pytest.mark.asyncio
+    async def test_disabled(self, emitted, stub_agent, monkeypatch):
+        """Test GRAVITY_RATE_LIMIT=0 (no limiter) lets everything through."""
+        monkeypatch.setattr(server, "rate_limits", None)
+        for _ in range(15):
+            await server.user_input("sid1", {"text": "hi"})
+        assert len([name for name, _, _ in emitted if name == "response"]) == 15
+
+
+class TestShutdown:
+    """Test draining and the lifespan hooks."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_drainer(self, monkeypatch):
+        """Each test starts with a server that isn't draining and no signal hooks."""
+        monkeypatch.setattr(server, "drainer", Drainer())
+        monkeypatch.setattr(server, "_drain_task", None)
+        monkeypatch.setattr(server, "drain_on_signals", lambda: None)
+
+    @pytest.mark.asyncio
+    async def test_new_input_refused_while_draining(self, emitted, stub_agent):
+        """Test user_input gets an immediate restarting reply once draining."""
+        server.drainer.begin()
+        await server.user_input("sid1", {"text": "hi"})
+        assert emitted[0][0] == "response"
+        assert emitted[0][1]["type"] == "busy"
+        assert "restarting" in emitted[0][1]["content"]
+        assert emitted[1][1]["msg"] == "Busy"
+        assert stub_agent.client.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_http_refused_while_draining(self, stub_agent):
+        """Test /chat answers 503 and /status fails health checks while draining."""
+        import httpx
+
+        server.drainer.begin()
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            chat = await http.post("/chat", json={"message": "hi"})
+            status = await http.get("/status")
+        assert chat.status_code == 503
+        assert chat.headers["Retry-After"] == str(server.DRAIN_RETRY_AFTER)
+        assert status.status_code == 503
+        assert status.json()["status"] == "draining"
+
+    @pytest.mark.asyncio
+    async def test_shutdown_waits_for_in_flight(self, emitted, monkeypatch):
+        """Test lifespan shutdown lets a running request deliver its reply."""
+        import asyncio
+
+        agent = GravityAgent(client=StubClient(latency=0.2, reply="Finished."), router=False)
+        monkeypatch.setattr(server, "agent", agent)
+        async with server.lifespan(server.app):
+            request = asyncio.ensure_future(server.user_input("sid1", {"text": "hi"}))
+            await asyncio.sleep(0.05)
+        # Shutdown returned only after the reply went out
+        assert request.done()
+        replies = [data for name, data, _ in emitted if name == "response"]
+        assert replies == [{"type": "text", "content": "Finished."}]
+        assert ("status", {"msg": "Restarting", "retry_after": server.DRAIN_RETRY_AFTER}, None) in emitted
+
+    @pytest.mark.asyncio
+    async def test_drain_deadline(self, emitted, monkeypatch):
+        """Test shutdown doesn't hang past the drain deadline."""
+        import asyncio
+        import time
+
+        agent = GravityAgent(client=StubClient(latency=5.0), router=False)
+        monkeypatch.setattr(server, "agent", agent)
+        monkeypatch.setattr(server, "DRAIN_TIMEOUT", 0.05)
+        start = time.perf_counter()
+        async with server.lifespan(server.app):
+            request = asyncio.ensure_future(server.user_input("sid1", {"text": "hi"}))
+            await asyncio.sleep(0.01)
+        assert time.perf_counter() - start < 1.0
+        request.cancel()
+
+    @pytest.mark.asyncio
+    async def test_cache_survives_restart(self, emitted, monkeypatch, tmp_path):
+        """Test caches are snapshotted on shutdown and restored on startup."""
+        monkeypatch.setattr(server, "CACHE_SNAPSHOT_DIR", str(tmp_path))
+        first = GravityAgent(client=StubClient(latency=0, reply="Warm."), router=False)
+        monkeypatch.setattr(server, "agent", first)
+        async with server.lifespan(server.app):
+            await first.process_input("hello")
+
+        monkeypatch.setattr(server, "drainer", Drainer())
+        monkeypatch.setattr(server, "_drain_task", None)
+        stub = StubClient(latency=0, reply="Cold.")
+        second = GravityAgent(client=stub, router=False)
+        monkeypatch.setattr(server, "agent", second)
+        async with server.lifespan(server.app):
+            result = await second.process_input("hello")
+        assert result["content"] == "Warm."
+        assert stub.calls == 0
+
+
+class TestSignals:
+    """Test SIGTERM drains before the previous handler runs."""
+
+    @pytest.mark.asyncio
+    async def test_sigterm_drains_first(self, monkeypatch):
+        """Test the original handler runs only after in-flight work finishes."""
+        import asyncio
+        import os
+        import signal
+
+        monkeypatch.setattr(server, "drainer", Drainer())
+        monkeypatch.setattr(server, "_drain_task", None)
+        monkeypatch.setattr(server.sio, "emit", lambda *args, **kwargs: asyncio.sleep(0))
+        seen = []
+        originals = {s: signal.getsignal(s) for s in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            signal.signal(signal.SIGTERM, lambda signum, frame: seen.append(("previous", server.drainer.in_flight)))
+            server.drain_on_signals()
+
+            async def work():
+                with server.drainer.track():
+                    await asyncio.sleep(0.1)
+
+            task = asyncio.ensure_future(work())
+            await asyncio.sleep(0)
+            os.kill(os.getpid(), signal.SIGTERM)
+            await asyncio.sleep(0.3)
+            assert server.drainer.draining
+            assert seen == [("previous", 0)]
+            await task
+        finally:
+            for signum, handler in originals.items():
+                signal.signal(signum, handler)
+
+
+class TestMetrics:
+    """Test the /metrics endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_metrics_endpoint(self, emitted, stub_agent):
+        """Test /metrics serves Prometheus text with server and agent metrics."""
+        import httpx
+
+        connected = server.CONNECTED_CLIENTS.get()
+        await server.connect("sid1", {})
+        await server.user_input("sid1", {"text": "hi"})
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            resp = await http.get("/metrics")
+        await server.disconnect("sid1")
+
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain")
+        body = resp.text
+        assert f"gravity_socketio_connected_clients {connected + 1}" in body
+        assert 'gravity_socketio_events_total{event="user_input"}' in body
+        assert 'gravity_cache_hit_ratio{cache="reply"}' in body
+        assert "gravity_process_input_seconds_bucket" in body
+        assert "gravity_socketio_events_per_second" in body
+
+
+class TestSessions:
+    """Test per-sid history lifecycle."""
+
+    @pytest.mark.asyncio
+    async def test_disconnect_drops_history(self, emitted, stub_agent):
+        """Test a socket's history is released on disconnect."""
+        await server.user_input("sid9", {"text": "hi"})
+        assert "sid9" in stub_agent.sessions
+        await server.disconnect("sid9")
+        assert "sid9" not in stub_agent.sessions
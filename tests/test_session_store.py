@@ -0,0 +1,108 @@
+"""
+Tests for per-session conversation history.
+"""
+import pytest
+
+from session_store import SessionStore
+from gravity_agent import GravityAgent
+from response_cache import ResponseCache
+from stub_model import StubClient
+
+
+class TestConversation:
+    """Test per-session ring buffer and trimming."""
+
+    def test_ring_buffer(self):
+        """Test only the newest max_turns messages are kept."""
+        store = SessionStore(max_turns=3)
+        for i in range(5):
+            store.append("s", "user", f"m{i}")
+        assert [text for _, text in store.history("s")] == ["m2", "m3", "m4"]
+
+    def test_token_budget(self):
+        """Test oldest turns are trimmed to fit the token budget."""
+        store = SessionStore(max_turns=100, token_budget=30)
+        for i in range(10):
+            store.append("s", "user", "x" * 40)  # ~11 tokens each
+        history = store.history("s")
+        assert 1 <= len(history) <= 2
+
+    def test_drop(self):
+        """Test dropping a session frees its memory."""
+        store = SessionStore()
+        store.append("s", "user", "hello")
+        store.drop("s")
+        assert "s" not in store
+        assert store.total_bytes == 0
+
+
+class TestLimits:
+    """Test store-wide caps."""
+
+    def test_max_sessions(self):
+        """Test the least recently used session is evicted first."""
+        store = SessionStore(max_sessions=2)
+        store.append("a", "user", "1")
+        store.append("b", "user", "2")
+        store.history("a")
+        store.append("c", "user", "3")
+        assert "a" in store and "c" in store
+        assert "b" not in store
+
+    def test_memory_cap(self):
+        """Test total history bytes never exceed the cap."""
+        store = SessionStore(max_total_bytes=1000)
+        for i in range(50):
+            store.append(f"s{i}", "user", "y" * 100)
+            assert store.total_bytes <= 1000
+        assert len(store) <= 10
+
+    def test_idle_eviction(self):
+        """Test idle sessions are dropped."""
+        store = SessionStore(idle_timeout=10)
+        store.append("old", "user", "hi")
+        store.evict_idle(now=store._sessions["old"].last_used + 11)
+        assert "old" not in store
+
+
+class TestAgentSessions:
+    """Test GravityAgent threads history into prompts."""
+
+    @pytest.mark.asyncio
+    async def test_follow_up_has_context(self):
+        """Test a follow-up prompt includes the earlier turns."""
+        prompts = []
+
+        def reply(prompt):
+            prompts.append(prompt)
+            return f"answer {len(prompts)}"
+
+        agent = GravityAgent(client=StubClient(latency=0, reply=reply), cache=ResponseCache())
+        await agent.process_input("what is a list", session_id="sid1")
+        await agent.process_input("and a tuple?", session_id="sid1")
+
+        assert "Conversation so far" not in prompts[0]
+        assert "User: what is a list" in prompts[1]
+        assert "AI: answer 1" in prompts[1]
+
+    @pytest.mark.asyncio
+    async def test_sessions_are_isolated(self):
+        """Test one client's history never leaks into another's prompt."""
+        prompts = []
+
+        def reply(prompt):
+            prompts.append(prompt)
+            return "ok"
+
+        agent = GravityAgent(client=StubClient(latency=0, reply=reply), cache=ResponseCache(max_entries=0))
+        await agent.process_input("secret project", session_id="a")
+        await agent.process_input("hello", session_id="b")
+        assert "secret project" not in prompts[1]
+
+    @pytest.mark.asyncio
+    async def test_end_session(self):
+        """Test end_session forgets the history."""
+        agent = GravityAgent(client=StubClient(latency=0), cache=ResponseCache())
+        await agent.process_input("hi", session_id="sid1")
+        await agent.end_session("sid1")
+        assert agent.sessions.history("sid1") == []
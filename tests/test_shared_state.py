@@ -0,0 +1,114 @@
+"""
+Tests for shared state across server workers (Redis backend via MiniRedis).
+"""
+import pytest
+import asyncio
+
+pytest.importorskip("redis")
+
+from mini_redis import MiniRedis
+from shared_state import RedisState, create_state
+from gravity_agent import GravityAgent
+from response_cache import ResponseCache
+from stub_model import StubClient
+
+
+@pytest.fixture
+async def redis_url():
+    async with MiniRedis() as server:
+        yield server.url
+
+
+def make_agent(url, **stub_kwargs):
+    """An agent as one worker would build it: private local tiers, shared Redis."""
+    return GravityAgent(client=StubClient(latency=0, **stub_kwargs), cache=ResponseCache(), shared=RedisState(url))
+
+
+class TestRedisState:
+    """Test the key/value wrapper against MiniRedis."""
+
+    @pytest.mark.asyncio
+    async def test_set_get_delete(self, redis_url):
+        """Test values round-trip and can be deleted."""
+        state = RedisState(redis_url)
+        await state.set("k", "v", ttl=60)
+        assert await state.get("k") == "v"
+        await state.delete("k")
+        assert await state.get("k") is None
+        await state.close()
+
+    @pytest.mark.asyncio
+    async def test_ttl_expires(self, redis_url):
+        """Test entries expire after their TTL."""
+        state = RedisState(redis_url)
+        await state.set("k", "v", ttl=0.2)
+        assert await state.get("k") == "v"
+        await asyncio.sleep(1.1)
+        assert await state.get("k") is None
+        await state.close()
+
+    @pytest.mark.asyncio
+    async def test_pubsub(self, redis_url):
+        """Test PUBLISH reaches subscribers (used by Socket.IO's Redis manager)."""
+        import redis.asyncio as aioredis
+
+        client = aioredis.Redis.from_url(redis_url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe("socketio")
+        await pubsub.get_message(timeout=1)  # subscribe confirmation
+        assert await client.publish("socketio", "hello") == 1
+        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1)
+        assert message["data"] == b"hello"
+        await pubsub.aclose()
+        await client.aclose()
+
+    def test_create_state_disabled(self):
+        """Test no URL means single-process mode."""
+        assert create_state("") is None
+
+
+class TestSharedAgents:
+    """Test two workers' agents see each other's state."""
+
+    @pytest.mark.asyncio
+    async def test_reply_cache_shared(self, redis_url):
+        """Test a reply cached by one worker is served by another."""
+        first, second = make_agent(redis_url, reply="shared answer"), make_agent(redis_url)
+        await first.process_input("what is redis")
+        result = await second.process_input("What is Redis?")
+        assert result["content"] == "shared answer"
+        assert second.client.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_session_history_shared(self, redis_url):
+        """Test a session continues on another worker with its history."""
+        prompts = []
+
+        def reply(prompt):
+            prompts.append(prompt)
+            return "ok"
+
+        first, second = make_agent(redis_url, reply=reply), make_agent(redis_url, reply=reply)
+        await first.process_input("my name is Ada", session_id="s1")
+        await second.process_input("what is my name", session_id="s1")
+        assert "my name is Ada" in prompts[-1]
+
+    @pytest.mark.asyncio
+    async def test_end_session_clears_shared(self, redis_url):
+        """Test ending a session removes it for every worker."""
+        first, second = make_agent(redis_url), make_agent(redis_url)
+        await first.process_input("hi", session_id="s1")
+        await first.end_session("s1")
+        assert await second.load_history("s1") == []
+
+    @pytest.mark.asyncio
+    async def test_shared_outage_degrades(self):
+        """Test an unreachable Redis falls back to local state."""
+        agent = GravityAgent(
+            client=StubClient(latency=0, reply="local"),
+            cache=ResponseCache(),
+            shared=RedisState("redis://127.0.0.1:1/0"),
+        )
+        result = await agent.process_input("hello", session_id="s1")
+        assert result["content"] == "local"
+        assert agent.sessions.history("s1")
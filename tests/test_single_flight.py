@@ -0,0 +1,134 @@
+"""
+Tests for request coalescing (single-flight).
+"""
+import pytest
+import asyncio
+
+from single_flight import LeaderAbandoned, SingleFlight
+from gravity_agent import GravityAgent
+from response_cache import ResponseCache
+from stub_model import StubClient
+
+
+class TestSingleFlight:
+    """Test the coalescing primitive."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_result(self):
+        """Test concurrent callers with one key run fn once."""
+        flights = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return "done"
+
+        results = await asyncio.gather(*(flights.do("k", work) for _ in range(5)))
+        assert results == ["done"] * 5
+        assert len(calls) == 1
+        assert flights.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 4}
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate(self):
+        """Test every caller sees the shared failure."""
+        flights = SingleFlight()
+
+        async def boom():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(*(flights.do("k", boom) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_leader_cancel_does_not_cancel_followers(self):
+        """Test cancelling the first caller leaves the shared call running."""
+        flights = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        leader = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await follower == "ok"
+
+
+    @pytest.mark.asyncio
+    async def test_abandoned_leader_hands_over(self):
+        """Test followers of a leader that gives up retry, and one of them leads, instead of being cancelled."""
+        flights = SingleFlight()
+        flights.claim("k")
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        followers = [asyncio.create_task(flights.do("k", work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        flights.abandon("k")
+        assert await asyncio.gather(*followers) == ["ok"] * 3
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_join_raises_leader_abandoned(self):
+        """Test a joined follower learns the leader went away with an ordinary exception."""
+        flights = SingleFlight()
+        flights.claim("k")
+        follower = asyncio.create_task(flights.join("k"))
+        await asyncio.sleep(0)
+        flights.abandon("k")
+        with pytest.raises(LeaderAbandoned):
+            await follower
+
+
+class TestAgentCoalescing:
+    """Test GravityAgent coalesces identical prompts."""
+
+    @pytest.mark.asyncio
+    async def test_burst_makes_one_model_call(self):
+        """Test a burst of identical prompts hits the model once."""
+        stub = StubClient(latency=0.05, reply="Shared answer.")
+        agent = GravityAgent(client=stub, cache=ResponseCache(max_entries=0))
+        results = await asyncio.gather(*(agent.process_input("Explain closures") for _ in range(6)))
+        assert all(r == {"type": "text", "content": "Shared answer."} for r in results)
+        assert stub.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_followers_share_stream(self):
+        """Test a second streaming caller waits on the first one's reply."""
+        stub = StubClient(latency=0.05, reply="Streamed once.", chunk_size=4)
+        agent = GravityAgent(client=stub, cache=ResponseCache(max_entries=0))
+
+        async def collect():
+            return [e async for e in agent.stream_input("Explain closures")]
+
+        first, second = await asyncio.gather(collect(), collect())
+        assert stub.calls == 1
+        assert first[-1] == second[-1]
+        assert second[0] == {"type": "chunk", "content": "Streamed once."}
+
+    @pytest.mark.asyncio
+    async def test_abandoned_stream_hands_over_to_stream_follower(self):
+        """Test a streaming follower takes over when the streaming leader's consumer goes away."""
+        stub = StubClient(latency=0.1, reply="Streamed twice.", chunk_size=2)
+        agent = GravityAgent(client=stub, cache=ResponseCache(max_entries=0))
+        leader = agent.stream_input("Explain closures")
+        await leader.__anext__()
+
+        async def collect():
+            return [e async for e in agent.stream_input("Explain closures")]
+
+        follower = asyncio.create_task(collect())
+        while not agent.flights.stats()["coalesced"]:
+            await asyncio.sleep(0.005)
+        await leader.aclose()
+        events = await follower
+        assert events[-1] == {"type": "done", "result": {"type": "text", "content": "Streamed twice."}}
+        assert stub.calls == 2
@@ -0,0 +1,170 @@
+"""
+Tests for voice activity detection engines and the speech gate.
+Uses synthetic PCM chunks, so no microphone is required.
+"""
+import numpy as np
+import pytest
+
+import vad
+from bench_vad import legacy_rms, make_chunks, run_benchmark
+from vad import EnergyVAD, SpectralVAD, SpeechGate, make_vad, rms, samples_of
+
+RATE = 16000
+CHUNK = 1024
+
+
+def pcm(signal):
+    return np.clip(signal, -32768, 32767).astype("<i2").tobytes()
+
+
+def tone(freq, amplitude, n=CHUNK):
+    return pcm(amplitude * np.sin(2 * np.pi * freq * np.arange(n) / RATE))
+
+
+def noise(amplitude, seed=0, n=CHUNK):
+    return pcm(np.random.default_rng(seed).normal(0, amplitude, n))
+
+
+SPEECH = make_chunks(1, CHUNK, RATE)[0]
+SILENCE = bytes(2 * CHUNK)
+MIC_CHUNK = 320  # ada.CHUNK_SIZE
+
+
+class FakeWebrtcvad:
+    """Stands in for the webrtcvad module: loud frames are speech, odd frame lengths raise like the real one."""
+
+    class Vad:
+        def __init__(self, mode):
+            self.frames = []
+
+        def is_speech(self, frame, sample_rate):
+            if len(frame) // 2 not in (sample_rate // 100, sample_rate // 50, sample_rate * 3 // 100):
+                raise ValueError("Error while processing frame")
+            self.frames.append(len(frame) // 2)
+            return rms(samples_of(frame)) > 800
+
+
+class TestRms:
+    """Test the numpy RMS against the original pure-Python one."""
+
+    def test_matches_legacy(self):
+        """Test the RMS agrees with struct.unpack + sum on random audio."""
+        for seed in range(5):
+            data = noise(3000, seed)
+            assert int(rms(samples_of(data))) == pytest.approx(legacy_rms(data), abs=1)
+
+    def test_empty_and_odd(self):
+        """Test empty chunks score 0 and a trailing odd byte is ignored."""
+        assert rms(samples_of(b"")) == 0.0
+        assert rms(samples_of(b"\x10\x00\x10")) == 16.0
+
+
+class TestEngines:
+    """Test the per-chunk speech decision of each engine."""
+
+    def test_energy_threshold(self):
+        """Test the energy engine compares RMS with its threshold."""
+        engine = EnergyVAD(RATE, threshold=800)
+        assert engine.is_speech(samples_of(tone(440, 2000)))
+        assert not engine.is_speech(samples_of(tone(440, 500)))
+
+    def test_spectral_speech_over_noise(self):
+        """Test the spectral engine fires on voiced audio but learns steady noise."""
+        engine = SpectralVAD(RATE)
+        for seed in range(20):
+            assert not engine.is_speech(samples_of(noise(400, seed)))
+        assert engine.is_speech(samples_of(SPEECH))
+
+    def test_spectral_ignores_hum(self):
+        """Test loud energy outside the voice band (mains hum) isn't speech."""
+        engine = SpectralVAD(RATE)
+        engine.is_speech(samples_of(noise(50)))
+        assert not engine.is_speech(samples_of(tone(50, 8000)))
+
+    def test_spectral_quiet_is_silence(self):
+        """Test digital silence is never speech."""
+        assert not SpectralVAD(RATE).is_speech(samples_of(SILENCE))
+
+    def test_unknown_engine(self):
+        """Test a typo in the engine name fails loudly."""
+        with pytest.raises(ValueError):
+            make_vad("neural", RATE)
+
+    def test_webrtc_fallback(self, monkeypatch):
+        """Test asking for webrtc without the package falls back to spectral."""
+        monkeypatch.setattr(vad, "HAS_WEBRTCVAD", False)
+        assert isinstance(make_vad("webrtc", RATE), SpectralVAD)
+
+    def test_webrtc_mic_chunks(self, monkeypatch):
+        """Test the WebRTC engine gates the 20 ms chunks the mic is read in."""
+        monkeypatch.setattr(vad, "webrtcvad", FakeWebrtcvad)
+        monkeypatch.setattr(vad, "HAS_WEBRTCVAD", True)
+        gate = SpeechGate(make_vad("webrtc", RATE), hangover=0.1)
+        speech = make_chunks(1, MIC_CHUNK, RATE)[0]
+        events = [gate.update(speech) for _ in range(3)] + [gate.update(bytes(2 * MIC_CHUNK)) for _ in range(6)]
+        assert events[0] == "start"
+        assert "end" in events
+        assert set(gate.detector.vad.frames) == {MIC_CHUNK}
+
+    def test_webrtc_carries_remainder(self, monkeypatch):
+        """Test samples left over from a chunk that isn't a whole number of frames start the next frame."""
+        monkeypatch.setattr(vad, "webrtcvad", FakeWebrtcvad)
+        monkeypatch.setattr(vad, "HAS_WEBRTCVAD", True)
+        engine = make_vad("webrtc", RATE)
+        assert engine.is_speech(samples_of(tone(220, 3000, n=500)))
+        assert engine.is_speech(samples_of(tone(220, 3000, n=140)))
+        assert engine.vad.frames == [320, 320]
+        assert not engine.is_speech(samples_of(SILENCE))
+
+
+class TestSpeechGate:
+    """Test utterance start/end smoothing."""
+
+    def test_start_and_hangover(self):
+        """Test speech starts at once and ends only after hangover seconds of silence."""
+        gate = SpeechGate(EnergyVAD(RATE), hangover=0.2)
+        assert gate.update(SPEECH) == "start"
+        assert gate.update(SPEECH) is None
+        # 1024 samples at 16 kHz = 64 ms, so the fourth silent chunk passes 0.2 s
+        assert [gate.update(SILENCE) for _ in range(4)] == [None, None, None, "end"]
+        assert not gate.speaking
+
+    def test_short_pause_keeps_utterance(self):
+        """Test a pause shorter than the hangover doesn't split an utterance."""
+        gate = SpeechGate(EnergyVAD(RATE), hangover=0.2)
+        events = [gate.update(chunk) for chunk in (SPEECH, SILENCE, SILENCE, SPEECH, SILENCE, SILENCE)]
+        assert events == ["start", None, None, None, None, None]
+        assert gate.speaking
+
+    def test_attack(self):
+        """Test a single loud click doesn't start speech when attack needs several chunks."""
+        gate = SpeechGate(EnergyVAD(RATE), attack=2)
+        assert gate.update(SPEECH) is None
+        assert gate.update(SILENCE) is None
+        assert gate.update(SPEECH) is None
+        assert gate.update(SPEECH) == "start"
+
+    def test_level(self):
+        """Test the gate reports the last chunk's RMS for logging."""
+        gate = SpeechGate(EnergyVAD(RATE))
+        gate.update(SPEECH)
+        assert gate.level == pytest.approx(legacy_rms(SPEECH), abs=1)
+
+    def test_from_env(self, monkeypatch):
+        """Test the engine and its settings are read from GRAVITY_VAD* variables."""
+        monkeypatch.setenv("GRAVITY_VAD", "energy")
+        monkeypatch.setenv("GRAVITY_VAD_THRESHOLD", "1200")
+        monkeypatch.setenv("GRAVITY_VAD_HANGOVER", "1.5")
+        gate = SpeechGate.from_env(RATE)
+        assert gate.detector.threshold == 1200
+        assert gate.hangover == 1.5
+
+
+class TestBenchmark:
+    """Test the benchmark runs and reports every engine."""
+
+    def test_report(self):
+        """Test a short run reports per-chunk time for the baseline and numpy engines."""
+        report = run_benchmark(chunks=20)
+        assert {"legacy (struct + sum)", "energy (numpy)", "spectral (numpy fft)"} <= set(report["results"])
+        assert all(result["us_per_chunk"] >= 0 for result in report["results"].values())